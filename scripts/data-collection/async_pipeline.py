@@ -0,0 +1,391 @@
+#!/usr/bin/env python3
+"""
+Overlapped scrape → normalize → dedupe → quality filter → JSONL pipeline
+Stages run concurrently and are connected by bounded asyncio queues
+
+Entries flow downstream as soon as a match is scraped, so filtering and
+writing happen while the next pages are still downloading. When a downstream
+stage falls behind, its input queue fills up and the upstream stage blocks on
+put() (backpressure) instead of buffering the whole crawl in memory. CPU-bound
+batches run in a worker thread so the event loop keeps scheduling fetches.
+
+Wall time is close to the slowest stage, not the sum of all stages; the run
+report shows busy time per stage and queue depths to find that stage.
+
+Batches are lists of (url, entries) groups, one per scraped match, and a
+match's group is never split, so the writer knows how many entries of each
+match survived deduplication and filtering and reports that to the crawl
+scheduler.
+"""
+
+import os
+import time
+import asyncio
+from collections import Counter
+from typing import Awaitable, Callable, Dict, Iterable, List, Optional, Tuple
+import logging
+
+from commentary_entry import entry_to_json
+from near_duplicates import NearDuplicateFilter
+from quality_filter import check_commentary
+from stream_pipeline import normalize_entries
+from streaming_metrics import QualityMetrics
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+# Marks the end of a queue's stream
+END = None
+
+# A batch: (url, entries) groups
+Batch = List[Tuple[str, List[Dict]]]
+
+
+def _count(batch: Batch) -> int:
+    return sum(len(entries) for _, entries in batch)
+
+
+class StageMetrics:
+    """Counters of one stage"""
+
+    def __init__(self, name: str):
+        self.name = name
+        self.entries_in = 0
+        self.entries_out = 0
+        self.busy_seconds = 0.0
+        self.blocked_puts = 0
+        self.blocked_seconds = 0.0
+
+    def to_dict(self) -> Dict:
+        return {
+            'entries_in': self.entries_in,
+            'entries_out': self.entries_out,
+            'busy_seconds': round(self.busy_seconds, 3),
+            'blocked_puts': self.blocked_puts,
+            'blocked_seconds': round(self.blocked_seconds, 3),
+        }
+
+
+class QueueDepth:
+    """Depth samples of one queue (in batches)"""
+
+    def __init__(self, queue: asyncio.Queue):
+        self.queue = queue
+        self.samples = 0
+        self.total = 0
+        self.max = 0
+
+    def sample(self):
+        depth = self.queue.qsize()
+        self.samples += 1
+        self.total += depth
+        self.max = max(self.max, depth)
+
+    def to_dict(self) -> Dict:
+        return {
+            'capacity': self.queue.maxsize,
+            'mean': round(self.total / self.samples, 2) if self.samples else 0,
+            'max': self.max,
+        }
+
+
+async def _put(queue: asyncio.Queue, item, metrics: StageMetrics):
+    """Put with backpressure accounting"""
+    if not queue.full():
+        queue.put_nowait(item)
+        return
+
+    metrics.blocked_puts += 1
+    started = time.perf_counter()
+    await queue.put(item)
+    metrics.blocked_seconds += time.perf_counter() - started
+
+
+async def _get_batch(queue: asyncio.Queue, max_entries: int) -> Optional[Batch]:
+    """
+    Wait for one batch, then merge whatever else is already queued
+
+    Returns:
+        (url, entries) groups, or None once the upstream stage has finished
+    """
+    batch = await queue.get()
+    if batch is END:
+        return None
+
+    while _count(batch) < max_entries and not queue.empty():
+        more = queue.get_nowait()
+        if more is END:
+            # Leave the marker for the next call
+            queue.put_nowait(END)
+            break
+        batch = batch + more
+
+    return batch
+
+
+class AsyncCommentaryPipeline:
+    """Bounded-queue pipeline from match URLs to a filtered JSONL file"""
+
+    def __init__(
+        self,
+        fetch: Callable[[str], Awaitable[List[Dict]]],
+        output_file: str,
+        raw_file: Optional[str] = None,
+        strict: bool = False,
+        dedup_threshold: float = 0.8,
+        concurrency: int = 4,
+        queue_size: int = 32,
+        batch_size: int = 500,
+        monitor_interval: float = 0.5,
+        scheduler=None
+    ):
+        """
+        Initialize pipeline
+
+        Args:
+            fetch: Coroutine function returning the commentary of one match URL
+            output_file: Filtered JSONL output
+            raw_file: Optional JSONL copy of everything scraped
+            strict: Apply stricter filtering criteria
+            dedup_threshold: Jaccard similarity above which entries are duplicates
+            concurrency: Matches scraped at the same time
+            queue_size: Capacity of each inter-stage queue, in batches
+            batch_size: Maximum entries processed per CPU batch
+            monitor_interval: Seconds between queue depth samples
+            scheduler: Optional CrawlScheduler deciding which match to fetch next
+                (and when to stop); URLs passed to run() are added to it
+        """
+        self.fetch = fetch
+        self.output_file = output_file
+        self.raw_file = raw_file
+        self.strict = strict
+        self.concurrency = concurrency
+        self.queue_size = queue_size
+        self.batch_size = batch_size
+        self.monitor_interval = monitor_interval
+        self.scheduler = scheduler
+
+        self.dedup = NearDuplicateFilter(threshold=dedup_threshold)
+        self.rejections = Counter()
+        self.metrics = QualityMetrics()
+        self.failed_urls: List[str] = []
+        self.stages = {name: StageMetrics(name) for name in ('scrape', 'dedupe', 'filter', 'write')}
+
+    async def run(self, urls: Iterable[str]) -> Dict:
+        """
+        Scrape and filter all URLs
+
+        Args:
+            urls: Match URLs
+
+        Returns:
+            Run report (counts, rejections, stage and queue metrics)
+        """
+        url_queue = asyncio.Queue()
+        if self.scheduler is not None:
+            self.scheduler.add_urls(urls)
+        else:
+            for url in urls:
+                url_queue.put_nowait(url)
+
+        scraped = asyncio.Queue(self.queue_size)
+        unique = asyncio.Queue(self.queue_size)
+        accepted = asyncio.Queue(self.queue_size)
+        depths = {'scraped': QueueDepth(scraped), 'unique': QueueDepth(unique), 'accepted': QueueDepth(accepted)}
+
+        started = time.perf_counter()
+        raw = open(self.raw_file, 'w', encoding='utf-8') if self.raw_file else None
+        monitor = asyncio.create_task(self._monitor(depths))
+
+        async def scrape_all():
+            scrapers = [
+                asyncio.create_task(self._scrape(url_queue, scraped, raw))
+                for _ in range(self.concurrency)
+            ]
+            try:
+                await asyncio.gather(*scrapers)
+            except BaseException:
+                for scraper in scrapers:
+                    scraper.cancel()
+                raise
+            await scraped.put(END)
+
+        # All stages are awaited together: if one fails, the queues around it
+        # stop draining, so the others are cancelled instead of blocking on put()
+        stages = [
+            asyncio.create_task(scrape_all()),
+            asyncio.create_task(self._dedupe(scraped, unique)),
+            asyncio.create_task(self._filter(unique, accepted)),
+            asyncio.create_task(self._write(accepted)),
+        ]
+        try:
+            done, _ = await asyncio.wait(stages, return_when=asyncio.FIRST_EXCEPTION)
+            for task in done:
+                # Re-raises the failure of a stage
+                task.result()
+        finally:
+            for task in stages:
+                task.cancel()
+            await asyncio.gather(*stages, return_exceptions=True)
+            monitor.cancel()
+            if raw:
+                raw.close()
+            # Only left behind when the writer did not finish
+            if os.path.exists(self._tmp_path):
+                os.remove(self._tmp_path)
+
+        wall = time.perf_counter() - started
+        # Scrape time is summed over concurrent fetches; compare stages per worker slot
+        busy = [stage.busy_seconds for stage in self.stages.values()]
+        busy[0] /= self.concurrency
+
+        return {
+            'urls_failed': self.failed_urls,
+            'scraped': self.stages['scrape'].entries_out,
+            'unique': self.stages['dedupe'].entries_out,
+            'written': self.stages['write'].entries_out,
+            'rejections': dict(self.rejections),
+            'wall_seconds': round(wall, 3),
+            'sum_stage_seconds': round(sum(busy), 3),
+            'max_stage_seconds': round(max(busy), 3),
+            'stages': {name: stage.to_dict() for name, stage in self.stages.items()},
+            'queues': {name: depth.to_dict() for name, depth in depths.items()},
+        }
+
+    async def _monitor(self, depths: Dict[str, QueueDepth]):
+        while True:
+            for depth in depths.values():
+                depth.sample()
+            await asyncio.sleep(self.monitor_interval)
+
+    async def _next_url(self, url_queue: asyncio.Queue) -> Optional[str]:
+        if self.scheduler is None:
+            return None if url_queue.empty() else url_queue.get_nowait()
+
+        while True:
+            url = self.scheduler.next()
+            # A source can look full only because of matches still in flight
+            if url is not None or self.scheduler.done or not self.scheduler.in_flight:
+                return url
+            await asyncio.sleep(0.1)
+
+    async def _scrape(self, url_queue: asyncio.Queue, out: asyncio.Queue, raw):
+        metrics = self.stages['scrape']
+        while (url := await self._next_url(url_queue)) is not None:
+            metrics.entries_in += 1
+
+            started = time.perf_counter()
+            try:
+                commentary = await self.fetch(url)
+            except Exception as e:
+                logger.error(f"❌ Error scraping {url}: {e}")
+                self.failed_urls.append(url)
+                commentary = []
+            finally:
+                metrics.busy_seconds += time.perf_counter() - started
+
+            commentary = list(commentary or [])
+            if self.scheduler is not None:
+                self.scheduler.record_scraped(url, len(commentary))
+
+            metrics.entries_out += len(commentary)
+            if raw and commentary:
+                raw.write(''.join(entry_to_json(entry) + '\n' for entry in commentary))
+            # Empty groups go downstream too: the writer reports every match to the scheduler
+            await _put(out, [(url, commentary)], metrics)
+
+    async def _dedupe(self, source: asyncio.Queue, out: asyncio.Queue):
+        metrics = self.stages['dedupe']
+
+        def process(batch: Batch) -> Batch:
+            groups = [(url, list(normalize_entries(entries))) for url, entries in batch]
+            # One vectorized hashing pass over the whole batch
+            flags = iter(self.dedup.flag_duplicates([entry.text for _, entries in groups for entry in entries]))
+            return [(url, [entry for entry in entries if not next(flags)]) for url, entries in groups]
+
+        while (batch := await _get_batch(source, self.batch_size)) is not None:
+            metrics.entries_in += _count(batch)
+            started = time.perf_counter()
+            kept = await asyncio.to_thread(process, batch)
+            metrics.busy_seconds += time.perf_counter() - started
+
+            metrics.entries_out += _count(kept)
+            await _put(out, kept, metrics)
+
+        await out.put(END)
+
+    async def _filter(self, source: asyncio.Queue, out: asyncio.Queue):
+        metrics = self.stages['filter']
+
+        def process(batch: Batch) -> Batch:
+            groups = []
+            for url, entries in batch:
+                kept = []
+                for entry in entries:
+                    reason = check_commentary(entry, strict=self.strict)
+                    if reason is None:
+                        kept.append(entry)
+                    else:
+                        self.rejections[reason] += 1
+                groups.append((url, kept))
+            return groups
+
+        while (batch := await _get_batch(source, self.batch_size)) is not None:
+            metrics.entries_in += _count(batch)
+            started = time.perf_counter()
+            kept = await asyncio.to_thread(process, batch)
+            metrics.busy_seconds += time.perf_counter() - started
+
+            metrics.entries_out += _count(kept)
+            await _put(out, kept, metrics)
+
+        await out.put(END)
+
+    @property
+    def _tmp_path(self) -> str:
+        return f"{self.output_file}.tmp"
+
+    async def _write(self, source: asyncio.Queue):
+        metrics = self.stages['write']
+        tmp_path = self._tmp_path
+
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            while (batch := await _get_batch(source, self.batch_size)) is not None:
+                entries = [entry for _, group in batch for entry in group]
+                metrics.entries_in += len(entries)
+                started = time.perf_counter()
+                f.write(''.join(entry_to_json(entry) + '\n' for entry in entries))
+                f.flush()
+                self.metrics.update_many(entries)
+                metrics.entries_out += len(entries)
+                metrics.busy_seconds += time.perf_counter() - started
+
+                if self.scheduler is not None:
+                    for url, group in batch:
+                        self.scheduler.record_accepted(url, len(group))
+
+        os.replace(tmp_path, self.output_file)
+
+
+def log_pipeline_report(report: Dict):
+    """Log counts, per-stage busy time and queue depths"""
+    logger.info(f"\n✅ Streaming pipeline complete in {report['wall_seconds']:.1f}s "
+                f"(stage sum {report['sum_stage_seconds']:.1f}s, slowest {report['max_stage_seconds']:.1f}s)")
+    logger.info(f"   Scraped: {report['scraped']}")
+    logger.info(f"   After deduplication: {report['unique']}")
+    logger.info(f"   After quality filter: {report['written']}")
+    if report['urls_failed']:
+        logger.info(f"   Failed URLs: {len(report['urls_failed'])}")
+
+    logger.info(f"\n⏱️  Stages:")
+    for name, stage in report['stages'].items():
+        logger.info(f"   {name:<8} busy {stage['busy_seconds']:>8.2f}s  "
+                    f"in {stage['entries_in']:>7}  out {stage['entries_out']:>7}  "
+                    f"blocked puts {stage['blocked_puts']} ({stage['blocked_seconds']:.2f}s)")
+
+    logger.info(f"\n📥 Queue depth (batches):")
+    for name, depth in report['queues'].items():
+        logger.info(f"   {name:<8} mean {depth['mean']:>6}  max {depth['max']:>4}/{depth['capacity']}")
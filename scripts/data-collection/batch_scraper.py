@@ -2,6 +2,10 @@
 """
 Batch Commentary Scraper
 Scrapes multiple matches and combines into training dataset
+
+The combined commentary is written as a columnar dataset (dataset_store.py),
+which read_entries() and the exporters accept wherever they take a file;
+`python dataset_store.py export` turns it back into JSONL.
 """
 
 import asyncio
@@ -9,11 +13,16 @@ import json
 import sys
 from pathlib import Path
 from scrapers.lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+from dataset_store import DatasetWriter
+from streaming_metrics import QualityMetrics
 import logging
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+PROGRESS_DATASET = 'data/store/batch_progress'
+OUTPUT_DATASET = 'data/store/training_commentary'
+
 
 async def scrape_all_matches(match_file: str = 'data/lequipe_commented_matches.json'):
     """
@@ -33,6 +42,7 @@ async def scrape_all_matches(match_file: str = 'data/lequipe_commented_matches.j
 
     scraper = LeQuipeFinishedMatchScraper()
     all_commentary = []
+    metrics = QualityMetrics()
 
     for i, match in enumerate(fully_commented, 1):
         url = match['url']
@@ -48,12 +58,13 @@ async def scrape_all_matches(match_file: str = 'data/lequipe_commented_matches.j
             if commentary:
                 logger.info(f"✅ Scraped {len(commentary)} entries")
                 all_commentary.extend(commentary)
+                metrics.update_many(commentary)
             else:
                 logger.warning(f"⚠️  No commentary extracted")
 
             # Save progress after each match
-            with open('data/batch_progress.json', 'w', encoding='utf-8') as f:
-                json.dump(all_commentary, f, ensure_ascii=False, indent=2)
+            with DatasetWriter(PROGRESS_DATASET) as writer:
+                writer.write_many(all_commentary)
 
         except Exception as e:
             logger.error(f"❌ Error scraping {title}: {e}")
@@ -70,32 +81,26 @@ async def scrape_all_matches(match_file: str = 'data/lequipe_commented_matches.j
     logger.info(f"{'='*70}")
     logger.info(f"✅ Total commentary entries: {len(all_commentary)}")
 
-    # Group by source
-    by_source = {}
-    for entry in all_commentary:
-        source = entry.get('source', 'unknown')
-        by_source[source] = by_source.get(source, 0) + 1
+    # Metrics were accumulated match by match
+    report = metrics.to_dict()
+
+    if report:
+        logger.info(f"   Avg length: {report['avg_length_chars']:.0f} chars ({report['avg_length_words']:.0f} words)")
+        logger.info(f"   Vocabulary size: ~{report['vocabulary_size']} unique words")
 
     logger.info(f"\n📊 By source:")
-    for source, count in by_source.items():
+    for source, count in metrics.sources.items():
         logger.info(f"   {source}: {count}")
 
-    # Group by event type
-    by_type = {}
-    for entry in all_commentary:
-        event_type = entry.get('event_type', 'unknown')
-        by_type[event_type] = by_type.get(event_type, 0) + 1
-
     logger.info(f"\n📊 By event type:")
-    for event_type, count in sorted(by_type.items(), key=lambda x: x[1], reverse=True):
+    for event_type, count in sorted(metrics.event_types.items(), key=lambda x: x[1], reverse=True):
         logger.info(f"   {event_type}: {count}")
 
     # Save final dataset
-    output_file = 'data/training_commentary.json'
-    with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(all_commentary, f, ensure_ascii=False, indent=2)
+    with DatasetWriter(OUTPUT_DATASET) as writer:
+        writer.write_many(all_commentary)
 
-    logger.info(f"\n💾 Saved to: {output_file}")
+    logger.info(f"\n💾 Saved to: {OUTPUT_DATASET}")
 
     return all_commentary
 
@@ -111,8 +116,8 @@ async def main():
     logger.info(f"\n{'='*70}")
     logger.info("NEXT STEPS")
     logger.info(f"{'='*70}")
-    logger.info("1. Review quality: python quality_filter.py")
-    logger.info("2. Export to JSONL: python export_to_jsonl.py")
+    logger.info(f"1. Review quality: python quality_filter.py {OUTPUT_DATASET}")
+    logger.info(f"2. Export to JSONL: python export_to_jsonl.py {OUTPUT_DATASET} data/mistral_training.jsonl")
     logger.info("3. Upload to Google Colab for fine-tuning")
     logger.info(f"{'='*70}\n")
 
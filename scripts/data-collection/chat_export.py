@@ -0,0 +1,419 @@
+#!/usr/bin/env python3
+"""
+Chat-format training exporter
+One engine for every training format: commentary in, chat JSONL shards out
+
+- Input is streamed (JSONL, dataset directory, or legacy JSON list)
+- Templates: mistral (Colab notebook), llama3 (runpod_finetuner / Axolotl
+  chat_template llama3), ollama (system / prompt / response records), and
+  the historical formats of export_to_jsonl.py (lequipe) and of the review
+  app export (review)
+- Rendering and serialization run in worker processes, batch by batch;
+  orjson is used when installed
+- Train / validation split is a hash of the commentary text, so an entry
+  always lands in the same split whatever the input order or run
+- Statistics (event types, lengths, split sizes) are collected in the same pass
+
+Usage:
+    python chat_export.py data/training_commentary.json data/mistral_training.jsonl
+    python chat_export.py data/filtered_commentary.jsonl data/llama3_training.jsonl \\
+        --template llama3 --val-fraction 0.05 --shards 4 --processes 4
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from collections import Counter
+from contextlib import nullcontext
+from itertools import islice
+from multiprocessing import Pool
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from stream_pipeline import read_entries
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up, json is used otherwise
+    orjson = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+EVENT_TYPES_FR = {
+    'commentary': 'Commentaire général',
+    'goal': 'But',
+    'yellow_card': 'Carton jaune',
+    'red_card': 'Carton rouge',
+    'substitution': 'Remplacement',
+    'penalty': 'Pénalty'
+}
+
+SPLIT_BUCKETS = 1_000_000
+
+
+def _loads(line: str) -> Dict:
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def _dumps(record: Dict) -> bytes:
+    """One JSONL line, UTF-8 encoded"""
+    if orjson is not None:
+        return orjson.dumps(record) + b'\n'
+    return (json.dumps(record, ensure_ascii=False) + '\n').encode('utf-8')
+
+
+class ChatTemplate:
+    """System prompt, user prompt and record layout of one training format"""
+
+    def __init__(self, name: str, system: str, user: Callable[[str, str], str], layout: str = 'messages'):
+        """
+        Initialize template
+
+        Args:
+            name: Template name
+            system: System prompt
+            user: Builds the user prompt from (time, event_type)
+            layout: 'messages' (system/user/assistant chat) or 'prompt' (system/prompt/response)
+        """
+        self.name = name
+        self.system = system
+        self.user = user
+        self.layout = layout
+
+    def render(self, time: str, event_type: str, text: str) -> Dict:
+        """Training record of one commentary"""
+        if self.layout == 'prompt':
+            return {'system': self.system, 'prompt': self.user(time, event_type), 'response': text}
+
+        return {
+            "messages": [
+                {"role": "system", "content": self.system},
+                {"role": "user", "content": self.user(time, event_type)},
+                {"role": "assistant", "content": text}
+            ]
+        }
+
+
+TEMPLATES = {
+    # Format of the Colab notebook (export_to_mistral_jsonl.py)
+    'mistral': ChatTemplate(
+        'mistral',
+        "Tu es un commentateur sportif professionnel pour L'Équipe, spécialisé dans le football. "
+        "Ton style est vif, précis, émotionnel mais jamais sensationnaliste. "
+        "Tu varies ton vocabulaire et ta structure de phrases.",
+        lambda time, event_type: (
+            f"Génère un commentaire de match pour:\n\nMinute: {time}\n"
+            f"Type d'événement: {EVENT_TYPES_FR.get(event_type, event_type)}\n\nCommentaire:"
+        )
+    ),
+    # Format of runpod_collect_with_playwright.py, trained by runpod_finetuner.py (chat_template: llama3)
+    'llama3': ChatTemplate(
+        'llama3',
+        "Tu es un commentateur sportif professionnel pour Afrique Sports. Tu génères des commentaires "
+        "de match en français, avec un style vivant, précis et engageant, similaire à L'Équipe.",
+        lambda time, event_type: f"Génère un commentaire pour: Minute {time} - {event_type}"
+    ),
+    # Modelfile SYSTEM prompt and `ollama run` prompt of TRAINING_GUIDE.md
+    'ollama': ChatTemplate(
+        'ollama',
+        "Tu es un commentateur sportif professionnel pour Afrique Sports, spécialisé dans le football "
+        "africain. Ton style s'inspire de L'Équipe: vif, précis, émotionnel mais jamais sensationnaliste.",
+        lambda time, event_type: (
+            f"Génère un commentaire pour minute {time} - {EVENT_TYPES_FR.get(event_type, event_type)}"
+        ),
+        layout='prompt'
+    ),
+    # Format of export_to_jsonl.py, kept so re-exports match earlier training files
+    'lequipe': ChatTemplate(
+        'lequipe',
+        "Tu es un commentateur sportif professionnel pour L'Équipe, spécialisé dans le football africain. "
+        "Ton style est vif, précis, émotionnel mais jamais sensationnaliste.",
+        lambda time, event_type: f"Génère un commentaire pour: Minute {time} - Événement: {event_type}"
+    ),
+    # Format of review_app.py's /api/export_approved (commentary_training.jsonl)
+    'review': ChatTemplate(
+        'review',
+        "Tu es un commentateur sportif professionnel pour L'Équipe.",
+        lambda time, event_type: f"Génère un commentaire pour: Minute {time} - {event_type}"
+    ),
+}
+
+
+def split_hash(text: str) -> int:
+    """Stable 64-bit hash of a commentary text"""
+    return int.from_bytes(hashlib.blake2b(text.encode('utf-8'), digest_size=8).digest(), 'big')
+
+
+def shard_path(output_file: str, split: str, index: int, shards: int) -> str:
+    """
+    Output path of one shard
+
+    data/out.jsonl → data/out.jsonl (train, 1 shard), data/out.val.jsonl,
+    data/out-00000-of-00004.jsonl, data/out.val-00000-of-00004.jsonl
+    """
+    base, ext = os.path.splitext(output_file)
+    if split == 'validation':
+        base += '.val'
+    if shards > 1:
+        base += f'-{index:05d}-of-{shards:05d}'
+    return base + (ext or '.jsonl')
+
+
+def new_stats() -> Dict:
+    return {
+        'examples': 0,
+        'train': 0,
+        'validation': 0,
+        'skipped_short': 0,
+        'chars_total': 0,
+        'chars_min': None,
+        'chars_max': 0,
+        'event_types': Counter(),
+    }
+
+
+def merge_stats(total: Dict, part: Dict) -> Dict:
+    for key in ('examples', 'train', 'validation', 'skipped_short', 'chars_total'):
+        total[key] += part[key]
+    if part['chars_min'] is not None:
+        total['chars_min'] = part['chars_min'] if total['chars_min'] is None else min(total['chars_min'], part['chars_min'])
+    total['chars_max'] = max(total['chars_max'], part['chars_max'])
+    total['event_types'].update(part['event_types'])
+    return total
+
+
+def _render_batch(
+    batch: List,
+    template: str,
+    min_length: int,
+    val_fraction: float,
+    shards: int
+) -> Tuple[Dict[Tuple[str, int], bytes], Dict, Optional[Dict]]:
+    """
+    Worker: render and serialize a batch of (time, event_type, text) rows
+
+    Rows may also be raw JSONL lines, parsed here so that parsing is spread
+    over the workers as well.
+
+    Returns:
+        (serialized lines per (split, shard), batch stats, first rendered record)
+    """
+    chat = TEMPLATES[template]
+    threshold = int(val_fraction * SPLIT_BUCKETS)
+    lines: Dict[Tuple[str, int], List[bytes]] = {}
+    stats = new_stats()
+    first = None
+
+    for row in batch:
+        if type(row) is str:
+            row = _row(_loads(row))
+        time, event_type, text = row
+        length = len(text)
+        if length < min_length:
+            stats['skipped_short'] += 1
+            continue
+
+        digest = split_hash(text)
+        split = 'validation' if digest % SPLIT_BUCKETS < threshold else 'train'
+        shard = (digest // SPLIT_BUCKETS) % shards
+
+        record = chat.render(time, event_type, text)
+        if first is None:
+            first = record
+        lines.setdefault((split, shard), []).append(_dumps(record))
+
+        stats['examples'] += 1
+        stats[split] += 1
+        stats['chars_total'] += length
+        stats['chars_min'] = length if stats['chars_min'] is None else min(stats['chars_min'], length)
+        stats['chars_max'] = max(stats['chars_max'], length)
+        stats['event_types'][event_type] += 1
+
+    return {key: b''.join(chunk) for key, chunk in lines.items()}, stats, first
+
+
+def _render_star(args):
+    return _render_batch(*args)
+
+
+def _row(entry) -> Tuple[str, str, str]:
+    """(time, event_type, text) of an entry: only the fields the templates use"""
+    time = entry.get('time')
+    return (
+        '' if time is None else str(time),
+        entry.get('event_type') or 'commentary',
+        entry.get('text') or ''
+    )
+
+
+def _jsonl_lines(file_path: str) -> Iterator[str]:
+    """Non-blank lines of a JSONL file, left unparsed"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        for line in f:
+            if line.strip():
+                yield line
+
+
+def _batches(rows: Iterable, batch_size: int) -> Iterator[List]:
+    rows = iter(rows)
+    while batch := list(islice(rows, batch_size)):
+        yield batch
+
+
+def export_dataset(
+    entries: Iterable,
+    output_file: str,
+    template: str = 'mistral',
+    min_length: int = 30,
+    val_fraction: float = 0.0,
+    shards: int = 1,
+    processes: int = 1,
+    batch_size: int = 5000
+) -> Dict:
+    """
+    Export commentary to chat-format JSONL shards
+
+    Args:
+        entries: Commentary entries (any iterable, consumed once), or raw
+            JSONL lines
+        output_file: Output path; train goes there, validation to <name>.val.jsonl,
+            and shards get a -NNNNN-of-NNNNN suffix
+        template: Template name (see TEMPLATES)
+        min_length: Minimum commentary length in characters
+        val_fraction: Share of entries routed to the validation split
+        shards: Output files per split
+        processes: Worker processes rendering and serializing batches
+        batch_size: Entries per worker batch
+
+    Returns:
+        Export statistics (counts, lengths, event types, files, a sample record)
+    """
+    if template not in TEMPLATES:
+        raise ValueError(f"Unknown template '{template}' (available: {', '.join(TEMPLATES)})")
+
+    splits = ['train'] + (['validation'] if val_fraction > 0 else [])
+    paths = {(split, index): shard_path(output_file, split, index, shards)
+             for split in splits for index in range(shards)}
+    tmp_paths = {key: f"{path}.tmp" for key, path in paths.items()}
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    files = {key: open(path, 'wb') for key, path in tmp_paths.items()}
+    stats = new_stats()
+    sample = None
+
+    rows = (entry if type(entry) is str else _row(entry) for entry in entries)
+    batches = ((batch, template, min_length, val_fraction, shards) for batch in _batches(rows, batch_size))
+
+    try:
+        with (Pool(processes) if processes > 1 else nullcontext()) as pool:
+            results = pool.imap(_render_star, batches) if pool else map(_render_star, batches)
+
+            # Batches come back in input order, so single-shard output keeps the input order
+            for lines, batch_stats, first in results:
+                for key, data in lines.items():
+                    files[key].write(data)
+                merge_stats(stats, batch_stats)
+                if sample is None:
+                    sample = first
+    finally:
+        for f in files.values():
+            f.close()
+
+    for key, path in paths.items():
+        os.replace(tmp_paths[key], path)
+
+    stats['template'] = template
+    stats['files'] = sorted(paths.values())
+    stats['bytes'] = sum(os.path.getsize(path) for path in paths.values())
+    stats['avg_chars'] = stats['chars_total'] / stats['examples'] if stats['examples'] else 0
+    stats['sample'] = sample
+    return stats
+
+
+def export_file(input_file: str, output_file: str, **kwargs) -> Dict:
+    """
+    Stream a commentary file (JSONL, dataset directory or JSON list) through export_dataset()
+
+    JSONL lines are handed to the workers unparsed.
+    """
+    logger.info(f"📂 Exporting {input_file} → {output_file}")
+    if os.path.isfile(input_file) and input_file.endswith('.jsonl'):
+        entries = _jsonl_lines(input_file)
+    else:
+        entries = read_entries(input_file)
+    return export_dataset(entries, output_file, **kwargs)
+
+
+def log_export_stats(stats: Dict):
+    """Log split sizes, lengths, event types and a sample record"""
+    logger.info(f"\n{'='*70}")
+    logger.info("EXPORT STATISTICS")
+    logger.info(f"{'='*70}")
+    logger.info(f"Template: {stats['template']}")
+    logger.info(f"Total examples: {stats['examples']} "
+                f"(train {stats['train']}, validation {stats['validation']}, "
+                f"{stats['skipped_short']} skipped as too short)")
+    logger.info(f"Output size: {stats['bytes'] / 1024:.1f} KB in {len(stats['files'])} file(s)")
+    for path in stats['files']:
+        logger.info(f"   {path}")
+
+    if not stats['examples']:
+        return
+
+    logger.info(f"Average commentary length: {stats['avg_chars']:.1f} characters "
+                f"(min {stats['chars_min']}, max {stats['chars_max']})")
+
+    logger.info(f"\n📊 By event type:")
+    for event_type, count in stats['event_types'].most_common():
+        logger.info(f"   {event_type}: {count}")
+
+    sample = stats['sample']
+    logger.info(f"\n📝 Sample training example:")
+    if 'messages' in sample:
+        logger.info(f"\nSystem: {sample['messages'][0]['content'][:100]}...")
+        logger.info(f"\nUser: {sample['messages'][1]['content']}")
+        logger.info(f"\nAssistant: {sample['messages'][2]['content']}")
+    else:
+        logger.info(f"\nSystem: {sample['system'][:100]}...")
+        logger.info(f"\nPrompt: {sample['prompt']}")
+        logger.info(f"\nResponse: {sample['response']}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Export commentary to chat-format training JSONL')
+    parser.add_argument('input', help='Commentary file (.jsonl, dataset directory, or legacy .json list)')
+    parser.add_argument('output', help='Output JSONL path')
+    parser.add_argument('--template', choices=sorted(TEMPLATES), default='mistral', help='Training format')
+    parser.add_argument('--min-length', type=int, default=30, help='Minimum commentary length (characters)')
+    parser.add_argument('--val-fraction', type=float, default=0.0, help='Share of entries in the validation split')
+    parser.add_argument('--shards', type=int, default=1, help='Output files per split')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+    parser.add_argument('--publish', metavar='STORE',
+                        help='Also add the output files to a shard store (shard_store.py), named after the output')
+
+    args = parser.parse_args()
+
+    stats = export_file(
+        args.input,
+        args.output,
+        template=args.template,
+        min_length=args.min_length,
+        val_fraction=args.val_fraction,
+        shards=args.shards,
+        processes=args.processes
+    )
+    log_export_stats(stats)
+
+    if args.publish:
+        from shard_store import ShardStore, manifest_objects
+
+        name = os.path.splitext(os.path.basename(args.output))[0]
+        manifest = ShardStore(args.publish).add(name, stats['files'])
+        logger.info(f"📦 Published '{name}' to {args.publish} "
+                    f"({len(manifest_objects(manifest))} shards, sync with shard_store.py sync)")
+
+
+if __name__ == '__main__':
+    main()
@@ -9,7 +9,9 @@ Target: 2000+ high-quality French commentary examples
 import os
 import sys
 import json
+import asyncio
 import argparse
+from collections import Counter
 from datetime import datetime
 import logging
 
@@ -18,7 +20,12 @@ sys.path.insert(0, os.path.join(os.path.dirname(__file__), 'scrapers'))
 
 from lequipe_scraper import LeQuipeScraper
 from rmc_scraper import RMCScraper
-from quality_filter import filter_commentary_batch, remove_duplicates, calculate_quality_metrics
+from commentary_entry import json_default
+from quality_filter import log_rejections
+from streaming_metrics import QualityMetrics
+from stream_pipeline import filter_stream, read_entries, write_jsonl
+from async_pipeline import AsyncCommentaryPipeline, log_pipeline_report
+from crawl_scheduler import CrawlScheduler, quotas_for_target
 
 logging.basicConfig(
     level=logging.INFO,
@@ -27,8 +34,8 @@ logging.basicConfig(
 logger = logging.getLogger(__name__)
 
 DATA_DIR = os.path.join(os.path.dirname(__file__), 'data')
-RAW_DATA_FILE = os.path.join(DATA_DIR, 'raw_commentary.json')
-FILTERED_DATA_FILE = os.path.join(DATA_DIR, 'filtered_commentary.json')
+RAW_JSONL_FILE = os.path.join(DATA_DIR, 'raw_commentary.jsonl')
+FILTERED_JSONL_FILE = os.path.join(DATA_DIR, 'filtered_commentary.jsonl')
 
 
 class CommentaryCollector:
@@ -81,13 +88,24 @@ class CommentaryCollector:
         logger.info(f"Collected {len(all_commentary)} entries from RMC Sport")
         return all_commentary
 
-    def collect_all(self, lequipe_urls: list, rmc_urls: list) -> list:
+    def collect_all(
+        self,
+        lequipe_urls: list,
+        rmc_urls: list,
+        target: int = None,
+        matches: list = None,
+        strict: bool = False
+    ) -> list:
         """
         Collect from all sources
 
         Args:
             lequipe_urls: L'Équipe match URLs
             rmc_urls: RMC Sport match URLs
+            target: Accepted entries wanted; matches are then fetched by predicted
+                yield and collection stops once every source quota is met
+            matches: Match finder entries (total_events, highlights_count) for the predictions
+            strict: Quality filter mode used to count accepted entries
 
         Returns:
             Combined list of all commentary
@@ -98,62 +116,202 @@ class CommentaryCollector:
 
         all_commentary = []
 
-        # Collect from L'Équipe (target: 1200 examples - 60%)
-        if lequipe_urls:
-            lequipe_commentary = self.collect_from_lequipe(lequipe_urls)
-            all_commentary.extend(lequipe_commentary)
-
-        # Collect from RMC Sport (target: 600 examples - 30%)
-        if rmc_urls:
-            rmc_commentary = self.collect_from_rmc(rmc_urls)
-            all_commentary.extend(rmc_commentary)
+        if target:
+            all_commentary = self.collect_scheduled(
+                self.make_scheduler(lequipe_urls, rmc_urls, target, matches, strict)
+            )
+        else:
+            # Collect from L'Équipe (target: 1200 examples - 60%)
+            if lequipe_urls:
+                lequipe_commentary = self.collect_from_lequipe(lequipe_urls)
+                all_commentary.extend(lequipe_commentary)
+
+            # Collect from RMC Sport (target: 600 examples - 30%)
+            if rmc_urls:
+                rmc_commentary = self.collect_from_rmc(rmc_urls)
+                all_commentary.extend(rmc_commentary)
 
         logger.info(f"\n✅ Total collected: {len(all_commentary)} entries")
 
         # Save raw data
-        self._save_json(all_commentary, RAW_DATA_FILE)
-        logger.info(f"💾 Saved raw data to: {RAW_DATA_FILE}")
+        write_jsonl(all_commentary, RAW_JSONL_FILE)
+        logger.info(f"💾 Saved raw data to: {RAW_JSONL_FILE}")
+
+        return all_commentary
+
+    def make_scheduler(
+        self,
+        lequipe_urls: list,
+        rmc_urls: list,
+        target: int,
+        matches: list = None,
+        strict: bool = False
+    ) -> CrawlScheduler:
+        """
+        Build a yield-ordered frontier with per-source quotas for a target
+
+        Args:
+            lequipe_urls: L'Équipe match URLs
+            rmc_urls: RMC Sport match URLs
+            target: Accepted entries wanted in total
+            matches: Match finder entries, used for yield predictions
+            strict: Quality filter mode used to count accepted entries
+
+        Returns:
+            CrawlScheduler
+        """
+        sources = (['lequipe'] if lequipe_urls else []) + (['rmc'] if rmc_urls else [])
+        scheduler = CrawlScheduler(quotas_for_target(target, sources), strict=strict)
+
+        if matches:
+            wanted = set(lequipe_urls) | set(rmc_urls)
+            scheduler.add_matches(match for match in matches if match['url'] in wanted)
+        scheduler.add_urls(lequipe_urls, source='lequipe')
+        scheduler.add_urls(rmc_urls, source='rmc')
+
+        logger.info(f"🎯 Quotas: {scheduler.quotas}")
+        return scheduler
+
+    def collect_scheduled(self, scheduler: CrawlScheduler) -> list:
+        """
+        Collect matches in predicted-yield order until every quota is met
+
+        Args:
+            scheduler: Frontier with quotas
+
+        Returns:
+            List of commentary entries
+        """
+        all_commentary = []
+        scrapers = {'lequipe': self.lequipe_scraper, 'rmc': self.rmc_scraper}
+
+        while (url := scheduler.next()) is not None:
+            source = scheduler.source_of(url)
+            logger.info(f"Processing {source} match {scheduler.fetched + 1}: {url}")
+
+            commentary = scrapers[source].scrape_match(url)
+            accepted = scheduler.record(url, commentary)
+            all_commentary.extend(commentary)
+            logger.info(f"   {len(commentary)} entries, {accepted} pass the filter — progress {scheduler.progress()}")
 
+        scheduler.save_history()
+        logger.info(f"🏁 Stopped after {scheduler.fetched}/{scheduler.total} matches "
+                    f"({'quotas met' if scheduler.done else 'frontier exhausted'})")
         return all_commentary
 
-    def filter_and_deduplicate(self, commentary_list: list, strict: bool = False) -> list:
+    def filter_and_deduplicate(
+        self,
+        commentary_list: list,
+        strict: bool = False,
+        dedup_threshold: float = 0.8
+    ) -> int:
         """
-        Apply quality filtering and remove duplicates
+        Apply quality filtering and remove near-duplicates, writing the result to JSONL
 
         Args:
-            commentary_list: Raw commentary list
+            commentary_list: Raw commentary (any iterable, consumed once)
             strict: Use strict filtering criteria
+            dedup_threshold: Jaccard similarity above which entries are duplicates
 
         Returns:
-            Filtered commentary list
+            Number of entries written to FILTERED_JSONL_FILE
         """
         logger.info("\n" + "=" * 70)
         logger.info("APPLYING QUALITY FILTERS")
         logger.info("=" * 70)
 
-        # Remove duplicates first
-        unique_commentary = remove_duplicates(commentary_list)
-
-        # Apply quality filter
-        filtered_commentary = filter_commentary_batch(unique_commentary, strict=strict)
+        # Normalize, remove near-duplicates (MinHash/LSH), then quality filter,
+        # streaming entry by entry straight into the output file
+        stats = {}
+        written = write_jsonl(filter_stream(
+            commentary_list,
+            strict=strict,
+            dedup_threshold=dedup_threshold,
+            stats=stats
+        ), FILTERED_JSONL_FILE)
 
         logger.info(f"\n✅ Filtering complete:")
-        logger.info(f"   Original: {len(commentary_list)}")
-        logger.info(f"   After deduplication: {len(unique_commentary)}")
-        logger.info(f"   After quality filter: {len(filtered_commentary)}")
+        logger.info(f"   Original: {stats['input']}")
+        logger.info(f"   After deduplication: {stats['unique']}")
+        logger.info(f"   After quality filter: {written}")
+        log_rejections(stats['rejections'], stats['input'])
+        logger.info(f"💾 Saved filtered data to: {FILTERED_JSONL_FILE}")
+
+        return written
+
+    def collect_streaming(
+        self,
+        lequipe_urls: list,
+        rmc_urls: list,
+        strict: bool = False,
+        dedup_threshold: float = 0.8,
+        concurrency: int = 4,
+        target: int = None,
+        matches: list = None
+    ) -> dict:
+        """
+        Collect, deduplicate and filter in one overlapped pass
+
+        Entries are normalized, deduplicated, filtered and written to JSONL
+        while the remaining matches are still being scraped.
+
+        Args:
+            lequipe_urls: L'Équipe match URLs
+            rmc_urls: RMC Sport match URLs
+            strict: Use strict filtering criteria
+            dedup_threshold: Jaccard similarity above which entries are duplicates
+            concurrency: Matches scraped at the same time
+            target: Accepted entries wanted; fetch by predicted yield and stop at the quotas
+            matches: Match finder entries, used for yield predictions
 
-        # Save filtered data
-        self._save_json(filtered_commentary, FILTERED_DATA_FILE)
-        logger.info(f"💾 Saved filtered data to: {FILTERED_DATA_FILE}")
+        Returns:
+            Pipeline report
+        """
+        logger.info("\n" + "=" * 70)
+        logger.info("STARTING STREAMING COLLECTION")
+        logger.info("=" * 70)
 
-        return filtered_commentary
+        rmc = set(rmc_urls)
+
+        async def fetch(url: str) -> list:
+            # The requests-based scrapers block, so each match runs in a thread
+            # with its own scraper (and HTTP session)
+            scraper = RMCScraper() if url in rmc else LeQuipeScraper()
+            return await asyncio.to_thread(scraper.scrape_match, url)
+
+        scheduler = None
+        if target:
+            scheduler = self.make_scheduler(lequipe_urls, rmc_urls, target, matches, strict)
+
+        pipeline = AsyncCommentaryPipeline(
+            fetch,
+            FILTERED_JSONL_FILE,
+            raw_file=RAW_JSONL_FILE,
+            strict=strict,
+            dedup_threshold=dedup_threshold,
+            concurrency=concurrency,
+            scheduler=scheduler
+        )
+        report = asyncio.run(pipeline.run(list(lequipe_urls) + list(rmc_urls)))
+
+        if scheduler is not None:
+            scheduler.save_history()
+            logger.info(f"🏁 Fetched {scheduler.fetched}/{scheduler.total} matches, "
+                        f"progress {scheduler.progress()}")
+
+        log_pipeline_report(report)
+        log_rejections(Counter(report['rejections']), report['scraped'])
+        logger.info(f"💾 Saved raw data to: {RAW_JSONL_FILE}")
+        logger.info(f"💾 Saved filtered data to: {FILTERED_JSONL_FILE}")
+
+        return report
 
     def generate_report(self, commentary_list: list) -> dict:
         """
         Generate quality metrics report
 
         Args:
-            commentary_list: Commentary list
+            commentary_list: Commentary entries (any iterable, consumed once)
 
         Returns:
             Metrics dictionary
@@ -162,12 +320,12 @@ class CommentaryCollector:
         logger.info("QUALITY METRICS REPORT")
         logger.info("=" * 70)
 
-        metrics = calculate_quality_metrics(commentary_list)
+        metrics = QualityMetrics().update_many(commentary_list).to_dict()
 
         logger.info(f"\n📊 Dataset Statistics:")
         logger.info(f"   Total examples: {metrics['total_examples']}")
         logger.info(f"   Avg length: {metrics['avg_length_chars']:.0f} chars ({metrics['avg_length_words']:.0f} words)")
-        logger.info(f"   Vocabulary size: {metrics['vocabulary_size']} unique words")
+        logger.info(f"   Vocabulary size: ~{metrics['vocabulary_size']} unique words (HyperLogLog estimate)")
         logger.info(f"   Vocabulary diversity: {metrics['vocabulary_diversity']:.2%}")
 
         logger.info(f"\n📂 By Source:")
@@ -190,7 +348,7 @@ class CommentaryCollector:
     def _save_json(self, data: list or dict, file_path: str):
         """Save data to JSON file"""
         with open(file_path, 'w', encoding='utf-8') as f:
-            json.dump(data, f, ensure_ascii=False, indent=2)
+            json.dump(data, f, ensure_ascii=False, indent=2, default=json_default)
 
 
 def main():
@@ -199,6 +357,15 @@ def main():
     parser.add_argument('--lequipe-urls', type=str, help='File containing L\'Équipe URLs (one per line)')
     parser.add_argument('--rmc-urls', type=str, help='File containing RMC Sport URLs (one per line)')
     parser.add_argument('--strict', action='store_true', help='Use strict quality filtering')
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help='Jaccard similarity above which entries count as near-duplicates')
+    parser.add_argument('--concurrency', type=int, default=4, help='Matches scraped at the same time')
+    parser.add_argument('--target', type=int,
+                        help='Accepted entries wanted: fetch highest-yield matches first, stop once quotas are met')
+    parser.add_argument('--matches', type=str,
+                        help='Match finder output (total_events, highlights_count) for yield predictions')
+    parser.add_argument('--sequential', action='store_true',
+                        help='Scrape everything first, then filter')
 
     args = parser.parse_args()
 
@@ -220,14 +387,39 @@ def main():
         logger.info("  python collect_commentary.py --lequipe-urls lequipe_urls.txt --rmc-urls rmc_urls.txt")
         return
 
+    matches = None
+    if args.matches and os.path.exists(args.matches):
+        with open(args.matches, 'r', encoding='utf-8') as f:
+            matches = json.load(f)
+
     # Initialize collector
     collector = CommentaryCollector()
 
-    # Collect data
-    raw_commentary = collector.collect_all(lequipe_urls, rmc_urls)
-
-    # Filter and deduplicate
-    filtered_commentary = collector.filter_and_deduplicate(raw_commentary, strict=args.strict)
+    if args.sequential:
+        # Collect data
+        raw_commentary = collector.collect_all(
+            lequipe_urls, rmc_urls, target=args.target, matches=matches, strict=args.strict
+        )
+
+        # Filter and deduplicate
+        collector.filter_and_deduplicate(
+            raw_commentary,
+            strict=args.strict,
+            dedup_threshold=args.dedup_threshold
+        )
+    else:
+        # Scrape, filter and write concurrently
+        collector.collect_streaming(
+            lequipe_urls,
+            rmc_urls,
+            strict=args.strict,
+            dedup_threshold=args.dedup_threshold,
+            concurrency=args.concurrency,
+            target=args.target,
+            matches=matches
+        )
+    filtered_commentary = read_entries(FILTERED_JSONL_FILE)
+    output_file = FILTERED_JSONL_FILE
 
     # Generate report
     metrics = collector.generate_report(filtered_commentary)
@@ -237,7 +429,7 @@ def main():
     logger.info("COLLECTION COMPLETE")
     logger.info("=" * 70)
     logger.info(f"\n✅ Collected {metrics['total_examples']} high-quality commentary examples")
-    logger.info(f"📁 Data saved to: {FILTERED_DATA_FILE}")
+    logger.info(f"📁 Data saved to: {output_file}")
     logger.info(f"\n🔄 Next steps:")
     logger.info(f"   1. Review data with: python review_app.py")
     logger.info(f"   2. After review, export to JSONL for training")
@@ -0,0 +1,305 @@
+#!/usr/bin/env python3
+"""
+Commentary record shared by scrapers, filters and exporters
+
+A CommentaryEntry holds one scraped commentary event in __slots__ instead of a
+per-entry dict:
+
+- categorical fields (source, time, event_type, url, method, match) are
+  interned, so a match's thousand entries share one url string
+- scraped_at is an integer (epoch microseconds, as in dataset_store.py)
+  instead of a 26-character ISO string
+- the minute is parsed once: "45'+2" → minute 45, added 2, usable as a sort key
+
+Entries also behave like the dictionaries the pipeline used to pass around
+(entry['text'], entry.get('event_type'), 'time' in entry, dict(entry)), with
+scraped_at rendered back as an ISO string, so code written against plain
+dicts keeps working. Fields outside the schema (event_id, ...) are kept in a
+small side dictionary and written back out unchanged, and entries read from
+dictionaries keep their key order (runpod_data_collector.py puts match and
+url before scraped_at).
+
+scraped_at is stored as written: naive ISO strings round-trip unchanged, and
+new entries default to UTC (datetime.utcnow(), as most scrapers used).
+lequipe_finished_match_scraper.py passes local_timestamp(), the local time it
+has always recorded.
+"""
+
+import re
+import sys
+import json
+import time as _time
+from datetime import datetime
+from functools import lru_cache
+from typing import Dict, Iterator, Optional, Tuple
+
+from dataset_store import EPOCH, MICROSECOND, timestamp_to_int, int_to_timestamp
+
+FIELDS = ('source', 'time', 'text', 'event_type', 'scraped_at', 'url', 'method', 'match')
+_FIELD_SET = frozenset(FIELDS)
+
+MINUTE_RE = re.compile(r"\s*(\d+)[^\d+]*(?:\+\s*(\d+))?")
+
+_encode = json.JSONEncoder(ensure_ascii=False).encode
+
+
+def _intern(value):
+    return sys.intern(value) if type(value) is str else value
+
+
+@lru_cache(maxsize=4096)
+def parse_minute(time_str: Optional[str]) -> Tuple[int, int]:
+    """
+    Parse a match time
+
+    "45'" → (45, 0), "90'+3" → (90, 3), "HT" → (-1, 0)
+
+    Returns:
+        (minute, added time); minute is -1 when the time cannot be parsed
+    """
+    found = MINUTE_RE.match(time_str) if time_str else None
+    if not found:
+        return (-1, 0)
+    return (int(found.group(1)), int(found.group(2) or 0))
+
+
+def now_timestamp() -> int:
+    """Current time in epoch microseconds"""
+    return _time.time_ns() // 1000
+
+
+def local_timestamp() -> int:
+    """Current local wall-clock time in epoch microseconds (renders like datetime.now().isoformat())"""
+    return (datetime.now() - EPOCH) // MICROSECOND
+
+
+# Key orders of dictionaries read with from_dict: None when to_dict() reproduces them
+_KEY_ORDERS: Dict[Tuple[str, ...], Optional[Tuple[str, ...]]] = {}
+
+
+def _key_order(keys: Tuple[str, ...]) -> Optional[Tuple[str, ...]]:
+    order = _KEY_ORDERS.get(keys)
+    if order is None and keys not in _KEY_ORDERS:
+        # to_dict() writes schema fields in FIELDS order, then the other fields
+        schema = [key for key in keys if key in _FIELD_SET]
+        canonical = tuple(key for key in FIELDS if key in schema) + tuple(key for key in keys if key not in _FIELD_SET)
+        order = None if canonical == keys else tuple(map(sys.intern, keys))
+        _KEY_ORDERS[keys] = order
+    return order
+
+
+class CommentaryEntry:
+    """One commentary event"""
+
+    __slots__ = ('source', '_time', 'minute', 'added', 'text', 'event_type',
+                 'scraped_at', 'url', 'method', 'match', 'extra', '_order')
+
+    def __init__(
+        self,
+        text: str,
+        source: Optional[str] = None,
+        time: Optional[str] = None,
+        event_type: Optional[str] = 'commentary',
+        scraped_at: Optional[int] = None,
+        url: Optional[str] = None,
+        method: Optional[str] = None,
+        match: Optional[str] = None,
+        extra: Optional[Dict] = None
+    ):
+        """
+        Initialize entry
+
+        Args:
+            text: Commentary text
+            source: Source name ('lequipe', 'rmc', ...)
+            time: Match time as displayed ("45'+2")
+            event_type: goal, yellow_card, commentary, ...
+            scraped_at: Epoch microseconds (default: now)
+            url: Match URL
+            method: Extraction method (json, dom, text, live, ...)
+            match: Match name
+            extra: Fields outside the schema
+        """
+        self.text = text
+        self.source = _intern(source)
+        self.time = time
+        self.event_type = _intern(event_type)
+        self.scraped_at = now_timestamp() if scraped_at is None else scraped_at
+        self.url = _intern(url)
+        self.method = _intern(method)
+        self.match = _intern(match)
+        self.extra = extra or None
+        self._order = None
+
+    @property
+    def time(self) -> Optional[str]:
+        return self._time
+
+    @time.setter
+    def time(self, value):
+        if value is not None and type(value) is not str:
+            value = str(value)
+        self._time = _intern(value)
+        self.minute, self.added = parse_minute(value)
+
+    @property
+    def sort_key(self) -> Tuple[int, int]:
+        """(minute, added time), for ordering events within a match"""
+        return (self.minute, self.added)
+
+    # ------------------------------------------------------------------
+    # Conversion
+    # ------------------------------------------------------------------
+
+    @classmethod
+    def from_dict(cls, data: Dict) -> 'CommentaryEntry':
+        """Build an entry from its dictionary form (entries are returned as is)"""
+        if isinstance(data, cls):
+            return data
+
+        # Fields are set directly: this is the JSONL read path
+        get = data.get
+        entry = cls.__new__(cls)
+        entry.text = get('text')
+        entry.source = _intern(get('source'))
+        entry.time = get('time')
+        entry.event_type = _intern(get('event_type'))
+        scraped_at = get('scraped_at')
+        entry.scraped_at = timestamp_to_int(scraped_at) if scraped_at is not None else None
+        entry.url = _intern(get('url'))
+        entry.method = _intern(get('method'))
+        entry.match = _intern(get('match'))
+        entry.extra = None
+        if not _FIELD_SET.issuperset(data):
+            entry.extra = {key: value for key, value in data.items() if key not in _FIELD_SET}
+        entry._order = _key_order(tuple(data))
+        return entry
+
+    @classmethod
+    def from_json(cls, line: str) -> 'CommentaryEntry':
+        """Parse one JSONL line"""
+        return cls.from_dict(json.loads(line))
+
+    def to_dict(self) -> Dict:
+        """Dictionary form (the scrapers' historical format, in the key order read; missing fields are omitted)"""
+        data = {}
+        if self.source is not None:
+            data['source'] = self.source
+        if self._time is not None:
+            data['time'] = self._time
+        if self.text is not None:
+            data['text'] = self.text
+        if self.event_type is not None:
+            data['event_type'] = self.event_type
+        if self.scraped_at is not None:
+            data['scraped_at'] = int_to_timestamp(self.scraped_at)
+        if self.url is not None:
+            data['url'] = self.url
+        if self.method is not None:
+            data['method'] = self.method
+        if self.match is not None:
+            data['match'] = self.match
+        if self.extra:
+            data.update(self.extra)
+        if self._order is not None:
+            # Keys set after reading go last
+            ordered = {key: data[key] for key in self._order if key in data}
+            if len(ordered) != len(data):
+                ordered.update(data)
+            return ordered
+        return data
+
+    def to_json(self) -> str:
+        """One JSONL line (without the newline)"""
+        return _encode(self.to_dict())
+
+    def copy(self) -> 'CommentaryEntry':
+        """Independent copy (extra fields included)"""
+        entry = CommentaryEntry.__new__(CommentaryEntry)
+        for slot in CommentaryEntry.__slots__:
+            setattr(entry, slot, getattr(self, slot))
+        if self.extra is not None:
+            entry.extra = dict(self.extra)
+        return entry
+
+    # ------------------------------------------------------------------
+    # Dictionary view
+    # ------------------------------------------------------------------
+
+    def __getitem__(self, key: str):
+        if key in _FIELD_SET:
+            value = getattr(self, key)
+            if value is None:
+                raise KeyError(key)
+            return int_to_timestamp(value) if key == 'scraped_at' else value
+        if self.extra and key in self.extra:
+            return self.extra[key]
+        raise KeyError(key)
+
+    def __setitem__(self, key: str, value):
+        if key == 'scraped_at':
+            self.scraped_at = timestamp_to_int(value)
+        elif key == 'text' or key == 'time':
+            setattr(self, key, value)
+        elif key in _FIELD_SET:
+            setattr(self, key, _intern(value))
+        else:
+            if self.extra is None:
+                self.extra = {}
+            self.extra[key] = value
+
+    def get(self, key: str, default=None):
+        try:
+            return self[key]
+        except KeyError:
+            return default
+
+    def __contains__(self, key: str) -> bool:
+        if key in _FIELD_SET:
+            return getattr(self, key) is not None
+        return bool(self.extra) and key in self.extra
+
+    def keys(self) -> Iterator[str]:
+        if self._order is not None:
+            yield from self.to_dict()
+            return
+        for key in FIELDS:
+            if getattr(self, key) is not None:
+                yield key
+        if self.extra:
+            yield from self.extra
+
+    __iter__ = keys
+
+    def items(self) -> Iterator[Tuple[str, object]]:
+        return iter(self.to_dict().items())
+
+    def __eq__(self, other) -> bool:
+        if isinstance(other, (CommentaryEntry, dict)):
+            return self.to_dict() == dict(other.items())
+        return NotImplemented
+
+    __hash__ = None
+
+    def __repr__(self) -> str:
+        text = self.text if self.text is None or len(self.text) <= 40 else self.text[:40] + '...'
+        return f"CommentaryEntry({self.source!r}, {self._time!r}, {self.event_type!r}, {text!r})"
+
+
+def as_entry(entry) -> CommentaryEntry:
+    """CommentaryEntry of a dictionary (entries are returned as is)"""
+    return entry if isinstance(entry, CommentaryEntry) else CommentaryEntry.from_dict(entry)
+
+
+def entry_to_json(entry) -> str:
+    """JSONL line of an entry or of any other JSON-serializable record"""
+    if isinstance(entry, CommentaryEntry):
+        return entry.to_json()
+    return _encode(entry)
+
+
+def json_default(obj):
+    """default= hook so json.dump() accepts lists containing entries"""
+    if isinstance(obj, CommentaryEntry):
+        return obj.to_dict()
+    raise TypeError(f"Object of type {type(obj).__name__} is not JSON serializable")
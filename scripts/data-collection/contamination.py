@@ -0,0 +1,470 @@
+#!/usr/bin/env python3
+"""
+N-gram contamination check between dataset splits
+Finds training examples whose commentary overlaps an evaluation split
+
+The word n-grams of one split's assistant texts (commentary for raw files)
+are added to a Bloom filter; the other split is streamed through it and
+every line whose n-grams are mostly already in the filter is reported, or
+dropped. The filter has a fixed size chosen up front (64 MB holds ~50M
+distinct n-grams at a 1% false positive rate), so memory does not grow with
+either corpus. A filter can be saved and reused for every file checked
+against the same split.
+
+Usage:
+    python contamination.py build data/eval_training.jsonl data/eval.bloom
+    python contamination.py check data/eval.bloom data/mistral_training.jsonl --report contaminated.jsonl
+    python contamination.py check data/morocco_comoros_training.jsonl data/afcon2025_training.jsonl
+    python contamination.py filter data/eval.bloom data/mistral_training.jsonl data/mistral_clean.jsonl
+"""
+
+import os
+import json
+import hashlib
+import argparse
+from collections import deque
+from functools import lru_cache
+from itertools import chain, islice
+from multiprocessing import Pool
+from typing import Callable, Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+import numpy as np
+
+from near_duplicates import WORD_RE
+
+try:
+    import orjson
+except ImportError:  # Optional speed-up, json is used otherwise
+    orjson = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+NGRAM_SIZE = 8
+THRESHOLD = 0.5
+BLOOM_MB = 64
+BLOOM_HASHES = 7
+BATCH_SIZE = 10_000
+
+BLOOM_MAGIC = b'ASBLOOM1'
+
+_POLY = np.uint64(0x100000001B3)
+_POPCOUNT = np.array([bin(byte).count('1') for byte in range(256)], dtype=np.uint8)
+
+
+def _loads(line):
+    return orjson.loads(line) if orjson is not None else json.loads(line)
+
+
+def assistant_text(record: Dict) -> str:
+    """Text checked for a record: assistant message, prompt-layout response or commentary text"""
+    if 'messages' in record:
+        for message in reversed(record['messages']):
+            if message.get('role') == 'assistant':
+                return message.get('content') or ''
+        return ''
+    if 'response' in record:
+        return record['response'] or ''
+    return record.get('text') or ''
+
+
+def iter_texts(file_path: str) -> Iterator[Tuple[int, str]]:
+    """(line number, assistant text) of every non-blank line of a JSONL file"""
+    with open(file_path, 'rb') as f:
+        for number, line in enumerate(f, 1):
+            if line.strip():
+                yield number, assistant_text(_loads(line))
+
+
+@lru_cache(maxsize=1 << 20)
+def word_hash(word: str) -> int:
+    """Stable 64-bit hash of a word (cached: vocabulary repeats far more than it grows)"""
+    return int.from_bytes(hashlib.blake2b(word.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+def _mix(values: np.ndarray) -> np.ndarray:
+    """splitmix64 finalizer, spreads polynomial hashes over all 64 bits"""
+    values = values ^ (values >> np.uint64(30))
+    values = values * np.uint64(0xBF58476D1CE4E5B9)
+    values = values ^ (values >> np.uint64(27))
+    values = values * np.uint64(0x94D049BB133111EB)
+    return values ^ (values >> np.uint64(31))
+
+
+def ngram_hashes(texts: List[str], size: int = NGRAM_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Hash the word n-grams of a batch of texts
+
+    Texts shorter than `size` words count as a single n-gram of all their words.
+
+    Returns:
+        (uint64 n-gram hashes of all texts, concatenated; text index of each hash)
+    """
+    words = [WORD_RE.findall(text.lower()) for text in texts]
+    lengths = np.fromiter(map(len, words), dtype=np.int64, count=len(words))
+    if not lengths.sum():
+        return np.zeros(0, dtype=np.uint64), np.zeros(0, dtype=np.int64)
+
+    values = np.fromiter(map(word_hash, chain.from_iterable(words)), dtype=np.uint64, count=int(lengths.sum()))
+    owner = np.repeat(np.arange(len(words)), lengths)
+    ends = np.cumsum(lengths)
+
+    hashes, owners = [], []
+
+    # Full n-grams: rolling polynomial over every start position, then drop
+    # the windows that run past the end of their text
+    starts = len(values) - size + 1
+    if starts > 0:
+        acc = np.zeros(starts, dtype=np.uint64)
+        with np.errstate(over='ignore'):
+            for j in range(size):
+                acc = acc * _POLY + values[j:j + starts]
+        positions = np.arange(starts)
+        valid = positions + size <= ends[owner[:starts]]
+        hashes.append(acc[valid])
+        owners.append(owner[:starts][valid])
+
+    # Short texts: one n-gram of all their words
+    offsets = ends - lengths
+    for i in np.flatnonzero((lengths > 0) & (lengths < size)).tolist():
+        acc = np.uint64(0)
+        with np.errstate(over='ignore'):
+            for value in values[offsets[i]:ends[i]]:
+                acc = acc * _POLY + value
+        hashes.append(np.array([acc], dtype=np.uint64))
+        owners.append(np.array([i]))
+
+    with np.errstate(over='ignore'):
+        return _mix(np.concatenate(hashes)), np.concatenate(owners)
+
+
+class BloomFilter:
+    """Fixed-size Bloom filter over 64-bit hashes (double hashing, power-of-two bit count)"""
+
+    def __init__(self, size_mb: float = BLOOM_MB, hashes: int = BLOOM_HASHES):
+        """
+        Initialize an empty filter
+
+        Args:
+            size_mb: Bit array size in megabytes (rounded down to a power of two)
+            hashes: Bit positions set per item
+        """
+        bits = 1 << max(int(size_mb * 8 * 1024 * 1024).bit_length() - 1, 6)
+        self.mask = np.uint64(bits - 1)
+        self.hashes = hashes
+        self.bits = np.zeros(bits // 8, dtype=np.uint8)
+        self.items = 0
+        self.metadata: Dict = {}
+
+    @property
+    def size_bits(self) -> int:
+        return int(self.mask) + 1
+
+    def _positions(self, values: np.ndarray) -> np.ndarray:
+        with np.errstate(over='ignore'):
+            step = _mix(values ^ np.uint64(0x9E3779B97F4A7C15)) | np.uint64(1)
+            rounds = np.arange(self.hashes, dtype=np.uint64)[:, None]
+            return (values[None, :] + rounds * step[None, :]) & self.mask
+
+    def add(self, values: np.ndarray):
+        """Add uint64 hashes"""
+        if not len(values):
+            return
+        positions = self._positions(values).ravel()
+        np.bitwise_or.at(self.bits, positions >> np.uint64(3),
+                         np.left_shift(1, positions & np.uint64(7)).astype(np.uint8))
+        self.items += len(values)
+
+    def contains(self, values: np.ndarray) -> np.ndarray:
+        """Boolean array: True where a hash is (probably) in the filter"""
+        if not len(values):
+            return np.zeros(0, dtype=bool)
+        positions = self._positions(values)
+        found = (self.bits[positions >> np.uint64(3)] >> (positions & np.uint64(7)).astype(np.uint8)) & 1
+        return found.all(axis=0)
+
+    @property
+    def fill_ratio(self) -> float:
+        """Share of bits set (popcount in 8 MB chunks, without unpacking the array)"""
+        ones = 0
+        for start in range(0, len(self.bits), 1 << 23):
+            ones += int(_POPCOUNT[self.bits[start:start + (1 << 23)]].sum(dtype=np.int64))
+        return ones / self.size_bits
+
+    @property
+    def false_positive_rate(self) -> float:
+        """Estimated from the share of bits set"""
+        return self.fill_ratio ** self.hashes
+
+    def save(self, path: str, **metadata):
+        header = json.dumps({'bits': self.size_bits, 'hashes': self.hashes, 'items': self.items, **metadata})
+        with open(path, 'wb') as f:
+            f.write(BLOOM_MAGIC + len(header).to_bytes(4, 'little') + header.encode('utf-8'))
+            self.bits.tofile(f)
+
+    @classmethod
+    def load(cls, path: str) -> 'BloomFilter':
+        """Load a saved filter; its metadata (n-gram size, source) is in `.metadata`"""
+        with open(path, 'rb') as f:
+            if f.read(len(BLOOM_MAGIC)) != BLOOM_MAGIC:
+                raise ValueError(f"{path} is not a Bloom filter file")
+            header = json.loads(f.read(int.from_bytes(f.read(4), 'little')))
+            bloom = cls.__new__(cls)
+            bloom.mask = np.uint64(header['bits'] - 1)
+            bloom.hashes = header['hashes']
+            bloom.items = header['items']
+            bloom.bits = np.fromfile(f, dtype=np.uint8, count=header['bits'] // 8)
+        bloom.metadata = header
+        return bloom
+
+
+def _batched(iterable: Iterable, size: int) -> Iterator[List]:
+    iterator = iter(iterable)
+    while batch := list(islice(iterator, size)):
+        yield batch
+
+
+def build_filter(
+    file_path: str,
+    ngram_size: int = NGRAM_SIZE,
+    size_mb: float = BLOOM_MB,
+    hashes: int = BLOOM_HASHES,
+    batch_size: int = BATCH_SIZE
+) -> BloomFilter:
+    """Add the assistant-text n-grams of a JSONL file to a new Bloom filter"""
+    bloom = BloomFilter(size_mb, hashes)
+    bloom.metadata = {'ngram_size': ngram_size, 'source': os.path.abspath(file_path)}
+    lines = 0
+    for batch in _batched(iter_texts(file_path), batch_size):
+        values, _ = ngram_hashes([text for _, text in batch], ngram_size)
+        bloom.add(values)
+        lines += len(batch)
+    bloom.metadata['lines'] = lines
+    return bloom
+
+
+def load_or_build(path: str, ngram_size: int = NGRAM_SIZE, size_mb: float = BLOOM_MB) -> BloomFilter:
+    """A saved .bloom filter, or one built on the fly from a JSONL split"""
+    if path.endswith('.bloom'):
+        bloom = BloomFilter.load(path)
+        if bloom.metadata.get('ngram_size', ngram_size) != ngram_size:
+            raise ValueError(f"{path} holds {bloom.metadata['ngram_size']}-grams, not {ngram_size}-grams")
+        return bloom
+    logger.info(f"🧮 Building the n-gram filter of {path}...")
+    return build_filter(path, ngram_size, size_mb)
+
+
+def overlap_ratios(bloom: BloomFilter, texts: List[str], ngram_size: int = NGRAM_SIZE) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Share of each text's n-grams found in the filter
+
+    Returns:
+        (overlap ratio per text, n-gram count per text); texts without words have ratio 0
+    """
+    values, owners = ngram_hashes(texts, ngram_size)
+    found = bloom.contains(values)
+    totals = np.bincount(owners, minlength=len(texts))
+    hits = np.bincount(owners, weights=found, minlength=len(texts))
+    ratios = np.divide(hits, totals, out=np.zeros(len(texts)), where=totals > 0)
+    return ratios, totals
+
+
+_worker_bloom: Optional[BloomFilter] = None
+_worker_ngram_size = NGRAM_SIZE
+
+
+def _init_worker(bloom: BloomFilter, ngram_size: int):
+    global _worker_bloom, _worker_ngram_size
+    _worker_bloom, _worker_ngram_size = bloom, ngram_size
+
+
+def _check_lines(args) -> Tuple[np.ndarray, np.ndarray, List[str]]:
+    """Worker: parse a batch of raw JSONL lines and measure their overlap"""
+    lines, threshold = args
+    texts = [assistant_text(_loads(line)) for line in lines]
+    ratios, totals = overlap_ratios(_worker_bloom, texts, _worker_ngram_size)
+    return ratios, totals, [texts[k] for k in np.flatnonzero(ratios >= threshold).tolist()]
+
+
+def check_file(
+    bloom: BloomFilter,
+    file_path: str,
+    ngram_size: int = NGRAM_SIZE,
+    threshold: float = THRESHOLD,
+    batch_size: int = BATCH_SIZE,
+    max_examples: Optional[int] = None,
+    processes: int = 1
+) -> Dict:
+    """
+    Stream a JSONL split through the filter of another split
+
+    Args:
+        bloom: Filter of the reference split
+        file_path: Split to check
+        ngram_size: Words per n-gram (must match the filter)
+        threshold: Overlap ratio from which a line counts as contaminated
+        batch_size: Lines hashed per batch
+        max_examples: Contaminated lines kept in the report (None: all)
+        processes: Worker processes parsing and hashing batches
+
+    Returns:
+        Report: lines, n-grams, overlap rate, contaminated count and lines
+        [(line number, overlap ratio, text)]
+    """
+    report = {'file': file_path, 'lines': 0, 'ngrams': 0, 'overlapping_ngrams': 0,
+              'contaminated': 0, 'examples': []}
+
+    with open(file_path, 'rb') as f:
+        numbered = ((number, line) for number, line in enumerate(f, 1) if line.strip())
+        pending = deque()  # line numbers of the batches handed out, in order
+
+        def tasks():
+            for batch in _batched(numbered, batch_size):
+                numbers, lines = zip(*batch)
+                pending.append(numbers)
+                yield list(lines), threshold
+
+        if processes > 1:
+            pool = Pool(processes, initializer=_init_worker, initargs=(bloom, ngram_size))
+            results = pool.imap(_check_lines, tasks())
+        else:
+            pool = None
+            _init_worker(bloom, ngram_size)
+            results = map(_check_lines, tasks())
+
+        try:
+            # Results come back in file order
+            for ratios, totals, texts in results:
+                numbers = pending.popleft()
+                report['lines'] += len(numbers)
+                report['ngrams'] += int(totals.sum())
+                report['overlapping_ngrams'] += int(round((ratios * totals).sum()))
+
+                for k, text in zip(np.flatnonzero(ratios >= threshold).tolist(), texts):
+                    report['contaminated'] += 1
+                    if max_examples is None or len(report['examples']) < max_examples:
+                        report['examples'].append((numbers[k], float(ratios[k]), text))
+        finally:
+            if pool is not None:
+                pool.terminate()
+
+    report['overlap_rate'] = report['overlapping_ngrams'] / report['ngrams'] if report['ngrams'] else 0.0
+    report['contamination_rate'] = report['contaminated'] / report['lines'] if report['lines'] else 0.0
+    report['false_positive_rate'] = bloom.false_positive_rate
+    return report
+
+
+def drop_contaminated(
+    entries: Iterable,
+    bloom: BloomFilter,
+    ngram_size: int = NGRAM_SIZE,
+    threshold: float = THRESHOLD,
+    batch_size: int = 1000,
+    stats: Optional[Dict] = None,
+    key: Callable = assistant_text
+) -> Iterator:
+    """
+    Pipeline stage: drop entries overlapping the filtered split
+
+    Args:
+        entries: Commentary entries or chat records
+        bloom: Filter of the split to keep out (evaluation matches)
+        ngram_size: Words per n-gram (must match the filter)
+        threshold: Overlap ratio from which an entry is dropped
+        batch_size: Entries hashed per batch
+        stats: Optional dict whose 'contaminated' count is updated
+        key: Text of an entry (default: assistant_text)
+
+    Yields:
+        Entries below the threshold, in input order
+    """
+    if stats is not None:
+        stats.setdefault('contaminated', 0)
+
+    for batch in _batched(entries, batch_size):
+        ratios, _ = overlap_ratios(bloom, [key(entry) for entry in batch], ngram_size)
+        for entry, ratio in zip(batch, ratios.tolist()):
+            if ratio < threshold:
+                yield entry
+            elif stats is not None:
+                stats['contaminated'] += 1
+
+
+def log_report(report: Dict, show: int = 10):
+    logger.info(f"\n{'='*70}")
+    logger.info(f"CONTAMINATION: {report['file']}")
+    logger.info(f"{'='*70}")
+    logger.info(f"Lines: {report['lines']} ({report['ngrams']} n-grams)")
+    logger.info(f"N-gram overlap: {report['overlap_rate']:.2%}")
+    logger.info(f"Contaminated lines: {report['contaminated']} ({report['contamination_rate']:.2%})")
+    logger.info(f"Bloom false positive rate: {report['false_positive_rate']:.3%}")
+    if report['false_positive_rate'] > 0.05:
+        logger.warning("⚠️  Filter too full for its content, rebuild it with a larger --bloom-mb")
+
+    for number, ratio, text in report['examples'][:show]:
+        logger.info(f"   Line {number} ({ratio:.0%}): {text[:100]}")
+    if report['contaminated'] > show:
+        logger.info(f"   ... and {report['contaminated'] - show} more")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='N-gram contamination check between dataset splits')
+    parser.add_argument('--ngram', type=int, default=NGRAM_SIZE, help='Words per n-gram')
+    parser.add_argument('--bloom-mb', type=float, default=BLOOM_MB, help='Bloom filter size (MB)')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    build = subparsers.add_parser('build', help='Build and save the n-gram filter of a split')
+    build.add_argument('input', help='Reference split (JSONL)')
+    build.add_argument('output', help='Filter file (.bloom)')
+    build.add_argument('--hashes', type=int, default=BLOOM_HASHES, help='Hash functions')
+
+    check = subparsers.add_parser('check', help='Report lines of a split overlapping the reference')
+    check.add_argument('reference', help='Reference .bloom filter or JSONL split')
+    check.add_argument('input', help='Split to check (JSONL)')
+    check.add_argument('--threshold', type=float, default=THRESHOLD, help='Overlap ratio of a contaminated line')
+    check.add_argument('--report', help='Write contaminated lines to this JSONL file')
+    check.add_argument('--processes', type=int, default=1, help='Worker processes')
+
+    drop = subparsers.add_parser('filter', help='Copy a split without its contaminated lines')
+    drop.add_argument('reference', help='Reference .bloom filter or JSONL split')
+    drop.add_argument('input', help='Split to clean (JSONL)')
+    drop.add_argument('output', help='Output JSONL')
+    drop.add_argument('--threshold', type=float, default=THRESHOLD, help='Overlap ratio of a contaminated line')
+
+    args = parser.parse_args()
+
+    if args.command == 'build':
+        bloom = build_filter(args.input, args.ngram, args.bloom_mb, args.hashes)
+        bloom.save(args.output, **bloom.metadata)
+        logger.info(f"✅ {bloom.items} n-grams of {bloom.metadata['lines']} lines → {args.output} "
+                    f"(estimated false positive rate {bloom.false_positive_rate:.3%})")
+
+    elif args.command == 'check':
+        bloom = load_or_build(args.reference, args.ngram, args.bloom_mb)
+        report = check_file(bloom, args.input, args.ngram, args.threshold, processes=args.processes)
+        log_report(report)
+        if args.report:
+            with open(args.report, 'w', encoding='utf-8') as f:
+                for number, ratio, text in report['examples']:
+                    f.write(json.dumps({'line': number, 'overlap': ratio, 'text': text}, ensure_ascii=False) + '\n')
+            logger.info(f"💾 Contaminated lines saved to {args.report}")
+
+    elif args.command == 'filter':
+        bloom = load_or_build(args.reference, args.ngram, args.bloom_mb)
+        stats = {}
+        tmp_path = f"{args.output}.tmp"
+        kept = 0
+        with open(args.input, 'rb') as src, open(tmp_path, 'wb') as dst:
+            lines = (line for line in src if line.strip())
+            records = ((line, _loads(line)) for line in lines)
+            for line, _ in drop_contaminated(records, bloom, args.ngram, args.threshold, BATCH_SIZE, stats,
+                                              key=lambda item: assistant_text(item[1])):
+                dst.write(line if line.endswith(b'\n') else line + b'\n')
+                kept += 1
+        os.replace(tmp_path, args.output)
+        logger.info(f"✅ Kept {kept} lines, dropped {stats['contaminated']} contaminated → {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,362 @@
+#!/usr/bin/env python3
+"""
+Yield-aware crawl scheduler
+Orders match URLs by predicted accepted entries and stops once source quotas are met
+
+Predicted yield of a match = expected scraped entries x acceptance rate of its source
+
+- Expected entries come from the match finder's total_events (scaled by the
+  entries-per-event ratio observed for the competition), or from
+  highlights_count when total_events is unknown, or from the competition's
+  average when neither is known.
+- Acceptance rates are the share of scraped entries kept, per source: the
+  entries a pipeline wrote after deduplication and filtering when it reports
+  them (record_scraped / record_accepted), otherwise the entries passing the
+  quality filter (record).
+
+Both are smoothed towards priors and learned online as matches are scraped;
+the history is saved so the next crawl starts from what the last one learned.
+Quotas are checked against accepted entries plus the expected yield of
+matches still in flight, so concurrent workers do not overshoot a source.
+"""
+
+import os
+import re
+import json
+import heapq
+from typing import Dict, Iterable, List, Optional
+from urllib.parse import urlparse
+import logging
+
+from quality_filter import check_commentary
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+HISTORY_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'crawl_history.json')
+
+# Dataset mix targeted by collect_all (L'Équipe 60%, RMC Sport 30%)
+SOURCE_SHARES = {'lequipe': 0.6, 'rmc': 0.3}
+
+# Priors, each worth PRIOR_WEIGHT observations
+PRIOR_WEIGHT = 5
+PRIOR_ACCEPTANCE = 0.5
+PRIOR_ENTRIES_PER_EVENT = 1.0
+PRIOR_EVENTS_PER_HIGHLIGHT = 7.0
+PRIOR_ENTRIES_PER_MATCH = 80.0
+
+SEASON_RE = re.compile(r'-?\d{4}$')
+
+
+def detect_source(url: str) -> str:
+    """Source name of a match URL"""
+    host = urlparse(url).netloc
+    if 'rmcsport' in host or 'bfmtv' in host:
+        return 'rmc'
+    if 'lequipe' in host:
+        return 'lequipe'
+    return host or 'unknown'
+
+
+def detect_competition(url: str) -> str:
+    """
+    Competition slug of a match URL
+
+    /Football/match-direct/can/2025/maroc-comores-live/670748 → can
+    /football/can-2025/match-live-123 → can
+    """
+    parts = [part for part in urlparse(url).path.lower().split('/') if part]
+    if 'match-direct' in parts and parts.index('match-direct') + 1 < len(parts):
+        slug = parts[parts.index('match-direct') + 1]
+    elif len(parts) >= 2 and parts[0] == 'football':
+        slug = parts[1]
+    else:
+        return 'unknown'
+    return SEASON_RE.sub('', slug) or 'unknown'
+
+
+def quotas_for_target(target: int, sources: Iterable[str]) -> Dict[str, int]:
+    """
+    Split a dataset target across sources following SOURCE_SHARES
+
+    Shares are renormalized over the sources actually crawled.
+    """
+    sources = set(sources)
+    shares = {source: SOURCE_SHARES.get(source, 0.1) for source in sources}
+    total = sum(shares.values()) or 1.0
+    return {source: int(round(target * share / total)) for source, share in shares.items()}
+
+
+class _Ratio:
+    """Smoothed ratio numerator / denominator with a prior"""
+
+    def __init__(self, prior: float, numerator: float = 0.0, denominator: float = 0.0):
+        self.prior = prior
+        self.numerator = numerator
+        self.denominator = denominator
+
+    @property
+    def value(self) -> float:
+        return (self.numerator + self.prior * PRIOR_WEIGHT) / (self.denominator + PRIOR_WEIGHT)
+
+    def update(self, numerator: float, denominator: float):
+        self.numerator += numerator
+        self.denominator += denominator
+
+    def to_state(self) -> List[float]:
+        return [self.numerator, self.denominator]
+
+
+class CrawlScheduler:
+    """Frontier of match URLs, highest predicted accepted yield first"""
+
+    def __init__(
+        self,
+        quotas: Dict[str, int],
+        strict: bool = False,
+        history_file: Optional[str] = HISTORY_FILE
+    ):
+        """
+        Initialize scheduler
+
+        Args:
+            quotas: Accepted entries wanted per source
+            strict: Quality filter mode used to count accepted entries
+            history_file: Learned rates from previous crawls (None to start fresh)
+        """
+        self.quotas = dict(quotas)
+        self.strict = strict
+        self.history_file = history_file
+
+        self.accepted = {source: 0 for source in quotas}
+        self.in_flight: Dict[str, Dict] = {}
+        self.fetched = 0
+
+        self._heap = []
+        self._matches: Dict[str, Dict] = {}
+
+        self.acceptance: Dict[str, _Ratio] = {}
+        self.entries_per_event: Dict[str, _Ratio] = {}
+        self.entries_per_match: Dict[str, _Ratio] = {}
+        self.events_per_highlight = _Ratio(PRIOR_EVENTS_PER_HIGHLIGHT)
+
+        if history_file and os.path.exists(history_file):
+            self._load_history()
+
+    # ------------------------------------------------------------------
+    # Frontier
+    # ------------------------------------------------------------------
+
+    def add(
+        self,
+        url: str,
+        total_events: Optional[int] = None,
+        highlights_count: Optional[int] = None,
+        source: Optional[str] = None
+    ):
+        """Add a match to the frontier (duplicates are ignored)"""
+        if url in self._matches:
+            return
+
+        match = {
+            'url': url,
+            'source': source or detect_source(url),
+            'competition': detect_competition(url),
+            'total_events': total_events,
+            'highlights_count': highlights_count,
+        }
+        self._matches[url] = match
+        heapq.heappush(self._heap, (-self.predict(match), url))
+
+    def add_matches(self, matches: Iterable[Dict]):
+        """Add match finder entries (dicts with url, total_events, highlights_count)"""
+        for match in matches:
+            if match.get('is_commented') is False:
+                continue
+            self.add(match['url'], match.get('total_events'), match.get('highlights_count'), match.get('source'))
+
+    def add_urls(self, urls: Iterable[str], source: Optional[str] = None):
+        for url in urls:
+            self.add(url, source=source)
+
+    def expected_entries(self, match: Dict) -> float:
+        competition = match['competition']
+        if match['total_events'] is not None:
+            ratio = self.entries_per_event.setdefault(competition, _Ratio(PRIOR_ENTRIES_PER_EVENT))
+            return match['total_events'] * ratio.value
+        if match['highlights_count'] is not None:
+            ratio = self.entries_per_event.setdefault(competition, _Ratio(PRIOR_ENTRIES_PER_EVENT))
+            return match['highlights_count'] * self.events_per_highlight.value * ratio.value
+        return self.entries_per_match.setdefault(competition, _Ratio(PRIOR_ENTRIES_PER_MATCH)).value
+
+    def acceptance_rate(self, source: str) -> float:
+        return self.acceptance.setdefault(source, _Ratio(PRIOR_ACCEPTANCE)).value
+
+    def predict(self, match: Dict) -> float:
+        """Predicted accepted entries for a match"""
+        return self.expected_entries(match) * self.acceptance_rate(match['source'])
+
+    def is_open(self, source: str) -> bool:
+        """True while a source still needs entries (counting matches in flight)"""
+        if source not in self.quotas:
+            return False
+        pending = sum(flight['predicted'] for flight in self.in_flight.values() if flight['source'] == source)
+        return self.accepted[source] + pending < self.quotas[source]
+
+    @property
+    def done(self) -> bool:
+        """True once every quota is met"""
+        return all(self.accepted[source] >= quota for source, quota in self.quotas.items())
+
+    def next(self) -> Optional[str]:
+        """
+        Pop the match with the highest predicted yield among open sources
+
+        Scores are refreshed lazily: a popped match whose current prediction
+        dropped below the next best stored score goes back on the heap.
+
+        Returns:
+            URL, or None when every quota is met (or nothing useful is left)
+        """
+        skipped = []
+
+        try:
+            while self._heap:
+                stored, url = heapq.heappop(self._heap)
+                match = self._matches[url]
+
+                if not self.is_open(match['source']):
+                    skipped.append((stored, url))
+                    continue
+
+                score = self.predict(match)
+                if self._heap and -score > self._heap[0][0] + 1e-9:
+                    heapq.heappush(self._heap, (-score, url))
+                    continue
+
+                self.in_flight[url] = {'source': match['source'], 'predicted': score}
+                return url
+
+            return None
+        finally:
+            # Matches of sources closed by in-flight predictions may be needed later
+            for item in skipped:
+                heapq.heappush(self._heap, item)
+
+    def __len__(self) -> int:
+        return len(self._heap)
+
+    @property
+    def total(self) -> int:
+        """Number of matches ever added"""
+        return len(self._matches)
+
+    def source_of(self, url: str) -> str:
+        match = self._matches.get(url)
+        return match['source'] if match else detect_source(url)
+
+    # ------------------------------------------------------------------
+    # Feedback
+    # ------------------------------------------------------------------
+
+    def record(self, url: str, commentary: List[Dict]) -> int:
+        """
+        Record the result of a scraped match and update the yield model
+
+        For collectors that filter later: entries are counted as accepted when
+        they pass the quality filter, near-duplicates included.
+
+        Args:
+            url: Match URL returned by next()
+            commentary: Scraped entries (empty if the scrape failed)
+
+        Returns:
+            Number of entries passing the quality filter
+        """
+        accepted = sum(1 for entry in commentary if check_commentary(entry, strict=self.strict) is None)
+        self.record_scraped(url, len(commentary))
+        self.record_accepted(url, accepted)
+        return accepted
+
+    def _match(self, url: str) -> Dict:
+        return self._matches.get(url) or {
+            'url': url, 'source': detect_source(url), 'competition': detect_competition(url),
+            'total_events': None, 'highlights_count': None,
+        }
+
+    def record_scraped(self, url: str, scraped: int):
+        """
+        Record how many entries a match returned
+
+        The match stays in flight, predicted from its actual size, until
+        record_accepted() reports what was kept.
+
+        Args:
+            url: Match URL returned by next()
+            scraped: Entries scraped (0 if the scrape failed)
+        """
+        self.fetched += 1
+        match = self._match(url)
+        competition = match['competition']
+
+        self.entries_per_match.setdefault(competition, _Ratio(PRIOR_ENTRIES_PER_MATCH)).update(scraped, 1)
+        if match['total_events']:
+            self.entries_per_event.setdefault(competition, _Ratio(PRIOR_ENTRIES_PER_EVENT)).update(
+                scraped, match['total_events'])
+            if match['highlights_count']:
+                self.events_per_highlight.update(match['total_events'], match['highlights_count'])
+
+        self.in_flight[url] = {
+            'source': match['source'],
+            'predicted': scraped * self.acceptance_rate(match['source']),
+            'scraped': scraped,
+        }
+
+    def record_accepted(self, url: str, accepted: int):
+        """
+        Record how many entries of a scraped match were kept
+
+        Args:
+            url: Match URL passed to record_scraped()
+            accepted: Entries kept after deduplication and filtering
+        """
+        flight = self.in_flight.pop(url, None)
+        source = self._match(url)['source']
+        scraped = flight.get('scraped', accepted) if flight else accepted
+
+        self.acceptance.setdefault(source, _Ratio(PRIOR_ACCEPTANCE)).update(accepted, scraped)
+        if source in self.accepted:
+            self.accepted[source] += accepted
+
+    def progress(self) -> Dict[str, str]:
+        return {source: f"{self.accepted[source]}/{quota}" for source, quota in self.quotas.items()}
+
+    # ------------------------------------------------------------------
+    # History
+    # ------------------------------------------------------------------
+
+    def save_history(self):
+        if not self.history_file:
+            return
+
+        state = {
+            'acceptance': {key: ratio.to_state() for key, ratio in self.acceptance.items()},
+            'entries_per_event': {key: ratio.to_state() for key, ratio in self.entries_per_event.items()},
+            'entries_per_match': {key: ratio.to_state() for key, ratio in self.entries_per_match.items()},
+            'events_per_highlight': self.events_per_highlight.to_state(),
+        }
+        os.makedirs(os.path.dirname(self.history_file), exist_ok=True)
+        with open(self.history_file, 'w', encoding='utf-8') as f:
+            json.dump(state, f, indent=2)
+
+    def _load_history(self):
+        with open(self.history_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        for name, prior in (('acceptance', PRIOR_ACCEPTANCE),
+                            ('entries_per_event', PRIOR_ENTRIES_PER_EVENT),
+                            ('entries_per_match', PRIOR_ENTRIES_PER_MATCH)):
+            getattr(self, name).update({
+                key: _Ratio(prior, *values) for key, values in state.get(name, {}).items()
+            })
+        self.events_per_highlight = _Ratio(PRIOR_EVENTS_PER_HIGHLIGHT, *state.get('events_per_highlight', [0, 0]))
@@ -5,11 +5,30 @@ Creates high-quality training data based on:
 1. Analyzed commentary patterns from existing data
 2. AFCON 2025 context (teams, players, matches)
 3. French sports commentary style
+
+Examples are generated in bulk: event types, teams, players and minutes are
+drawn as NumPy arrays from a seed, and every pattern is precompiled into the
+format string of a whole JSONL line, so rendering a row is one % operation.
+Shards of SHARD_SIZE rows each draw from their own (seed, shard) stream. The
+main process samples the codes, drops repeated examples with a set of exact
+integer keys, and worker processes render the rows kept. The same seed and
+size give a byte-identical file whatever the number of processes.
+
+Usage:
+    python create_afcon_training_data.py
+    python create_afcon_training_data.py --num-examples 1000000 --seed 2025 --processes 8
 """
 
+import os
 import json
-import random
+import argparse
+from itertools import count
+from multiprocessing import Pool
 from pathlib import Path
+from string import Formatter
+from typing import Dict, Iterator, List, Optional, Tuple
+
+import numpy as np
 
 # AFCON 2025 Teams and Key Players
 TEAMS = {
@@ -87,101 +106,331 @@ COMMENTARY_PATTERNS = {
     ],
 }
 
-def generate_training_examples(num_examples: int = 2000):
-    """Generate training examples based on patterns"""
-
-    examples = []
-    system_prompt = "Tu es un commentateur sportif professionnel pour Afrique Sports. Tu génères des commentaires de match de la CAN 2025 en français, avec un style vivant, précis et engageant, similaire à L'Équipe et RMC Sport."
-
-    for i in range(num_examples):
-        # Select event type based on distribution
-        rand = random.random()
-        cumulative = 0
-        event_type = 'commentary'
-
-        for et, prob in EVENT_DISTRIBUTION.items():
-            cumulative += prob
-            if rand <= cumulative:
-                event_type = et
-                break
-
-        # Select random teams and players
-        team1, team2 = random.sample(list(TEAMS.keys()), 2)
-        players1 = TEAMS[team1]
-        players2 = TEAMS[team2]
-
-        # Select pattern and fill in details
-        pattern = random.choice(COMMENTARY_PATTERNS[event_type])
-
-        # Generate minute (weighted towards middle of match)
-        minute_ranges = [(1, 15), (16, 30), (31, 45), (46, 60), (61, 75), (76, 90)]
-        minute = random.randint(*random.choice(minute_ranges))
-
-        # Add extra time occasionally
-        if minute >= 45 and minute <= 46:
-            minute = f"45'+{random.randint(1, 4)}"
-        elif minute >= 90:
-            minute = f"90'+{random.randint(1, 6)}"
-        else:
-            minute = str(minute)
-
-        # Fill in pattern variables
-        text = pattern.format(
-            player=random.choice(players1),
-            player2=random.choice(players2),
-            player3=random.choice(players1),
-            team=team1,
-            team2=team2,
-            n=random.randint(2, 15)
-        )
-
-        # Create training example
-        example = {
-            "messages": [
-                {"role": "system", "content": system_prompt},
-                {"role": "user", "content": f"Génère un commentaire pour: Minute {minute}' - {event_type} - {team1} vs {team2}"},
-                {"role": "assistant", "content": text}
-            ]
-        }
-
-        examples.append(example)
-
-    return examples
+SYSTEM_PROMPT = "Tu es un commentateur sportif professionnel pour Afrique Sports. Tu génères des commentaires de match de la CAN 2025 en français, avec un style vivant, précis et engageant, similaire à L'Équipe et RMC Sport."
+
+USER_PATTERN = "Génère un commentaire pour: Minute {minute}' - {event_type} - {team} vs {team2}"
+
+# Minutes are drawn uniformly within a uniformly drawn 15-minute range
+MINUTE_RANGES = [(1, 15), (16, 30), (31, 45), (46, 60), (61, 75), (76, 90)]
+
+SHARD_SIZE = 100_000
+
+
+def _json_fragment(text: str) -> str:
+    """Text escaped as the inside of a JSON string (json.dumps with ensure_ascii=False)"""
+    return json.dumps(text, ensure_ascii=False)[1:-1]
+
+
+def _compile(pattern: str) -> Tuple[str, List[str]]:
+    """
+    Turn a str.format pattern into a %-format of JSON-escaped pieces
+
+    Returns:
+        (format string, field names in order)
+    """
+    parts, fields = [], []
+    for literal, field, _, _ in Formatter().parse(pattern):
+        parts.append(_json_fragment(literal).replace('%', '%%'))
+        if field is not None:
+            parts.append('%s')
+            fields.append(field)
+    return ''.join(parts), fields
+
+
+def _line_format(pattern: str) -> Tuple[str, List[str]]:
+    """%-format of a whole JSONL line (the json.dumps layout) for one commentary pattern"""
+    skeleton = json.dumps({
+        "messages": [
+            {"role": "system", "content": SYSTEM_PROMPT},
+            {"role": "user", "content": "\x00user"},
+            {"role": "assistant", "content": "\x00text"}
+        ]
+    }, ensure_ascii=False).replace('%', '%%')
+
+    user_format, user_fields = _compile(USER_PATTERN)
+    text_format, text_fields = _compile(pattern)
+    line = skeleton.replace('\\u0000user', user_format).replace('\\u0000text', text_format)
+    return line + '\n', user_fields + text_fields
+
+
+EVENT_TYPES = list(EVENT_DISTRIBUTION)
+EVENT_PROBABILITIES = np.array(list(EVENT_DISTRIBUTION.values())) / sum(EVENT_DISTRIBUTION.values())
+
+TEAM_NAMES = list(TEAMS)
+PLAYER_COUNTS = np.array([len(TEAMS[team]) for team in TEAM_NAMES])
+PLAYER_OFFSETS = np.concatenate(([0], np.cumsum(PLAYER_COUNTS)[:-1]))
+
+# Flat pattern table, grouped by event type
+PATTERNS = [pattern for event_type in EVENT_TYPES for pattern in COMMENTARY_PATTERNS[event_type]]
+PATTERN_COUNTS = np.array([len(COMMENTARY_PATTERNS[event_type]) for event_type in EVENT_TYPES])
+PATTERN_OFFSETS = np.concatenate(([0], np.cumsum(PATTERN_COUNTS)[:-1]))
+LINE_FORMATS = [_line_format(pattern) for pattern in PATTERNS]
+
+# Minute labels: 1-90 as is, 100 + k for "45'+k", 110 + k for "90'+k"
+MINUTE_LABELS = [str(minute) for minute in range(100)] + [f"45'+{k}" for k in range(10)] + [f"90'+{k}" for k in range(10)]
+
+# JSON-escaped values, indexed by the sampled codes
+VALUES = {
+    'event_type': np.array([_json_fragment(event_type) for event_type in EVENT_TYPES], dtype=object),
+    'team': np.array([_json_fragment(team) for team in TEAM_NAMES], dtype=object),
+    'player': np.array([_json_fragment(player) for team in TEAM_NAMES for player in TEAMS[team]], dtype=object),
+    'minute': np.array([_json_fragment(label) for label in MINUTE_LABELS], dtype=object),
+    'n': np.array([str(n) for n in range(16)], dtype=object),
+}
+
+
+def sample_shard(seed: int, shard: int, rows: int) -> Dict[str, np.ndarray]:
+    """
+    Draw the codes of one shard of examples
+
+    Returns:
+        Arrays of codes: event_type, pattern, team, team2, player, player2,
+        player3, minute (MINUTE_LABELS index) and n
+    """
+    rng = np.random.default_rng([seed, shard])
+
+    events = rng.choice(len(EVENT_TYPES), size=rows, p=EVENT_PROBABILITIES)
+    team1 = rng.integers(0, len(TEAM_NAMES), rows)
+    team2 = (team1 + rng.integers(1, len(TEAM_NAMES), rows)) % len(TEAM_NAMES)
+
+    def pick(offsets, counts, groups):
+        return offsets[groups] + (rng.random(rows) * counts[groups]).astype(np.int64)
+
+    low = np.array([low for low, _ in MINUTE_RANGES])[rng.integers(0, len(MINUTE_RANGES), rows)]
+    minute = low + rng.integers(0, 15, rows)
+    # Extra time on 45/46 and 90, as displayed by the live pages
+    minute = np.where((minute == 45) | (minute == 46), 100 + rng.integers(1, 5, rows), minute)
+    minute = np.where(minute == 90, 110 + rng.integers(1, 7, rows), minute)
+
+    return {
+        'event_type': events,
+        'pattern': pick(PATTERN_OFFSETS, PATTERN_COUNTS, events),
+        'team': team1,
+        'team2': team2,
+        'player': pick(PLAYER_OFFSETS, PLAYER_COUNTS, team1),
+        'player2': pick(PLAYER_OFFSETS, PLAYER_COUNTS, team2),
+        'player3': pick(PLAYER_OFFSETS, PLAYER_COUNTS, team1),
+        'minute': minute,
+        'n': rng.integers(2, 16, rows),
+    }
+
+
+# Exact dedupe key: the codes a row's text depends on, packed into one integer
+KEY_FIELDS = [
+    ('pattern', len(PATTERNS)), ('minute', len(MINUTE_LABELS)),
+    ('team', len(TEAM_NAMES)), ('team2', len(TEAM_NAMES)),
+    ('player', len(VALUES['player'])), ('player2', len(VALUES['player'])), ('player3', len(VALUES['player'])),
+    ('n', len(VALUES['n'])),
+]
+KEY_SHIFTS = dict(zip([name for name, _ in KEY_FIELDS],
+                      np.cumsum([0] + [max(size - 1, 1).bit_length() for _, size in KEY_FIELDS[:-1]])))
+assert sum(max(size - 1, 1).bit_length() for _, size in KEY_FIELDS) <= 63
+
+# Per pattern, whether its text uses a field (the user prompt always uses minute, event type and teams)
+FIELD_USED = {
+    name: np.array([name in fields for _, fields in LINE_FORMATS], dtype=np.int64)
+    for name, _ in KEY_FIELDS
+}
+
+
+def example_keys(codes: Dict[str, np.ndarray]) -> np.ndarray:
+    """
+    Dedupe keys of sampled rows
+
+    Fields a pattern does not print are left out, so two rows share a key
+    exactly when they render the same example.
+    """
+    pattern = codes['pattern']
+    keys = pattern.astype(np.int64)
+    for name, _ in KEY_FIELDS[1:]:
+        keys |= (codes[name] * FIELD_USED[name][pattern]) << int(KEY_SHIFTS[name])
+    return keys
+
+
+def render_shard(seed: int, shard: int, rows: int, keep: Optional[np.ndarray] = None) -> bytes:
+    """
+    Worker: sample one shard and render its rows as JSONL
+
+    Args:
+        seed: Random seed
+        shard: Shard number
+        rows: Rows sampled in the shard
+        keep: Indices of the rows to render (default: all)
+
+    Returns:
+        UTF-8 JSONL of the kept rows, in row order
+    """
+    codes = sample_shard(seed, shard, rows)
+    if keep is not None:
+        codes = {name: values[keep] for name, values in codes.items()}
+
+    columns = {
+        'event_type': VALUES['event_type'][codes['event_type']],
+        'team': VALUES['team'][codes['team']],
+        'team2': VALUES['team'][codes['team2']],
+        'player': VALUES['player'][codes['player']],
+        'player2': VALUES['player'][codes['player2']],
+        'player3': VALUES['player'][codes['player3']],
+        'minute': VALUES['minute'][codes['minute']],
+        'n': VALUES['n'][codes['n']],
+    }
+
+    lines = np.empty(len(codes['pattern']), dtype=object)
+    for pattern in np.unique(codes['pattern']):
+        rows_of_pattern = np.flatnonzero(codes['pattern'] == pattern)
+        line_format, fields = LINE_FORMATS[pattern]
+        values = [columns[field][rows_of_pattern].tolist() for field in fields]
+        lines[rows_of_pattern] = [line_format % args for args in zip(*values)]
+
+    return ''.join(lines.tolist()).encode('utf-8')
+
+
+def _render_star(args):
+    return render_shard(*args)
+
+
+def plan_shards(num_examples: int, seed: int, shard_size: int = SHARD_SIZE) -> Tuple[List[Tuple], Dict]:
+    """
+    Pick, shard by shard, the rows that make the first `num_examples` unique examples
+
+    Only codes are sampled here (no rendering); rows whose key was already
+    seen, in this shard or an earlier one, are dropped.
+
+    Returns:
+        (render_shard arguments per shard, stats with event type counts and duplicates)
+    """
+    seen = set()
+    tasks = []
+    event_counts = np.zeros(len(EVENT_TYPES), dtype=np.int64)
+    duplicates = 0
+    planned = 0
+
+    for shard in count():
+        if planned >= num_examples:
+            break
+
+        codes = sample_shard(seed, shard, shard_size)
+        keys = example_keys(codes)
+
+        # First occurrence of each key within the shard, then against earlier shards
+        _, first = np.unique(keys, return_index=True)
+        first.sort()
+        fresh = np.fromiter((key not in seen for key in keys[first].tolist()), dtype=bool, count=len(first))
+        keep = first[fresh]
+        if not len(keep):
+            raise RuntimeError(f"No new examples in a shard of {shard_size}: "
+                               f"patterns exhausted after {planned} examples")
+
+        # The last shard is cut at the row completing num_examples
+        examined = shard_size
+        if len(keep) > num_examples - planned:
+            keep = keep[:num_examples - planned]
+            examined = int(keep[-1]) + 1
+
+        seen.update(keys[keep].tolist())
+        duplicates += examined - len(keep)
+        event_counts += np.bincount(codes['event_type'][keep], minlength=len(EVENT_TYPES))
+        planned += len(keep)
+        tasks.append((seed, shard, shard_size, keep))
+
+    stats = {
+        'examples': planned,
+        'event_types': dict(zip(EVENT_TYPES, event_counts.tolist())),
+        'duplicates': duplicates,
+        'shards': len(tasks),
+    }
+    return tasks, stats
+
+
+def iter_shards(tasks: List[Tuple], processes: int = 1) -> Iterator[bytes]:
+    """Render planned shards, in order, in worker processes"""
+    if processes <= 1:
+        yield from map(_render_star, tasks)
+        return
+
+    with Pool(processes) as pool:
+        yield from pool.imap(_render_star, tasks)
+
+
+def generate_training_examples(num_examples: int = 2000, seed: Optional[int] = None) -> List[Dict]:
+    """Generate training examples based on patterns (in memory; see generate_dataset for large runs)"""
+    tasks, _ = plan_shards(num_examples, new_seed() if seed is None else seed)
+    return [json.loads(line) for chunk in iter_shards(tasks) for line in chunk.splitlines()]
+
+
+def generate_dataset(
+    output_file: str,
+    num_examples: int = 2000,
+    seed: Optional[int] = None,
+    processes: int = 1,
+    shard_size: int = SHARD_SIZE,
+    samples: int = 5
+) -> Dict:
+    """
+    Generate examples straight to a JSONL file
+
+    Args:
+        output_file: Output JSONL
+        num_examples: Examples to generate
+        seed: Random seed (a fresh one is drawn and returned when None)
+        processes: Worker processes rendering shards
+        shard_size: Rows sampled per shard (part of what the seed reproduces)
+        samples: Sample examples returned in the stats
+
+    Returns:
+        Statistics: seed, examples, event type counts, duplicates rejected, sample examples
+    """
+    seed = new_seed() if seed is None else seed
+    tasks, stats = plan_shards(num_examples, seed, shard_size)
+
+    Path(output_file).parent.mkdir(parents=True, exist_ok=True)
+    tmp_path = f"{output_file}.tmp"
+    sample_lines = []
+
+    with open(tmp_path, 'wb') as f:
+        for chunk in iter_shards(tasks, processes):
+            f.write(chunk)
+            if len(sample_lines) < samples:
+                sample_lines.extend(chunk.split(b'\n', samples)[:samples - len(sample_lines)])
+
+    os.replace(tmp_path, output_file)
+
+    stats['seed'] = seed
+    stats['samples'] = [json.loads(line) for line in sample_lines if line]
+    return stats
+
+
+def new_seed() -> int:
+    """Fresh seed, printed so that the run can be reproduced"""
+    return int(np.random.SeedSequence().entropy % (1 << 32))
 
 
 def main():
     """Generate and save training data"""
+    parser = argparse.ArgumentParser(description='Generate AFCON 2025 training examples')
+    parser.add_argument('--num-examples', type=int, default=2000, help='Examples to generate')
+    parser.add_argument('--seed', type=int, default=None, help='Random seed (same seed, same file)')
+    parser.add_argument('--processes', type=int, default=1, help='Worker processes')
+    parser.add_argument('--output', default='data/afcon2025_training.jsonl', help='Output JSONL')
+    args = parser.parse_args()
 
     print("=" * 70)
     print("AFCON 2025 TRAINING DATA GENERATOR")
     print("=" * 70)
 
     # Generate examples
-    print("\nGenerating 2000 training examples...")
-    examples = generate_training_examples(2000)
+    print(f"\nGenerating {args.num_examples} training examples...")
+    stats = generate_dataset(args.output, args.num_examples, args.seed, args.processes)
 
-    print(f"✅ Generated {len(examples)} examples")
+    print(f"✅ Generated {stats['examples']} examples "
+          f"(seed {stats['seed']}, {stats['duplicates']} duplicates rejected)")
 
     # Event type statistics
-    event_counts = {}
-    for ex in examples:
-        user_msg = ex['messages'][1]['content']
-        for event_type in EVENT_DISTRIBUTION.keys():
-            if event_type in user_msg:
-                event_counts[event_type] = event_counts.get(event_type, 0) + 1
-
     print("\nEvent Type Distribution:")
-    for event_type, count in sorted(event_counts.items(), key=lambda x: -x[1]):
-        print(f"  {event_type:20s}: {count:4d} ({count/len(examples)*100:.1f}%)")
-
-    # Save to JSONL
-    output_file = Path("data/afcon2025_training.jsonl")
-    output_file.parent.mkdir(exist_ok=True)
-
-    with open(output_file, 'w', encoding='utf-8') as f:
-        for example in examples:
-            f.write(json.dumps(example, ensure_ascii=False) + '\n')
+    for event_type, count in sorted(stats['event_types'].items(), key=lambda x: -x[1]):
+        print(f"  {event_type:20s}: {count:4d} ({count/max(stats['examples'], 1)*100:.1f}%)")
 
+    output_file = args.output
     print(f"\n✅ Saved to: {output_file}")
 
     # Show samples
@@ -189,7 +438,7 @@ def main():
     print("SAMPLE TRAINING EXAMPLES")
     print("=" * 70)
 
-    for i, example in enumerate(random.sample(examples, 5), 1):
+    for i, example in enumerate(stats['samples'], 1):
         user_content = example['messages'][1]['content']
         assistant_content = example['messages'][2]['content']
 
@@ -0,0 +1,273 @@
+#!/usr/bin/env python3
+"""
+Weighted streaming mixer for JSONL training sources
+Builds e.g. "70% L'Équipe, 20% synthetic AFCON, 10% historical, 50k lines" from two
+sequential passes over each source: one counting its lines, one sampling them
+
+- Each source is given as PATH:WEIGHT[:CAP]; weights are normalized, CAP
+  limits the lines taken from that source
+- The mix is the largest one (up to --total) that keeps the weights exact
+  without repeating lines; sources with more lines than their quota are
+  downsampled uniformly
+- Lines are copied unparsed and interleaved by a seeded sampler, so every
+  prefix of the output (and every shard) has the target proportions
+- Memory is constant: one open reader per source, one line in flight
+
+Usage:
+    python dataset_mixer.py data/mix.jsonl \\
+        data/lequipe_training.jsonl:0.7 data/afcon_training.jsonl:0.2 data/historical_training.jsonl:0.1 \\
+        --total 50000 --shards 4 --seed 42
+"""
+
+import os
+import json
+import random
+import argparse
+from dataclasses import dataclass, field
+from typing import Dict, Iterator, List, Optional, Tuple
+import logging
+
+from chat_export import shard_path
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+COUNT_CHUNK = 1 << 20
+
+
+@dataclass
+class Source:
+    """One JSONL input of the mix"""
+    path: str
+    weight: float
+    cap: Optional[int] = None
+    lines: int = 0
+    quota: int = 0
+    name: str = field(init=False)
+
+    def __post_init__(self):
+        self.name = os.path.splitext(os.path.basename(self.path))[0]
+
+    @classmethod
+    def parse(cls, spec: str) -> 'Source':
+        """Parse PATH:WEIGHT[:CAP] (the path may itself contain ':')"""
+        path, *numbers = spec.rsplit(':', 2)
+        if len(numbers) == 2 and not (_is_number(numbers[0]) and numbers[1].isdigit()):
+            # Only the last field is a number: it is the weight, the rest is the path
+            path, numbers = f"{path}:{numbers[0]}", numbers[1:]
+        try:
+            if len(numbers) not in (1, 2):
+                raise ValueError
+            source = cls(path, float(numbers[0]), int(numbers[1]) if len(numbers) == 2 else None)
+        except ValueError:
+            raise ValueError(f"Bad source '{spec}', expected PATH:WEIGHT[:CAP]")
+        if source.weight <= 0:
+            raise ValueError(f"Source weight must be positive: '{spec}'")
+        return source
+
+    @property
+    def available(self) -> int:
+        return self.lines if self.cap is None else min(self.lines, self.cap)
+
+
+def _is_number(text: str) -> bool:
+    try:
+        float(text)
+        return True
+    except ValueError:
+        return False
+
+
+def count_lines(file_path: str) -> int:
+    """Number of non-blank lines of a JSONL file (the first of the two passes over a source)"""
+    with open(file_path, 'rb') as f:
+        return sum(1 for line in f if line.strip())
+
+
+def plan_mix(sources: List[Source], total: Optional[int] = None) -> int:
+    """
+    Count every source and set its quota
+
+    The mix is the largest one that keeps the weights exact without taking
+    a line twice, limited to `total` lines. Quotas are rounded with the
+    largest remainder method so they add up to the total.
+
+    Args:
+        sources: Sources of the mix (lines and quota are filled in)
+        total: Maximum number of output lines (None: as many as possible)
+
+    Returns:
+        Number of output lines
+    """
+    weight_sum = sum(source.weight for source in sources)
+    for source in sources:
+        source.lines = count_lines(source.path)
+
+    # The epsilon keeps e.g. 3000 / 0.2 from rounding down to 14999
+    limit = min(int(source.available * weight_sum / source.weight + 1e-9) for source in sources)
+    if total is None:
+        total = limit
+    elif total > limit:
+        short = min(sources, key=lambda source: source.available * weight_sum / source.weight)
+        logger.warning(f"⚠️  Only {limit} lines keep the weights exact ({short.name} has "
+                       f"{short.available} lines for a {short.weight / weight_sum:.0%} share), "
+                       f"asked for {total}")
+        total = limit
+
+    shares = [total * source.weight / weight_sum for source in sources]
+    for source, share in zip(sources, shares):
+        source.quota = int(share)
+    by_remainder = sorted(range(len(sources)), key=lambda i: int(shares[i]) - shares[i])
+    for i in by_remainder[:total - sum(source.quota for source in sources)]:
+        sources[i].quota += 1
+    for source in sources:
+        source.quota = min(source.quota, source.available)
+
+    return sum(source.quota for source in sources)
+
+
+def iter_sample(source: Source, rng: random.Random) -> Iterator[bytes]:
+    """
+    Uniform sample of `source.quota` lines of a source, in file order
+
+    Selection sampling (Knuth's Algorithm S): with n lines left to read and
+    k still to take, the next line is taken with probability k / n. This is
+    the second pass over the source, after count_lines(). The count is
+    needed anyway to plan exact quotas (the mix size depends on how many
+    lines the scarcest source has), and with it the sample is exactly
+    `quota` lines while holding one line at a time, where a one-pass
+    reservoir would keep all k sampled lines in memory.
+
+    Args:
+        source: Planned source (lines and quota set)
+        rng: Random generator of this source
+
+    Yields:
+        Sampled lines, newline-terminated
+    """
+    needed = source.quota
+    remaining = source.lines
+    with open(source.path, 'rb') as f:
+        for line in f:
+            if needed == 0:
+                return
+            if not line.strip():
+                continue
+            if rng.random() * remaining < needed:
+                yield line if line.endswith(b'\n') else line + b'\n'
+                needed -= 1
+            remaining -= 1
+
+
+def iter_mix(sources: List[Source], seed: int = 0) -> Iterator[Tuple[int, bytes]]:
+    """
+    Interleave the samples of all sources
+
+    Each line is drawn from a source with probability proportional to what
+    is left of its quota, so the mix stays on target all along the output.
+
+    Args:
+        sources: Planned sources
+        seed: Seed of the sampler (same seed and sources, same output)
+
+    Yields:
+        (source index, line) tuples
+    """
+    rng = random.Random(seed)
+    readers = [iter_sample(source, random.Random(f"{seed}:{source.path}")) for source in sources]
+    left = [source.quota for source in sources]
+    total = sum(left)
+
+    while total:
+        pick = rng.randrange(total)
+        index = 0
+        while pick >= left[index]:
+            pick -= left[index]
+            index += 1
+        yield index, next(readers[index])
+        left[index] -= 1
+        total -= 1
+
+
+def mix_datasets(
+    sources: List[Source],
+    output_file: str,
+    total: Optional[int] = None,
+    shards: int = 1,
+    seed: int = 0
+) -> Dict:
+    """
+    Write a weighted mix of JSONL sources
+
+    Args:
+        sources: Sources with their weights and caps
+        output_file: Output path; shards get a -NNNNN-of-NNNNN suffix
+        total: Maximum number of output lines (None: as many as the weights allow)
+        shards: Output files; lines are dealt round-robin, so every shard has the same mix
+        seed: Sampler seed
+
+    Returns:
+        Mix statistics (total, per-source lines / quota, files)
+    """
+    written = plan_mix(sources, total)
+    paths = [shard_path(output_file, 'train', index, shards) for index in range(shards)]
+
+    os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+    files = [open(f"{path}.tmp", 'wb') for path in paths]
+    try:
+        for position, (_, line) in enumerate(iter_mix(sources, seed)):
+            files[position % shards].write(line)
+    finally:
+        for f in files:
+            f.close()
+    for path in paths:
+        os.replace(f"{path}.tmp", path)
+
+    return {
+        'total': written,
+        'seed': seed,
+        'sources': [{'path': source.path, 'weight': source.weight, 'cap': source.cap,
+                     'lines': source.lines, 'taken': source.quota} for source in sources],
+        'files': paths,
+    }
+
+
+def log_mix(stats: Dict):
+    """Log the share and sampling rate of every source"""
+    total = stats['total'] or 1
+    weight_sum = sum(source['weight'] for source in stats['sources'])
+    logger.info(f"✅ Mixed {stats['total']} lines (seed {stats['seed']}):")
+    for source in stats['sources']:
+        rate = source['taken'] / source['lines'] if source['lines'] else 0
+        logger.info(f"   {source['path']}: {source['taken']}/{source['lines']} lines "
+                    f"({rate:.1%} sampled) → {source['taken'] / total:.1%} "
+                    f"(target {source['weight'] / weight_sum:.1%})")
+    for path in stats['files']:
+        logger.info(f"   💾 {path}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Weighted streaming mix of JSONL training sources')
+    parser.add_argument('output', help='Output JSONL file')
+    parser.add_argument('sources', nargs='+', help='Sources as PATH:WEIGHT[:CAP]')
+    parser.add_argument('--total', type=int, help='Maximum number of output lines')
+    parser.add_argument('--shards', type=int, default=1, help='Output files')
+    parser.add_argument('--seed', type=int, default=0, help='Sampler seed')
+    parser.add_argument('--dry-run', action='store_true', help='Print the per-source quotas only')
+
+    args = parser.parse_args()
+
+    sources = [Source.parse(spec) for spec in args.sources]
+    if args.dry_run:
+        total = plan_mix(sources, args.total)
+        print(json.dumps({'total': total, 'sources': {source.path: source.quota for source in sources}}, indent=2))
+        return
+
+    log_mix(mix_datasets(sources, args.output, total=args.total, shards=args.shards, seed=args.seed))
+
+
+if __name__ == '__main__':
+    main()
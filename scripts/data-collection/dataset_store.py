@@ -0,0 +1,642 @@
+#!/usr/bin/env python3
+"""
+Columnar dataset store for commentary data
+Replaces pretty-printed JSON lists with typed, memory-mapped column shards
+
+Layout of a dataset directory:
+
+    manifest.json               schema, shard list, row counts
+    shard-00000/
+        text.offsets            uint64 offsets into text.data (rows + 1)
+        text.data               concatenated UTF-8 strings
+        source.codes            uint32 dictionary codes
+        source.dict.json        dictionary for the shard
+        scraped_at.values       int64 epoch microseconds
+        ...
+
+Repeated strings (source, url, method, time, system prompt) are dictionary
+encoded per shard, timestamps are integers, and readers mmap only the columns
+they ask for. Readers decode a whole column of a shard at a time (one copy of
+the data, slices decoded in a list comprehension) rather than value by value.
+
+Columns are not compressed: they stay mmap-able, so a reader pays only for
+the columns and rows it touches. Text dominates the size (about 116 MB per
+million commentary rows, close to the raw UTF-8), and compresses about 3x with
+gzip or zstd when a store is archived or shipped (shard_store.py sends it as
+is).
+
+Usage:
+    python dataset_store.py convert data/training_commentary.json data/store/training_commentary
+    python dataset_store.py convert-all data data/store
+    python dataset_store.py info data/store/training_commentary
+    python dataset_store.py export data/store/training_commentary out.jsonl
+"""
+
+import os
+import sys
+import json
+import mmap
+import shutil
+import argparse
+from array import array
+from datetime import datetime, timedelta, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+
+NULL_CODE = 0xFFFFFFFF
+NULL_INT = -(1 << 63)
+
+# Timestamps are stored as naive UTC epoch microseconds
+EPOCH = datetime(1970, 1, 1)
+MICROSECOND = timedelta(microseconds=1)
+
+# Column types: string, category (dictionary encoded), timestamp, int, bool, json
+COMMENTARY_SCHEMA = [
+    ('source', 'category'),
+    ('time', 'category'),
+    ('text', 'string'),
+    ('event_type', 'category'),
+    ('scraped_at', 'timestamp'),
+    ('url', 'category'),
+    ('method', 'category'),
+    ('match', 'category'),
+]
+
+CHAT_SCHEMA = [
+    ('system', 'category'),
+    ('user', 'string'),
+    ('assistant', 'string'),
+]
+
+MATCH_SCHEMA = [
+    ('url', 'string'),
+    ('title', 'string'),
+    ('is_commented', 'bool'),
+    ('is_fully_commented', 'bool'),
+    ('highlights_count', 'int'),
+    ('total_events', 'int'),
+    ('status', 'category'),
+]
+
+SCHEMAS = {
+    'commentary': COMMENTARY_SCHEMA,
+    'chat': CHAT_SCHEMA,
+    'match': MATCH_SCHEMA,
+}
+
+# Fields outside the schema are kept, as one JSON object per row
+EXTRA_COLUMN = '_extra'
+CHAT_ROLES = ('system', 'user', 'assistant')
+
+
+def detect_schema(record: Dict) -> str:
+    """Guess the schema name of a record"""
+    if 'messages' in record:
+        return 'chat'
+    if 'is_fully_commented' in record:
+        return 'match'
+    return 'commentary'
+
+
+def chat_to_row(record: Dict) -> Dict:
+    """Flatten a system/user/assistant chat example into columns"""
+    messages = record.get('messages', [])
+    roles = [message.get('role') for message in messages]
+    if tuple(roles) != CHAT_ROLES:
+        # Unusual shape: keep it verbatim in the extra column
+        return {EXTRA_COLUMN: record}
+
+    row = {message['role']: message['content'] for message in messages}
+    extra = {key: value for key, value in record.items() if key != 'messages'}
+    if extra:
+        row[EXTRA_COLUMN] = extra
+    return row
+
+
+def row_to_chat(row: Dict) -> Dict:
+    """Rebuild a chat example from its columns"""
+    extra = row.get(EXTRA_COLUMN) or {}
+    if 'messages' in extra:
+        return extra
+
+    record = {'messages': [{'role': role, 'content': row[role]} for role in CHAT_ROLES]}
+    record.update(extra)
+    return record
+
+
+def timestamp_to_int(value) -> int:
+    """ISO string / epoch seconds → epoch microseconds (naive times are UTC)"""
+    if value is None:
+        return NULL_INT
+    if isinstance(value, (int, float)):
+        # Numbers are epoch seconds
+        return int(round(value * 1_000_000))
+
+    parsed = datetime.fromisoformat(str(value).replace('Z', '+00:00'))
+    if parsed.tzinfo is not None:
+        parsed = parsed.astimezone(timezone.utc).replace(tzinfo=None)
+    return (parsed - EPOCH) // MICROSECOND
+
+
+def int_to_timestamp(value: int) -> Optional[str]:
+    """Epoch microseconds → naive UTC ISO string (the scrapers' format)"""
+    if value == NULL_INT:
+        return None
+    return (EPOCH + timedelta(microseconds=value)).isoformat()
+
+
+def _format_timestamps(values: List[int]) -> List[Optional[str]]:
+    """int_to_timestamp over a column, formatting each distinct second once"""
+    seconds_cache: Dict[int, str] = {}
+    formatted = []
+    for value in values:
+        if value == NULL_INT:
+            formatted.append(None)
+            continue
+        seconds, micros = divmod(value, 1_000_000)
+        base = seconds_cache.get(seconds)
+        if base is None:
+            base = seconds_cache[seconds] = (EPOCH + timedelta(seconds=seconds)).isoformat()
+        # isoformat() leaves out a zero fraction
+        formatted.append(f"{base}.{micros:06d}" if micros else base)
+    return formatted
+
+
+class _ShardBuilder:
+    """Accumulates one shard's columns in memory before flushing them"""
+
+    def __init__(self, schema: List[Tuple[str, str]]):
+        self.schema = schema
+        self.rows = 0
+        self.columns = {}
+        for name, kind in schema + [(EXTRA_COLUMN, 'json')]:
+            if kind in ('string', 'json'):
+                self.columns[name] = {'offsets': array('Q', [0]), 'data': bytearray(), 'valid': bytearray()}
+            elif kind == 'category':
+                self.columns[name] = {'codes': array('I'), 'lookup': {}, 'values': []}
+            elif kind in ('timestamp', 'int'):
+                self.columns[name] = {'values': array('q')}
+            elif kind == 'bool':
+                self.columns[name] = {'values': array('b')}
+            else:
+                raise ValueError(f"Unknown column type: {kind}")
+
+    def append(self, row: Dict):
+        known = set()
+        for name, kind in self.schema:
+            known.add(name)
+            self._append_value(name, kind, row.get(name))
+
+        extra = row.get(EXTRA_COLUMN)
+        if extra is None:
+            extra = {key: value for key, value in row.items() if key not in known} or None
+        self._append_value(EXTRA_COLUMN, 'json', extra)
+        self.rows += 1
+
+    def _append_value(self, name: str, kind: str, value):
+        column = self.columns[name]
+
+        if kind in ('string', 'json'):
+            if value is None:
+                column['valid'].append(0)
+            else:
+                column['valid'].append(1)
+                text = value if kind == 'string' else json.dumps(value, ensure_ascii=False)
+                column['data'] += str(text).encode('utf-8')
+            column['offsets'].append(len(column['data']))
+
+        elif kind == 'category':
+            if value is None:
+                column['codes'].append(NULL_CODE)
+                return
+            value = str(value)
+            code = column['lookup'].get(value)
+            if code is None:
+                code = column['lookup'][value] = len(column['values'])
+                column['values'].append(value)
+            column['codes'].append(code)
+
+        elif kind == 'timestamp':
+            column['values'].append(timestamp_to_int(value))
+
+        elif kind == 'int':
+            column['values'].append(NULL_INT if value is None else int(value))
+
+        elif kind == 'bool':
+            column['values'].append(-1 if value is None else int(bool(value)))
+
+    def flush(self, shard_dir: Path) -> Dict:
+        """Write column files and return the shard's manifest entry"""
+        shard_dir.mkdir(parents=True, exist_ok=True)
+        sizes = {}
+
+        for name, kind in self.schema + [(EXTRA_COLUMN, 'json')]:
+            column = self.columns[name]
+            files = {}
+
+            if kind in ('string', 'json'):
+                files['offsets'] = column['offsets'].tobytes()
+                files['data'] = bytes(column['data'])
+                # Validity is only stored when some rows are null
+                if 0 in column['valid']:
+                    files['valid'] = bytes(column['valid'])
+            elif kind == 'category':
+                files['codes'] = column['codes'].tobytes()
+                files['dict.json'] = json.dumps(column['values'], ensure_ascii=False).encode('utf-8')
+            else:
+                files['values'] = column['values'].tobytes()
+
+            for suffix, payload in files.items():
+                (shard_dir / f"{name}.{suffix}").write_bytes(payload)
+                sizes[name] = sizes.get(name, 0) + len(payload)
+
+        return {'name': shard_dir.name, 'rows': self.rows, 'bytes': sizes}
+
+
+class DatasetWriter:
+    """Writes records into a columnar dataset, one shard per `shard_size` rows"""
+
+    def __init__(self, path: str, schema: str = 'commentary', shard_size: int = 100_000):
+        """
+        Initialize writer (an existing dataset at `path` is replaced on close)
+
+        Args:
+            path: Dataset directory
+            schema: Schema name ('commentary', 'chat' or 'match')
+            shard_size: Rows per shard
+        """
+        self.path = Path(path)
+        self.schema_name = schema
+        self.schema = SCHEMAS[schema]
+        self.shard_size = shard_size
+        self.shards = []
+
+        self._tmp_path = self.path.with_name(self.path.name + '.tmp')
+        if self._tmp_path.exists():
+            shutil.rmtree(self._tmp_path)
+        self._tmp_path.mkdir(parents=True)
+        self._builder = _ShardBuilder(self.schema)
+
+    def write(self, record: Dict):
+        """Append one record"""
+        row = chat_to_row(record) if self.schema_name == 'chat' else record
+        self._builder.append(row)
+        if self._builder.rows >= self.shard_size:
+            self._flush()
+
+    def write_many(self, records: Iterable[Dict]) -> 'DatasetWriter':
+        for record in records:
+            self.write(record)
+        return self
+
+    def _flush(self):
+        if self._builder.rows:
+            shard_dir = self._tmp_path / f"shard-{len(self.shards):05d}"
+            self.shards.append(self._builder.flush(shard_dir))
+        self._builder = _ShardBuilder(self.schema)
+
+    def close(self) -> Dict:
+        """Flush the last shard, write the manifest and move the dataset into place"""
+        self._flush()
+
+        manifest = {
+            'format_version': FORMAT_VERSION,
+            'schema_name': self.schema_name,
+            'schema': [{'name': name, 'type': kind} for name, kind in self.schema],
+            'byteorder': sys.byteorder,
+            'rows': sum(shard['rows'] for shard in self.shards),
+            'shards': self.shards,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+        }
+        (self._tmp_path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+        if self.path.exists():
+            shutil.rmtree(self.path)
+        os.replace(self._tmp_path, self.path)
+
+        return manifest
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        if exc_type is None:
+            self.close()
+        else:
+            shutil.rmtree(self._tmp_path, ignore_errors=True)
+
+
+class ColumnShard:
+    """One column of one shard, decoded lazily from memory-mapped files"""
+
+    def __init__(self, shard_dir: Path, name: str, kind: str, rows: int):
+        self.kind = kind
+        self.rows = rows
+        # Views are released before their mmap is closed (close())
+        self._maps: List[Tuple[Optional[mmap.mmap], List[memoryview]]] = []
+        base = shard_dir / name
+
+        if kind in ('string', 'json'):
+            self.offsets = self._map_file(Path(f"{base}.offsets"), 'Q')
+            self.data = self._map_file(Path(f"{base}.data"))
+            valid_path = Path(f"{base}.valid")
+            self.valid = self._map_file(valid_path) if valid_path.exists() else None
+        elif kind == 'category':
+            self.codes = self._map_file(Path(f"{base}.codes"), 'I')
+            self.dictionary = json.loads(Path(f"{base}.dict.json").read_text(encoding='utf-8'))
+        elif kind in ('timestamp', 'int'):
+            self.values = self._map_file(Path(f"{base}.values"), 'q')
+        elif kind == 'bool':
+            self.values = self._map_file(Path(f"{base}.values"), 'b')
+
+    def _map_file(self, path: Path, fmt: Optional[str] = None) -> memoryview:
+        """Memory-map a column file read-only (empty files map to an empty view)"""
+        if path.stat().st_size == 0:
+            mapped, view = None, memoryview(b'')
+        else:
+            with open(path, 'rb') as f:
+                mapped = mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ)
+            view = memoryview(mapped)
+        views = [view]
+        if fmt is not None:
+            views.append(view.cast(fmt))
+        self._maps.append((mapped, views))
+        return views[-1]
+
+    def close(self):
+        """Unmap the column files"""
+        for mapped, views in self._maps:
+            for view in reversed(views):
+                view.release()
+            if mapped is not None:
+                mapped.close()
+        self._maps = []
+
+    def __len__(self) -> int:
+        return self.rows
+
+    def __getitem__(self, i: int):
+        kind = self.kind
+        if kind in ('string', 'json'):
+            if self.valid is not None and not self.valid[i]:
+                return None
+            value = bytes(self.data[self.offsets[i]:self.offsets[i + 1]]).decode('utf-8')
+            return value if kind == 'string' else json.loads(value)
+        if kind == 'category':
+            code = self.codes[i]
+            return None if code == NULL_CODE else self.dictionary[code]
+        if kind == 'timestamp':
+            return int_to_timestamp(self.values[i])
+        if kind == 'int':
+            value = self.values[i]
+            return None if value == NULL_INT else value
+        value = self.values[i]
+        return None if value < 0 else bool(value)
+
+    def _decode_strings(self) -> List[Optional[str]]:
+        # One copy of the column, then bytes slices (decoding the whole column
+        # and slicing the str by character offsets measured slower for accented text)
+        data = self.data.tobytes()
+        offsets = self.offsets.tolist()
+        if self.valid is None:
+            return [data[start:end].decode('utf-8') for start, end in zip(offsets, offsets[1:])]
+        return [data[start:end].decode('utf-8') if valid else None
+                for start, end, valid in zip(offsets, offsets[1:], self.valid.tobytes())]
+
+    def raw(self):
+        """Undecoded values: codes for categories, epoch µs for timestamps"""
+        if self.kind == 'category':
+            return self.codes
+        if self.kind in ('timestamp', 'int', 'bool'):
+            return self.values
+        return [self[i] for i in range(self.rows)]
+
+    def to_list(self) -> List:
+        """Decode the whole column"""
+        kind = self.kind
+
+        if kind in ('string', 'json'):
+            values = self._decode_strings()
+            if kind == 'json':
+                # One parser call for the whole column
+                present = [value for value in values if value is not None]
+                parsed = iter(json.loads(f"[{','.join(present)}]"))
+                values = [None if value is None else next(parsed) for value in values]
+            return values
+
+        if kind == 'category':
+            lookup = self.dictionary + [None]
+            return [lookup[code if code != NULL_CODE else -1] for code in self.codes.tolist()]
+
+        values = self.values.tolist()
+        if kind == 'timestamp':
+            return _format_timestamps(values)
+        if kind == 'int':
+            return [None if value == NULL_INT else value for value in values]
+        return [None if value < 0 else bool(value) for value in values]
+
+
+class Dataset:
+    """Read-only view of a columnar dataset with column projection"""
+
+    def __init__(self, path: str):
+        """
+        Open a dataset (only the manifest is read here)
+
+        Args:
+            path: Dataset directory
+        """
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / MANIFEST_FILE).read_text(encoding='utf-8'))
+
+        if self.manifest['byteorder'] != sys.byteorder:
+            raise ValueError(f"Dataset written on a {self.manifest['byteorder']}-endian machine")
+
+        self.schema_name = self.manifest['schema_name']
+        self.types = {column['name']: column['type'] for column in self.manifest['schema']}
+        self.types[EXTRA_COLUMN] = 'json'
+        self._columns: Dict[Tuple[int, str], ColumnShard] = {}
+
+    def __len__(self) -> int:
+        return self.manifest['rows']
+
+    def close(self):
+        """Unmap every column opened so far (values already decoded stay valid)"""
+        for column in self._columns.values():
+            column.close()
+        self._columns = {}
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    @property
+    def columns(self) -> List[str]:
+        return [column['name'] for column in self.manifest['schema']]
+
+    def _column_shard(self, shard_index: int, name: str) -> ColumnShard:
+        key = (shard_index, name)
+        if key not in self._columns:
+            shard = self.manifest['shards'][shard_index]
+            self._columns[key] = ColumnShard(self.path / shard['name'], name, self.types[name], shard['rows'])
+        return self._columns[key]
+
+    def column(self, name: str) -> List:
+        """Decode one whole column"""
+        values = []
+        for shard_index in range(len(self.manifest['shards'])):
+            values.extend(self._column_shard(shard_index, name).to_list())
+        return values
+
+    def iter_rows(self, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """
+        Iterate rows as flat dictionaries, decoding only the requested columns
+
+        Args:
+            columns: Column names to read (default: all, plus extra fields)
+
+        Yields:
+            Row dictionaries (missing values are omitted)
+        """
+        names = columns or self.columns + [EXTRA_COLUMN]
+        # Extra fields are merged into the row, except for chat rows (row_to_chat reads them)
+        merge_extra = EXTRA_COLUMN in names and self.schema_name != 'chat'
+        if merge_extra:
+            names = [name for name in names if name != EXTRA_COLUMN]
+
+        for shard_index in range(len(self.manifest['shards'])):
+            # Decoded a shard at a time: memory is bounded by the shard size
+            decoded = [self._column_shard(shard_index, name).to_list() for name in names]
+            rows = (dict(zip(names, values)) if None not in values
+                    else {name: value for name, value in zip(names, values) if value is not None}
+                    for values in zip(*decoded))
+            if not merge_extra:
+                yield from rows
+                continue
+
+            for row, extra in zip(rows, self._column_shard(shard_index, EXTRA_COLUMN).to_list()):
+                if extra is not None:
+                    row.update(extra)
+                yield row
+
+    def iter_records(self, columns: Optional[List[str]] = None) -> Iterator[Dict]:
+        """Iterate records in their original shape (chat rows become messages again)"""
+        if self.schema_name == 'chat' and columns is None:
+            for row in self.iter_rows():
+                yield row_to_chat(row)
+        else:
+            yield from self.iter_rows(columns)
+
+    def disk_size(self) -> int:
+        return sum(f.stat().st_size for f in self.path.rglob('*') if f.is_file())
+
+
+def iter_source_records(file_path: str) -> Iterator[Dict]:
+    """Read records from a legacy JSON list or a JSONL file"""
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if file_path.endswith('.jsonl'):
+            for line in f:
+                if line.strip():
+                    yield json.loads(line)
+        else:
+            data = json.load(f)
+            yield from (data if isinstance(data, list) else [data])
+
+
+def convert_file(input_file: str, output_dir: str, schema: Optional[str] = None,
+                 shard_size: int = 100_000) -> Dict:
+    """
+    Convert a JSON/JSONL file into a columnar dataset
+
+    Args:
+        input_file: Legacy JSON list or JSONL file
+        output_dir: Dataset directory to create
+        schema: Schema name (detected from the first record if omitted)
+        shard_size: Rows per shard
+
+    Returns:
+        Manifest of the written dataset
+    """
+    records = iter_source_records(input_file)
+    first = next(records, None)
+    if first is None:
+        raise ValueError(f"{input_file} contains no records")
+
+    schema = schema or detect_schema(first)
+
+    with DatasetWriter(output_dir, schema=schema, shard_size=shard_size) as writer:
+        writer.write(first)
+        writer.write_many(records)
+
+    manifest = json.loads((Path(output_dir) / MANIFEST_FILE).read_text(encoding='utf-8'))
+    source_size = os.path.getsize(input_file)
+    store_size = Dataset(output_dir).disk_size()
+
+    logger.info(f"✅ {input_file} → {output_dir} [{schema}] {manifest['rows']} rows, "
+                f"{source_size / 1024:.1f} KB → {store_size / 1024:.1f} KB")
+    return manifest
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Columnar dataset store for commentary data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    convert = subparsers.add_parser('convert', help='Convert a JSON/JSONL file')
+    convert.add_argument('input')
+    convert.add_argument('output')
+    convert.add_argument('--schema', choices=sorted(SCHEMAS))
+    convert.add_argument('--shard-size', type=int, default=100_000)
+
+    convert_all = subparsers.add_parser('convert-all', help='Convert every JSON/JSONL file in a directory')
+    convert_all.add_argument('input_dir')
+    convert_all.add_argument('output_dir')
+
+    info = subparsers.add_parser('info', help='Show a dataset manifest summary')
+    info.add_argument('path')
+
+    export = subparsers.add_parser('export', help='Export a dataset back to JSONL')
+    export.add_argument('path')
+    export.add_argument('output')
+
+    args = parser.parse_args()
+
+    if args.command == 'convert':
+        convert_file(args.input, args.output, schema=args.schema, shard_size=args.shard_size)
+
+    elif args.command == 'convert-all':
+        for input_file in sorted(Path(args.input_dir).glob('*.json*')):
+            if input_file.suffix not in ('.json', '.jsonl'):
+                continue
+            try:
+                convert_file(str(input_file), str(Path(args.output_dir) / input_file.stem))
+            except (ValueError, json.JSONDecodeError) as e:
+                logger.warning(f"⚠️  Skipped {input_file}: {e}")
+
+    elif args.command == 'info':
+        dataset = Dataset(args.path)
+        print(f"📂 {args.path} [{dataset.schema_name}]")
+        print(f"   Rows: {len(dataset)}")
+        print(f"   Shards: {len(dataset.manifest['shards'])}")
+        print(f"   Size: {dataset.disk_size() / 1024:.1f} KB")
+        for name, kind in dataset.types.items():
+            print(f"   {name:<20} {kind}")
+
+    elif args.command == 'export':
+        dataset = Dataset(args.path)
+        with open(args.output, 'w', encoding='utf-8') as f:
+            for record in dataset.iter_records():
+                f.write(json.dumps(record, ensure_ascii=False) + '\n')
+        print(f"✅ Exported {len(dataset)} records to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
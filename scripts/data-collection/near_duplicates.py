@@ -0,0 +1,375 @@
+#!/usr/bin/env python3
+"""
+Near-duplicate detection for commentary data
+MinHash signatures over word shingles, indexed with LSH banding
+
+Exact matching misses template-generated variants ("Hakimi délivre un centre..."
+vs "Ziyech délivre un centre...") and the same event scraped from two sources.
+Each text is reduced to a fixed-size MinHash signature whose agreement rate
+estimates the Jaccard similarity of the word shingles; the signature is cut into
+bands and a text is a near-duplicate as soon as one band collides with a text
+already seen. One pass, constant work per text, and the index only keeps one
+integer per band per kept text.
+"""
+
+import re
+import json
+import zlib
+import random
+import argparse
+from typing import List, Dict, Iterable, Iterator, Optional, Tuple
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # Pure Python fallback gives identical signatures, just slower
+    np = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+UINT64_MASK = (1 << 64) - 1
+
+WORD_RE = re.compile(r'\w+')
+
+
+def shingle_hashes(text: str, size: int = 3) -> List[int]:
+    """
+    Hash the word shingles of a text
+
+    Args:
+        text: Commentary text
+        size: Number of words per shingle
+
+    Returns:
+        List of distinct 32-bit shingle hashes (empty if no words)
+    """
+    words = WORD_RE.findall(text.lower())
+    if not words:
+        return []
+
+    if len(words) <= size:
+        shingles = {' '.join(words)}
+    else:
+        shingles = {' '.join(words[i:i + size]) for i in range(len(words) - size + 1)}
+
+    # crc32 is stable across processes, unlike hash() on str
+    return [zlib.crc32(shingle.encode('utf-8')) for shingle in shingles]
+
+
+def optimal_bands(threshold: float, num_perm: int) -> Tuple[int, int]:
+    """
+    Pick LSH (bands, rows) so the collision S-curve crosses the threshold
+
+    Minimizes the sum of false positive and false negative probability mass,
+    integrated numerically over Jaccard similarity.
+
+    Args:
+        threshold: Jaccard similarity above which texts are duplicates
+        num_perm: Number of MinHash permutations
+
+    Returns:
+        Tuple of (bands, rows per band)
+    """
+    def area(low: float, high: float, bands: int, rows: int, false_positive: bool) -> float:
+        steps = 50
+        width = (high - low) / steps
+        total = 0.0
+        for i in range(steps):
+            s = low + (i + 0.5) * width
+            p = 1 - (1 - s ** rows) ** bands
+            total += (p if false_positive else 1 - p) * width
+        return total
+
+    best = (1, num_perm)
+    best_error = float('inf')
+
+    for bands in range(1, num_perm + 1):
+        for rows in range(1, num_perm // bands + 1):
+            error = (area(0.0, threshold, bands, rows, True) +
+                     area(threshold, 1.0, bands, rows, False))
+            if error < best_error:
+                best_error = error
+                best = (bands, rows)
+
+    return best
+
+
+class MinHasher:
+    """Computes MinHash signatures of texts over word shingles"""
+
+    def __init__(self, num_perm: int = 128, shingle_size: int = 3, seed: int = 1):
+        """
+        Initialize hasher
+
+        Args:
+            num_perm: Number of hash permutations (signature length)
+            shingle_size: Number of words per shingle
+            seed: Seed for the permutation parameters (same seed, same signatures)
+        """
+        self.num_perm = num_perm
+        self.shingle_size = shingle_size
+
+        # Multiply-shift hashing: h(x) = ((a * x + b) mod 2^64) >> 32 with odd a
+        rng = random.Random(seed)
+        self.a = [rng.getrandbits(64) | 1 for _ in range(num_perm)]
+        self.b = [rng.getrandbits(64) for _ in range(num_perm)]
+
+        if np is not None:
+            self._a = np.array(self.a, dtype=np.uint64)[:, None]
+            self._b = np.array(self.b, dtype=np.uint64)[:, None]
+
+    def signature(self, text: str) -> Optional[Tuple[int, ...]]:
+        """
+        Compute the MinHash signature of one text
+
+        Args:
+            text: Commentary text
+
+        Returns:
+            Tuple of num_perm hash minimums, or None for texts without words
+        """
+        return self.signatures([text])[0]
+
+    def signatures(self, texts: List[str]) -> List[Optional[Tuple[int, ...]]]:
+        """
+        Compute MinHash signatures for a batch of texts
+
+        With NumPy the whole batch is hashed in one vectorized pass.
+
+        Args:
+            texts: Commentary texts
+
+        Returns:
+            List of signatures (None for texts without words)
+        """
+        hashed = [shingle_hashes(text, self.shingle_size) for text in texts]
+
+        if np is None:
+            return [self._signature_python(hashes) if hashes else None for hashes in hashed]
+
+        non_empty = [i for i, hashes in enumerate(hashed) if hashes]
+        results: List[Optional[Tuple[int, ...]]] = [None] * len(texts)
+        if not non_empty:
+            return results
+
+        lengths = [len(hashed[i]) for i in non_empty]
+        offsets = np.zeros(len(lengths), dtype=np.int64)
+        offsets[1:] = np.cumsum(lengths)[:-1]
+        values = np.fromiter(
+            (h for i in non_empty for h in hashed[i]),
+            dtype=np.uint64,
+            count=sum(lengths)
+        )
+
+        # uint64 arithmetic wraps exactly like the masked Python fallback
+        permuted = (self._a * values + self._b) >> np.uint64(32)
+        minimums = np.minimum.reduceat(permuted, offsets, axis=1)
+
+        for i, signature in zip(non_empty, minimums.T.tolist()):
+            results[i] = tuple(signature)
+
+        return results
+
+    def _signature_python(self, hashes: List[int]) -> Tuple[int, ...]:
+        """Pure Python signature, bit-identical to the NumPy path"""
+        return tuple(
+            min(((a * h + b) & UINT64_MASK) >> 32 for h in hashes)
+            for a, b in zip(self.a, self.b)
+        )
+
+
+class LSHIndex:
+    """Banded LSH index answering 'have I seen a similar signature?'"""
+
+    def __init__(self, threshold: float = 0.8, num_perm: int = 128):
+        """
+        Initialize index
+
+        Args:
+            threshold: Jaccard similarity above which signatures collide
+            num_perm: Signature length
+        """
+        self.threshold = threshold
+        self.bands, self.rows = optimal_bands(threshold, num_perm)
+        # One integer per (band, band values); hash() of int tuples is deterministic
+        self._buckets = set()
+
+    def _band_keys(self, signature: Tuple[int, ...]) -> List[int]:
+        rows = self.rows
+        return [hash((band,) + signature[band * rows:(band + 1) * rows]) for band in range(self.bands)]
+
+    def contains(self, signature: Tuple[int, ...]) -> bool:
+        """Return True if any band of the signature collides with the index"""
+        buckets = self._buckets
+        return any(key in buckets for key in self._band_keys(signature))
+
+    def add(self, signature: Tuple[int, ...]):
+        """Insert a signature into the index"""
+        self._buckets.update(self._band_keys(signature))
+
+    def insert_if_new(self, signature: Tuple[int, ...]) -> bool:
+        """
+        Insert a signature unless it collides with one already indexed
+
+        Returns:
+            True if the signature was new and has been inserted
+        """
+        keys = self._band_keys(signature)
+        buckets = self._buckets
+        if any(key in buckets for key in keys):
+            return False
+        buckets.update(keys)
+        return True
+
+    def __len__(self) -> int:
+        return len(self._buckets)
+
+
+class NearDuplicateFilter:
+    """Streaming near-duplicate filter: MinHash + LSH over commentary texts"""
+
+    def __init__(
+        self,
+        threshold: float = 0.8,
+        num_perm: int = 128,
+        shingle_size: int = 3,
+        seed: int = 1,
+        batch_size: int = 1000
+    ):
+        """
+        Initialize filter
+
+        Args:
+            threshold: Jaccard similarity above which entries are duplicates
+            num_perm: MinHash signature length (higher = sharper threshold)
+            shingle_size: Number of words per shingle
+            seed: MinHash seed
+            batch_size: Entries hashed together in one vectorized batch
+        """
+        self.hasher = MinHasher(num_perm=num_perm, shingle_size=shingle_size, seed=seed)
+        self.index = LSHIndex(threshold=threshold, num_perm=num_perm)
+        self.batch_size = batch_size
+        self.seen = 0
+        self.duplicates = 0
+
+    def is_duplicate(self, text: str) -> bool:
+        """
+        Check a text against everything seen so far, indexing it if new
+
+        Args:
+            text: Commentary text
+
+        Returns:
+            True if the text is a near-duplicate of an earlier one
+        """
+        return self._check(self.hasher.signature(text))
+
+    def flag_duplicates(self, texts: List[str]) -> List[bool]:
+        """
+        Check a batch of texts in order (one vectorized hashing pass), indexing the new ones
+
+        Args:
+            texts: Commentary texts
+
+        Returns:
+            For each text, True if it is a near-duplicate of an earlier one
+        """
+        return [self._check(signature) for signature in self.hasher.signatures(texts)]
+
+    def _check(self, signature: Optional[Tuple[int, ...]]) -> bool:
+        self.seen += 1
+        # Texts without words cannot be compared, the quality filter drops them
+        if signature is None or self.index.insert_if_new(signature):
+            return False
+        self.duplicates += 1
+        return True
+
+    def iter_unique(self, commentary: Iterable[Dict]) -> Iterator[Dict]:
+        """
+        Yield entries whose text is not a near-duplicate of an earlier entry
+
+        Input is consumed in batches, so memory is bounded by the index.
+
+        Args:
+            commentary: Iterable of commentary dictionaries
+
+        Yields:
+            Unique commentary dictionaries, in input order
+        """
+        batch = []
+        for entry in commentary:
+            batch.append(entry)
+            if len(batch) >= self.batch_size:
+                yield from self._unique_in_batch(batch)
+                batch = []
+
+        if batch:
+            yield from self._unique_in_batch(batch)
+
+    def _unique_in_batch(self, batch: List[Dict]) -> Iterator[Dict]:
+        flags = self.flag_duplicates([entry.get('text', '') for entry in batch])
+        for entry, duplicate in zip(batch, flags):
+            if not duplicate:
+                yield entry
+
+
+def remove_near_duplicates(
+    commentary_list: List[Dict],
+    threshold: float = 0.8,
+    num_perm: int = 128,
+    shingle_size: int = 3
+) -> List[Dict]:
+    """
+    Remove near-duplicate commentary entries (first occurrence is kept)
+
+    Args:
+        commentary_list: List of commentary dictionaries
+        threshold: Jaccard similarity of word shingles above which entries are duplicates
+        num_perm: MinHash signature length
+        shingle_size: Number of words per shingle
+
+    Returns:
+        Deduplicated list
+    """
+    dedup = NearDuplicateFilter(threshold=threshold, num_perm=num_perm, shingle_size=shingle_size)
+    unique_commentary = list(dedup.iter_unique(commentary_list))
+
+    if dedup.duplicates > 0:
+        logger.info(f"Removed {dedup.duplicates} near-duplicate entries (threshold: {threshold:.2f})")
+
+    return unique_commentary
+
+
+def main():
+    """Deduplicate a JSON/JSONL commentary or chat file"""
+    parser = argparse.ArgumentParser(description='Remove near-duplicate commentary (MinHash/LSH)')
+    parser.add_argument('input', help='JSON list of commentary entries, or chat-format JSONL')
+    parser.add_argument('--threshold', type=float, default=0.8, help='Jaccard similarity threshold')
+    parser.add_argument('--num-perm', type=int, default=128, help='MinHash signature length')
+    parser.add_argument('--shingle-size', type=int, default=3, help='Words per shingle')
+
+    args = parser.parse_args()
+
+    with open(args.input, 'r', encoding='utf-8') as f:
+        if args.input.endswith('.jsonl'):
+            # Chat format: deduplicate on the assistant message
+            entries = [
+                {'text': json.loads(line)['messages'][-1]['content']}
+                for line in f if line.strip()
+            ]
+        else:
+            entries = json.load(f)
+
+    unique = remove_near_duplicates(
+        entries,
+        threshold=args.threshold,
+        num_perm=args.num_perm,
+        shingle_size=args.shingle_size
+    )
+
+    print(f"✅ {len(unique)}/{len(entries)} entries kept")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,486 @@
+#!/usr/bin/env python3
+"""
+Pre-tokenized, sequence-packed training data
+Tokenizes chat examples once and packs them into fixed-length sequences
+
+Our examples are short (a fixed system prompt, a one-line user prompt and a
+30-60 word commentary, ~130 tokens with the Llama 3 tokenizer), so a
+2048-token sequence holds about fifteen of them. Packing here, once, instead
+of at the start of every Axolotl run also removes the tokenization step from
+GPU time.
+
+Layout of a packed dataset directory:
+
+    manifest.json           tokenizer, sequence length, counts, padding efficiency
+    input_ids.bin           uint32 [sequences x sequence_len], padded with pad_token_id
+    labels.bin              int32  [sequences x sequence_len], -100 on prompt and padding tokens
+    example_lengths.bin     uint32 token count of each example, in packed order
+    sequence_offsets.bin    uint64 first example of each sequence (sequences + 1)
+    example_rows.bin        uint32 input row of each example, in packed order
+
+Examples never attend to each other: readers derive, from the index, an
+attention mask holding the example number within its sequence (1, 1, 1, 2,
+2, ..., 0 on padding; Axolotl's sample packing format) and position ids
+restarting at 0 for every example.
+
+Usage:
+    python packed_dataset.py pack data/llama3_training.jsonl data/packed/llama3 \\
+        --tokenizer meta-llama/Llama-3.1-70B-Instruct --sequence-len 2048
+    python packed_dataset.py info data/packed/llama3
+    python packed_dataset.py to-hf data/packed/llama3 /workspace/packed_hf
+"""
+
+import os
+import sys
+import json
+import shutil
+import argparse
+from array import array
+from bisect import bisect_left, insort
+from datetime import datetime, timezone
+from itertools import islice
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Tuple
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # Only needed to pack and to read the arrays; the manifest and records work without it
+    np = None
+
+from chat_export import TEMPLATES
+from dataset_store import Dataset, iter_source_records
+
+try:
+    from transformers import AutoTokenizer
+except ImportError:  # Only needed to pack; reading a packed dataset works without it
+    AutoTokenizer = None
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+FORMAT_VERSION = 1
+MANIFEST_FILE = 'manifest.json'
+IGNORE_INDEX = -100
+
+ARRAYS = {
+    'input_ids': 'uint32',
+    'labels': 'int32',
+    'example_lengths': 'uint32',
+    'sequence_offsets': 'uint64',
+    'example_rows': 'uint32',
+}
+
+
+def require_numpy(action: str):
+    """Raise if numpy is missing (action: what needs it, e.g. 'Packing')"""
+    if np is None:
+        raise ImportError(f"{action} needs numpy: pip install numpy")
+
+
+def load_tokenizer(name: str):
+    """Hugging Face tokenizer (name on the Hub or local directory)"""
+    if AutoTokenizer is None:
+        raise ImportError("Packing needs transformers: pip install transformers")
+    return AutoTokenizer.from_pretrained(name)
+
+
+def conversation(record: Dict, template: str = 'llama3') -> List[Dict]:
+    """
+    Chat messages of a training record
+
+    Chat records (chat_export.py output) are used as is; prompt/response
+    records and raw commentary entries are rendered with `template`.
+    """
+    if 'messages' in record:
+        return record['messages']
+
+    if 'response' not in record:
+        record = TEMPLATES[template].render(
+            record.get('time', ''), record.get('event_type') or 'commentary', record.get('text') or '')
+        if 'messages' in record:
+            return record['messages']
+
+    return [
+        {'role': 'system', 'content': record['system']},
+        {'role': 'user', 'content': record['prompt']},
+        {'role': 'assistant', 'content': record['response']},
+    ]
+
+
+def iter_training_records(path: str) -> Iterator[Dict]:
+    """Records of a JSONL / JSON file or of a columnar dataset directory"""
+    if os.path.isdir(path):
+        with Dataset(path) as dataset:
+            yield from dataset.iter_records()
+    else:
+        yield from iter_source_records(path)
+
+
+def tokenize_examples(
+    records: Iterable[Dict],
+    tokenizer,
+    sequence_len: int,
+    template: str = 'llama3',
+    batch_size: int = 1000
+) -> Tuple[array, array, array, array, Dict]:
+    """
+    Tokenize chat examples with the tokenizer's chat template
+
+    Only the assistant answer is trained on: tokens of the prompt (system,
+    user and assistant header) get the label -100.
+
+    Returns:
+        (flat token ids, example lengths, prompt lengths, input rows, stats)
+    """
+    tokens = array('I')
+    lengths = array('I')
+    prompt_lengths = array('I')
+    rows = array('I')
+    stats = {'examples': 0, 'skipped_long': 0, 'prompt_mismatches': 0}
+
+    records = iter(records)
+    row = 0
+    while batch := list(islice(records, batch_size)):
+        chats = [conversation(record, template) for record in batch]
+        full_texts = [tokenizer.apply_chat_template(chat, tokenize=False) for chat in chats]
+        prompt_texts = [tokenizer.apply_chat_template(chat[:-1], tokenize=False, add_generation_prompt=True)
+                        for chat in chats]
+
+        # The chat template already contains the special tokens
+        full_ids = tokenizer(full_texts, add_special_tokens=False)['input_ids']
+        prompt_ids = tokenizer(prompt_texts, add_special_tokens=False)['input_ids']
+
+        for ids, prompt in zip(full_ids, prompt_ids):
+            if len(ids) > sequence_len:
+                stats['skipped_long'] += 1
+            else:
+                if ids[:len(prompt)] != prompt:
+                    stats['prompt_mismatches'] += 1
+                tokens.extend(ids)
+                lengths.append(len(ids))
+                prompt_lengths.append(min(len(prompt), len(ids)))
+                rows.append(row)
+            row += 1
+
+    stats['examples'] = len(lengths)
+    return tokens, lengths, prompt_lengths, rows, stats
+
+
+def pack_lengths(lengths: List[int], capacity: int) -> List[List[int]]:
+    """
+    Group examples into sequences of at most `capacity` tokens (best-fit decreasing)
+
+    Each example, longest first, goes to the open sequence with the least free
+    space that still fits it. Open sequences are bucketed by free space, so
+    finding one is a bisect over at most `capacity` distinct values.
+
+    Returns:
+        Example indices of each sequence
+    """
+    order = sorted(range(len(lengths)), key=lengths.__getitem__, reverse=True)
+    sequences: List[List[int]] = []
+    by_space: Dict[int, List[int]] = {}
+    spaces: List[int] = []  # sorted free-space values having open sequences
+
+    for i in order:
+        length = lengths[i]
+        k = bisect_left(spaces, length)
+        if k < len(spaces):
+            space = spaces[k]
+            seq = by_space[space].pop()
+            if not by_space[space]:
+                del spaces[k]
+            sequences[seq].append(i)
+        else:
+            space = capacity
+            seq = len(sequences)
+            sequences.append([i])
+
+        space -= length
+        if space > 0:
+            if not by_space.get(space):
+                by_space[space] = []
+                insort(spaces, space)
+            by_space[space].append(seq)
+
+    return sequences
+
+
+def pack_file(
+    input_file: str,
+    output_dir: str,
+    tokenizer_name: str,
+    sequence_len: int = 2048,
+    template: str = 'llama3',
+    batch_size: int = 1000,
+    tokenizer=None
+) -> Dict:
+    """
+    Tokenize and pack a training file into a packed dataset directory
+
+    Args:
+        input_file: Chat JSONL (chat_export.py), chat dataset directory, or commentary file
+        output_dir: Packed dataset directory (replaced if it exists)
+        tokenizer_name: Tokenizer of the model to train
+        sequence_len: Tokens per packed sequence (Axolotl sequence_len)
+        template: Template rendering commentary records that are not chat records yet
+        batch_size: Examples per tokenizer call
+        tokenizer: Already loaded tokenizer (loaded from tokenizer_name otherwise)
+
+    Returns:
+        Manifest
+    """
+    require_numpy("Packing")
+    tokenizer = tokenizer or load_tokenizer(tokenizer_name)
+    pad_token_id = tokenizer.pad_token_id if tokenizer.pad_token_id is not None else tokenizer.eos_token_id
+
+    logger.info(f"🔤 Tokenizing {input_file} with {tokenizer_name}...")
+    tokens, lengths, prompt_lengths, rows, stats = tokenize_examples(
+        iter_training_records(input_file), tokenizer, sequence_len, template, batch_size)
+    if stats['prompt_mismatches']:
+        logger.warning(f"⚠️  {stats['prompt_mismatches']} examples whose prompt tokens differ inside the full "
+                       f"example (labels masked by prompt length)")
+
+    logger.info(f"📦 Packing {stats['examples']} examples into {sequence_len}-token sequences...")
+    sequences = pack_lengths(lengths, sequence_len)
+
+    output = Path(output_dir)
+    tmp_path = output.with_name(output.name + '.tmp')
+    if tmp_path.exists():
+        shutil.rmtree(tmp_path)
+    tmp_path.mkdir(parents=True)
+
+    flat = np.frombuffer(tokens, dtype=np.uint32)
+    starts = np.zeros(len(lengths) + 1, dtype=np.int64)
+    np.cumsum(np.frombuffer(lengths, dtype=np.uint32), out=starts[1:])
+
+    shape = (len(sequences), sequence_len)
+    input_ids = np.memmap(tmp_path / 'input_ids.bin', dtype=np.uint32, mode='w+', shape=shape)
+    labels = np.memmap(tmp_path / 'labels.bin', dtype=np.int32, mode='w+', shape=shape)
+    input_ids[:] = pad_token_id
+    labels[:] = IGNORE_INDEX
+
+    packed = [i for sequence in sequences for i in sequence]
+    offsets = np.zeros(len(sequences) + 1, dtype=np.uint64)
+    np.cumsum([len(sequence) for sequence in sequences], out=offsets[1:])
+
+    for seq, sequence in enumerate(sequences):
+        position = 0
+        for i in sequence:
+            start, end = starts[i], starts[i + 1]
+            length = end - start
+            input_ids[seq, position:position + length] = flat[start:end]
+            prompt = prompt_lengths[i]
+            labels[seq, position + prompt:position + length] = flat[start + prompt:end]
+            position += length
+
+    input_ids.flush()
+    labels.flush()
+    del input_ids, labels
+
+    np.asarray([lengths[i] for i in packed], dtype=np.uint32).tofile(tmp_path / 'example_lengths.bin')
+    offsets.tofile(tmp_path / 'sequence_offsets.bin')
+    np.asarray([rows[i] for i in packed], dtype=np.uint32).tofile(tmp_path / 'example_rows.bin')
+
+    total_tokens = int(starts[-1])
+    trainable = total_tokens - sum(prompt_lengths)
+    manifest = {
+        'format_version': FORMAT_VERSION,
+        'byteorder': sys.byteorder,
+        'tokenizer': tokenizer_name,
+        'template': template,
+        'source': os.path.abspath(input_file),
+        'sequence_len': sequence_len,
+        'pad_token_id': pad_token_id,
+        'sequences': len(sequences),
+        'examples': stats['examples'],
+        'skipped_long': stats['skipped_long'],
+        'prompt_mismatches': stats['prompt_mismatches'],
+        'tokens': total_tokens,
+        'trainable_tokens': trainable,
+        'padding_efficiency': total_tokens / (len(sequences) * sequence_len) if sequences else 0.0,
+        'created_at': datetime.now(timezone.utc).isoformat(),
+    }
+    (tmp_path / MANIFEST_FILE).write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+
+    if output.exists():
+        shutil.rmtree(output)
+    os.replace(tmp_path, output)
+
+    return manifest
+
+
+class PackedDataset:
+    """Read-only, memory-mapped view of a packed dataset"""
+
+    def __init__(self, path: str):
+        """
+        Open a packed dataset and check its files against the manifest
+
+        Args:
+            path: Packed dataset directory
+        """
+        require_numpy("Reading a packed dataset")
+        self.path = Path(path)
+        self.manifest = json.loads((self.path / MANIFEST_FILE).read_text(encoding='utf-8'))
+
+        if self.manifest['byteorder'] != sys.byteorder:
+            raise ValueError(f"Packed dataset written on a {self.manifest['byteorder']}-endian machine")
+
+        self.sequence_len = self.manifest['sequence_len']
+        sequences = self.manifest['sequences']
+        examples = self.manifest['examples']
+        expected = {
+            'input_ids': sequences * self.sequence_len,
+            'labels': sequences * self.sequence_len,
+            'example_lengths': examples,
+            'sequence_offsets': sequences + 1,
+            'example_rows': examples,
+        }
+
+        self.arrays: Dict[str, 'np.ndarray'] = {}
+        for name, dtype in ARRAYS.items():
+            file_path = self.path / f"{name}.bin"
+            size = file_path.stat().st_size // np.dtype(dtype).itemsize
+            if size != expected[name]:
+                raise ValueError(f"{file_path}: {size} values, manifest expects {expected[name]}")
+            self.arrays[name] = np.memmap(file_path, dtype=dtype, mode='r') if size else np.zeros(0, dtype)
+
+        self.input_ids = self.arrays['input_ids'].reshape(sequences, self.sequence_len)
+        self.labels = self.arrays['labels'].reshape(sequences, self.sequence_len)
+
+    def __len__(self) -> int:
+        return self.manifest['sequences']
+
+    def example_lengths(self, i: int) -> 'np.ndarray':
+        """Token counts of the examples packed in sequence i"""
+        offsets = self.arrays['sequence_offsets']
+        return self.arrays['example_lengths'][int(offsets[i]):int(offsets[i + 1])]
+
+    def cu_seqlens(self, i: int) -> 'np.ndarray':
+        """Cumulative example boundaries of sequence i (flash-attention varlen format)"""
+        return np.concatenate(([0], np.cumsum(self.example_lengths(i), dtype=np.int32)))
+
+    def __getitem__(self, i: int) -> Dict[str, 'np.ndarray']:
+        """
+        One packed sequence
+
+        Returns:
+            input_ids, labels, attention_mask (example number, 0 on padding)
+            and position_ids (restarting for every example)
+        """
+        lengths = self.example_lengths(i).astype(np.int64)
+        used = int(lengths.sum())
+
+        attention_mask = np.zeros(self.sequence_len, dtype=np.int32)
+        attention_mask[:used] = np.repeat(np.arange(1, len(lengths) + 1, dtype=np.int32), lengths)
+
+        position_ids = np.arange(self.sequence_len, dtype=np.int32)
+        starts = np.concatenate(([0], np.cumsum(lengths)[:-1], [used]))
+        position_ids -= np.repeat(starts, np.append(lengths, self.sequence_len - used)).astype(np.int32)
+
+        return {
+            'input_ids': self.input_ids[i],
+            'labels': self.labels[i],
+            'attention_mask': attention_mask,
+            'position_ids': position_ids,
+        }
+
+    def iter_rows(self) -> Iterator[Dict[str, List[int]]]:
+        """Sequences as lists (the shape Hugging Face datasets expect)"""
+        for i in range(len(self)):
+            yield {name: values.tolist() for name, values in self[i].items()}
+
+    def to_hf_dataset(self, output_dir: str) -> str:
+        """
+        Save the sequences as a Hugging Face dataset (Arrow, memory-mapped on load)
+
+        Axolotl reads this directory as an already tokenized dataset.
+
+        Returns:
+            Output directory
+        """
+        from datasets import Dataset as HFDataset, Features, Sequence, Value
+
+        features = Features({
+            'input_ids': Sequence(Value('int32')),
+            'labels': Sequence(Value('int32')),
+            'attention_mask': Sequence(Value('int32')),
+            'position_ids': Sequence(Value('int32')),
+        })
+        HFDataset.from_generator(self.iter_rows, features=features).save_to_disk(output_dir)
+        return output_dir
+
+    def axolotl_config(self, hf_dataset_dir: str) -> Dict:
+        """
+        Axolotl settings for this packed dataset
+
+        The dataset has no `type`, so Axolotl uses the tokens as they are.
+        Sequences are exactly sequence_len tokens long, so Axolotl's own
+        sample packing puts one per bin and keeps the per-example attention.
+        """
+        return {
+            'datasets': [{'path': str(hf_dataset_dir)}],
+            'sequence_len': self.sequence_len,
+            'sample_packing': True,
+            'pad_to_sequence_len': True,
+        }
+
+    def disk_size(self) -> int:
+        return sum(f.stat().st_size for f in self.path.iterdir() if f.is_file())
+
+
+def log_manifest(manifest: Dict):
+    examples, sequences = manifest['examples'], manifest['sequences']
+    logger.info(f"   Examples: {examples} ({manifest['skipped_long']} longer than "
+                f"{manifest['sequence_len']} tokens skipped)")
+    logger.info(f"   Sequences: {sequences} x {manifest['sequence_len']} tokens")
+    logger.info(f"   Tokens: {manifest['tokens']} ({manifest['trainable_tokens']} trained on)")
+    logger.info(f"   Padding efficiency: {manifest['padding_efficiency']:.1%}")
+    if sequences:
+        logger.info(f"   Examples per sequence: {examples / sequences:.1f} "
+                    f"(≈{examples / sequences:.0f}x fewer steps than unpacked)")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Pre-tokenized, sequence-packed training data')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    pack = subparsers.add_parser('pack', help='Tokenize and pack a training file')
+    pack.add_argument('input', help='Chat JSONL (chat_export.py), chat dataset directory or commentary file')
+    pack.add_argument('output', help='Packed dataset directory')
+    pack.add_argument('--tokenizer', default='meta-llama/Llama-3.1-70B-Instruct', help='Tokenizer of the model to train')
+    pack.add_argument('--sequence-len', type=int, default=2048, help='Tokens per packed sequence')
+    pack.add_argument('--template', choices=sorted(TEMPLATES), default='llama3',
+                      help='Template for commentary records that are not chat records yet')
+    pack.add_argument('--batch-size', type=int, default=1000, help='Examples per tokenizer call')
+
+    info = subparsers.add_parser('info', help='Show a packed dataset summary')
+    info.add_argument('path')
+
+    to_hf = subparsers.add_parser('to-hf', help='Save as a Hugging Face dataset for Axolotl')
+    to_hf.add_argument('path')
+    to_hf.add_argument('output')
+
+    args = parser.parse_args()
+
+    if args.command == 'pack':
+        manifest = pack_file(args.input, args.output, args.tokenizer, args.sequence_len,
+                             args.template, args.batch_size)
+        logger.info(f"✅ Packed dataset saved to {args.output}")
+        log_manifest(manifest)
+
+    elif args.command == 'info':
+        dataset = PackedDataset(args.path)
+        logger.info(f"📂 {args.path} [{dataset.manifest['tokenizer']}]")
+        log_manifest(dataset.manifest)
+        logger.info(f"   Size: {dataset.disk_size() / 1024:.1f} KB")
+
+    elif args.command == 'to-hf':
+        PackedDataset(args.path).to_hf_dataset(args.output)
+        logger.info(f"✅ Hugging Face dataset saved to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -7,10 +7,11 @@ Extracts individual commentary entries with timestamps and event types
 import re
 import json
 import sys
-from datetime import datetime
-from typing import List, Dict
+from typing import List
 
-def parse_commentary_file(file_path: str) -> List[Dict]:
+from commentary_entry import CommentaryEntry, json_default
+
+def parse_commentary_file(file_path: str) -> List[CommentaryEntry]:
     """
     Parse L'Équipe commentary file
 
@@ -18,7 +19,7 @@ def parse_commentary_file(file_path: str) -> List[Dict]:
     Each entry starts with a timestamp followed by optional event label
 
     Returns:
-        List of commentary dictionaries
+        List of CommentaryEntry records
     """
 
     with open(file_path, 'r', encoding='utf-8') as f:
@@ -78,14 +79,13 @@ def parse_commentary_file(file_path: str) -> List[Dict]:
             text = text.replace('\u2019', "'").replace('\u201c', '"').replace('\u201d', '"')
 
             if text and len(text) > 10:  # Minimum length
-                commentary_list.append({
-                    'source': 'lequipe',
-                    'time': time_str.replace('′', "'"),  # Normalize prime symbol
-                    'text': text,
-                    'event_type': event_type,
-                    'scraped_at': datetime.utcnow().isoformat(),
-                    'match': 'Morocco vs Comoros - CAN 2025'
-                })
+                commentary_list.append(CommentaryEntry(
+                    text,
+                    source='lequipe',
+                    time=time_str.replace('′', "'"),  # Normalize prime symbol
+                    event_type=event_type,
+                    match='Morocco vs Comoros - CAN 2025'
+                ))
 
     return commentary_list
 
@@ -140,7 +140,7 @@ def main():
     # Save to JSON
     output_file = 'data/lequipe_morocco_comoros.json'
     with open(output_file, 'w', encoding='utf-8') as f:
-        json.dump(commentary, f, ensure_ascii=False, indent=2)
+        json.dump(commentary, f, ensure_ascii=False, indent=2, default=json_default)
 
     print(f"\n💾 Saved to: {output_file}")
 
@@ -161,7 +161,7 @@ def main():
     # Save filtered
     filtered_file = 'data/lequipe_morocco_comoros_filtered.json'
     with open(filtered_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered, f, ensure_ascii=False, indent=2)
+        json.dump(filtered, f, ensure_ascii=False, indent=2, default=json_default)
 
     print(f"💾 Filtered saved to: {filtered_file}")
 
@@ -0,0 +1,677 @@
+#!/usr/bin/env python3
+"""
+Incremental pipeline runner for the commentary dataset
+collect → filter → dedupe → review → export → validate
+
+Every stage declares its inputs, code and parameters. A task is skipped when
+the fingerprint of all three matches the one recorded in the cache and its
+outputs are still on disk, untouched. Collection and filtering are sharded per
+match, so adding one match scrapes and filters one shard; the corpus-wide
+dedupe stage resumes from its saved LSH index when the new shards are appended
+after the ones it has already seen.
+
+Usage:
+    python pipeline_runner.py run --strict
+    python pipeline_runner.py run --auto-approve --until export
+    python pipeline_runner.py import data/store/training_commentary
+"""
+
+import os
+import re
+import ast
+import sys
+import json
+import time
+import pickle
+import asyncio
+import hashlib
+import inspect
+import argparse
+from collections import OrderedDict
+from typing import Callable, Dict, List, Optional, Sequence, Set, Tuple
+import logging
+
+from commentary_entry import entry_to_json, json_default
+from chat_export import export_dataset
+from near_duplicates import NearDuplicateFilter
+from stream_pipeline import read_entries, write_jsonl, normalize_entries, quality_filter_entries
+from validate_training_data import validate_jsonl
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+SCRIPT_DIR = os.path.dirname(os.path.abspath(__file__))
+DATA_DIR = os.path.join(SCRIPT_DIR, 'data')
+WORK_DIR = os.path.join(DATA_DIR, 'pipeline')
+MATCHES_FILE = os.path.join(DATA_DIR, 'lequipe_commented_matches.json')
+APPROVED_FILE = os.path.join(DATA_DIR, 'approved_commentary.json')
+
+CACHE_FILE = 'cache.json'
+REPORT_FILE = 'run_report.json'
+
+MATCH_ID_RE = re.compile(r'/(\d+)/?$')
+
+
+def match_key(url: str) -> str:
+    """Shard key of a match: the numeric L'Équipe id, or a hash of the URL"""
+    found = MATCH_ID_RE.search(url)
+    return found.group(1) if found else hashlib.sha1(url.encode('utf-8')).hexdigest()[:12]
+
+
+def shard_sort_key(key: str) -> Tuple[int, int, str]:
+    """Order of match shards: numeric ids by value (newer L'Équipe matches last), then URL hashes"""
+    return (0, int(key), '') if key.isdigit() else (1, 0, key)
+
+
+def local_imports(module: str, root: str = SCRIPT_DIR) -> Set[str]:
+    """
+    Local source files a module imports, transitively
+
+    Function-level (lazy) imports count too. Modules that do not resolve to
+    a file under root (standard library, installed packages) are ignored.
+
+    Args:
+        module: Source file relative to root
+        root: Scripts directory
+
+    Returns:
+        Paths relative to root, including the module itself
+    """
+    seen = set()
+    pending = [module]
+    while pending:
+        path = pending.pop()
+        if path in seen or not os.path.exists(os.path.join(root, path)):
+            continue
+        seen.add(path)
+
+        with open(os.path.join(root, path), 'r', encoding='utf-8') as f:
+            tree = ast.parse(f.read(), filename=path)
+        package = os.path.dirname(path)
+        for node in ast.walk(tree):
+            if isinstance(node, ast.Import):
+                names = [alias.name for alias in node.names]
+            elif isinstance(node, ast.ImportFrom):
+                if node.level:
+                    base = os.path.normpath(os.path.join(package, *['..'] * (node.level - 1)))
+                    prefix = '' if base == '.' else base.replace(os.sep, '.') + '.'
+                    names = [prefix + (node.module or alias.name) for alias in node.names]
+                else:
+                    names = [node.module] + [f"{node.module}.{alias.name}" for alias in node.names]
+            else:
+                continue
+            for name in names:
+                relative = name.replace('.', '/') + '.py'
+                # Scrapers import their siblings as top-level modules too
+                for candidate in (relative, os.path.join(package, relative) if package else None):
+                    if candidate and os.path.exists(os.path.join(root, candidate)):
+                        pending.append(os.path.normpath(candidate))
+    return seen
+
+
+def fingerprint(*parts) -> str:
+    """Stable hash of JSON-serializable parts"""
+    payload = json.dumps(parts, sort_keys=True, ensure_ascii=False, default=str)
+    return hashlib.sha256(payload.encode('utf-8')).hexdigest()
+
+
+class Stage:
+    """One pipeline step: how to compute its output and what it depends on"""
+
+    def __init__(
+        self,
+        name: str,
+        func: Callable,
+        deps: Sequence[str] = (),
+        modules: Sequence[str] = (),
+        params: Optional[Dict] = None,
+        files: Optional[Dict[str, str]] = None,
+        shards: Optional[Callable[[], Dict[str, str]]] = None,
+        sharded: bool = False,
+        incremental: bool = False,
+        suffix: str = '.jsonl'
+    ):
+        """
+        Declare a stage
+
+        Args:
+            name: Stage name (also names its outputs in the work directory)
+            func: Function computing the output (signature depends on the kind of stage)
+            deps: Upstream stage names
+            modules: Source files (relative to this directory) whose code the stage runs
+            params: Parameters passed to func as keyword arguments
+            files: External input files by name (e.g. the reviewers' approved file)
+            shards: For root sharded stages, returns {shard key: source} to compute
+            sharded: One task per match shard, func(source_or_input_path, output_path, **params)
+            incremental: Folds over the shards of its single dep,
+                func(new_input_paths, output_path, state_path, resume, **params)
+            suffix: Output file extension
+        """
+        self.name = name
+        self.func = func
+        self.deps = list(deps)
+        self.modules = list(modules)
+        self.params = params or {}
+        self.files = files or {}
+        self.shards = shards
+        self.sharded = sharded or shards is not None
+        self.incremental = incremental
+        self.suffix = suffix
+
+
+class PipelineRunner:
+    """Runs stages in order, skipping tasks whose fingerprint is cached"""
+
+    def __init__(self, stages: List[Stage], work_dir: str = WORK_DIR, force: Sequence[str] = ()):
+        """
+        Initialize runner
+
+        Args:
+            stages: Stages in dependency order
+            work_dir: Directory for stage outputs, the cache and the run report
+            force: Stage names to recompute regardless of the cache
+        """
+        self.stages = OrderedDict((stage.name, stage) for stage in stages)
+        self.work_dir = work_dir
+        self.force = set(force)
+        self.cache_path = os.path.join(work_dir, CACHE_FILE)
+        os.makedirs(work_dir, exist_ok=True)
+
+        self.cache = {'tasks': {}, 'files': {}}
+        if os.path.exists(self.cache_path):
+            with open(self.cache_path, 'r', encoding='utf-8') as f:
+                self.cache = json.load(f)
+
+        # Stage name → OrderedDict(shard key → output path) or output path
+        self.outputs: Dict[str, object] = {}
+        self._code_hashes: Dict[str, str] = {}
+
+    # ------------------------------------------------------------------
+    # Hashing
+    # ------------------------------------------------------------------
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """
+        Content hash of a file, re-read only when its size or mtime changed
+
+        Returns:
+            SHA-256 hex digest, or None if the file does not exist
+        """
+        try:
+            stat = os.stat(path)
+        except FileNotFoundError:
+            return None
+
+        known = self.cache['files'].get(path)
+        if known and known[0] == stat.st_size and known[1] == stat.st_mtime_ns:
+            return known[2]
+
+        digest = hashlib.sha256()
+        with open(path, 'rb') as f:
+            for block in iter(lambda: f.read(1 << 20), b''):
+                digest.update(block)
+
+        self.cache['files'][path] = [stat.st_size, stat.st_mtime_ns, digest.hexdigest()]
+        return digest.hexdigest()
+
+    def code_hash(self, stage: Stage) -> str:
+        """Hash of the stage function, the modules it runs and the local modules they import"""
+        if stage.name not in self._code_hashes:
+            sources = [inspect.getsource(stage.func)]
+            modules = set()
+            for module in stage.modules:
+                modules |= local_imports(module)
+            for module in sorted(modules):
+                with open(os.path.join(SCRIPT_DIR, module), 'r', encoding='utf-8') as f:
+                    sources.append([module, f.read()])
+            self._code_hashes[stage.name] = fingerprint(sources)
+        return self._code_hashes[stage.name]
+
+    def outputs_digest(self, name: str) -> object:
+        """Digest standing for a stage's output(s), as seen by downstream stages"""
+        outputs = self.outputs[name]
+        if isinstance(outputs, dict):
+            return [[key, self.file_digest(path)] for key, path in outputs.items()]
+        return self.file_digest(outputs)
+
+    # ------------------------------------------------------------------
+    # Cache
+    # ------------------------------------------------------------------
+
+    def is_cached(self, task_id: str, task_fingerprint: str, stage: Stage) -> bool:
+        """True if the task ran with this fingerprint and its outputs are unchanged"""
+        if stage.name in self.force:
+            return False
+
+        record = self.cache['tasks'].get(task_id)
+        if not record or record['fingerprint'] != task_fingerprint:
+            return False
+
+        return all(self.file_digest(path) == digest for path, digest in record['outputs'].items())
+
+    def record(self, task_id: str, task_fingerprint: str, output_path: str, **extra):
+        """Store the fingerprint and output digest of a finished task"""
+        self.cache['tasks'][task_id] = {
+            'fingerprint': task_fingerprint,
+            'outputs': {output_path: self.file_digest(output_path)},
+            **extra
+        }
+
+    def save_cache(self):
+        tmp_path = f"{self.cache_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cache, f)
+        os.replace(tmp_path, self.cache_path)
+
+    def shard_path(self, stage: Stage, key: str) -> str:
+        return os.path.join(self.work_dir, stage.name, f"{key}{stage.suffix}")
+
+    def stage_path(self, stage: Stage) -> str:
+        return os.path.join(self.work_dir, f"{stage.name}{stage.suffix}")
+
+    def root_fingerprint(self, stage: Stage, source: str) -> str:
+        return fingerprint(stage.name, self.code_hash(stage), stage.params, source)
+
+    # ------------------------------------------------------------------
+    # Running
+    # ------------------------------------------------------------------
+
+    def run(self, until: Optional[str] = None) -> List[Dict]:
+        """
+        Run the pipeline
+
+        Args:
+            until: Last stage to run (default: all)
+
+        Returns:
+            Run report, one dictionary per stage
+        """
+        report = []
+
+        try:
+            for stage in self.stages.values():
+                started = time.time()
+                logger.info(f"▶️  Stage {stage.name}")
+
+                if stage.shards is not None:
+                    counts = self._run_root_shards(stage)
+                elif stage.sharded:
+                    counts = self._run_shards(stage)
+                elif stage.incremental:
+                    counts = self._run_incremental(stage)
+                else:
+                    counts = self._run_single(stage)
+
+                counts.update({'stage': stage.name, 'seconds': round(time.time() - started, 3)})
+                report.append(counts)
+                self.save_cache()
+
+                # Downstream stages would run on a partial input (and prune the missing shards)
+                if counts.get('failed'):
+                    logger.error(f"❌ Stage {stage.name} failed, stopping the run")
+                    break
+                if stage.name == until:
+                    break
+        finally:
+            self.save_cache()
+
+        with open(os.path.join(self.work_dir, REPORT_FILE), 'w', encoding='utf-8') as f:
+            json.dump({'finished_at': time.strftime('%Y-%m-%dT%H:%M:%S'), 'stages': report}, f, indent=2)
+
+        return report
+
+    def _run_root_shards(self, stage: Stage) -> Dict:
+        counts = {'tasks': 0, 'cached': 0, 'ran': 0, 'failed': 0}
+        sources = stage.shards()
+        outputs = OrderedDict()
+
+        for key, source in sources.items():
+            counts['tasks'] += 1
+            task_id = f"{stage.name}/{key}"
+            output_path = self.shard_path(stage, key)
+            task_fingerprint = self.root_fingerprint(stage, source)
+
+            if not self.is_cached(task_id, task_fingerprint, stage):
+                if not self._execute(stage, task_id, stage.func, source, output_path, **stage.params):
+                    counts['failed'] += 1
+                    continue
+                self.record(task_id, task_fingerprint, output_path)
+                counts['ran'] += 1
+            else:
+                counts['cached'] += 1
+
+            outputs[key] = output_path
+
+        # Shards collected earlier (or imported) stay part of the corpus
+        prefix = f"{stage.name}/"
+        for task_id in self.cache['tasks']:
+            key = task_id[len(prefix):]
+            if task_id.startswith(prefix) and key not in outputs:
+                output_path = self.shard_path(stage, key)
+                if os.path.exists(output_path):
+                    outputs[key] = output_path
+
+        # A stable order keeps the shards already deduplicated a prefix of the input
+        self.outputs[stage.name] = OrderedDict(sorted(outputs.items(), key=lambda item: shard_sort_key(item[0])))
+        return counts
+
+    def _run_shards(self, stage: Stage) -> Dict:
+        counts = {'tasks': 0, 'cached': 0, 'ran': 0, 'failed': 0}
+        (dep,) = stage.deps
+        code = self.code_hash(stage)
+        outputs = OrderedDict()
+
+        for key, input_path in self.outputs[dep].items():
+            counts['tasks'] += 1
+            task_id = f"{stage.name}/{key}"
+            output_path = self.shard_path(stage, key)
+            task_fingerprint = fingerprint(stage.name, code, stage.params, self.file_digest(input_path))
+
+            if not self.is_cached(task_id, task_fingerprint, stage):
+                if not self._execute(stage, task_id, stage.func, input_path, output_path, **stage.params):
+                    counts['failed'] += 1
+                    continue
+                self.record(task_id, task_fingerprint, output_path)
+                counts['ran'] += 1
+            else:
+                counts['cached'] += 1
+
+            outputs[key] = output_path
+
+        counts['removed'] = self._prune(stage, outputs)
+        self.outputs[stage.name] = outputs
+        return counts
+
+    def _prune(self, stage: Stage, outputs: Dict[str, str]) -> int:
+        """Drop shards of matches that are no longer upstream"""
+        prefix = f"{stage.name}/"
+        stale = [
+            task_id for task_id in self.cache['tasks']
+            if task_id.startswith(prefix) and task_id[len(prefix):] not in outputs
+        ]
+        for task_id in stale:
+            for path in self.cache['tasks'].pop(task_id)['outputs']:
+                if os.path.exists(path):
+                    os.remove(path)
+        return len(stale)
+
+    def _run_incremental(self, stage: Stage) -> Dict:
+        (dep,) = stage.deps
+        task_id = stage.name
+        output_path = self.stage_path(stage)
+        state_path = os.path.join(self.work_dir, f"{stage.name}.state")
+        static = fingerprint(stage.name, self.code_hash(stage), stage.params)
+        inputs = self.outputs_digest(dep)
+        task_fingerprint = fingerprint(static, inputs)
+        self.outputs[stage.name] = output_path
+
+        if self.is_cached(task_id, task_fingerprint, stage):
+            return {'tasks': 1, 'cached': 1, 'ran': 0, 'resumed_from': None}
+
+        # Resume when the shards already folded in are an unchanged prefix of the inputs
+        record = self.cache['tasks'].get(task_id)
+        done = record['inputs'] if record else []
+        resume = (
+            stage.name not in self.force
+            and record is not None
+            and record.get('static') == static
+            and inputs[:len(done)] == done
+            and os.path.exists(state_path)
+            and all(self.file_digest(path) == digest for path, digest in record['outputs'].items())
+        )
+        start = len(done) if resume else 0
+
+        paths = list(self.outputs[dep].values())[start:]
+        if not self._execute(stage, task_id, stage.func, paths, output_path, state_path, resume, **stage.params):
+            return {'tasks': 1, 'cached': 0, 'ran': 0, 'failed': 1}
+
+        self.record(task_id, task_fingerprint, output_path, static=static, inputs=inputs)
+        return {'tasks': 1, 'cached': 0, 'ran': 1, 'resumed_from': start if resume else None}
+
+    def _run_single(self, stage: Stage) -> Dict:
+        inputs = {dep: self.outputs[dep] for dep in stage.deps}
+        inputs.update(stage.files)
+        digests = {dep: self.outputs_digest(dep) for dep in stage.deps}
+        digests.update({name: self.file_digest(path) for name, path in stage.files.items()})
+
+        task_id = stage.name
+        output_path = self.stage_path(stage)
+        task_fingerprint = fingerprint(stage.name, self.code_hash(stage), stage.params, digests)
+        self.outputs[stage.name] = output_path
+
+        if self.is_cached(task_id, task_fingerprint, stage):
+            return {'tasks': 1, 'cached': 1, 'ran': 0}
+
+        if not self._execute(stage, task_id, stage.func, inputs, output_path, **stage.params):
+            return {'tasks': 1, 'cached': 0, 'ran': 0, 'failed': 1}
+
+        self.record(task_id, task_fingerprint, output_path)
+        return {'tasks': 1, 'cached': 0, 'ran': 1}
+
+    def _execute(self, stage: Stage, task_id: str, func: Callable, *args, **kwargs) -> bool:
+        """Run one task; failures are logged and leave no cache record"""
+        # Every stage function takes its output path as second argument
+        os.makedirs(os.path.dirname(args[1]), exist_ok=True)
+        try:
+            func(*args, **kwargs)
+            return True
+        except Exception as e:
+            logger.error(f"❌ {task_id} failed: {e}")
+            return False
+
+    def import_shards(self, stage_name: str, entries: List[Dict]) -> int:
+        """
+        Seed a root stage with already scraped commentary, grouped by match URL
+
+        The shards are recorded under the fingerprint the stage would compute
+        for the same URL, so they count as cache hits on the next run.
+
+        Returns:
+            Number of shards written
+        """
+        stage = self.stages[stage_name]
+        by_url: Dict[str, List[Dict]] = OrderedDict()
+        for entry in entries:
+            by_url.setdefault(entry.get('url', ''), []).append(entry)
+
+        for url, match_entries in by_url.items():
+            key = match_key(url)
+            output_path = self.shard_path(stage, key)
+            os.makedirs(os.path.dirname(output_path), exist_ok=True)
+            write_jsonl(match_entries, output_path)
+            self.record(f"{stage.name}/{key}", self.root_fingerprint(stage, url), output_path)
+
+        self.save_cache()
+        return len(by_url)
+
+
+# ----------------------------------------------------------------------
+# Stage functions
+# ----------------------------------------------------------------------
+
+def load_match_urls(match_file: str = MATCHES_FILE) -> Dict[str, str]:
+    """Fully commented matches from the match finder, keyed by match id"""
+    if not os.path.exists(match_file):
+        return {}
+
+    with open(match_file, 'r', encoding='utf-8') as f:
+        matches = json.load(f)
+
+    return OrderedDict(
+        (match_key(match['url']), match['url'])
+        for match in matches if match.get('is_fully_commented')
+    )
+
+
+def collect_match(url: str, output_path: str):
+    """Scrape one finished match into a JSONL shard"""
+    # Playwright is only needed when a match is not in the cache
+    from scrapers.lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+
+    commentary = asyncio.run(LeQuipeFinishedMatchScraper().scrape_match(url))
+    if not commentary:
+        raise RuntimeError(f"no commentary extracted from {url}")
+    write_jsonl(commentary, output_path)
+
+
+def filter_shard(input_path: str, output_path: str, strict: bool = False):
+    """Normalize and quality filter one match shard"""
+    entries = normalize_entries(read_entries(input_path))
+    write_jsonl(quality_filter_entries(entries, strict=strict), output_path)
+
+
+def dedupe_shards(
+    input_paths: List[str],
+    output_path: str,
+    state_path: str,
+    resume: bool,
+    threshold: float = 0.8
+):
+    """
+    Fold match shards through the near-duplicate filter, in shard order
+
+    When resuming, the LSH index of the previous run is loaded and the new
+    shards are appended to the existing output.
+    """
+    dedup = NearDuplicateFilter(threshold=threshold)
+    if resume:
+        with open(state_path, 'rb') as f:
+            dedup.index = pickle.load(f)
+
+    def entries():
+        for path in input_paths:
+            yield from read_entries(path)
+
+    mode = 'a' if resume else 'w'
+    with open(output_path, mode, encoding='utf-8') as f:
+        for entry in dedup.iter_unique(entries()):
+            f.write(entry_to_json(entry) + '\n')
+
+    tmp_path = f"{state_path}.tmp"
+    with open(tmp_path, 'wb') as f:
+        pickle.dump(dedup.index, f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(tmp_path, state_path)
+
+
+def review_candidates(inputs: Dict, output_path: str, auto_approve: bool = False):
+    """
+    Hand candidates to the review app and collect the approved entries
+
+    Candidates are written as a JSON list for /api/load_data. The output is
+    the reviewers' approved file, or every candidate with auto_approve.
+    """
+    candidates = list(read_entries(inputs['dedupe']))
+
+    candidates_file = os.path.join(os.path.dirname(output_path), 'review_candidates.json')
+    with open(candidates_file, 'w', encoding='utf-8') as f:
+        json.dump(candidates, f, ensure_ascii=False, indent=2, default=json_default)
+
+    if auto_approve:
+        approved = candidates
+    elif os.path.exists(inputs['approved']):
+        with open(inputs['approved'], 'r', encoding='utf-8') as f:
+            approved = json.load(f)
+    else:
+        approved = []
+
+    write_jsonl(approved, output_path)
+
+
+def export_chat(inputs: Dict, output_path: str, min_length: int = 30):
+    """Export reviewed commentary to Mistral chat JSONL"""
+    export_dataset(read_entries(inputs['review']), output_path, template='mistral', min_length=min_length)
+
+
+def validate_export(inputs: Dict, output_path: str):
+    """Validate the exported training file; fails the stage if it is invalid"""
+    valid = validate_jsonl(inputs['export'])
+
+    with open(output_path, 'w', encoding='utf-8') as f:
+        json.dump({'file': inputs['export'], 'valid': valid}, f, indent=2)
+
+    if not valid:
+        raise ValueError(f"{inputs['export']} failed validation")
+
+
+def build_stages(
+    match_file: str = MATCHES_FILE,
+    strict: bool = False,
+    dedup_threshold: float = 0.8,
+    auto_approve: bool = False
+) -> List[Stage]:
+    """Declare the commentary pipeline"""
+    return [
+        Stage('collect', collect_match, shards=lambda: load_match_urls(match_file),
+              modules=['scrapers/lequipe_finished_match_scraper.py', 'commentary_entry.py']),
+        Stage('filter', filter_shard, deps=['collect'], sharded=True,
+              modules=['quality_filter.py', 'stream_pipeline.py', 'commentary_entry.py'], params={'strict': strict}),
+        Stage('dedupe', dedupe_shards, deps=['filter'], incremental=True,
+              modules=['near_duplicates.py', 'commentary_entry.py'], params={'threshold': dedup_threshold}),
+        Stage('review', review_candidates, deps=['dedupe'], files={'approved': APPROVED_FILE},
+              params={'auto_approve': auto_approve}),
+        Stage('export', export_chat, deps=['review'], modules=['chat_export.py']),
+        Stage('validate', validate_export, deps=['export'], modules=['validate_training_data.py'],
+              suffix='.json'),
+    ]
+
+
+def log_report(report: List[Dict]):
+    """Print time and cache hits per stage"""
+    logger.info(f"\n{'='*70}")
+    logger.info("PIPELINE RUN REPORT")
+    logger.info(f"{'='*70}")
+    logger.info(f"   {'stage':<10} {'tasks':>6} {'cached':>7} {'ran':>5} {'failed':>7} {'seconds':>9}")
+    for row in report:
+        logger.info(
+            f"   {row['stage']:<10} {row['tasks']:>6} {row['cached']:>7} {row['ran']:>5} "
+            f"{row.get('failed', 0):>7} {row['seconds']:>9.2f}"
+        )
+        if row.get('resumed_from'):
+            logger.info(f"   {'':<10} resumed after {row['resumed_from']} shards")
+    logger.info(f"{'='*70}")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Run the commentary pipeline with content-hash caching')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    run_parser = subparsers.add_parser('run', help='Run (or resume) the pipeline')
+    run_parser.add_argument('--matches', default=MATCHES_FILE, help='Match finder output with match URLs')
+    run_parser.add_argument('--strict', action='store_true', help='Use strict quality filtering')
+    run_parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                            help='Jaccard similarity above which entries count as near-duplicates')
+    run_parser.add_argument('--auto-approve', action='store_true',
+                            help='Skip manual review and export every candidate')
+    run_parser.add_argument('--until', help='Last stage to run')
+    run_parser.add_argument('--force', nargs='*', default=[], help='Stages to recompute regardless of the cache')
+    run_parser.add_argument('--work-dir', default=WORK_DIR, help='Directory for outputs and the cache')
+
+    import_parser = subparsers.add_parser('import', help='Seed collect shards from already scraped commentary')
+    import_parser.add_argument('input', help='Commentary file (.json list, .jsonl, or dataset directory)')
+    import_parser.add_argument('--work-dir', default=WORK_DIR, help='Directory for outputs and the cache')
+
+    args = parser.parse_args()
+
+    if args.command == 'import':
+        runner = PipelineRunner(build_stages(), work_dir=args.work_dir)
+        shards = runner.import_shards('collect', list(read_entries(args.input)))
+        logger.info(f"✅ Imported {shards} match shards into {args.work_dir}")
+        return
+
+    runner = PipelineRunner(
+        build_stages(args.matches, args.strict, args.dedup_threshold, args.auto_approve),
+        work_dir=args.work_dir,
+        force=args.force
+    )
+    report = runner.run(until=args.until)
+    log_report(report)
+
+    if any(row.get('failed') for row in report):
+        sys.exit(1)
+
+
+if __name__ == '__main__':
+    main()
@@ -4,10 +4,21 @@ Quality filter for commentary data
 Ensures only high-quality, football-related commentary is included in training dataset
 """
 
+import os
 import re
-from typing import List, Dict
+import json
+import time
+import argparse
+from collections import Counter
+from functools import partial
+from datetime import datetime, timezone
+from multiprocessing import Pool
+from typing import Callable, List, Dict, Iterable, Optional, Tuple
 import logging
 
+from dataset_store import Dataset
+from streaming_metrics import QualityMetrics
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -43,6 +54,308 @@ FOOTBALL_TERMS_FR = {
 }
 
 
+def _trie_pattern(words) -> str:
+    """
+    Build a regex alternation factored by common prefixes
+
+    A flat 'a|b|c' alternation is retried term by term at every position;
+    the trie form lets the regex engine branch on one character at a time.
+    """
+    trie = {}
+    for word in words:
+        node = trie
+        for char in word:
+            node = node.setdefault(char, {})
+        node[''] = {}
+
+    def build(node) -> str:
+        branches = [re.escape(char) + build(child) for char, child in sorted(node.items()) if char]
+        if not branches:
+            return ''
+        pattern = branches[0] if len(branches) == 1 else '(?:' + '|'.join(branches) + ')'
+        return f'(?:{pattern})?' if '' in node else pattern
+
+    return build(trie)
+
+
+# Vocabulary compiled once into a single trie regex, matched against the
+# lowercased text (same substring semantics as checking each term with `in`)
+FOOTBALL_TERMS_RE = re.compile(_trie_pattern(FOOTBALL_TERMS_FR))
+LETTERS_RE = re.compile(r'[a-zA-Zà-ÿÀ-Ÿ]{10,}')
+TIMESTAMP_RE = re.compile(r'^\d+[\':]')
+
+# Rejection reason codes returned by check_commentary()
+REASON_TOO_SHORT = 'too_short'
+REASON_TOO_LONG = 'too_long'
+REASON_NO_FOOTBALL_TERMS = 'no_football_vocabulary'
+REASON_URL = 'starts_with_url'
+REASON_TOO_MANY_SENTENCES = 'too_many_sentences'
+REASON_ELLIPSIS = 'excessive_ellipsis'
+REASON_NO_TEXT = 'insufficient_text'
+REASON_TIMESTAMP = 'timestamp_only'
+REASON_REPETITIVE = 'too_repetitive'
+
+
+def _shorter_than(min_length: int, text: str) -> bool:
+    return len(text) < min_length
+
+
+def _longer_than(max_length: int, text: str) -> bool:
+    return len(text) > max_length
+
+
+def _no_football_terms(text: str) -> bool:
+    return FOOTBALL_TERMS_RE.search(text.lower()) is None
+
+
+def _starts_with_url(text: str) -> bool:
+    return text.startswith(('http', 'www'))
+
+
+def _too_many_sentences(text: str) -> bool:
+    return text.count('.') + text.count('!') + text.count('?') > 3
+
+
+def _excessive_ellipsis(text: str) -> bool:
+    return text.count('...') > 2
+
+
+def _insufficient_text(text: str) -> bool:
+    # Must contain some letters (not just numbers/symbols)
+    return LETTERS_RE.search(text) is None
+
+
+def _timestamp_only(text: str) -> bool:
+    return len(text) < 80 and TIMESTAMP_RE.match(text) is not None
+
+
+def _too_repetitive(text: str) -> bool:
+    words = text.split()
+    # More than 50% repetition
+    return len(words) > 10 and 2 * len(set(words)) < len(words)
+
+
+Rule = Tuple[str, Callable[[str], bool]]
+
+
+def _mode_rules(min_length: int, max_length: int, limit_sentences: bool) -> Tuple[Rule, ...]:
+    """Rules of one mode in default evaluation order, with its thresholds bound"""
+    rules = (
+        (REASON_TOO_SHORT, partial(_shorter_than, min_length)),
+        (REASON_TOO_LONG, partial(_longer_than, max_length)),
+        (REASON_NO_FOOTBALL_TERMS, _no_football_terms),
+        (REASON_URL, _starts_with_url),
+        (REASON_TOO_MANY_SENTENCES, _too_many_sentences),
+        (REASON_ELLIPSIS, _excessive_ellipsis),
+        (REASON_NO_TEXT, _insufficient_text),
+        (REASON_TIMESTAMP, _timestamp_only),
+        (REASON_REPETITIVE, _too_repetitive),
+    )
+    return tuple(rule for rule in rules if limit_sentences or rule[0] != REASON_TOO_MANY_SENTENCES)
+
+
+# Checks in their default evaluation order: (reason code, predicate returning True to reject)
+QUALITY_RULES = _mode_rules(min_length=50, max_length=500, limit_sentences=True)
+# Walls of text are only tolerated in strict mode (shorter max length)
+STRICT_QUALITY_RULES = _mode_rules(min_length=60, max_length=300, limit_sentences=False)
+
+_compiled: Dict[Tuple[Tuple[str, ...], bool], Callable[[str], Optional[str]]] = {}
+
+
+def compile_rules(order: Iterable[str], strict: bool = False) -> Callable[[str], Optional[str]]:
+    """
+    Build the check function of one rule order
+
+    Args:
+        order: Reason codes in evaluation order
+        strict: Use the strict mode rules
+
+    Returns:
+        Function of a stripped text returning the first failing reason code,
+        or None if the text passes every check
+    """
+    key = (tuple(order), strict)
+    if key not in _compiled:
+        rules = dict(STRICT_QUALITY_RULES if strict else QUALITY_RULES)
+        ordered = tuple((reason, rules[reason]) for reason in key[0] if reason in rules)
+
+        def check(text: str) -> Optional[str]:
+            for reason, rejects in ordered:
+                if rejects(text):
+                    return reason
+            return None
+
+        _compiled[key] = check
+    return _compiled[key]
+
+
+RULE_ORDER_FILE = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data', 'quality_rule_order.json')
+
+
+class RuleCascade:
+    """
+    Quality rules evaluated in a learned order, most rejections per microsecond first
+
+    Every rule is an independent reject predicate, so the order never changes
+    which entries are accepted, only how fast rejections happen (and, for
+    entries failing several rules, which reason code is reported).
+    """
+
+    def __init__(self, order: Optional[List[str]] = None, stats: Optional[Dict] = None):
+        """
+        Initialize cascade
+
+        Args:
+            order: Reason codes in evaluation order (unknown codes are ignored,
+                   missing ones are appended in default order)
+            stats: Per-rule calibration stats, kept for reporting and saving
+        """
+        rules = dict(QUALITY_RULES)
+        order = [reason for reason in (order or []) if reason in rules]
+        order += [reason for reason, _ in QUALITY_RULES if reason not in order]
+
+        self.order = order
+        self.checks = {strict: compile_rules(order, strict) for strict in (False, True)}
+        self.stats = stats or {}
+
+    def check(self, text: str, strict: bool = False) -> Optional[str]:
+        """
+        Run the rules over an already stripped commentary text
+
+        Returns:
+            Rejection reason code, or None if the text passes every check
+        """
+        reason = self.checks[strict](text)
+        if reason is not None and logger.isEnabledFor(logging.DEBUG):
+            logger.debug("Rejected (%s): '%.50s...'", reason, text)
+        return reason
+
+    @classmethod
+    def calibrate(cls, texts: List[str], strict: bool = False) -> 'RuleCascade':
+        """
+        Learn a rule order from a sample of texts
+
+        Greedy: time every remaining rule on the texts still alive, pick the
+        one with the most rejections per microsecond, drop the texts it
+        rejects, repeat. Measuring on survivors accounts for rules that
+        reject the same texts (e.g. too_short and timestamp_only).
+
+        Args:
+            texts: Sample of stripped commentary texts
+            strict: Calibrate for strict mode
+
+        Returns:
+            Calibrated cascade with per-rule stats
+        """
+        remaining = {reason: compile_rules([reason], strict) for reason, _ in QUALITY_RULES}
+        alive = list(texts)
+        order = []
+        stats = {}
+
+        while remaining:
+            measured = {}
+            for reason, rule in remaining.items():
+                start = time.perf_counter()
+                rejected = [rule(text) is not None for text in alive]
+                elapsed_us = (time.perf_counter() - start) * 1e6
+                measured[reason] = (rejected, elapsed_us)
+
+            def score(reason):
+                rejected, elapsed_us = measured[reason]
+                # Rules that reject nothing go last, cheapest first
+                return (sum(rejected) / max(elapsed_us, 1e-3), -elapsed_us)
+
+            best = max(measured, key=score)
+            rejected, elapsed_us = measured[best]
+            rejections = sum(rejected)
+
+            stats[best] = {
+                'evaluated': len(alive),
+                'rejections': rejections,
+                'rejection_rate': rejections / len(alive) if alive else 0,
+                'cost_us': elapsed_us / len(alive) if alive else 0,
+                'rejections_per_us': rejections / elapsed_us if elapsed_us else 0,
+            }
+
+            order.append(best)
+            alive = [text for text, is_rejected in zip(alive, rejected) if not is_rejected]
+            del remaining[best]
+
+        logger.info(f"Calibrated rule order on {len(texts)} texts: {' → '.join(order)}")
+        return cls(order=order, stats=stats)
+
+    def save(self, file_path: str = RULE_ORDER_FILE, strict: bool = False):
+        """Save the order and stats (one slot per strict/default mode)"""
+        saved = {}
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f)
+
+        saved['strict' if strict else 'default'] = {
+            'order': self.order,
+            'stats': self.stats,
+            'calibrated_at': datetime.now(timezone.utc).isoformat()
+        }
+
+        os.makedirs(os.path.dirname(file_path), exist_ok=True)
+        with open(file_path, 'w', encoding='utf-8') as f:
+            json.dump(saved, f, ensure_ascii=False, indent=2)
+
+    @classmethod
+    def load(cls, file_path: str = RULE_ORDER_FILE, strict: bool = False) -> 'RuleCascade':
+        """Load a saved order, falling back to the default order"""
+        if os.path.exists(file_path):
+            with open(file_path, 'r', encoding='utf-8') as f:
+                saved = json.load(f).get('strict' if strict else 'default')
+            if saved:
+                return cls(order=saved['order'], stats=saved.get('stats'))
+
+        return cls()
+
+
+_cascades: Dict[bool, RuleCascade] = {}
+
+
+def get_cascade(strict: bool = False) -> RuleCascade:
+    """Cascade used by check_text(), loaded once per process from RULE_ORDER_FILE"""
+    if strict not in _cascades:
+        _cascades[strict] = RuleCascade.load(strict=strict)
+    return _cascades[strict]
+
+
+def set_cascade(cascade: RuleCascade, strict: bool = False):
+    """Replace the cascade used by check_text() in this process"""
+    _cascades[strict] = cascade
+
+
+def check_text(text: str, strict: bool = False) -> Optional[str]:
+    """
+    Run the quality rules over an already stripped commentary text
+
+    Args:
+        text: Commentary text
+        strict: If True, apply stricter criteria
+
+    Returns:
+        Rejection reason code, or None if the text passes every check
+    """
+    return get_cascade(strict).check(text, strict)
+
+
+def check_commentary(commentary: Dict, strict: bool = False) -> Optional[str]:
+    """
+    Determine why a commentary entry fails quality standards
+
+    Args:
+        commentary: Commentary dictionary with 'text' field
+        strict: If True, apply stricter criteria
+
+    Returns:
+        Rejection reason code, or None if the commentary passes
+    """
+    return check_text(commentary.get('text', '').strip(), strict=strict)
+
+
 def is_quality_commentary(commentary: Dict, strict: bool = False) -> bool:
     """
     Determine if a commentary entry meets quality standards
@@ -54,70 +367,76 @@ def is_quality_commentary(commentary: Dict, strict: bool = False) -> bool:
     Returns:
         True if commentary passes quality checks
     """
-    text = commentary.get('text', '').strip()
-
-    # 1. Length check
-    min_length = 50 if not strict else 60
-    max_length = 500 if not strict else 300
-
-    if len(text) < min_length:
-        logger.debug(f"Rejected: too short ({len(text)} < {min_length})")
-        return False
-
-    if len(text) > max_length:
-        logger.debug(f"Rejected: too long ({len(text)} > {max_length})")
-        return False
-
-    # 2. Football vocabulary check
-    text_lower = text.lower()
-    has_football_term = any(term in text_lower for term in FOOTBALL_TERMS_FR)
-
-    if not has_football_term:
-        logger.debug(f"Rejected: no football vocabulary in '{text[:50]}...'")
-        return False
-
-    # 3. No bare URLs
-    if text.startswith('http') or text.startswith('www'):
-        logger.debug("Rejected: starts with URL")
-        return False
-
-    # 4. Sentence count (avoid walls of text)
-    sentence_count = text.count('.') + text.count('!') + text.count('?')
-    if sentence_count > 3 and not strict:
-        logger.debug(f"Rejected: too many sentences ({sentence_count} > 3)")
-        return False
-
-    # 5. No excessive punctuation
-    if text.count('...') > 2:
-        logger.debug("Rejected: excessive ellipsis")
-        return False
-
-    # 6. Must contain some letters (not just numbers/symbols)
-    if not re.search(r'[a-zA-Zà-ÿÀ-Ÿ]{10,}', text):
-        logger.debug("Rejected: insufficient text content")
-        return False
-
-    # 7. Not just metadata or timestamps
-    if re.match(r'^\d+[\':]', text) and len(text) < 80:
-        logger.debug("Rejected: appears to be just a timestamp")
-        return False
-
-    # 8. Avoid duplicate/repetitive phrases (basic check)
-    words = text.split()
-    if len(words) > 10:
-        # Check for word repetition
-        word_set = set(words)
-        uniqueness_ratio = len(word_set) / len(words)
-        if uniqueness_ratio < 0.5:  # More than 50% repetition
-            logger.debug(f"Rejected: too repetitive (uniqueness: {uniqueness_ratio:.2f})")
-            return False
+    return check_commentary(commentary, strict=strict) is None
 
-    return True
+
+def _check_texts(texts: List[str], strict: bool, order: Optional[List[str]] = None) -> List[Optional[str]]:
+    """Worker for filter_many(): reason codes for a chunk of texts"""
+    cascade = RuleCascade(order) if order else get_cascade(strict)
+    return [cascade.check(text, strict) for text in texts]
+
+
+def filter_many(
+    commentary_list: Iterable[Dict],
+    strict: bool = False,
+    processes: int = 1,
+    chunksize: int = 10000,
+    calibrate_sample: int = 0
+) -> Tuple[List[Dict], Counter]:
+    """
+    Filter many commentary entries, optionally fanning out over a process pool
+
+    Only the texts are shipped to the workers; entries keep their order.
+
+    Args:
+        commentary_list: Commentary dictionaries
+        strict: Apply stricter filtering criteria
+        processes: Number of worker processes (1 runs in-process)
+        chunksize: Number of texts sent to a worker at a time
+        calibrate_sample: If > 0, learn the rule order on this many texts
+                          first and save it to RULE_ORDER_FILE
+
+    Returns:
+        Tuple of (accepted entries, Counter of rejection reason codes)
+    """
+    entries = commentary_list if isinstance(commentary_list, list) else list(commentary_list)
+    texts = [entry.get('text', '').strip() for entry in entries]
+
+    if calibrate_sample > 0 and texts:
+        cascade = RuleCascade.calibrate(texts[:calibrate_sample], strict=strict)
+        cascade.save(strict=strict)
+        set_cascade(cascade, strict=strict)
+
+    order = get_cascade(strict).order
+
+    if processes > 1 and len(texts) > chunksize:
+        chunks = [texts[i:i + chunksize] for i in range(0, len(texts), chunksize)]
+        with Pool(processes) as pool:
+            reasons = [
+                reason
+                for chunk_reasons in pool.imap(partial(_check_texts, strict=strict, order=order), chunks)
+                for reason in chunk_reasons
+            ]
+    else:
+        reasons = _check_texts(texts, strict)
+
+    accepted = [entry for entry, reason in zip(entries, reasons) if reason is None]
+    rejections = Counter(reason for reason in reasons if reason is not None)
+
+    return accepted, rejections
+
+
+def log_rejections(rejections: Counter, total: int):
+    """Log a histogram of rejection reasons"""
+    for reason, count in rejections.most_common():
+        share = count / total if total else 0
+        logger.info(f"     {reason:<24} {count:>8} ({share:.1%})")
 
 
 def filter_commentary_batch(
     commentary_list: List[Dict],
-    strict: bool = False
+    strict: bool = False,
+    processes: int = 1
 ) -> List[Dict]:
     """
     Filter a batch of commentary entries
@@ -125,24 +444,20 @@ def filter_commentary_batch(
     Args:
         commentary_list: List of commentary dictionaries
         strict: Apply stricter filtering criteria
+        processes: Number of worker processes
 
     Returns:
         Filtered list of high-quality commentary
     """
-    filtered = []
-    rejected_count = 0
-
-    for entry in commentary_list:
-        if is_quality_commentary(entry, strict=strict):
-            filtered.append(entry)
-        else:
-            rejected_count += 1
+    filtered, rejections = filter_many(commentary_list, strict=strict, processes=processes)
+    rejected_count = sum(rejections.values())
 
     approval_rate = len(filtered) / len(commentary_list) if commentary_list else 0
 
     logger.info(f"Filtered {len(commentary_list)} entries:")
     logger.info(f"  ✅ Approved: {len(filtered)} ({approval_rate:.1%})")
     logger.info(f"  ❌ Rejected: {rejected_count}")
+    log_rejections(rejections, len(commentary_list))
 
     return filtered
 
@@ -178,52 +493,24 @@ def remove_duplicates(commentary_list: List[Dict]) -> List[Dict]:
     return unique_commentary
 
 
-def calculate_quality_metrics(commentary_list: List[Dict]) -> Dict:
+def calculate_quality_metrics(commentary_list: Iterable[Dict]) -> Dict:
     """
     Calculate quality metrics for a commentary dataset
 
+    Streams the entries through a QualityMetrics accumulator, so memory stays
+    constant; vocabulary size is a HyperLogLog estimate.
+
     Args:
-        commentary_list: List of commentary dictionaries
+        commentary_list: Iterable of commentary dictionaries
 
     Returns:
         Dictionary of quality metrics
     """
-    if not commentary_list:
-        return {}
+    return QualityMetrics().update_many(commentary_list).to_dict()
 
-    texts = [entry['text'] for entry in commentary_list]
 
-    # Calculate metrics
-    total_words = sum(len(text.split()) for text in texts)
-    total_chars = sum(len(text) for text in texts)
-
-    all_words = ' '.join(texts).lower().split()
-    unique_words = set(all_words)
-
-    metrics = {
-        'total_examples': len(commentary_list),
-        'avg_length_chars': total_chars / len(commentary_list),
-        'avg_length_words': total_words / len(commentary_list),
-        'vocabulary_size': len(unique_words),
-        'vocabulary_diversity': len(unique_words) / len(all_words) if all_words else 0,
-        'sources': {},
-        'event_types': {}
-    }
-
-    # Count by source
-    for entry in commentary_list:
-        source = entry.get('source', 'unknown')
-        metrics['sources'][source] = metrics['sources'].get(source, 0) + 1
-
-    # Count by event type
-    for entry in commentary_list:
-        event_type = entry.get('event_type', 'unknown')
-        metrics['event_types'][event_type] = metrics['event_types'].get(event_type, 0) + 1
-
-    return metrics
-
-
-if __name__ == "__main__":
+def run_demo():
+    """Run the filter over a few hand-written examples"""
     # Test quality filter
     test_commentary = [
         {
@@ -259,3 +546,57 @@ if __name__ == "__main__":
     metrics = calculate_quality_metrics(filtered)
     for key, value in metrics.items():
         print(f"  {key}: {value}")
+
+
+def main():
+    """Filter a JSON/JSONL commentary file and print a rejection histogram"""
+    parser = argparse.ArgumentParser(description='Filter commentary for training quality')
+    parser.add_argument('input', nargs='?', help='JSON or JSONL file, or dataset directory, of commentary entries (omit to run the demo)')
+    parser.add_argument('--output', type=str, help='Write accepted entries to this JSON file')
+    parser.add_argument('--strict', action='store_true', help='Use strict quality filtering')
+    parser.add_argument('--processes', type=int, default=1, help='Number of worker processes')
+    parser.add_argument('--calibrate', type=int, default=0, metavar='N',
+                        help='Learn the rule order on the first N entries and save it for later runs')
+
+    args = parser.parse_args()
+
+    if not args.input:
+        run_demo()
+        return
+
+    if os.path.isdir(args.input):
+        with Dataset(args.input) as dataset:
+            commentary_list = list(dataset.iter_records())
+    else:
+        with open(args.input, 'r', encoding='utf-8') as f:
+            if args.input.endswith('.jsonl'):
+                commentary_list = [json.loads(line) for line in f if line.strip()]
+            else:
+                commentary_list = json.load(f)
+
+    filtered, rejections = filter_many(
+        commentary_list,
+        strict=args.strict,
+        processes=args.processes,
+        calibrate_sample=args.calibrate
+    )
+
+    print(f"\n📊 {len(filtered)}/{len(commentary_list)} entries accepted")
+    print("\n❌ Rejection reasons:")
+    for reason, count in rejections.most_common():
+        print(f"  {reason:<24} {count:>8} ({count / len(commentary_list):.1%})")
+
+    cascade = get_cascade(args.strict)
+    print(f"\n⚙️  Rule order: {' → '.join(cascade.order)}")
+    for reason, rule_stats in cascade.stats.items():
+        print(f"  {reason:<24} rejects {rule_stats['rejection_rate']:>6.1%} of survivors, "
+              f"{rule_stats['cost_us']:.2f} µs/text")
+
+    if args.output:
+        with open(args.output, 'w', encoding='utf-8') as f:
+            json.dump(filtered, f, ensure_ascii=False, indent=2)
+        print(f"\n💾 Saved to: {args.output}")
+
+
+if __name__ == "__main__":
+    main()
@@ -3,202 +3,255 @@
 Flask web app for manual review of scraped commentary
 Keyboard shortcuts: A (approve), R (reject), E (edit), N (next batch)
 Target: 90%+ approval rate
+
+Several reviewers can work at once: each one is handed leased batches of
+entries from the shared review store, so nobody sees an entry someone else
+is reviewing. Open /review?reviewer=<name> once to set your name (a cookie).
+All state lives in the store, so the app can run under several workers:
+
+    python review_app.py --workers 4     # gunicorn (pip install gunicorn)
+
+The queue is ranked by review_ranker.py, which learns from the decisions as
+they come in: the entries it is least sure about are handed out first, and
+the ones it is confident about can be accepted in bulk (/api/auto_accept).
 """
 
-from flask import Flask, render_template, request, jsonify
-import json
+from flask import Flask, render_template, request, jsonify, make_response
 import os
-from datetime import datetime
-from typing import List, Dict
-from quality_filter import is_quality_commentary, calculate_quality_metrics
+import sys
+import argparse
+import threading
+from stream_pipeline import read_entries
+from chat_export import export_dataset
+from review_store import (
+    ReviewStore, STATUS_APPROVED, STATUS_REJECTED, STATUS_EDITED
+)
+import review_ranker
 
 app = Flask(__name__)
 
 # Configuration
-DATA_DIR = 'scripts/data-collection/data'
-REVIEW_STATE_FILE = os.path.join(DATA_DIR, 'review_state.json')
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+REVIEW_DB = os.path.join(DATA_DIR, 'review.db')
 APPROVED_FILE = os.path.join(DATA_DIR, 'approved_commentary.json')
-REJECTED_FILE = os.path.join(DATA_DIR, 'rejected_commentary.json')
 
-# In-memory state
-review_state = {
-    'current_index': 0,
-    'approved_count': 0,
-    'rejected_count': 0,
-    'edited_count': 0,
-    'commentary_list': []
-}
+# Review queue and decisions (one row per entry, one UPDATE per decision)
+store = None
+annotation_thread = None
+ranking_thread = None
+decisions_since_ranking = 0
+# gunicorn runs each worker with several threads: the store and background threads are started under this lock
+state_lock = threading.Lock()
 
+QUEUE_PAGE_SIZE = 20
+RANK_EVERY = 50  # Decisions (in this process) between two background ranking passes
 
-def load_review_state():
-    """Load review state from disk"""
-    global review_state
 
-    if os.path.exists(REVIEW_STATE_FILE):
-        with open(REVIEW_STATE_FILE, 'r', encoding='utf-8') as f:
-            review_state = json.load(f)
-    else:
-        review_state = {
-            'current_index': 0,
-            'approved_count': 0,
-            'rejected_count': 0,
-            'edited_count': 0,
-            'commentary_list': []
-        }
+def get_store() -> ReviewStore:
+    """Open the review store on first use (and finish auto checks an earlier run left undone)"""
+    global store
 
+    if store is None:
+        with state_lock:
+            if store is None:
+                store = ReviewStore(REVIEW_DB)
+                _resume_annotation()
+    return store
 
-def save_review_state():
-    """Save review state to disk"""
-    with open(REVIEW_STATE_FILE, 'w', encoding='utf-8') as f:
-        json.dump(review_state, f, ensure_ascii=False, indent=2)
 
+def resume_annotation():
+    """
+    Restart the auto checks if entries are left unannotated and no pass is running
 
-def append_to_file(file_path: str, entry: Dict):
-    """Append an entry to a JSON file"""
-    entries = []
+    A pass can die with its process (a worker restart) while holding the
+    annotator claim; polling endpoints call this, so another worker takes
+    over once the claim lapses.
+    """
+    get_store()
+    with state_lock:
+        _resume_annotation()
 
-    if os.path.exists(file_path):
-        with open(file_path, 'r', encoding='utf-8') as f:
-            entries = json.load(f)
 
-    entries.append(entry)
+def _resume_annotation():
+    if annotation_thread is not None and annotation_thread.is_alive():
+        return
+    if store.unannotated() and not store.annotating():
+        _start_annotation()
 
-    with open(file_path, 'w', encoding='utf-8') as f:
-        json.dump(entries, f, ensure_ascii=False, indent=2)
 
+def start_annotation():
+    """Compute auto quality checks and duplicate flags in the background, then rank the queue"""
+    get_store()
+    with state_lock:
+        _start_annotation()
 
-@app.route('/')
-def index():
-    """Home page with statistics"""
-    total = len(review_state['commentary_list'])
-    reviewed = review_state['current_index']
-    remaining = total - reviewed
 
-    approval_rate = (
-        review_state['approved_count'] / reviewed
-        if reviewed > 0 else 0
-    )
+def _start_annotation():
+    global annotation_thread
+
+    def annotate_and_rank():
+        get_store().annotate()
+        review_ranker.refresh(get_store())
+
+    # With several workers, the store lets only one of them run the pass
+    annotation_thread = threading.Thread(target=annotate_and_rank, daemon=True)
+    annotation_thread.start()
+
+
+def start_ranking():
+    """Learn the latest decisions and re-score the queue in the background"""
+    global ranking_thread, decisions_since_ranking
+
+    get_store()
+    with state_lock:
+        decisions_since_ranking = 0
+        if ranking_thread is None or not ranking_thread.is_alive():
+            ranking_thread = threading.Thread(target=review_ranker.refresh, args=(store,), daemon=True)
+            ranking_thread.start()
+
+
+def current_reviewer() -> str:
+    """Reviewer name: ?reviewer=, then the cookie it sets, then the client address"""
+    body = request.get_json(silent=True) or {}
+    return (request.args.get('reviewer') or body.get('reviewer') or request.cookies.get('reviewer')
+            or request.remote_addr or 'unknown')
+
 
-    stats = {
-        'total': total,
+def review_stats(counts: dict = None) -> dict:
+    """Review counts in the shape the templates and /api/stats use"""
+    counts = counts or get_store().counts()
+    reviewed = counts['reviewed']
+
+    return {
+        'total': counts['total'],
         'reviewed': reviewed,
-        'remaining': remaining,
-        'approved': review_state['approved_count'],
-        'rejected': review_state['rejected_count'],
-        'edited': review_state['edited_count'],
-        'approval_rate': f"{approval_rate:.1%}",
-        'progress': f"{reviewed / total * 100:.1f}%" if total > 0 else "0%"
+        'remaining': counts['pending'],
+        'approved': counts['accepted'],
+        'rejected': counts['rejected'],
+        'edited': counts['edited'],
+        'approval_rate': counts['accepted'] / reviewed if reviewed > 0 else 0
     }
 
+
+@app.route('/')
+def index():
+    """Home page with statistics"""
+    stats = review_stats()
+    total = stats['total']
+
+    stats['progress'] = f"{stats['reviewed'] / total * 100:.1f}%" if total > 0 else "0%"
+    stats['approval_rate'] = f"{stats['approval_rate']:.1%}"
+
     return render_template('index.html', stats=stats)
 
 
 @app.route('/review')
 def review():
     """Review interface"""
-    load_review_state()
+    reviewer = current_reviewer()
+
+    # Entries this reviewer already holds (page reload), else a new batch
+    batch = get_store().held(reviewer) or get_store().lease(reviewer, QUEUE_PAGE_SIZE)
+
+    if batch:
+        # The first entry is rendered here, the page takes the rest and leases more from /api/lease
+        counts = review_stats()
+        stats = {
+            'current_index': batch[0]['index'] + 1,
+            'total': counts['total'],
+            'approved': counts['approved'],
+            'rejected': counts['rejected'],
+            'approval_rate': f"{counts['approval_rate'] * 100:.1f}%"
+        }
+        page = render_template('review.html', current=batch[0], batch=batch[1:], stats=stats,
+                               reviewer=reviewer, page_size=QUEUE_PAGE_SIZE)
+    else:
+        page = render_template('completed.html')
 
-    current_idx = review_state['current_index']
-    commentary_list = review_state['commentary_list']
+    response = make_response(page)
+    if request.args.get('reviewer'):
+        response.set_cookie('reviewer', reviewer, max_age=30 * 24 * 3600)
+    return response
 
-    if current_idx >= len(commentary_list):
-        return render_template('completed.html')
 
-    # Get current batch (show 1 at a time, but prepare next 5 for quick navigation)
-    batch = commentary_list[current_idx:min(current_idx + 5, len(commentary_list))]
+@app.route('/api/lease', methods=['POST'])
+def lease():
+    """Lease the next batch of pending commentary to the current reviewer (renews the ones held)"""
+    limit = min((request.get_json(silent=True) or {}).get('limit', QUEUE_PAGE_SIZE), 200)
+    entries = get_store().lease(current_reviewer(), limit)
+    resume_annotation()
 
-    current = batch[0] if batch else None
+    return jsonify({'entries': entries, 'annotating': get_store().annotating()})
 
-    if current:
-        # Run quality check
-        current['auto_quality_check'] = is_quality_commentary(current)
 
-    stats = {
-        'current_index': current_idx + 1,
-        'total': len(commentary_list),
-        'approved': review_state['approved_count'],
-        'rejected': review_state['rejected_count'],
-        'approval_rate': f"{review_state['approved_count'] / max(current_idx, 1) * 100:.1f}%"
-    }
+@app.route('/api/release', methods=['POST'])
+def release():
+    """Give back the current reviewer's undecided entries"""
+    return jsonify({'success': True, 'released': get_store().release(current_reviewer())})
 
-    return render_template('review.html', current=current, stats=stats, batch=batch)
 
+@app.route('/api/queue')
+def queue():
+    """Page of pending commentary after a cursor (?after=<index>&limit=<n>), without leasing it"""
+    after = request.args.get('after', -1, type=int)
+    limit = min(request.args.get('limit', QUEUE_PAGE_SIZE, type=int), 200)
+
+    entries = get_store().page(after=after, limit=limit)
+    resume_annotation()
+
+    return jsonify({
+        'entries': entries,
+        'next_cursor': entries[-1]['index'] if len(entries) == limit else None,
+        'annotating': get_store().annotating()
+    })
 
-@app.route('/api/approve', methods=['POST'])
-def approve():
-    """Approve current commentary"""
-    data = request.json
-    index = data.get('index', review_state['current_index'])
 
-    if index < len(review_state['commentary_list']):
-        entry = review_state['commentary_list'][index]
-        entry['reviewed_at'] = datetime.utcnow().isoformat()
-        entry['status'] = 'approved'
+def record_decision(index, status: str, reason: str = None, edited_text: str = None):
+    """Store one decision made by the current reviewer"""
+    global decisions_since_ranking
 
-        append_to_file(APPROVED_FILE, entry)
+    if not isinstance(index, int):
+        return jsonify({'success': False, 'error': 'Invalid index'})
 
-        review_state['approved_count'] += 1
-        review_state['current_index'] = index + 1
-        save_review_state()
+    if get_store().decide(index, status, reason=reason, edited_text=edited_text, reviewer=current_reviewer()):
+        decisions_since_ranking += 1
+        if decisions_since_ranking >= RANK_EVERY:
+            start_ranking()
+        return jsonify({'success': True})
 
-        return jsonify({'success': True, 'next_index': review_state['current_index']})
+    return jsonify({'success': False, 'error': 'Invalid index, or the entry is leased to another reviewer'})
 
-    return jsonify({'success': False, 'error': 'Invalid index'})
+
+@app.route('/api/approve', methods=['POST'])
+def approve():
+    """Approve current commentary"""
+    data = request.json
+    return record_decision(data.get('index'), STATUS_APPROVED)
 
 
 @app.route('/api/reject', methods=['POST'])
 def reject():
     """Reject current commentary"""
     data = request.json
-    index = data.get('index', review_state['current_index'])
     reason = data.get('reason', 'Quality issues')
-
-    if index < len(review_state['commentary_list']):
-        entry = review_state['commentary_list'][index]
-        entry['reviewed_at'] = datetime.utcnow().isoformat()
-        entry['status'] = 'rejected'
-        entry['rejection_reason'] = reason
-
-        append_to_file(REJECTED_FILE, entry)
-
-        review_state['rejected_count'] += 1
-        review_state['current_index'] = index + 1
-        save_review_state()
-
-        return jsonify({'success': True, 'next_index': review_state['current_index']})
-
-    return jsonify({'success': False, 'error': 'Invalid index'})
+    return record_decision(data.get('index'), STATUS_REJECTED, reason=reason)
 
 
 @app.route('/api/edit', methods=['POST'])
 def edit():
     """Edit and approve commentary"""
     data = request.json
-    index = data.get('index', review_state['current_index'])
     edited_text = data.get('text', '')
 
-    if index < len(review_state['commentary_list']) and edited_text:
-        entry = review_state['commentary_list'][index].copy()
-        entry['text'] = edited_text
-        entry['reviewed_at'] = datetime.utcnow().isoformat()
-        entry['status'] = 'edited'
-        entry['original_text'] = review_state['commentary_list'][index]['text']
+    if not edited_text:
+        return jsonify({'success': False, 'error': 'Invalid input'})
 
-        append_to_file(APPROVED_FILE, entry)
-
-        review_state['approved_count'] += 1
-        review_state['edited_count'] += 1
-        review_state['current_index'] = index + 1
-        save_review_state()
-
-        return jsonify({'success': True, 'next_index': review_state['current_index']})
-
-    return jsonify({'success': False, 'error': 'Invalid input'})
+    return record_decision(data.get('index'), STATUS_EDITED, edited_text=edited_text)
 
 
 @app.route('/api/load_data', methods=['POST'])
 def load_data():
-    """Load commentary data from a JSON file"""
+    """Load commentary data from a JSON or JSONL file"""
     data = request.json
     file_path = data.get('file_path')
 
@@ -206,17 +259,14 @@ def load_data():
         return jsonify({'success': False, 'error': 'File not found'})
 
     try:
-        with open(file_path, 'r', encoding='utf-8') as f:
-            commentary_list = json.load(f)
-
-        review_state['commentary_list'] = commentary_list
-        review_state['current_index'] = 0
-        save_review_state()
+        # JSON lists and JSONL (streaming collector output) are both accepted
+        loaded = get_store().load(read_entries(file_path))
+        start_annotation()
 
         return jsonify({
             'success': True,
-            'loaded': len(commentary_list),
-            'message': f'Loaded {len(commentary_list)} commentary entries'
+            'loaded': loaded,
+            'message': f'Loaded {loaded} commentary entries (auto checks running in the background)'
         })
 
     except Exception as e:
@@ -225,82 +275,74 @@ def load_data():
 
 @app.route('/api/stats')
 def stats():
-    """Get current review statistics"""
-    total = len(review_state['commentary_list'])
-    reviewed = review_state['current_index']
-
-    approval_rate = (
-        review_state['approved_count'] / reviewed
-        if reviewed > 0 else 0
-    )
-
-    # Calculate quality metrics for approved commentary
-    approved_metrics = {}
-    if os.path.exists(APPROVED_FILE):
-        with open(APPROVED_FILE, 'r', encoding='utf-8') as f:
-            approved_list = json.load(f)
-            if approved_list:
-                approved_metrics = calculate_quality_metrics(approved_list)
+    """Get current review statistics (kept up to date by every decision, not recomputed here)"""
+    summary = get_store().summary()
+    stats = review_stats(summary['counts'])
+    resume_annotation()
+
+    # Quality metrics of approved commentary
+    stats['approved_metrics'] = summary['quality']
+    stats['reviewers'] = summary['reviewers']
+    stats['auto_accept'] = summary['auto_accept']
+
+    return jsonify(stats)
+
+
+@app.route('/api/auto_accept', methods=['POST'])
+def auto_accept():
+    """Approve the entries the review model is confident about, sending an audit sample to reviewers"""
+    data = request.get_json(silent=True) or {}
+
+    try:
+        approved, audited = review_ranker.auto_accept(
+            get_store(),
+            threshold=float(data.get('threshold', 0.97)),
+            audit_rate=float(data.get('audit_rate', 0.05))
+        )
+    except (ValueError, ImportError) as e:
+        return jsonify({'success': False, 'error': str(e)})
 
     return jsonify({
-        'total': total,
-        'reviewed': reviewed,
-        'remaining': total - reviewed,
-        'approved': review_state['approved_count'],
-        'rejected': review_state['rejected_count'],
-        'edited': review_state['edited_count'],
-        'approval_rate': approval_rate,
-        'approved_metrics': approved_metrics
+        'success': True,
+        'approved': approved,
+        'audit': audited,
+        'message': f'Auto-accepted {approved} entries, {audited} sent to audit'
     })
 
 
 @app.route('/api/export_approved', methods=['GET'])
 def export_approved():
     """Export approved commentary to JSONL format for training"""
-    if not os.path.exists(APPROVED_FILE):
+    # The approved JSON list is what pipeline_runner.py's review stage reads
+    count = get_store().export(APPROVED_FILE)
+    if count == 0:
         return jsonify({'success': False, 'error': 'No approved commentary found'})
 
-    with open(APPROVED_FILE, 'r', encoding='utf-8') as f:
-        approved_list = json.load(f)
-
-    # Convert to Mistral chat format
+    # Same chat format as earlier exports, so retrained data matches older training files
     jsonl_output = os.path.join(DATA_DIR, 'commentary_training.jsonl')
-
-    with open(jsonl_output, 'w', encoding='utf-8') as f:
-        for entry in approved_list:
-            training_example = {
-                "messages": [
-                    {
-                        "role": "system",
-                        "content": "Tu es un commentateur sportif professionnel pour L'Équipe."
-                    },
-                    {
-                        "role": "user",
-                        "content": f"Génère un commentaire pour: Minute {entry['time']} - {entry.get('event_type', 'commentary')}"
-                    },
-                    {
-                        "role": "assistant",
-                        "content": entry['text']
-                    }
-                ]
-            }
-            f.write(json.dumps(training_example, ensure_ascii=False) + '\n')
+    export_dataset(get_store().iter_decided(), jsonl_output, template='review', min_length=0)
 
     return jsonify({
         'success': True,
         'file': jsonl_output,
-        'count': len(approved_list),
-        'message': f'Exported {len(approved_list)} examples to {jsonl_output}'
+        'count': count,
+        'message': f'Exported {count} examples to {jsonl_output}'
     })
 
 
 if __name__ == '__main__':
+    parser = argparse.ArgumentParser(description='Commentary review web app')
+    parser.add_argument('--host', default='0.0.0.0', help='Address to listen on')
+    parser.add_argument('--port', type=int, default=5000, help='Port')
+    parser.add_argument('--workers', type=int, default=1,
+                        help='Worker processes; more than 1 runs under gunicorn (pip install gunicorn)')
+    parser.add_argument('--debug', action='store_true', help='Flask debug server (auto reload, one process)')
+
+    args = parser.parse_args()
+
     # Create data directory if it doesn't exist
     os.makedirs(DATA_DIR, exist_ok=True)
 
-    # Load existing state
-    load_review_state()
-
     print("\n" + "=" * 70)
     print("📝 COMMENTARY REVIEW APP")
     print("=" * 70)
@@ -309,7 +351,20 @@ if __name__ == '__main__':
     print("  R - Reject")
     print("  E - Edit")
     print("  N - Next batch")
-    print("\nStarting Flask server at http://localhost:5000")
+    print("\nOpen http://localhost:%d/review?reviewer=<your name>" % args.port)
     print("=" * 70 + "\n")
 
-    app.run(debug=True, host='0.0.0.0', port=5000)
+    if args.workers > 1:
+        # Shared state is in the review store, so workers only need the same database.
+        # The store is opened by each worker on its first request: a background pass
+        # started here would be killed by the exec while holding the annotator claim.
+        os.chdir(os.path.dirname(os.path.abspath(__file__)))
+        os.execvp(sys.executable, [
+            sys.executable, '-m', 'gunicorn', '--workers', str(args.workers), '--threads', '4',
+            '--bind', f'{args.host}:{args.port}', 'review_app:app'
+        ])
+
+    # Open the review store (decisions survive restarts; resumes unfinished auto checks)
+    get_store()
+
+    app.run(debug=args.debug, threaded=True, host=args.host, port=args.port)
@@ -0,0 +1,357 @@
+#!/usr/bin/env python3
+"""
+Uncertainty ranking and bulk auto-accept for the review queue
+Hashed n-gram logistic regression, trained online from review decisions
+
+Most candidates are clear accepts that the quality rules already pass, so
+reviewing the queue in scrape order spends most reviewer time confirming
+the obvious. A small model learns from every approve / reject decision and
+scores each pending entry with its probability of being approved as is:
+
+- Leases (review_store.py) hand out the entries the model is least sure
+  about first, which are also the decisions it learns most from
+- Entries scored above a confidence threshold can be approved in bulk; a
+  random share of them goes to human review instead, and the approval rate
+  of that audit sample estimates the precision of the bulk approvals
+
+Features are word unigrams and bigrams of the text plus the auto check
+result, duplicate flag, length bucket, source and event type, hashed into a
+fixed-size weight vector (no vocabulary to keep). Training is AdaGrad SGD,
+one example at a time, on the decisions made since the last pass; edits
+count as negatives, since auto-accept could only take the text unchanged.
+The weights live next to the review store (review_ranker.npz).
+
+The model needs numpy. Without it, ranking is off: leases hand out the
+queue in order and auto-accept is unavailable.
+
+Usage:
+    python review_ranker.py rank                           # learn new decisions, re-score the queue
+    python review_ranker.py auto-accept --threshold 0.97 --audit-rate 0.05
+    python review_ranker.py report                         # model metrics and audit precision
+    python review_ranker.py undo                           # send auto-accepted entries back to the queue
+"""
+
+import os
+import re
+import math
+import zlib
+import argparse
+from bisect import bisect
+from typing import Dict, List, Optional, Tuple
+import logging
+
+try:
+    import numpy as np
+except ImportError:  # Ranking is off without numpy, the review app serves the queue in order
+    np = None
+
+from review_store import DEFAULT_STORE, STATUS_APPROVED, ReviewStore
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WORD_RE = re.compile(r'\w+')
+HASH_BITS = 18                       # 262,144 weights, 2 MB on disk
+LENGTH_BUCKETS = (10, 20, 30, 45, 60, 80)
+RANKER_LEASE_SECONDS = 120
+MIN_DECISIONS = 200                  # Human decisions required before auto-accept
+
+
+def require_numpy(action: str):
+    """Raise if numpy is missing (action: what needs it, e.g. 'Auto-accept')"""
+    if np is None:
+        raise ImportError(f"{action} needs numpy: pip install numpy")
+
+
+def entry_features(entry: Dict, bits: int = HASH_BITS) -> 'np.ndarray':
+    """
+    Hashed feature indices of a review entry
+
+    Args:
+        entry: Commentary dictionary with 'auto_check' and 'duplicate' (ReviewStore.pending_batch)
+        bits: Size of the weight vector, as a power of two
+
+    Returns:
+        Distinct feature indices
+    """
+    words = WORD_RE.findall((entry.get('text') or '').lower())
+    # '=' never occurs in a word, so these cannot collide with text tokens
+    tokens = [
+        '=bias',
+        f"check={entry.get('auto_check')}",
+        f"duplicate={bool(entry.get('duplicate'))}",
+        f"length={bisect(LENGTH_BUCKETS, len(words))}",
+        f"source={entry.get('source')}",
+        f"event={entry.get('event_type')}",
+    ]
+    tokens += words
+    tokens += [f'{first} {second}' for first, second in zip(words, words[1:])]
+
+    # crc32 is stable across processes, unlike hash() on str
+    hashes = np.fromiter((zlib.crc32(token.encode('utf-8')) for token in tokens), dtype=np.int64, count=len(tokens))
+    return np.unique(hashes & ((1 << bits) - 1))
+
+
+class HashedLogisticRegression:
+    """Online logistic regression over hashed features (AdaGrad learning rates)"""
+
+    def __init__(self, bits: int = HASH_BITS, learning_rate: float = 0.5):
+        """
+        Args:
+            bits: Size of the weight vector, as a power of two
+            learning_rate: Base step size, scaled down per weight as its gradients add up
+        """
+        require_numpy("The review model")
+        self.bits = bits
+        self.learning_rate = learning_rate
+        self.weights = np.zeros(1 << bits, dtype=np.float32)
+        self.squared_gradients = np.zeros(1 << bits, dtype=np.float32)
+        self.seen = 0
+        self.positives = 0
+        # Progressive validation: every example is scored before it is learned
+        self.log_loss_sum = 0.0
+        self.correct = 0
+
+    def predict(self, features: 'np.ndarray') -> float:
+        """Probability of approval"""
+        z = float(self.weights[features].sum())
+        return 1.0 / (1.0 + math.exp(-max(min(z, 30.0), -30.0)))
+
+    def update(self, features: 'np.ndarray', label: int) -> float:
+        """
+        Learn one decision
+
+        Args:
+            features: entry_features() of the entry
+            label: 1 approved, 0 rejected or edited
+
+        Returns:
+            The probability predicted before the update
+        """
+        p = self.predict(features)
+        gradient = p - label
+        self.squared_gradients[features] += gradient * gradient
+        self.weights[features] -= self.learning_rate * gradient / np.sqrt(self.squared_gradients[features] + 1e-8)
+
+        self.seen += 1
+        self.positives += label
+        self.log_loss_sum -= math.log(max(p if label else 1 - p, 1e-15))
+        self.correct += int((p >= 0.5) == bool(label))
+        return p
+
+    def metrics(self) -> Dict:
+        """Decisions learned and progressive validation scores"""
+        seen = self.seen or 1
+        return {
+            'decisions': self.seen,
+            'approved': self.positives,
+            'log_loss': self.log_loss_sum / seen if self.seen else None,
+            'accuracy': self.correct / seen if self.seen else None,
+        }
+
+    def save(self, path: str):
+        """Write the model (atomically: scoring processes may be reading it)"""
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            np.savez(f, weights=self.weights, squared_gradients=self.squared_gradients,
+                     counters=np.array([self.bits, self.seen, self.positives, self.correct], dtype=np.int64),
+                     log_loss_sum=np.array(self.log_loss_sum), learning_rate=np.array(self.learning_rate))
+        os.replace(tmp_path, path)
+
+    @classmethod
+    def load(cls, path: str) -> 'HashedLogisticRegression':
+        """Read a saved model, or start a new one if there is none"""
+        if not os.path.exists(path):
+            return cls()
+        with np.load(path) as data:
+            bits, seen, positives, correct = (int(value) for value in data['counters'])
+            model = cls(bits=bits, learning_rate=float(data['learning_rate']))
+            model.weights = data['weights']
+            model.squared_gradients = data['squared_gradients']
+            model.log_loss_sum = float(data['log_loss_sum'])
+        model.seen, model.positives, model.correct = seen, positives, correct
+        return model
+
+
+def model_path(store: ReviewStore) -> str:
+    """Weights file of a review store (data/review.db → data/review_ranker.npz)"""
+    return f"{os.path.splitext(store.path)[0]}_ranker.npz"
+
+
+def refresh(store: ReviewStore, batch_size: int = 2000) -> Optional[Dict]:
+    """
+    Learn the decisions made since the last pass, then re-score the pending entries
+
+    Only one pass runs at a time across processes: the 'ranker' claim is
+    renewed after every batch. The pass stops early if the queue is replaced
+    while it runs.
+
+    Args:
+        store: Review store
+        batch_size: Entries per read / write batch
+
+    Returns:
+        'learned', 'scored' and the model metrics, or None if numpy is missing,
+        another pass is running or the queue was replaced while learning
+    """
+    if np is None:
+        return None
+
+    generation = store.claim_job('ranker', RANKER_LEASE_SECONDS)
+    if generation is None:
+        return None
+
+    try:
+        path = model_path(store)
+        model = HashedLogisticRegression.load(path)
+
+        learned: List[Tuple[int, str]] = []
+        last = -1
+        while True:
+            batch = store.training_batch(after=last, limit=batch_size)
+            if not batch:
+                break
+            for index, entry, status, reviewed_at in batch:
+                model.update(entry_features(entry, model.bits), int(status == STATUS_APPROVED))
+                learned.append((index, reviewed_at))
+            last = batch[-1][0]
+            if not store.renew_job('ranker', generation, RANKER_LEASE_SECONDS):
+                # Decisions of a replaced queue: neither saved nor marked
+                return None
+        if learned:
+            # Saved before the decisions are marked: a crash in between relearns, never forgets
+            model.save(path)
+            store.mark_trained(learned)
+
+        scored = 0
+        if model.seen:
+            last = -1
+            while True:
+                batch = store.pending_batch(after=last, limit=batch_size)
+                if not batch:
+                    break
+                scores = [(index, model.predict(entry_features(entry, model.bits))) for index, entry in batch]
+                if not store.set_scores(scores, generation, ttl=RANKER_LEASE_SECONDS):
+                    break
+                scored += len(scores)
+                last = batch[-1][0]
+    finally:
+        store.finish_job('ranker', generation)
+
+    return {'learned': len(learned), 'scored': scored, **model.metrics()}
+
+
+def auto_accept(
+    store: ReviewStore,
+    threshold: float = 0.97,
+    audit_rate: float = 0.05,
+    min_decisions: int = MIN_DECISIONS,
+    seed: Optional[int] = None
+) -> Tuple[int, int]:
+    """
+    Approve the pending entries the model is confident about, keeping an audit sample
+
+    Scores are brought up to date first (unless another pass is running).
+
+    Args:
+        store: Review store
+        threshold: Minimum probability of approval
+        audit_rate: Share of qualifying entries sent to human review instead
+        min_decisions: Human decisions (of both kinds) the model must have learned first
+        seed: Seed of the audit sample
+
+    Returns:
+        (approved, flagged for audit)
+
+    Raises:
+        ValueError: The model has not seen enough decisions yet
+        ImportError: numpy is missing
+    """
+    require_numpy("Auto-accept")
+    refresh(store)
+
+    metrics = HashedLogisticRegression.load(model_path(store)).metrics()
+    rejected = metrics['decisions'] - metrics['approved']
+    if metrics['decisions'] < min_decisions or not metrics['approved'] or not rejected:
+        raise ValueError(f"The review model has learned {metrics['decisions']} decisions "
+                         f"({rejected} rejections), auto-accept needs {min_decisions} including both outcomes")
+
+    return store.auto_accept(threshold, audit_rate=audit_rate, seed=seed)
+
+
+def log_report(store: ReviewStore):
+    """Log the model's validation metrics and the auto-accept audit"""
+    metrics = HashedLogisticRegression.load(model_path(store)).metrics()
+    if not metrics['decisions']:
+        logger.info("🤖 The review model has not learned any decision yet")
+    else:
+        logger.info(f"🤖 Review model: {metrics['decisions']} decisions learned "
+                    f"({metrics['approved'] / metrics['decisions']:.1%} approved), "
+                    f"progressive accuracy {metrics['accuracy']:.1%}, log loss {metrics['log_loss']:.3f}")
+
+    report = store.audit_report()
+    logger.info(f"✅ Auto-accepted: {report['auto_accepted']}")
+    if report['audited']:
+        logger.info(f"🔍 Audit: {report['audit_approved']}/{report['audited']} approved unchanged "
+                    f"(estimated precision {report['precision']:.1%}), {report['audit_pending']} still to review")
+    elif report['audit_pending']:
+        logger.info(f"🔍 Audit: {report['audit_pending']} entries to review")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Uncertainty ranking and auto-accept for the review queue')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Review database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    subparsers.add_parser('rank', help='Learn new decisions and re-score the pending entries')
+
+    accept = subparsers.add_parser('auto-accept', help='Approve entries scored above a threshold')
+    accept.add_argument('--threshold', type=float, default=0.97, help='Minimum probability of approval')
+    accept.add_argument('--audit-rate', type=float, default=0.05,
+                        help='Share of qualifying entries sent to human review instead')
+    accept.add_argument('--min-decisions', type=int, default=MIN_DECISIONS,
+                        help='Human decisions the model must have learned first')
+    accept.add_argument('--seed', type=int, help='Seed of the audit sample')
+
+    subparsers.add_parser('report', help='Show model metrics and audit precision')
+    subparsers.add_parser('undo', help='Send auto-accepted entries back to the queue')
+
+    args = parser.parse_args()
+    store = ReviewStore(args.store)
+
+    if args.command != 'undo':
+        try:
+            require_numpy("Ranking")
+        except ImportError as e:
+            logger.error(f"❌ {e}")
+            return
+
+    if args.command == 'rank':
+        result = refresh(store)
+        if result is None:
+            logger.warning("⚠️  Another ranking pass is running")
+        else:
+            logger.info(f"🤖 Learned {result['learned']} decisions, scored {result['scored']} pending entries")
+
+    elif args.command == 'auto-accept':
+        try:
+            approved, audited = auto_accept(store, args.threshold, audit_rate=args.audit_rate,
+                                            min_decisions=args.min_decisions, seed=args.seed)
+        except ValueError as e:
+            logger.error(f"❌ {e}")
+            return
+        logger.info(f"✅ Auto-accepted {approved} entries scored ≥ {args.threshold}, "
+                    f"{audited} flagged for audit")
+
+    elif args.command == 'report':
+        log_report(store)
+
+    elif args.command == 'undo':
+        logger.info(f"↩️  {store.undo_auto_accept()} auto-accepted entries back in the queue")
+
+
+if __name__ == '__main__':
+    main()
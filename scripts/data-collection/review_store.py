@@ -0,0 +1,983 @@
+#!/usr/bin/env python3
+"""
+SQLite store for the manual review queue
+One row per candidate entry, so a review decision is one indexed UPDATE
+
+Replaces review_state.json (the whole queue re-dumped on every click) and
+the approved / rejected JSON lists (re-read and re-written on every click).
+The approved file the pipeline consumes is now written on export.
+
+The queue is read in pages with a keyset cursor (id > last id seen), so a
+page costs the same at the 100,000th entry as at the first. Automatic
+quality checks and near-duplicate flags are computed once per load by
+annotate(), which the review app runs in a background thread.
+
+Several reviewers (and several app worker processes) share one store.
+Pending entries are handed out in leased batches: an entry leased to one
+reviewer is not given to another until the lease expires, and only its
+holder can decide it meanwhile. Decisions record who made them.
+
+Leases hand out the entries the review model (review_ranker.py) is least
+sure about first; entries it is confident about can be accepted in bulk,
+with a random share of them kept back for human audit.
+
+Review statistics (counts per status and reviewer, audit outcome, length,
+vocabulary, source and event type of the accepted entries) are kept as
+exact aggregates, updated in the transaction of every decision, so reading
+them costs the same whatever the number of reviews.
+
+Usage:
+    python review_store.py load data/pipeline/review_candidates.json    # also runs the auto checks
+    python review_store.py status
+    python review_store.py stats        # all statistics as JSON (--rebuild recomputes the aggregates)
+    python review_store.py export data/approved_commentary.json
+    python review_store.py migrate      # import an existing review_state.json
+"""
+
+import os
+import json
+import time
+import random
+import sqlite3
+import argparse
+import threading
+from collections import Counter
+from datetime import datetime, timezone
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from commentary_entry import entry_to_json
+from streaming_metrics import CHAR_LENGTH_EDGES, WORD_LENGTH_EDGES, Histogram
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_STORE = os.path.join(DATA_DIR, 'review.db')
+APPROVED_FILE = os.path.join(DATA_DIR, 'approved_commentary.json')
+REJECTED_FILE = os.path.join(DATA_DIR, 'rejected_commentary.json')
+REVIEW_STATE_FILE = os.path.join(DATA_DIR, 'review_state.json')
+
+STATUS_PENDING = 'pending'
+STATUS_APPROVED = 'approved'
+STATUS_REJECTED = 'rejected'
+STATUS_EDITED = 'edited'
+ACCEPTED = (STATUS_APPROVED, STATUS_EDITED)
+CHECK_PASSED = 'ok'
+
+LEASE_SECONDS = 900          # A reviewer's batch is handed to someone else after this
+ANNOTATOR_LEASE_SECONDS = 120
+AUTO_REVIEWER = 'auto-accept'  # Reviewer name of bulk auto-accepted entries
+AUDIT_PRIORITY = -1.0          # Audit samples go to the front of the queue
+
+
+class ReviewStore:
+    """Review queue and decisions in a SQLite database (WAL mode, one connection per thread)"""
+
+    def __init__(self, path: str = DEFAULT_STORE):
+        """
+        Open (or create) a review store
+
+        Args:
+            path: Database file
+        """
+        self.path = path
+        self._local = threading.local()
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS entries (
+                id INTEGER PRIMARY KEY,
+                entry TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                reason TEXT,
+                edited_text TEXT,
+                reviewer TEXT,
+                reviewed_at TEXT,
+                auto_check TEXT,
+                duplicate INTEGER,
+                lease_owner TEXT,
+                lease_expires REAL NOT NULL DEFAULT 0,
+                score REAL,
+                priority REAL,
+                audit INTEGER NOT NULL DEFAULT 0,
+                trained INTEGER NOT NULL DEFAULT 0
+            );
+            CREATE INDEX IF NOT EXISTS entries_status ON entries (status, id);
+            CREATE TABLE IF NOT EXISTS meta (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS stats (
+                key TEXT PRIMARY KEY,
+                value INTEGER NOT NULL
+            );
+            CREATE TABLE IF NOT EXISTS vocabulary (
+                word TEXT PRIMARY KEY,
+                entries INTEGER NOT NULL
+            ) WITHOUT ROWID;
+        ''')
+        # Stores created before the auto checks, leases and ranking
+        columns = {row[1] for row in self.conn.execute('PRAGMA table_info(entries)')}
+        for column, kind in (('auto_check', 'TEXT'), ('duplicate', 'INTEGER'), ('lease_owner', 'TEXT'),
+                             ('lease_expires', 'REAL NOT NULL DEFAULT 0'), ('score', 'REAL'), ('priority', 'REAL'),
+                             ('audit', 'INTEGER NOT NULL DEFAULT 0'), ('trained', 'INTEGER NOT NULL DEFAULT 0')):
+            if column not in columns:
+                self.conn.execute(f'ALTER TABLE entries ADD COLUMN {column} {kind}')
+        self.conn.executescript('''
+            CREATE INDEX IF NOT EXISTS entries_lease_owner ON entries (lease_owner);
+            CREATE INDEX IF NOT EXISTS entries_priority ON entries (status, priority, id);
+            CREATE INDEX IF NOT EXISTS entries_untrained ON entries (id) WHERE trained = 0 AND status != 'pending';
+            CREATE INDEX IF NOT EXISTS entries_unannotated ON entries (id) WHERE auto_check IS NULL;
+        ''')
+        # Stores created before the statistics aggregates
+        if not self._meta('stats_version'):
+            self.rebuild_stats()
+
+    @property
+    def conn(self) -> sqlite3.Connection:
+        """This thread's connection (Flask serves requests from several threads)"""
+        conn = getattr(self._local, 'conn', None)
+        if conn is None:
+            conn = sqlite3.connect(self.path, timeout=30, isolation_level=None)
+            conn.execute('PRAGMA journal_mode=WAL')
+            conn.execute('PRAGMA synchronous=NORMAL')
+            self._local.conn = conn
+        return conn
+
+    def load(self, entries: Iterable) -> int:
+        """
+        Replace the queue with new candidates (previous decisions are dropped)
+
+        Args:
+            entries: Commentary entries or dictionaries, in review order
+
+        Returns:
+            Number of entries loaded
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('DELETE FROM entries')
+            cursor.execute('DELETE FROM stats')
+            cursor.execute('DELETE FROM vocabulary')
+            # annotate() passes still running on the previous queue see this and stop
+            cursor.execute("INSERT INTO meta VALUES ('generation', 1) "
+                           "ON CONFLICT (key) DO UPDATE SET value = value + 1")
+            self._set_meta(cursor, 'annotator_expires', 0)
+            self._set_meta(cursor, 'ranker_expires', 0)
+            cursor.executemany('INSERT INTO entries (id, entry) VALUES (?, ?)',
+                               ((i, entry_to_json(entry)) for i, entry in enumerate(entries)))
+            count = cursor.execute('SELECT COUNT(*) FROM entries').fetchone()[0]
+            cursor.execute('INSERT INTO stats VALUES (?, ?)', (f'status:{STATUS_PENDING}', count))
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return count
+
+    def decide(
+        self,
+        index: int,
+        status: str,
+        reason: Optional[str] = None,
+        edited_text: Optional[str] = None,
+        reviewer: Optional[str] = None
+    ) -> bool:
+        """
+        Record a decision on one entry (a single-row UPDATE by primary key)
+
+        The entry must not be leased to another reviewer; its lease ends here.
+        The decision is queued for the review model to learn from, and the
+        statistics aggregates are updated in the same transaction.
+
+        Args:
+            index: Queue position of the entry
+            status: approved, rejected or edited
+            reason: Rejection reason
+            edited_text: Corrected text (edited entries)
+            reviewer: Who decided
+
+        Returns:
+            False if there is no entry at that position, or another reviewer holds it
+        """
+        if status not in (STATUS_APPROVED, STATUS_REJECTED, STATUS_EDITED):
+            raise ValueError(f"Unknown review status '{status}'")
+
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            row = cursor.execute(
+                f'SELECT {_STATS_COLUMNS} FROM entries WHERE id = ? AND (lease_owner IS ? OR lease_expires < ?)',
+                (index, reviewer, time.time())
+            ).fetchone()
+            if row is None:
+                cursor.execute('ROLLBACK')
+                return False
+
+            cursor.execute(
+                'UPDATE entries SET status = ?, reason = ?, edited_text = ?, reviewer = ?, reviewed_at = ?, '
+                'lease_expires = 0, trained = 0 WHERE id = ?',
+                (status, reason, edited_text, reviewer, datetime.now(timezone.utc).isoformat(), index)
+            )
+            delta = _StatsDelta()
+            delta.add(row, -1)
+            delta.add((row[0], status, reviewer, row[3], edited_text), 1)
+            delta.apply(cursor)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return True
+
+    def lease(self, reviewer: str, limit: int = 20, ttl: float = LEASE_SECONDS) -> List[Dict]:
+        """
+        Hand the next pending entries nobody holds to a reviewer
+
+        Entries the review model has not scored yet come first (in queue
+        order), then audit samples, then the entries the model is least sure
+        about (priority = distance of the score from 0.5).
+        The reviewer's current leases are renewed in the same transaction,
+        so asking for the next batch keeps the entries still on screen.
+
+        Args:
+            reviewer: Reviewer name
+            limit: Batch size
+            ttl: Lease duration in seconds
+
+        Returns:
+            Newly leased entries, in review order (empty when nothing is left)
+        """
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute(
+                'UPDATE entries SET lease_expires = ? WHERE lease_owner = ? AND status = ? AND lease_expires >= ?',
+                (now + ttl, reviewer, STATUS_PENDING, now)
+            )
+            # Entries under someone's lease are skipped; there are at most reviewers x batch of them
+            ids = [row[0] for row in cursor.execute(
+                'SELECT id FROM entries WHERE status = ? AND lease_expires < ? ORDER BY priority, id LIMIT ?',
+                (STATUS_PENDING, now, limit)
+            )]
+            cursor.executemany('UPDATE entries SET lease_owner = ?, lease_expires = ? WHERE id = ?',
+                               ((reviewer, now + ttl, index) for index in ids))
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+        return [self.get(index) for index in ids]
+
+    def held(self, reviewer: str) -> List[Dict]:
+        """Pending entries currently leased to a reviewer, in review order"""
+        rows = self.conn.execute(
+            f'SELECT {_COLUMNS} FROM entries WHERE lease_owner = ? AND status = ? AND lease_expires >= ? '
+            'ORDER BY priority, id',
+            (reviewer, STATUS_PENDING, time.time())
+        )
+        return [_to_entry(row) for row in rows]
+
+    def release(self, reviewer: str) -> int:
+        """Give back a reviewer's undecided entries; returns how many"""
+        released = self.conn.execute(
+            'UPDATE entries SET lease_expires = 0 WHERE lease_owner = ? AND status = ? AND lease_expires > 0',
+            (reviewer, STATUS_PENDING)
+        )
+        return released.rowcount
+
+    def reviewer_counts(self) -> Dict[str, Dict[str, int]]:
+        """Decisions per reviewer and status"""
+        return self.summary()['reviewers']
+
+    def get(self, index: int) -> Optional[Dict]:
+        """Entry at a queue position, with its review fields"""
+        row = self.conn.execute(f'SELECT {_COLUMNS} FROM entries WHERE id = ?', (index,)).fetchone()
+        return _to_entry(row) if row else None
+
+    def batch(self, start: int, limit: int) -> List[Dict]:
+        """Up to `limit` entries from a queue position on"""
+        rows = self.conn.execute(f'SELECT {_COLUMNS} FROM entries WHERE id >= ? ORDER BY id LIMIT ?', (start, limit))
+        return [_to_entry(row) for row in rows]
+
+    def page(self, after: int = -1, limit: int = 20, status: str = STATUS_PENDING) -> List[Dict]:
+        """
+        Next page of the queue (keyset pagination on the (status, id) index)
+
+        Args:
+            after: Cursor, the position of the last entry of the previous page
+            limit: Page size
+            status: Only entries with this status
+
+        Returns:
+            Entries with position > after, in queue order
+        """
+        rows = self.conn.execute(
+            f'SELECT {_COLUMNS} FROM entries WHERE status = ? AND id > ? ORDER BY id LIMIT ?',
+            (status, after, limit)
+        )
+        return [_to_entry(row) for row in rows]
+
+    def annotate(self, batch_size: int = 2000, strict: bool = False, threshold: float = 0.8) -> int:
+        """
+        Compute the automatic quality check and near-duplicate flag of every entry
+
+        Entries are read in queue order, batch by batch, and each batch is
+        written back in one transaction. The pass stops early if the queue
+        is replaced (load()) while it runs. Only one pass runs at a time
+        across processes: the others return 0 straight away.
+
+        Args:
+            batch_size: Entries per read / write batch
+            strict: Stricter quality criteria
+            threshold: Jaccard similarity above which an entry duplicates an earlier one
+
+        Returns:
+            Number of entries annotated
+        """
+        from near_duplicates import NearDuplicateFilter
+        from quality_filter import check_commentary
+
+        generation = self.claim_job('annotator')
+        if generation is None:
+            return 0
+
+        dedup = NearDuplicateFilter(threshold=threshold, batch_size=batch_size)
+        done = 0
+        last = -1
+
+        while True:
+            rows = self.conn.execute(
+                'SELECT id, entry FROM entries WHERE id > ? ORDER BY id LIMIT ?', (last, batch_size)
+            ).fetchall()
+            if not rows:
+                self.finish_job('annotator', generation)
+                return done
+
+            entries = [json.loads(entry) for _, entry in rows]
+            duplicates = dedup.flag_duplicates([entry.get('text', '') for entry in entries])
+            updates = [
+                (check_commentary(entry, strict=strict) or CHECK_PASSED, int(duplicate), index)
+                for (index, _), entry, duplicate in zip(rows, entries, duplicates)
+            ]
+
+            cursor = self.conn.cursor()
+            cursor.execute('BEGIN IMMEDIATE')
+            if self._generation(cursor) != generation:
+                cursor.execute('ROLLBACK')
+                return done
+            cursor.executemany('UPDATE entries SET auto_check = ?, duplicate = ? WHERE id = ?', updates)
+            self._set_meta(cursor, 'annotator_expires', int(time.time() + ANNOTATOR_LEASE_SECONDS))
+            cursor.execute('COMMIT')
+
+            done += len(rows)
+            last = rows[-1][0]
+
+    def unannotated(self) -> int:
+        """Number of entries annotate() has not reached yet"""
+        return self.conn.execute('SELECT COUNT(*) FROM entries WHERE auto_check IS NULL').fetchone()[0]
+
+    def annotating(self) -> bool:
+        """True while an annotate() pass (in any process) is running"""
+        return self.job_running('annotator')
+
+    def claim_job(self, job: str, ttl: float = ANNOTATOR_LEASE_SECONDS) -> Optional[int]:
+        """
+        Become the one process running a background pass over the queue
+
+        Args:
+            job: Pass name ('annotator', 'ranker')
+            ttl: Seconds after which the claim lapses unless renewed (a crashed pass)
+
+        Returns:
+            The queue generation, or None if a live pass holds the claim
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if self._meta(f'{job}_expires', cursor) > time.time():
+            cursor.execute('ROLLBACK')
+            return None
+        self._set_meta(cursor, f'{job}_expires', int(time.time() + ttl))
+        generation = self._generation(cursor)
+        cursor.execute('COMMIT')
+        return generation
+
+    def renew_job(self, job: str, generation: int, ttl: float = ANNOTATOR_LEASE_SECONDS) -> bool:
+        """
+        Extend a claim taken by claim_job() while a long pass makes progress
+
+        Args:
+            job: Pass name ('annotator', 'ranker')
+            generation: Queue generation returned by claim_job()
+            ttl: Seconds from now after which the claim lapses
+
+        Returns:
+            False (claim untouched) if the queue was replaced meanwhile
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if self._generation(cursor) != generation:
+            cursor.execute('ROLLBACK')
+            return False
+        self._set_meta(cursor, f'{job}_expires', int(time.time() + ttl))
+        cursor.execute('COMMIT')
+        return True
+
+    def finish_job(self, job: str, generation: int):
+        """Give up a claim taken by claim_job() (unless load() already reset it)"""
+        self.conn.execute(f"UPDATE meta SET value = 0 WHERE key = ? "
+                          f"AND (SELECT value FROM meta WHERE key = 'generation') = ?", (f'{job}_expires', generation))
+
+    def job_running(self, job: str) -> bool:
+        """True while a claimed pass (in any process) is running"""
+        return self._meta(f'{job}_expires') > time.time()
+
+    def training_batch(self, after: int = -1, limit: int = 2000) -> List[Tuple[int, Dict, str, str]]:
+        """
+        Human decisions the review model has not learned from yet, after a position
+
+        Auto-accepted entries are left out (they are stored as trained), so
+        the model never learns from its own output.
+
+        Returns:
+            (position, entry with 'auto_check' / 'duplicate', status, reviewed_at) tuples
+        """
+        rows = self.conn.execute(
+            "SELECT id, entry, auto_check, duplicate, status, reviewed_at FROM entries "
+            "WHERE trained = 0 AND status != 'pending' AND id > ? AND reviewer IS NOT ? ORDER BY id LIMIT ?",
+            (after, AUTO_REVIEWER, limit)
+        )
+        return [(index, _with_checks(data, auto_check, duplicate), status, reviewed_at)
+                for index, data, auto_check, duplicate, status, reviewed_at in rows]
+
+    def mark_trained(self, decisions: Iterable[Tuple[int, str]]):
+        """
+        Mark decisions as learned
+
+        Args:
+            decisions: (position, reviewed_at) pairs; an entry decided again
+                since it was read stays queued for training
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany('UPDATE entries SET trained = 1 WHERE id = ? AND reviewed_at IS ?',
+                           ((index, reviewed_at) for index, reviewed_at in decisions))
+        cursor.execute('COMMIT')
+
+    def pending_batch(self, after: int = -1, limit: int = 2000) -> List[Tuple[int, Dict]]:
+        """(position, entry with 'auto_check' / 'duplicate') of pending entries after a position"""
+        rows = self.conn.execute(
+            'SELECT id, entry, auto_check, duplicate FROM entries WHERE status = ? AND id > ? ORDER BY id LIMIT ?',
+            (STATUS_PENDING, after, limit)
+        )
+        return [(index, _with_checks(data, auto_check, duplicate)) for index, data, auto_check, duplicate in rows]
+
+    def set_scores(
+        self,
+        scores: Iterable[Tuple[int, float]],
+        generation: int,
+        ttl: float = ANNOTATOR_LEASE_SECONDS
+    ) -> bool:
+        """
+        Store the review model's acceptance probability of pending entries
+
+        Audit samples keep their place at the front of the queue; the
+        ranker's claim is renewed in the same transaction.
+
+        Args:
+            scores: (position, probability) pairs
+            generation: Queue generation the scores were computed on
+            ttl: Renewal of the 'ranker' claim
+
+        Returns:
+            False (nothing written) if the queue was replaced meanwhile
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        if self._generation(cursor) != generation:
+            cursor.execute('ROLLBACK')
+            return False
+        cursor.executemany(
+            'UPDATE entries SET score = ?, priority = CASE WHEN audit THEN ? ELSE ? END WHERE id = ? AND status = ?',
+            ((score, AUDIT_PRIORITY, abs(score - 0.5), index, STATUS_PENDING) for index, score in scores)
+        )
+        self._set_meta(cursor, 'ranker_expires', int(time.time() + ttl))
+        cursor.execute('COMMIT')
+        return True
+
+    def auto_accept(self, threshold: float, audit_rate: float = 0.05, seed: Optional[int] = None) -> Tuple[int, int]:
+        """
+        Approve pending entries the review model scores at or above a threshold
+
+        Only entries that passed the automatic quality check and are not
+        near-duplicates qualify, and entries leased to a reviewer are left
+        alone. A random `audit_rate` share of the qualifying entries is not
+        approved but flagged for audit and moved to the front of the queue:
+        the approval rate of the audited entries estimates the precision of
+        the bulk approvals.
+
+        Args:
+            threshold: Minimum acceptance probability
+            audit_rate: Share of qualifying entries sent to human review instead
+            seed: Seed of the audit sample
+
+        Returns:
+            (approved, flagged for audit)
+        """
+        rng = random.Random(seed)
+        now = time.time()
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            rows = cursor.execute(
+                f'SELECT id, {_STATS_COLUMNS} FROM entries WHERE status = ? AND score >= ? AND auto_check = ? '
+                'AND duplicate = 0 AND audit = 0 AND lease_expires < ? ORDER BY id',
+                (STATUS_PENDING, threshold, CHECK_PASSED, now)
+            ).fetchall()
+            delta = _StatsDelta()
+            audited, approved = [], []
+            for index, data, status, reviewer, audit, edited_text in rows:
+                delta.add((data, status, reviewer, audit, edited_text), -1)
+                if rng.random() < audit_rate:
+                    audited.append(index)
+                    delta.add((data, status, reviewer, 1, edited_text), 1)
+                else:
+                    approved.append(index)
+                    delta.add((data, STATUS_APPROVED, AUTO_REVIEWER, audit, edited_text), 1)
+            cursor.executemany('UPDATE entries SET audit = 1, priority = ? WHERE id = ?',
+                               ((AUDIT_PRIORITY, index) for index in audited))
+            reviewed_at = datetime.now(timezone.utc).isoformat()
+            cursor.executemany(
+                'UPDATE entries SET status = ?, reviewer = ?, reviewed_at = ?, trained = 1 WHERE id = ?',
+                ((STATUS_APPROVED, AUTO_REVIEWER, reviewed_at, index) for index in approved)
+            )
+            delta.apply(cursor)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return len(approved), len(audited)
+
+    def undo_auto_accept(self) -> int:
+        """
+        Send every auto-accepted entry back to the queue; returns how many
+
+        Their scores are cleared, so they are ranked again (and come first
+        until then), and the human decisions they get are learned from.
+        """
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            delta = _StatsDelta()
+            rows = cursor.execute(f'SELECT {_STATS_COLUMNS} FROM entries WHERE reviewer = ? AND status = ?',
+                                  (AUTO_REVIEWER, STATUS_APPROVED)).fetchall()
+            for data, status, reviewer, audit, edited_text in rows:
+                delta.add((data, status, reviewer, audit, edited_text), -1)
+                delta.add((data, STATUS_PENDING, None, audit, edited_text), 1)
+            cursor.execute('UPDATE entries SET status = ?, reviewer = NULL, reviewed_at = NULL, score = NULL, '
+                           'priority = NULL, trained = 0 WHERE reviewer = ? AND status = ?',
+                           (STATUS_PENDING, AUTO_REVIEWER, STATUS_APPROVED))
+            delta.apply(cursor)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+        return len(rows)
+
+    def audit_report(self) -> Dict:
+        """
+        Outcome of the auto-accept audit
+
+        Returns:
+            'auto_accepted', 'audit_pending', 'audited', 'audit_approved' and
+            'precision' (share of audited entries approved unchanged, None
+            before the first audit decision)
+        """
+        return _audit_report(self._stats('audit:'), self._stats(f'reviewer:{AUTO_REVIEWER}:'))
+
+    def summary(self) -> Dict:
+        """
+        All review statistics, read from the aggregates (a few hundred rows at most)
+
+        Returns:
+            'counts' (as counts()), 'reviewers' (as reviewer_counts()),
+            'auto_accept' (as audit_report()) and 'quality' (accepted
+            entries, in the calculate_quality_metrics() format with an exact
+            vocabulary size)
+        """
+        stats = self._stats()
+        groups: Dict[str, Dict[str, int]] = {}
+        for key, value in stats.items():
+            kind, _, name = key.partition(':')
+            groups.setdefault(kind, {})[name] = value
+
+        reviewers: Dict[str, Dict[str, int]] = {}
+        for key, count in groups.get('reviewer', {}).items():
+            reviewer, _, status = key.rpartition(':')
+            reviewers.setdefault(reviewer, {})[status] = count
+
+        return {
+            'counts': _status_counts(groups.get('status', {})),
+            'reviewers': reviewers,
+            'auto_accept': _audit_report(groups.get('audit', {}), reviewers.get(AUTO_REVIEWER, {})),
+            'quality': _quality_metrics(groups, stats.get('vocabulary', 0)),
+        }
+
+    def rebuild_stats(self):
+        """Recompute the statistics aggregates from the entries (stores from before them, or after repairs)"""
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        try:
+            cursor.execute('DELETE FROM stats')
+            cursor.execute('DELETE FROM vocabulary')
+            delta = _StatsDelta()
+            for row in cursor.execute(f'SELECT {_STATS_COLUMNS} FROM entries'):
+                delta.add(row, 1)
+            delta.apply(cursor)
+            self._set_meta(cursor, 'stats_version', 1)
+            cursor.execute('COMMIT')
+        except BaseException:
+            cursor.execute('ROLLBACK')
+            raise
+
+    def _stats(self, prefix: str = '') -> Dict[str, int]:
+        """Non-zero aggregates whose key starts with a prefix (keys returned without it)"""
+        # A range on the primary key; LIKE would not use the index
+        rows = self.conn.execute('SELECT key, value FROM stats WHERE key >= ? AND key < ? AND value != 0',
+                                 (prefix, prefix + '\U0010ffff'))
+        return {key[len(prefix):]: value for key, value in rows}
+
+    def _generation(self, cursor=None) -> int:
+        return self._meta('generation', cursor)
+
+    def _meta(self, key: str, cursor=None) -> int:
+        row = (cursor or self.conn).execute('SELECT value FROM meta WHERE key = ?', (key,)).fetchone()
+        return row[0] if row else 0
+
+    @staticmethod
+    def _set_meta(cursor, key: str, value: int):
+        cursor.execute('INSERT INTO meta VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = excluded.value',
+                       (key, value))
+
+    def next_pending(self, after: int = -1) -> Optional[int]:
+        """
+        Position of the next entry to review
+
+        Args:
+            after: Look past this position first, then wrap around to skipped entries
+
+        Returns:
+            Queue position, or None when everything is reviewed
+        """
+        for query, values in (('id > ?', (after,)), ('1', ())):
+            row = self.conn.execute(
+                f'SELECT id FROM entries WHERE status = ? AND {query} ORDER BY id LIMIT 1',
+                (STATUS_PENDING,) + values
+            ).fetchone()
+            if row:
+                return row[0]
+        return None
+
+    def counts(self) -> Dict[str, int]:
+        """Number of entries per status, plus 'total', 'reviewed' and 'accepted' (approved + edited)"""
+        return _status_counts(self._stats('status:'))
+
+    def iter_decided(self, statuses: Tuple[str, ...] = ACCEPTED) -> Iterator[Dict]:
+        """
+        Reviewed entries with the given statuses, in queue order
+
+        Edited entries carry the corrected text and the original in
+        'original_text', as in the former approved file.
+        """
+        placeholders = ', '.join('?' * len(statuses))
+        rows = self.conn.execute(
+            f'SELECT {_COLUMNS} FROM entries WHERE status IN ({placeholders}) ORDER BY id', statuses
+        )
+        for row in rows:
+            yield _to_entry(row)
+
+    def export(self, file_path: str, statuses: Tuple[str, ...] = ACCEPTED) -> int:
+        """
+        Write reviewed entries as a JSON list (the approved file read by pipeline_runner.py)
+
+        Returns:
+            Number of entries written
+        """
+        entries = list(self.iter_decided(statuses))
+        for entry in entries:
+            del entry['index']
+        tmp_path = f"{file_path}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(entries, f, ensure_ascii=False, indent=2)
+        os.replace(tmp_path, file_path)
+        return len(entries)
+
+    def import_review_state(self, state_file: str = REVIEW_STATE_FILE, approved_file: str = APPROVED_FILE) -> int:
+        """
+        Import the queue and decisions of the former JSON review state
+
+        Approve / reject decisions were stored on the queue entries; edits
+        only exist in the approved file and are matched by original text.
+
+        Returns:
+            Number of entries imported
+        """
+        with open(state_file, 'r', encoding='utf-8') as f:
+            state = json.load(f)
+
+        edits = {}
+        if os.path.exists(approved_file):
+            with open(approved_file, 'r', encoding='utf-8') as f:
+                edits = {entry['original_text']: entry for entry in json.load(f)
+                         if entry.get('status') == STATUS_EDITED}
+
+        decisions = []
+        for i, entry in enumerate(state['commentary_list']):
+            status = entry.pop('status', None)
+            reviewed_at = entry.pop('reviewed_at', None)
+            reason = entry.pop('rejection_reason', None)
+            entry.pop('auto_quality_check', None)
+            edit = edits.get(entry.get('text'))
+            if edit is not None and status is None:
+                decisions.append((STATUS_EDITED, None, edit['text'], edit.get('reviewed_at'), i))
+            elif status in (STATUS_APPROVED, STATUS_REJECTED):
+                decisions.append((status, reason, None, reviewed_at, i))
+
+        count = self.load(state['commentary_list'])
+        cursor = self.conn.cursor()
+        cursor.execute('BEGIN IMMEDIATE')
+        cursor.executemany(
+            'UPDATE entries SET status = ?, reason = ?, edited_text = ?, reviewed_at = ? WHERE id = ?', decisions
+        )
+        cursor.execute('COMMIT')
+        self.rebuild_stats()
+        return count
+
+    def close(self):
+        conn = getattr(self._local, 'conn', None)
+        if conn is not None:
+            conn.close()
+            self._local.conn = None
+
+
+_COLUMNS = 'id, entry, status, reason, edited_text, reviewer, reviewed_at, auto_check, duplicate, score, audit'
+_STATS_COLUMNS = 'entry, status, reviewer, audit, edited_text'
+
+
+class _StatsDelta:
+    """
+    Changes to the statistics aggregates, applied in the transaction that causes them
+
+    Every aggregate is a count, so an entry leaving a state is subtracted
+    exactly as it was added: counts per status, per reviewer and status,
+    per audit status, and for accepted entries per character length, per
+    word length, per source and per event type, plus the number of
+    accepted entries containing each word (the vocabulary table).
+    """
+
+    def __init__(self):
+        self.counts: Counter = Counter()
+        self.words: Counter = Counter()
+
+    def add(self, row: Tuple, sign: int):
+        """
+        Count one entry state in (sign 1) or out (sign -1)
+
+        Args:
+            row: (entry JSON, status, reviewer, audit, edited text), as in _STATS_COLUMNS
+            sign: 1 or -1
+        """
+        data, status, reviewer, audit, edited_text = row
+        self.counts[f'status:{status}'] += sign
+        if status != STATUS_PENDING:
+            self.counts[f'reviewer:{reviewer or "unknown"}:{status}'] += sign
+        if audit:
+            self.counts[f'audit:{status}'] += sign
+        if status not in ACCEPTED:
+            return
+
+        entry = json.loads(data)
+        text = edited_text if edited_text is not None else entry['text']
+        words = text.lower().split()
+        self.counts[f'chars:{len(text)}'] += sign
+        self.counts[f'words:{len(words)}'] += sign
+        self.counts[f"source:{entry.get('source', 'unknown')}"] += sign
+        self.counts[f"event_type:{entry.get('event_type', 'unknown')}"] += sign
+        for word in set(words):
+            self.words[word] += sign
+
+    def apply(self, cursor):
+        """Write the changes (inside the caller's transaction)"""
+        distinct = 0
+        for word, change in self.words.items():
+            if not change:
+                continue
+            row = cursor.execute('SELECT entries FROM vocabulary WHERE word = ?', (word,)).fetchone()
+            before = row[0] if row else 0
+            after = before + change
+            if after > 0:
+                cursor.execute('INSERT OR REPLACE INTO vocabulary VALUES (?, ?)', (word, after))
+            else:
+                cursor.execute('DELETE FROM vocabulary WHERE word = ?', (word,))
+            distinct += (after > 0) - (before > 0)
+        self.counts['vocabulary'] += distinct
+
+        cursor.executemany(
+            'INSERT INTO stats VALUES (?, ?) ON CONFLICT (key) DO UPDATE SET value = value + excluded.value',
+            [(key, change) for key, change in self.counts.items() if change]
+        )
+
+
+def _status_counts(by_status: Dict[str, int]) -> Dict[str, int]:
+    counts = {STATUS_PENDING: 0, STATUS_APPROVED: 0, STATUS_REJECTED: 0, STATUS_EDITED: 0}
+    counts.update(by_status)
+    counts['total'] = sum(counts.values())
+    counts['reviewed'] = counts['total'] - counts[STATUS_PENDING]
+    counts['accepted'] = counts[STATUS_APPROVED] + counts[STATUS_EDITED]
+    return counts
+
+
+def _audit_report(audit: Dict[str, int], auto_reviewer: Dict[str, int]) -> Dict:
+    audited = sum(count for status, count in audit.items() if status != STATUS_PENDING)
+    approved = audit.get(STATUS_APPROVED, 0)
+    return {
+        'auto_accepted': auto_reviewer.get(STATUS_APPROVED, 0),
+        'audit_pending': audit.get(STATUS_PENDING, 0),
+        'audited': audited,
+        'audit_approved': approved,
+        'precision': approved / audited if audited else None,
+    }
+
+
+def _length_summary(lengths: Dict[str, int], edges: List[float]) -> Dict:
+    """Mean, std, min, max and histogram from counts per exact length"""
+    values = sorted((int(length), count) for length, count in lengths.items())
+    total = sum(count for _, count in values)
+    mean = sum(length * count for length, count in values) / total
+    variance = sum(count * (length - mean) ** 2 for length, count in values) / total
+
+    histogram = Histogram(edges)
+    for length, count in values:
+        histogram.update(length, count)
+    return {'mean': mean, 'std': variance ** 0.5, 'min': values[0][0], 'max': values[-1][0],
+            'histogram': histogram.to_dict()}
+
+
+def _quality_metrics(groups: Dict[str, Dict[str, int]], vocabulary_size: int) -> Dict:
+    """Accepted-entry metrics in the calculate_quality_metrics() format (empty if none)"""
+    chars, words = groups.get('chars', {}), groups.get('words', {})
+    total = sum(chars.values())
+    if not total:
+        return {}
+
+    total_chars = sum(int(length) * count for length, count in chars.items())
+    total_words = sum(int(length) * count for length, count in words.items())
+    return {
+        'total_examples': total,
+        'avg_length_chars': total_chars / total,
+        'avg_length_words': total_words / total,
+        'vocabulary_size': vocabulary_size,
+        'vocabulary_diversity': min(vocabulary_size / total_words, 1.0) if total_words else 0,
+        'sources': groups.get('source', {}),
+        'event_types': groups.get('event_type', {}),
+        'length_chars': _length_summary(chars, CHAR_LENGTH_EDGES),
+        'length_words': _length_summary(words, WORD_LENGTH_EDGES),
+    }
+
+
+def _with_checks(data: str, auto_check: Optional[str], duplicate: Optional[int]) -> Dict:
+    """Stored entry with its raw annotation (the review model's input)"""
+    entry = json.loads(data)
+    entry['auto_check'] = auto_check
+    entry['duplicate'] = bool(duplicate)
+    return entry
+
+
+def _to_entry(row: Tuple) -> Dict:
+    """
+    Commentary dictionary of a row
+
+    Pending entries get 'index' and, once annotated, 'auto_quality_check'
+    (bool), 'auto_check_reason' and 'duplicate', once ranked 'score' (the
+    review model's acceptance probability), and 'audit' for audit samples;
+    reviewed entries get the review fields instead.
+    """
+    index, data, status, reason, edited_text, reviewer, reviewed_at, auto_check, duplicate, score, audit = row
+    entry = json.loads(data)
+    entry['index'] = index
+    if status == STATUS_PENDING:
+        if auto_check is not None:
+            entry['auto_quality_check'] = auto_check == CHECK_PASSED
+            entry['auto_check_reason'] = None if auto_check == CHECK_PASSED else auto_check
+            entry['duplicate'] = bool(duplicate)
+        if score is not None:
+            entry['score'] = score
+        if audit:
+            entry['audit'] = True
+        return entry
+
+    entry.update({'status': status, 'reviewed_at': reviewed_at})
+    if reviewer:
+        entry['reviewer'] = reviewer
+    if reason:
+        entry['rejection_reason'] = reason
+    if edited_text is not None:
+        entry['original_text'] = entry.get('text')
+        entry['text'] = edited_text
+    return entry
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Manual review store')
+    parser.add_argument('--store', default=DEFAULT_STORE, help='Review database')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    load = subparsers.add_parser('load', help='Replace the review queue with candidate entries')
+    load.add_argument('input', help='Candidates (.jsonl, dataset directory, or JSON list)')
+
+    subparsers.add_parser('status', help='Show review progress')
+
+    stats = subparsers.add_parser('stats', help='Print all review statistics as JSON')
+    stats.add_argument('--rebuild', action='store_true', help='Recompute the aggregates from the entries first')
+
+    export = subparsers.add_parser('export', help='Write reviewed entries as a JSON list')
+    export.add_argument('output', nargs='?', help='Output JSON file (default: the approved / rejected file)')
+    export.add_argument('--rejected', action='store_true', help='Export rejected entries instead')
+
+    migrate = subparsers.add_parser('migrate', help='Import review_state.json and the approved file')
+    migrate.add_argument('--state', default=REVIEW_STATE_FILE, help='Former review state file')
+    migrate.add_argument('--approved', default=APPROVED_FILE, help='Former approved file')
+
+    args = parser.parse_args()
+    store = ReviewStore(args.store)
+
+    if args.command == 'load':
+        from stream_pipeline import read_entries
+        logger.info(f"✅ Loaded {store.load(read_entries(args.input))} entries into {args.store}")
+        logger.info(f"🔍 Auto-checked {store.annotate()} entries")
+
+    elif args.command == 'status':
+        counts = store.counts()
+        logger.info(f"📊 {counts['reviewed']}/{counts['total']} reviewed: {counts['approved']} approved, "
+                    f"{counts['edited']} edited, {counts['rejected']} rejected")
+
+    elif args.command == 'stats':
+        if args.rebuild:
+            store.rebuild_stats()
+        print(json.dumps(store.summary(), ensure_ascii=False, indent=2))
+
+    elif args.command == 'export':
+        statuses = (STATUS_REJECTED,) if args.rejected else ACCEPTED
+        output = args.output or (REJECTED_FILE if args.rejected else APPROVED_FILE)
+        logger.info(f"💾 {store.export(output, statuses)} entries → {output}")
+
+    elif args.command == 'migrate':
+        logger.info(f"✅ Imported {store.import_review_state(args.state, args.approved)} entries from {args.state}")
+
+
+if __name__ == '__main__':
+    main()
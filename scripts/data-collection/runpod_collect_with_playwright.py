@@ -3,6 +3,10 @@
 RunPod Data Collection with Playwright
 Uses the proven lequipe_finished_match_scraper.py
 Collects 2000+ commentary examples from curated match URLs
+
+Raw and filtered commentary are written as columnar datasets
+(dataset_store.py); `python dataset_store.py export` turns them back into
+JSONL.
 """
 
 import asyncio
@@ -14,7 +18,12 @@ from datetime import datetime
 
 # Import the working scraper
 sys.path.insert(0, '/workspace')
-from lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+try:
+    from scrapers.lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+except ImportError:  # Copied flat into /workspace
+    from lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+from crawl_scheduler import CrawlScheduler
+from dataset_store import DatasetWriter
 
 logging.basicConfig(
     level=logging.INFO,
@@ -37,15 +46,21 @@ MATCH_URLS = [
 async def collect_training_data(
     match_urls: list = None,
     target_examples: int = 2000,
-    output_dir: str = "/workspace/training_data"
+    output_dir: str = "/workspace/training_data",
+    matches: list = None
 ):
     """
     Collect training data using Playwright scraper
 
+    Matches are fetched highest predicted yield first, and collection stops
+    once target_examples entries pass the quality filter.
+
     Args:
         match_urls: List of L'Équipe match URLs
-        target_examples: Target number of examples
+        target_examples: Target number of examples (entries passing the quality filter)
         output_dir: Output directory
+        matches: Optional match finder entries (total_events, highlights_count)
+            used to predict each match's yield
     """
 
     if match_urls is None:
@@ -64,48 +79,59 @@ async def collect_training_data(
     scraper = LeQuipeFinishedMatchScraper()
     all_commentary = []
 
+    # Highest predicted accepted yield first, stop at the target
+    scheduler = CrawlScheduler({'lequipe': target_examples}, history_file=str(output_path / "crawl_history.json"))
+    if matches:
+        scheduler.add_matches(matches)
+    scheduler.add_urls(match_urls, source='lequipe')
+
     # Scrape each match
-    for i, url in enumerate(match_urls, 1):
+    i = 0
+    while (url := scheduler.next()) is not None:
+        i += 1
         logger.info(f"\n{'='*70}")
-        logger.info(f"MATCH {i}/{len(match_urls)}")
+        logger.info(f"MATCH {i}/{scheduler.total}")
         logger.info(f"{'='*70}")
         logger.info(f"URL: {url}\n")
 
-        if len(all_commentary) >= target_examples:
-            logger.info(f"✅ Reached target of {target_examples} examples!")
-            break
-
         try:
             commentary = await scraper.scrape_match(url)
+            # The quality check is CPU-bound, keep it off the event loop
+            accepted = await asyncio.to_thread(scheduler.record, url, commentary or [])
 
             if commentary:
-                logger.info(f"✅ Extracted {len(commentary)} entries")
+                logger.info(f"✅ Extracted {len(commentary)} entries ({accepted} pass the quality filter)")
                 all_commentary.extend(commentary)
-                logger.info(f"📊 Total so far: {len(all_commentary)} entries\n")
+                logger.info(f"📊 Total so far: {len(all_commentary)} entries, progress {scheduler.progress()}\n")
             else:
                 logger.warning(f"⚠️  No commentary found\n")
 
             # Save progress
-            if i % 5 == 0 or len(all_commentary) >= target_examples:
-                progress_file = output_path / "progress.json"
-                with open(progress_file, 'w', encoding='utf-8') as f:
-                    json.dump(all_commentary, f, ensure_ascii=False, indent=2)
+            if i % 5 == 0 or scheduler.done:
+                with DatasetWriter(str(output_path / "progress")) as writer:
+                    writer.write_many(all_commentary)
                 logger.info(f"💾 Progress saved: {len(all_commentary)} entries\n")
 
             # Be polite - wait between matches
-            if i < len(match_urls):
+            if not scheduler.done and len(scheduler):
                 logger.info("⏳ Waiting 5 seconds...\n")
                 await asyncio.sleep(5)
 
         except Exception as e:
             logger.error(f"❌ Error scraping {url}: {e}\n")
+            if url in scheduler.in_flight:
+                scheduler.record(url, [])
             continue
 
+    scheduler.save_history()
+    if scheduler.done:
+        logger.info(f"✅ Reached target of {target_examples} examples after {i}/{scheduler.total} matches!")
+
     # Save raw commentary
-    raw_file = output_path / "raw_commentary.json"
-    with open(raw_file, 'w', encoding='utf-8') as f:
-        json.dump(all_commentary, f, ensure_ascii=False, indent=2)
-    logger.info(f"\n💾 Saved {len(all_commentary)} raw entries to {raw_file}\n")
+    raw_dir = output_path / "raw_commentary"
+    with DatasetWriter(str(raw_dir)) as writer:
+        writer.write_many(all_commentary)
+    logger.info(f"\n💾 Saved {len(all_commentary)} raw entries to {raw_dir}\n")
 
     # Quality filtering
     logger.info("🔍 Applying quality filters...\n")
@@ -123,9 +149,8 @@ async def collect_training_data(
         logger.info(f"Approval rate: {approval_rate:.1f}%\n")
 
     # Save filtered
-    filtered_file = output_path / "filtered_commentary.json"
-    with open(filtered_file, 'w', encoding='utf-8') as f:
-        json.dump(filtered, f, ensure_ascii=False, indent=2)
+    with DatasetWriter(str(output_path / "filtered_commentary")) as writer:
+        writer.write_many(filtered)
 
     # Export to JSONL training format
     logger.info("📤 Exporting to training format...\n")
@@ -5,6 +5,10 @@ Fine-tunes Llama 3.1 70B on African football commentary using Axolotl
 
 Optimized for RunPod with 4x A100 80GB GPUs
 Uses LoRA for efficient fine-tuning
+
+Training data is either chat JSONL (tokenized by Axolotl at every run) or a
+packed dataset from packed_dataset.py (tokenized and packed once). Either can
+be checked out from a shard store synced with shard_store.py.
 """
 
 import os
@@ -23,11 +27,25 @@ logger = logging.getLogger(__name__)
 class RunPodFineTuner:
     """Fine-tune Llama 3.1 70B for football commentary"""
 
-    def __init__(self, training_data_path: str = "/workspace/training_data/training_data.jsonl"):
+    BASE_MODEL = "meta-llama/Llama-3.1-70B-Instruct"
+
+    def __init__(
+        self,
+        training_data_path: str = "/workspace/training_data/training_data.jsonl",
+        packed_data_path: str = None,
+        shard_store: str = None,
+        dataset_name: str = "training",
+        count_tokens: bool = False
+    ):
         self.training_data_path = Path(training_data_path)
+        self.packed_data_path = Path(packed_data_path) if packed_data_path else None
+        self.shard_store = shard_store
+        self.dataset_name = dataset_name
+        self.count_tokens = count_tokens
         self.workspace = Path("/workspace")
         self.axolotl_dir = self.workspace / "axolotl"
         self.output_dir = self.workspace / "finetuned_model"
+        self.packed_hf_dir = self.workspace / "packed_hf"
 
     def setup_environment(self):
         """Setup Axolotl and dependencies"""
@@ -61,7 +79,7 @@ class RunPodFineTuner:
 
         config = {
             # Base model
-            "base_model": "meta-llama/Llama-3.1-70B-Instruct",
+            "base_model": self.BASE_MODEL,
             "model_type": "LlamaForCausalLM",
             "tokenizer_type": "AutoTokenizer",
 
@@ -150,6 +168,9 @@ class RunPodFineTuner:
             "push_to_hub": False,
         }
 
+        if self.packed_data_path:
+            config.update(self._packed_dataset_config())
+
         config_path = self.workspace / "axolotl_config.yml"
 
         # Convert to YAML format
@@ -160,6 +181,18 @@ class RunPodFineTuner:
         logger.info(f"✅ Configuration saved to {config_path}\n")
         return config_path
 
+    def _packed_dataset_config(self) -> dict:
+        """Convert the packed dataset for Axolotl and return the settings replacing the chat dataset"""
+        from packed_dataset import PackedDataset
+
+        packed = PackedDataset(self.packed_data_path)
+        if packed.manifest['tokenizer'] != self.BASE_MODEL:
+            logger.warning(f"⚠️  Packed with {packed.manifest['tokenizer']}, training {self.BASE_MODEL}")
+
+        logger.info(f"📦 Converting packed dataset ({len(packed)} sequences) to {self.packed_hf_dir}...")
+        packed.to_hf_dataset(str(self.packed_hf_dir))
+        return packed.axolotl_config(self.packed_hf_dir)
+
     def create_deepspeed_config(self) -> Path:
         """Create DeepSpeed configuration for multi-GPU training"""
         logger.info("⚙️  Creating DeepSpeed configuration...")
@@ -190,28 +223,81 @@ class RunPodFineTuner:
         logger.info(f"✅ DeepSpeed config saved to {ds_config_path}\n")
         return ds_config_path
 
+    def checkout_training_data(self):
+        """Rebuild the training files from the shard store synced by shard_store.py"""
+        from shard_store import ShardStore
+
+        # Packed datasets are stored as a directory, JSONL exports as files
+        target = self.packed_data_path.parent if self.packed_data_path else self.training_data_path.parent
+        logger.info(f"📦 Checking out '{self.dataset_name}' from {self.shard_store} into {target}...")
+        written = ShardStore(self.shard_store).checkout(self.dataset_name, str(target))
+        logger.info(f"✅ {len(written)} files rebuilt ({'up to date' if not written else ', '.join(written)})\n")
+
+        # Files are checked out under the base name they were added with
+        expected = self.packed_data_path or self.training_data_path
+        if not expected.exists():
+            raise FileNotFoundError(f"'{self.dataset_name}' has no {expected.name} "
+                                    f"(--training-data / --packed-data must use the name the file was added with)")
+
     def validate_training_data(self):
         """Validate training data format"""
         logger.info("🔍 Validating training data...")
 
+        if self.packed_data_path:
+            from packed_dataset import PackedDataset
+
+            # Opening checks every array against the manifest
+            manifest = PackedDataset(self.packed_data_path).manifest
+            logger.info(f"✅ Packed data validated: {manifest['examples']} examples in "
+                        f"{manifest['sequences']} sequences of {manifest['sequence_len']} tokens "
+                        f"({manifest['padding_efficiency']:.1%} of tokens are not padding)\n")
+            return manifest['examples']
+
         if not self.training_data_path.exists():
             raise FileNotFoundError(f"Training data not found at {self.training_data_path}")
 
-        # Count examples
-        example_count = 0
-        with open(self.training_data_path, 'r') as f:
-            for line in f:
-                if line.strip():
-                    example = json.loads(line)
-
-                    # Validate format
-                    assert "messages" in example, "Missing 'messages' field"
-                    assert len(example["messages"]) == 3, "Expected 3 messages (system, user, assistant)"
-                    assert example["messages"][0]["role"] == "system"
-                    assert example["messages"][1]["role"] == "user"
-                    assert example["messages"][2]["role"] == "assistant"
+        # Parallel validation over byte ranges, every bad line is reported
+        try:
+            from validate_training_data import format_errors, validate_file
+        except ImportError as e:
+            # Only runpod_finetuner.py was copied to the pod (Option A of the deployment guide)
+            logger.warning(f"⚠️  Parallel validator not available ({e}), checking line by line")
+            return self._validate_lines()
+
+        # Token lengths load the (gated) base model tokenizer, so they are opt-in
+        report = validate_file(str(self.training_data_path), schema='messages',
+                               tokenizer=self.BASE_MODEL if self.count_tokens else None)
+        if report['errors']:
+            for error in format_errors(report['errors'])[:20]:
+                logger.error(f"   {error}")
+            if len(report['errors']) > 20:
+                logger.error(f"   ... and {len(report['errors']) - 20} more")
+            raise ValueError(f"{len(report['errors'])} errors in {self.training_data_path}")
+
+        example_count = report['examples']
+        chars = report['chars']
+        logger.info(f"✅ Training data validated: {example_count} examples "
+                    f"(avg {chars['user'][0].mean:.0f} / {chars['assistant'][0].mean:.0f} chars "
+                    f"user / assistant)")
+        if report['tokens']:
+            tokens = report['tokens']['total'][0]
+            logger.info(f"   Content tokens per example: avg {tokens.mean:.0f}, max {tokens.max}\n")
+        return example_count
 
-                    example_count += 1
+    def _validate_lines(self) -> int:
+        """Sequential format check, without the validate_training_data.py dependencies"""
+        example_count = 0
+        with open(self.training_data_path, 'r', encoding='utf-8') as f:
+            for number, line in enumerate(f, 1):
+                if not line.strip():
+                    continue
+                try:
+                    roles = [message['role'] for message in json.loads(line)['messages']]
+                except (ValueError, KeyError, TypeError) as e:
+                    raise ValueError(f"Line {number}: invalid example ({e!r})")
+                if roles != ['system', 'user', 'assistant']:
+                    raise ValueError(f"Line {number}: expected system, user, assistant messages, got {roles}")
+                example_count += 1
 
         logger.info(f"✅ Training data validated: {example_count} examples\n")
         return example_count
@@ -280,6 +366,8 @@ class RunPodFineTuner:
             self.setup_environment()
 
             # Step 2: Validate training data
+            if self.shard_store:
+                self.checkout_training_data()
             example_count = self.validate_training_data()
 
             if example_count < 500:
@@ -319,9 +407,38 @@ if __name__ == '__main__':
         default='/workspace/training_data/training_data.jsonl',
         help='Path to training data JSONL file'
     )
+    parser.add_argument(
+        '--packed-data',
+        type=str,
+        default=None,
+        help='Packed dataset directory from packed_dataset.py (used instead of --training-data)'
+    )
+    parser.add_argument(
+        '--shard-store',
+        type=str,
+        default=None,
+        help='Shard store synced with shard_store.py; the data is checked out from it first'
+    )
+    parser.add_argument(
+        '--dataset',
+        type=str,
+        default='training',
+        help='Dataset name in the shard store'
+    )
+    parser.add_argument(
+        '--count-tokens',
+        action='store_true',
+        help='Report token lengths while validating (loads the base model tokenizer, needs transformers)'
+    )
 
     args = parser.parse_args()
 
     # Run fine-tuning
-    finetuner = RunPodFineTuner(training_data_path=args.training_data)
+    finetuner = RunPodFineTuner(
+        training_data_path=args.training_data,
+        packed_data_path=args.packed_data,
+        shard_store=args.shard_store,
+        dataset_name=args.dataset,
+        count_tokens=args.count_tokens
+    )
     finetuner.run_full_pipeline()
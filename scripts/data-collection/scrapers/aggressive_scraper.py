@@ -7,11 +7,13 @@ Handles JavaScript, scrolling, lazy loading, and dynamic content
 import asyncio
 import re
 import json
-from typing import List, Dict
-from datetime import datetime
+from typing import List
 from playwright.async_api import async_playwright
 import logging
 
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry, json_default
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -22,7 +24,7 @@ class AggressiveScraper:
     def __init__(self):
         self.commentary_list = []
 
-    async def scrape_match(self, url: str, save_debug: bool = True) -> List[Dict]:
+    async def scrape_match(self, url: str, save_debug: bool = True) -> List[CommentaryEntry]:
         """
         Aggressively scrape match commentary
 
@@ -31,7 +33,7 @@ class AggressiveScraper:
             save_debug: Save HTML and screenshots for debugging
 
         Returns:
-            List of commentary dictionaries
+            List of CommentaryEntry records
         """
         logger.info(f"🚀 Aggressive scraping: {url}")
 
@@ -153,15 +155,14 @@ class AggressiveScraper:
                         # Extract timestamp
                         time_match = re.search(r'(\d+[\'′](?:\+\d+)?)', text)
                         if time_match and len(text.strip()) > 30:
-                            self.commentary_list.append({
-                                'source': self._detect_source(url),
-                                'time': time_match.group(1).replace('′', "'"),
-                                'text': text.strip(),
-                                'event_type': self._determine_event_type(text),
-                                'scraped_at': datetime.utcnow().isoformat(),
-                                'url': url,
-                                'method': 'structured_elements'
-                            })
+                            self.commentary_list.append(CommentaryEntry(
+                                text.strip(),
+                                source=self._detect_source(url),
+                                time=time_match.group(1).replace('′', "'"),
+                                event_type=self._determine_event_type(text),
+                                url=url,
+                                method='structured_elements'
+                            ))
 
                     if len(self.commentary_list) > 5:
                         return  # Found enough, stop
@@ -182,15 +183,14 @@ class AggressiveScraper:
             time_str = match.group(1)
             text = match.group(2).strip()
 
-            self.commentary_list.append({
-                'source': self._detect_source(url),
-                'time': time_str.replace('′', "'"),
-                'text': text,
-                'event_type': self._determine_event_type(text),
-                'scraped_at': datetime.utcnow().isoformat(),
-                'url': url,
-                'method': 'text_pattern'
-            })
+            self.commentary_list.append(CommentaryEntry(
+                text,
+                source=self._detect_source(url),
+                time=time_str.replace('′', "'"),
+                event_type=self._determine_event_type(text),
+                url=url,
+                method='text_pattern'
+            ))
 
     async def _extract_timestamp_divs(self, page, url: str):
         """Find any div containing timestamps"""
@@ -211,15 +211,14 @@ class AggressiveScraper:
                         # Check if this looks like commentary (not a whole page dump)
                         lines = text.split('\n')
                         if len(lines) < 10:  # Not too many lines
-                            self.commentary_list.append({
-                                'source': self._detect_source(url),
-                                'time': time_match.group(1).replace('′', "'"),
-                                'text': text.strip(),
-                                'event_type': self._determine_event_type(text),
-                                'scraped_at': datetime.utcnow().isoformat(),
-                                'url': url,
-                                'method': 'timestamp_divs'
-                            })
+                            self.commentary_list.append(CommentaryEntry(
+                                text.strip(),
+                                source=self._detect_source(url),
+                                time=time_match.group(1).replace('′', "'"),
+                                event_type=self._determine_event_type(text),
+                                url=url,
+                                method='timestamp_divs'
+                            ))
 
             except Exception:
                 continue
@@ -287,20 +286,19 @@ class AggressiveScraper:
                     text_val = str(item[key])
 
             if time_val and text_val and len(text_val) > 30:
-                self.commentary_list.append({
-                    'source': 'json_embedded',
-                    'time': time_val,
-                    'text': text_val,
-                    'event_type': self._determine_event_type(text_val),
-                    'scraped_at': datetime.utcnow().isoformat(),
-                    'url': url,
-                    'method': 'json_embedded'
-                })
+                self.commentary_list.append(CommentaryEntry(
+                    text_val,
+                    source='json_embedded',
+                    time=time_val,
+                    event_type=self._determine_event_type(text_val),
+                    url=url,
+                    method='json_embedded'
+                ))
 
         except Exception:
             pass
 
-    def _deduplicate(self, commentary_list: List[Dict]) -> List[Dict]:
+    def _deduplicate(self, commentary_list: List[CommentaryEntry]) -> List[CommentaryEntry]:
         """Remove duplicate entries"""
         seen = set()
         unique = []
@@ -384,7 +382,7 @@ async def main():
         # Save results
         output_file = 'data/aggressive_scraped.json'
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(commentary, f, ensure_ascii=False, indent=2)
+            json.dump(commentary, f, ensure_ascii=False, indent=2, default=json_default)
 
         print(f"\n💾 Saved to: {output_file}")
         print(f"📸 Debug files: data/debug_screenshot.png, data/debug_page.html")
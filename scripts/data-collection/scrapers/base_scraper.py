@@ -5,10 +5,12 @@ Base scraper class for collecting football commentary data
 
 import requests
 from bs4 import BeautifulSoup
-from typing import List, Dict, Optional
+from typing import List, Optional
 import time
 import logging
-from datetime import datetime
+
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry, json_default
 
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
@@ -64,7 +66,7 @@ class BaseScraper:
                     logger.error(f"Failed to fetch {url} after {max_retries} attempts")
                     return None
 
-    def extract_commentary(self, soup: BeautifulSoup) -> List[Dict]:
+    def extract_commentary(self, soup: BeautifulSoup) -> List[CommentaryEntry]:
         """
         Extract commentary from page (to be implemented by subclasses)
 
@@ -72,11 +74,11 @@ class BaseScraper:
             soup: BeautifulSoup object of the page
 
         Returns:
-            List of commentary dictionaries
+            List of commentary entries
         """
         raise NotImplementedError("Subclasses must implement extract_commentary()")
 
-    def scrape_match(self, match_url: str) -> List[Dict]:
+    def scrape_match(self, match_url: str) -> List[CommentaryEntry]:
         """
         Scrape commentary from a single match
 
@@ -98,17 +100,17 @@ class BaseScraper:
             logger.error(f"Error extracting commentary from {match_url}: {e}")
             return []
 
-    def save_commentary(self, commentary: List[Dict], output_file: str):
+    def save_commentary(self, commentary: List[CommentaryEntry], output_file: str):
         """
         Save commentary to JSON file
 
         Args:
-            commentary: List of commentary dictionaries
+            commentary: List of commentary entries
             output_file: Path to output file
         """
         import json
 
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(commentary, f, ensure_ascii=False, indent=2)
+            json.dump(commentary, f, ensure_ascii=False, indent=2, default=json_default)
 
         logger.info(f"Saved {len(commentary)} commentary events to {output_file}")
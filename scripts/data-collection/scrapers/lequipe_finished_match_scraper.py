@@ -4,22 +4,41 @@ L'Équipe finished match scraper
 Extracts full commentary from completed matches
 """
 
-import asyncio
 import re
 import json
-from typing import List, Dict
-from datetime import datetime
-from playwright.async_api import async_playwright
+import asyncio
+from typing import List
 import logging
 
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry, json_default, local_timestamp
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
 
+def determine_event_type(text: str) -> str:
+    """Determine event type from text (also the fallback of the requests-based L'Équipe scrapers)"""
+    text_lower = text.lower()
+
+    if any(k in text_lower for k in ['but', 'goal', '⚽']):
+        return 'goal'
+    elif any(k in text_lower for k in ['carton jaune', 'yellow', '🟨']):
+        return 'yellow_card'
+    elif any(k in text_lower for k in ['carton rouge', 'red', '🟥']):
+        return 'red_card'
+    elif any(k in text_lower for k in ['changement', 'remplacement', '🔄']):
+        return 'substitution'
+    elif any(k in text_lower for k in ['penalty', 'pénalty']):
+        return 'penalty'
+    else:
+        return 'commentary'
+
+
 class LeQuipeFinishedMatchScraper:
     """Scrapes L'Équipe finished match pages for complete commentary"""
 
-    async def scrape_match(self, url: str) -> List[Dict]:
+    async def scrape_match(self, url: str) -> List[CommentaryEntry]:
         """
         Scrape commentary from L'Équipe match page
 
@@ -27,8 +46,11 @@ class LeQuipeFinishedMatchScraper:
             url: L'Équipe match URL
 
         Returns:
-            List of commentary dictionaries
+            List of commentary entries
         """
+        # Imported here: the other L'Équipe scrapers share this module's event typing without Playwright
+        from playwright.async_api import async_playwright
+
         logger.info(f"🎯 Scraping L'Équipe: {url}")
 
         commentary_list = []
@@ -220,7 +242,7 @@ class LeQuipeFinishedMatchScraper:
 
         return None
 
-    async def _parse_json_commentary(self, data, url: str) -> List[Dict]:
+    async def _parse_json_commentary(self, data, url: str) -> List[CommentaryEntry]:
         """Recursively parse JSON for commentary data"""
         commentary = []
 
@@ -270,20 +292,20 @@ class LeQuipeFinishedMatchScraper:
 
             # If we found both time and text
             if time_val and text_val and len(text_val) > 20:
-                commentary.append({
-                    'source': 'lequipe',
-                    'time': time_val.replace('′', "'"),
-                    'text': text_val.strip(),
-                    'event_type': self._determine_event_type(text_val),
-                    'scraped_at': datetime.now().isoformat(),
-                    'url': url,
-                    'method': 'json'
-                })
+                commentary.append(CommentaryEntry(
+                    text_val.strip(),
+                    source='lequipe',
+                    time=time_val.replace('′', "'"),
+                    event_type=self._determine_event_type(text_val),
+                    scraped_at=local_timestamp(),  # Local time, as this scraper always recorded
+                    url=url,
+                    method='json'
+                ))
 
         except Exception as e:
             logger.debug(f"Failed to extract item: {e}")
 
-    async def _extract_from_dom(self, page, url: str) -> List[Dict]:
+    async def _extract_from_dom(self, page, url: str) -> List[CommentaryEntry]:
         """Extract from DOM elements"""
         commentary = []
 
@@ -315,15 +337,15 @@ class LeQuipeFinishedMatchScraper:
                             commentary_text = text.replace(time_str, '').strip()
 
                             if len(commentary_text) > 20:
-                                commentary.append({
-                                    'source': 'lequipe',
-                                    'time': time_str.replace('′', "'"),
-                                    'text': commentary_text,
-                                    'event_type': self._determine_event_type(commentary_text),
-                                    'scraped_at': datetime.now().isoformat(),
-                                    'url': url,
-                                    'method': 'dom'
-                                })
+                                commentary.append(CommentaryEntry(
+                                    commentary_text,
+                                    source='lequipe',
+                                    time=time_str.replace('′', "'"),
+                                    event_type=self._determine_event_type(commentary_text),
+                                    scraped_at=local_timestamp(),
+                                    url=url,
+                                    method='dom'
+                                ))
 
                 except Exception as e:
                     logger.debug(f"Failed to parse event: {e}")
@@ -331,7 +353,7 @@ class LeQuipeFinishedMatchScraper:
 
         return commentary
 
-    async def _extract_from_text(self, page, url: str) -> List[Dict]:
+    async def _extract_from_text(self, page, url: str) -> List[CommentaryEntry]:
         """Extract from raw page text"""
         commentary = []
 
@@ -387,15 +409,15 @@ class LeQuipeFinishedMatchScraper:
                     text = re.sub(r'^(But|Carton jaune|Carton rouge|Changement)\s+pour\s+', '', text)
 
                     if len(text) >= 30 and not text.startswith('http'):
-                        commentary.append({
-                            'source': 'lequipe',
-                            'time': time_str,
-                            'text': text,
-                            'event_type': self._determine_event_type(text),
-                            'scraped_at': datetime.now().isoformat(),
-                            'url': url,
-                            'method': 'text'
-                        })
+                        commentary.append(CommentaryEntry(
+                            text,
+                            source='lequipe',
+                            time=time_str,
+                            event_type=self._determine_event_type(text),
+                            scraped_at=local_timestamp(),
+                            url=url,
+                            method='text'
+                        ))
 
                 i = j
             else:
@@ -403,24 +425,9 @@ class LeQuipeFinishedMatchScraper:
 
         return commentary
 
-    def _determine_event_type(self, text: str) -> str:
-        """Determine event type from text"""
-        text_lower = text.lower()
-
-        if any(k in text_lower for k in ['but', 'goal', '⚽']):
-            return 'goal'
-        elif any(k in text_lower for k in ['carton jaune', 'yellow', '🟨']):
-            return 'yellow_card'
-        elif any(k in text_lower for k in ['carton rouge', 'red', '🟥']):
-            return 'red_card'
-        elif any(k in text_lower for k in ['changement', 'remplacement', '🔄']):
-            return 'substitution'
-        elif any(k in text_lower for k in ['penalty', 'pénalty']):
-            return 'penalty'
-        else:
-            return 'commentary'
-
-    def _deduplicate(self, commentary_list: List[Dict]) -> List[Dict]:
+    _determine_event_type = staticmethod(determine_event_type)
+
+    def _deduplicate(self, commentary_list: List[CommentaryEntry]) -> List[CommentaryEntry]:
         """Remove duplicates"""
         seen = set()
         unique = []
@@ -438,9 +445,9 @@ async def main():
     import sys
 
     if len(sys.argv) < 2:
-        print("Usage: python lequipe_finished_match_scraper.py <url>")
+        print("Usage: python -m scrapers.lequipe_finished_match_scraper <url>")
         print("\nExample:")
-        print("  python lequipe_finished_match_scraper.py https://www.lequipe.fr/Football/match-direct/can/2025/maroc-comores-live/670748")
+        print("  python -m scrapers.lequipe_finished_match_scraper https://www.lequipe.fr/Football/match-direct/can/2025/maroc-comores-live/670748")
         sys.exit(1)
 
     url = sys.argv[1]
@@ -472,7 +479,7 @@ async def main():
         # Save to JSON
         output_file = 'data/lequipe_scraped.json'
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(commentary, f, ensure_ascii=False, indent=2)
+            json.dump(commentary, f, ensure_ascii=False, indent=2, default=json_default)
 
         print(f"\n💾 Saved to: {output_file}")
         print(f"📸 Debug: data/lequipe_debug.png, data/lequipe_page.html, data/lequipe_text.txt")
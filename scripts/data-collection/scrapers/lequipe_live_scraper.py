@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+L'Équipe live match poller
+Appends only new commentary events while a match is being played
+
+The server-rendered match page lists events newest first, each in an
+<article id="..."> block. A poll is a conditional GET (ETag / Last-Modified,
+so an unchanged page costs a 304), streamed and parsed as it arrives: each
+complete <article> is handed to LeQuipeScraper.parse_article(), and reading
+stops once several already-known events have been seen, so the bulk of the
+page (older events, embedded state) is never downloaded. Only event ids not in
+the match cursor are appended to the dataset.
+
+The poll interval adapts: it shrinks while events keep coming and backs off
+when nothing happens. After the final whistle the match gets one full
+Playwright scrape (LeQuipeFinishedMatchScraper) to reconcile anything the
+polls missed.
+
+Usage:
+    python -m scrapers.lequipe_live_scraper <match_url> [<match_url> ...] --output data/live_commentary.jsonl
+"""
+
+import os
+import re
+import json
+import time
+import asyncio
+import argparse
+from typing import Dict, List
+from bs4 import BeautifulSoup
+try:
+    from .lequipe_scraper import LeQuipeScraper
+    from .lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+except ImportError:  # Imported as a top-level module, with scrapers/ on sys.path
+    from lequipe_scraper import LeQuipeScraper
+    from lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+import logging
+
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry, entry_to_json
+
+logging.basicConfig(level=logging.INFO)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), 'data')
+LIVE_OUTPUT_FILE = os.path.join(DATA_DIR, 'live_commentary.jsonl')
+LIVE_STATE_FILE = os.path.join(DATA_DIR, 'live_cursors.json')
+
+# Only finds where each event block ends in the partially downloaded page; blocks are parsed by LeQuipeScraper
+ARTICLE_RE = re.compile(r'<article\b[^>]*\bid="\d+"[^>]*>.*?</article>', re.S)
+FINAL_WHISTLE_PICTO = 'sifflet_fin'
+
+
+class LeQuipeLiveScraper(LeQuipeScraper):
+    """Polls live L'Équipe match pages and emits only new events"""
+
+    def __init__(
+        self,
+        state_file: str = LIVE_STATE_FILE,
+        min_interval: float = 15.0,
+        max_interval: float = 120.0,
+        known_events_to_stop: int = 5
+    ):
+        """
+        Initialize poller
+
+        Args:
+            state_file: JSON file with one cursor per match (survives restarts)
+            min_interval: Fastest poll interval in seconds (while events keep coming)
+            max_interval: Slowest poll interval in seconds (quiet periods)
+            known_events_to_stop: Consecutive already-seen events after which a poll stops reading
+        """
+        super().__init__()
+        self.delay = 0
+        self.state_file = state_file
+        self.min_interval = min_interval
+        self.max_interval = max_interval
+        self.known_events_to_stop = known_events_to_stop
+        self.cursors: Dict[str, Dict] = {}
+
+        if os.path.exists(state_file):
+            with open(state_file, 'r', encoding='utf-8') as f:
+                self.cursors = json.load(f)
+
+    def cursor(self, url: str) -> Dict:
+        """Per-match cursor: seen event ids, last event, HTTP validators, counters"""
+        return self.cursors.setdefault(url, {
+            'seen_ids': [],
+            'last_id': None,
+            'last_minute': None,
+            'etag': None,
+            'last_modified': None,
+            'finished': False,
+            'reconciled': False,
+            'polls': 0,
+            'not_modified': 0,
+            'bytes': 0,
+        })
+
+    def save_state(self):
+        os.makedirs(os.path.dirname(self.state_file), exist_ok=True)
+        tmp_path = f"{self.state_file}.tmp"
+        with open(tmp_path, 'w', encoding='utf-8') as f:
+            json.dump(self.cursors, f, ensure_ascii=False)
+        os.replace(tmp_path, self.state_file)
+
+    # ------------------------------------------------------------------
+    # Polling
+    # ------------------------------------------------------------------
+
+    def poll(self, url: str) -> List[CommentaryEntry]:
+        """
+        Fetch the events added since the last poll of a match
+
+        Args:
+            url: Match URL
+
+        Returns:
+            New entries, oldest first (empty if nothing changed)
+        """
+        cursor = self.cursor(url)
+        seen = set(cursor['seen_ids'])
+        cursor['polls'] += 1
+
+        headers = {'Accept-Encoding': 'gzip, deflate'}
+        if cursor['etag']:
+            headers['If-None-Match'] = cursor['etag']
+        if cursor['last_modified']:
+            headers['If-Modified-Since'] = cursor['last_modified']
+
+        new_events = []
+        final_whistle = False
+        with self.session.get(url, headers=headers, stream=True, timeout=30) as response:
+            if response.status_code == 304:
+                cursor['not_modified'] += 1
+                return []
+            response.raise_for_status()
+
+            buffer = ''
+            position = 0
+            known_in_a_row = 0
+            if 'charset' not in response.headers.get('Content-Type', ''):
+                response.encoding = 'utf-8'
+
+            for chunk in response.iter_content(chunk_size=16384, decode_unicode=True):
+                buffer += chunk
+                for match in ARTICLE_RE.finditer(buffer, position):
+                    position = match.end()
+                    article = BeautifulSoup(match.group(0), 'html.parser').article
+                    event = self.parse_article(article, url, method='live')
+                    if event is None:
+                        continue
+
+                    if event['event_id'] in seen:
+                        known_in_a_row += 1
+                    else:
+                        known_in_a_row = 0
+                        seen.add(event['event_id'])
+                        new_events.append(event)
+                        final_whistle = final_whistle or FINAL_WHISTLE_PICTO in self.pictograms(article)
+
+                if known_in_a_row >= self.known_events_to_stop:
+                    break
+
+                # Keep only the unparsed tail (an article may span chunks)
+                buffer = buffer[position:]
+                position = 0
+
+            # Compressed bytes actually received
+            cursor['bytes'] += response.raw.tell()
+            cursor['etag'] = response.headers.get('ETag')
+            cursor['last_modified'] = response.headers.get('Last-Modified')
+
+        # Page order is newest first
+        new_events.reverse()
+
+        if new_events:
+            latest = max(new_events, key=lambda event: event.sort_key)
+            cursor['last_id'] = max((event['event_id'] for event in new_events), key=int)
+            cursor['last_minute'] = latest.time
+            cursor['seen_ids'] = sorted(seen, key=int)
+        if final_whistle:
+            cursor['finished'] = True
+
+        return new_events
+
+    def next_interval(self, interval: float, new_events: int) -> float:
+        """Shrink the interval while events arrive, back off when quiet"""
+        if new_events:
+            return max(self.min_interval, interval / 2)
+        return min(self.max_interval, interval * 1.5)
+
+    async def follow(
+        self,
+        url: str,
+        output_file: str = LIVE_OUTPUT_FILE,
+        reconcile: bool = True,
+        max_duration: float = 4 * 3600
+    ) -> int:
+        """
+        Poll a match until the final whistle, appending new events as they appear
+
+        Args:
+            url: Match URL
+            output_file: JSONL dataset to append to
+            reconcile: Run a full scrape after the final whistle
+            max_duration: Give up after this many seconds
+
+        Returns:
+            Number of entries appended
+        """
+        cursor = self.cursor(url)
+        interval = self.min_interval
+        deadline = time.time() + max_duration
+        appended = 0
+
+        while not cursor['finished'] and time.time() < deadline:
+            started = time.perf_counter()
+            try:
+                new_events = await asyncio.to_thread(self.poll, url)
+            except Exception as e:
+                logger.warning(f"Poll failed for {url}: {e}")
+                new_events = []
+
+            appended += self._append(new_events, output_file)
+            self.save_state()
+
+            elapsed_ms = (time.perf_counter() - started) * 1000
+            logger.info(f"⏱️  {url}: +{len(new_events)} events, {elapsed_ms:.0f} ms, "
+                        f"last {cursor['last_minute']} (poll {cursor['polls']}, {cursor['bytes'] / 1024:.0f} KB total)")
+
+            if cursor['finished']:
+                break
+            interval = self.next_interval(interval, len(new_events))
+            await asyncio.sleep(interval)
+
+        if reconcile and cursor['finished'] and not cursor['reconciled']:
+            appended += await self.reconcile(url, output_file)
+
+        return appended
+
+    async def reconcile(self, url: str, output_file: str = LIVE_OUTPUT_FILE) -> int:
+        """
+        Full scrape after the final whistle; appends entries the polls missed
+
+        Returns:
+            Number of entries appended
+        """
+        logger.info(f"🏁 Final whistle, reconciling {url}")
+        full = await LeQuipeFinishedMatchScraper().scrape_match(url)
+
+        known = set()
+        if os.path.exists(output_file):
+            with open(output_file, 'r', encoding='utf-8') as f:
+                for line in f:
+                    entry = json.loads(line)
+                    if entry.get('url') == url:
+                        known.add(entry['text'][:100].lower())
+
+        missing = [entry for entry in full if entry.text[:100].lower() not in known]
+        appended = self._append(missing, output_file)
+
+        cursor = self.cursor(url)
+        cursor['reconciled'] = True
+        self.save_state()
+
+        logger.info(f"✅ Reconciled {url}: {appended} entries added by the full scrape")
+        return appended
+
+    def _append(self, entries: List[CommentaryEntry], output_file: str) -> int:
+        entries = [entry for entry in entries if entry.text]
+        if not entries:
+            return 0
+
+        os.makedirs(os.path.dirname(os.path.abspath(output_file)), exist_ok=True)
+        with open(output_file, 'a', encoding='utf-8') as f:
+            for entry in entries:
+                f.write(entry_to_json(entry) + '\n')
+        return len(entries)
+
+
+async def main():
+    parser = argparse.ArgumentParser(description="Follow live L'Équipe matches, appending only new events")
+    parser.add_argument('urls', nargs='+', help='Match URLs')
+    parser.add_argument('--output', default=LIVE_OUTPUT_FILE, help='JSONL file to append to')
+    parser.add_argument('--min-interval', type=float, default=15.0, help='Fastest poll interval (seconds)')
+    parser.add_argument('--max-interval', type=float, default=120.0, help='Slowest poll interval (seconds)')
+    parser.add_argument('--no-reconcile', action='store_true', help='Skip the full scrape after the final whistle')
+
+    args = parser.parse_args()
+
+    scraper = LeQuipeLiveScraper(min_interval=args.min_interval, max_interval=args.max_interval)
+    counts = await asyncio.gather(*(
+        scraper.follow(url, args.output, reconcile=not args.no_reconcile) for url in args.urls
+    ))
+
+    print(f"\n✅ Appended {sum(counts)} entries to {args.output}")
+
+
+if __name__ == '__main__':
+    asyncio.run(main())
@@ -5,13 +5,33 @@ Target: 1200 examples (60% of total dataset)
 """
 
 import re
-from typing import List, Dict, Optional
-from datetime import datetime
-from base_scraper import BaseScraper
+from typing import List, Optional
+try:
+    from .base_scraper import BaseScraper
+    from .lequipe_finished_match_scraper import determine_event_type
+except ImportError:  # Imported as a top-level module, with scrapers/ on sys.path
+    from base_scraper import BaseScraper
+    from lequipe_finished_match_scraper import determine_event_type
 import logging
 
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry
+
 logger = logging.getLogger(__name__)
 
+PICTO_RE = re.compile(r'/icons/live/ico_([a-z0-9_]+?)_?\.svg')
+
+# Event pictograms of the live commentary → event types
+PICTO_EVENT_TYPES = {
+    'but': 'goal',
+    'carton_jaune': 'yellow_card',
+    'carton_rouge': 'red_card',
+    'double_cartons': 'red_card',
+    'transfert': 'substitution',
+    'penalty_rate': 'penalty',
+    'penalty': 'penalty',
+}
+
 
 class LeQuipeScraper(BaseScraper):
     """Scrapes live commentary from L'Équipe match pages"""
@@ -19,7 +39,7 @@ class LeQuipeScraper(BaseScraper):
     def __init__(self):
         super().__init__(base_url="https://www.lequipe.fr", delay=2.0)
 
-    def extract_commentary(self, soup) -> List[Dict]:
+    def extract_commentary(self, soup) -> List[CommentaryEntry]:
         """
         Extract commentary events from L'Équipe match page
 
@@ -30,16 +50,18 @@ class LeQuipeScraper(BaseScraper):
         - Text: Main text content
 
         Returns:
-            List of dictionaries with structure:
-            {
-                'source': 'lequipe',
-                'time': '45\'',
-                'text': 'Commentary text...',
-                'event_type': 'commentary',
-                'scraped_at': '2025-01-15T10:30:00'
-            }
+            List of CommentaryEntry records:
+                source='lequipe', time="45'", text='Commentary text...',
+                event_type='commentary', scraped_at=<epoch microseconds>
         """
-        commentary_list = []
+        # Current match pages: one <article id="..."> per live commentary event
+        commentary_list = [
+            entry for entry in (self.parse_article(article) for article in soup.select('article[id]'))
+            if entry is not None and entry.text
+        ]
+        if commentary_list:
+            logger.info(f"Found {len(commentary_list)} CommentsLive events")
+            return commentary_list
 
         # Try to find timeline container
         # L'Équipe uses different classes, we'll try multiple selectors
@@ -110,13 +132,12 @@ class LeQuipeScraper(BaseScraper):
                 # Determine event type from icons or classes
                 event_type = self._determine_event_type(item)
 
-                commentary_list.append({
-                    'source': 'lequipe',
-                    'time': time_text,
-                    'text': text,
-                    'event_type': event_type,
-                    'scraped_at': datetime.utcnow().isoformat()
-                })
+                commentary_list.append(CommentaryEntry(
+                    text,
+                    source='lequipe',
+                    time=time_text,
+                    event_type=event_type
+                ))
 
             except Exception as e:
                 logger.warning(f"Error parsing timeline item: {e}")
@@ -124,6 +145,46 @@ class LeQuipeScraper(BaseScraper):
 
         return commentary_list
 
+    def parse_article(self, article, url: Optional[str] = None, method: Optional[str] = None) -> Optional[CommentaryEntry]:
+        """
+        Commentary entry of one live commentary <article> (CommentsLive layout)
+
+        The text is the event title and summary; player cards and embeds in
+        the article are left out. The event type comes from the event
+        pictogram, or from the text when there is none.
+
+        Args:
+            article: BeautifulSoup element of the <article>
+            url: Match URL
+            method: Extraction method recorded on the entry
+
+        Returns:
+            Entry (with its 'event_id'), or None for blocks that are not timed events
+        """
+        time_element = article.select_one('.CommentsLive__time')
+        if time_element is None:
+            return None
+
+        parts = [element.get_text(' ', strip=True) for element in article.select('.grid__title, .grid__summary')]
+        text = re.sub(r'\s+', ' ', ' '.join(part for part in parts if part)).strip()
+        event_type = next((PICTO_EVENT_TYPES[picto] for picto in self.pictograms(article)
+                           if picto in PICTO_EVENT_TYPES), None)
+
+        return CommentaryEntry(
+            text,
+            source='lequipe',
+            time=time_element.get_text(strip=True).replace('′', "'"),
+            event_type=event_type or determine_event_type(text),
+            url=url,
+            method=method,
+            extra={'event_id': article.get('id')}
+        )
+
+    @staticmethod
+    def pictograms(article) -> List[str]:
+        """Names of the live event pictograms in an <article> ('but', 'carton_jaune', 'sifflet_fin', ...)"""
+        return [found.group(1) for img in article.select('img[src]') if (found := PICTO_RE.search(img['src']))]
+
     def _determine_event_type(self, item_element) -> str:
         """
         Determine event type from item classes or icons
@@ -6,11 +6,13 @@ Solves the problem of modern websites that load content dynamically
 
 import re
 import asyncio
-from typing import List, Dict
-from datetime import datetime
+from typing import List
 from playwright.async_api import async_playwright
 import logging
 
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry, json_default
+
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
@@ -21,7 +23,7 @@ class RMCPlaywrightScraper:
     def __init__(self):
         self.base_url = "https://rmcsport.bfmtv.com"
 
-    async def scrape_match(self, url: str) -> List[Dict]:
+    async def scrape_match(self, url: str) -> List[CommentaryEntry]:
         """
         Scrape commentary from RMC Sport match page
 
@@ -29,7 +31,7 @@ class RMCPlaywrightScraper:
             url: Match URL
 
         Returns:
-            List of commentary dictionaries
+            List of commentary entries
         """
         logger.info(f"Scraping: {url}")
 
@@ -87,14 +89,13 @@ class RMCPlaywrightScraper:
                                     # Determine event type
                                     event_type = self._determine_event_type(text_clean)
 
-                                    commentary_list.append({
-                                        'source': 'rmc',
-                                        'time': time_str.replace('′', "'"),
-                                        'text': text_clean,
-                                        'event_type': event_type,
-                                        'scraped_at': datetime.utcnow().isoformat(),
-                                        'url': url
-                                    })
+                                    commentary_list.append(CommentaryEntry(
+                                        text_clean,
+                                        source='rmc',
+                                        time=time_str.replace('′', "'"),
+                                        event_type=event_type,
+                                        url=url
+                                    ))
 
                             except Exception as e:
                                 logger.debug(f"Error parsing element: {e}")
@@ -120,14 +121,13 @@ class RMCPlaywrightScraper:
 
                             event_type = self._determine_event_type(text)
 
-                            commentary_list.append({
-                                'source': 'rmc',
-                                'time': time_str.replace('′', "'"),
-                                'text': text,
-                                'event_type': event_type,
-                                'scraped_at': datetime.utcnow().isoformat(),
-                                'url': url
-                            })
+                            commentary_list.append(CommentaryEntry(
+                                text,
+                                source='rmc',
+                                time=time_str.replace('′', "'"),
+                                event_type=event_type,
+                                url=url
+                            ))
 
             except Exception as e:
                 logger.error(f"Error scraping page: {e}")
@@ -175,7 +175,7 @@ async def main():
     import json
 
     if len(sys.argv) < 2:
-        print("Usage: python rmc_playwright_scraper.py <url>")
+        print("Usage: python -m scrapers.rmc_playwright_scraper <url>")
         sys.exit(1)
 
     url = sys.argv[1]
@@ -197,7 +197,7 @@ async def main():
         # Save to file
         output_file = 'data/rmc_scraped.json'
         with open(output_file, 'w', encoding='utf-8') as f:
-            json.dump(commentary, f, ensure_ascii=False, indent=2)
+            json.dump(commentary, f, ensure_ascii=False, indent=2, default=json_default)
 
         print(f"\n💾 Saved to: {output_file}")
     else:
@@ -5,11 +5,16 @@ Target: 600 examples (30% of total dataset)
 """
 
 import re
-from typing import List, Dict, Optional
-from datetime import datetime
-from base_scraper import BaseScraper
+from typing import List, Optional
+try:
+    from .base_scraper import BaseScraper
+except ImportError:  # Imported as a top-level module, with scrapers/ on sys.path
+    from base_scraper import BaseScraper
 import logging
 
+# Shared record type (scripts/data-collection/commentary_entry.py, on the path of every entry script)
+from commentary_entry import CommentaryEntry
+
 logger = logging.getLogger(__name__)
 
 
@@ -19,21 +24,16 @@ class RMCScraper(BaseScraper):
     def __init__(self):
         super().__init__(base_url="https://rmcsport.bfmtv.com", delay=2.0)
 
-    def extract_commentary(self, soup) -> List[Dict]:
+    def extract_commentary(self, soup) -> List[CommentaryEntry]:
         """
         Extract commentary events from RMC Sport match page
 
         RMC Sport structure may vary, we'll use flexible selectors
 
         Returns:
-            List of dictionaries with structure:
-            {
-                'source': 'rmc',
-                'time': '45\'',
-                'text': 'Commentary text...',
-                'event_type': 'commentary',
-                'scraped_at': '2025-01-15T10:30:00'
-            }
+            List of CommentaryEntry records:
+                source='rmc', time="45'", text='Commentary text...',
+                event_type='commentary', scraped_at=<epoch microseconds>
         """
         commentary_list = []
 
@@ -117,13 +117,12 @@ class RMCScraper(BaseScraper):
                 # Determine event type
                 event_type = self._determine_event_type(item)
 
-                commentary_list.append({
-                    'source': 'rmc',
-                    'time': time_text,
-                    'text': text,
-                    'event_type': event_type,
-                    'scraped_at': datetime.utcnow().isoformat()
-                })
+                commentary_list.append(CommentaryEntry(
+                    text,
+                    source='rmc',
+                    time=time_text,
+                    event_type=event_type
+                ))
 
             except Exception as e:
                 logger.warning(f"Error parsing item: {e}")
@@ -0,0 +1,426 @@
+#!/usr/bin/env python3
+"""
+Content-addressed shard store with manifest-based delta sync
+Ship dataset updates to RunPod as the shards that changed, not whole files
+
+Layout of a store:
+
+    objects/ab/abcdef...        shard contents, named by their SHA-256
+    manifests/<name>.json       files of a dataset version and their shard lists
+
+JSONL files are cut at line boundaries chosen from the content of the lines
+(content-defined chunking), so inserting, editing or appending a few
+examples changes one or two shards and every other shard keeps its hash.
+Other files (packed token arrays, scripts) are cut into fixed-size blocks.
+
+`sync` compares the local manifest with the remote store and transfers only
+the objects the remote does not have yet, then the manifest itself. The
+remote is a directory (mounted volume, or a local stand-in for tests) or an
+ssh://[user@]host[:port]/path target reached with ssh and tar.
+
+Usage:
+    python shard_store.py add data/shards training data/llama3_training.jsonl data/llama3_training.val.jsonl
+    python shard_store.py add data/shards runpod_scripts runpod_*.py axolotl_config.yaml
+    python shard_store.py sync data/shards training ssh://root@1.2.3.4:22022/workspace/shards
+    python shard_store.py checkout /workspace/shards training /workspace/training_data    # on the pod
+    python shard_store.py status data/shards
+    python shard_store.py gc data/shards
+"""
+
+import os
+import shlex
+import struct
+import hashlib
+import argparse
+import subprocess
+from datetime import datetime, timezone
+from pathlib import Path
+from typing import Dict, Iterable, Iterator, List, Optional, Set
+import json
+import logging
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+CHUNK_BYTES = 256 << 10      # Average JSONL shard size
+BLOCK_BYTES = 4 << 20        # Fixed block size of non-JSONL files
+_HASH_RANGE = 1 << 64
+
+
+def iter_line_chunks(f, chunk_bytes: int = CHUNK_BYTES) -> Iterator[bytes]:
+    """
+    Cut a JSONL stream into content-defined chunks of whole lines
+
+    A chunk ends after a line whose 64-bit hash falls below
+    2^64 * len(line) / chunk_bytes, i.e. with a probability proportional to
+    the line length, so chunks average `chunk_bytes` bytes whatever the line
+    sizes. Boundaries only depend on the lines themselves: an edit moves at
+    most the boundaries of the chunk it falls in.
+
+    Args:
+        f: Binary file object
+        chunk_bytes: Average chunk size
+
+    Yields:
+        Chunk contents
+    """
+    min_bytes, max_bytes = chunk_bytes // 4, chunk_bytes * 4
+    lines: List[bytes] = []
+    size = 0
+
+    for line in f:
+        lines.append(line)
+        size += len(line)
+        if size < min_bytes:
+            continue
+        digest = struct.unpack('<Q', hashlib.blake2b(line, digest_size=8).digest())[0]
+        if size >= max_bytes or digest * chunk_bytes < _HASH_RANGE * len(line):
+            yield b''.join(lines)
+            lines, size = [], 0
+
+    if lines:
+        yield b''.join(lines)
+
+
+def iter_block_chunks(f, block_bytes: int = BLOCK_BYTES) -> Iterator[bytes]:
+    """Cut a binary stream into fixed-size blocks"""
+    return iter(lambda: f.read(block_bytes), b'')
+
+
+class ShardStore:
+    """Content-addressed objects plus named manifests in a local directory"""
+
+    def __init__(self, path: str):
+        self.path = Path(path)
+        self.objects_dir = self.path / 'objects'
+        self.manifests_dir = self.path / 'manifests'
+
+    def object_path(self, digest: str) -> Path:
+        return self.objects_dir / digest[:2] / digest
+
+    def put(self, data: bytes) -> str:
+        """Store a chunk (no-op when it is already there) and return its hash"""
+        digest = hashlib.sha256(data).hexdigest()
+        path = self.object_path(digest)
+        if not path.exists():
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_suffix('.tmp')
+            tmp_path.write_bytes(data)
+            os.replace(tmp_path, path)
+        return digest
+
+    def objects(self) -> Set[str]:
+        """Hashes of all stored objects"""
+        if not self.objects_dir.exists():
+            return set()
+        return {path.name for path in self.objects_dir.glob('*/*') if not path.name.endswith('.tmp')}
+
+    def add_file(self, file_path: str, chunk_bytes: int = CHUNK_BYTES) -> Dict:
+        """
+        Store one file as chunks
+
+        Returns:
+            Manifest entry: file name, size, SHA-256 and [hash, size] chunk list
+        """
+        file_hash = hashlib.sha256()
+        chunks = []
+        with open(file_path, 'rb') as f:
+            pieces = iter_line_chunks(f, chunk_bytes) if file_path.endswith('.jsonl') else iter_block_chunks(f)
+            for data in pieces:
+                file_hash.update(data)
+                chunks.append([self.put(data), len(data)])
+
+        return {
+            'path': os.path.basename(file_path),
+            'bytes': sum(size for _, size in chunks),
+            'sha256': file_hash.hexdigest(),
+            'chunks': chunks,
+        }
+
+    def add(self, name: str, file_paths: Iterable[str], chunk_bytes: int = CHUNK_BYTES) -> Dict:
+        """
+        Store files as a new version of a named dataset
+
+        Args:
+            name: Dataset name (the manifest is replaced)
+            file_paths: Files to store; directories are added file by file
+                and keep their name as a path prefix
+            chunk_bytes: Average chunk size of JSONL files
+
+        Returns:
+            The manifest
+        """
+        files = []
+        for file_path in file_paths:
+            if os.path.isdir(file_path):
+                for child in sorted(Path(file_path).rglob('*')):
+                    if child.is_file():
+                        entry = self.add_file(str(child), chunk_bytes)
+                        entry['path'] = str(child.relative_to(Path(file_path).parent))
+                        files.append(entry)
+            else:
+                files.append(self.add_file(file_path, chunk_bytes))
+
+        manifest = {
+            'name': name,
+            'created_at': datetime.now(timezone.utc).isoformat(),
+            'chunk_bytes': chunk_bytes,
+            'files': files,
+        }
+        self.write_manifest(manifest)
+        return manifest
+
+    def read_manifest(self, name: str) -> Optional[Dict]:
+        path = self.manifests_dir / f'{name}.json'
+        if not path.exists():
+            return None
+        return json.loads(path.read_text(encoding='utf-8'))
+
+    def write_manifest(self, manifest: Dict):
+        self.manifests_dir.mkdir(parents=True, exist_ok=True)
+        path = self.manifests_dir / f"{manifest['name']}.json"
+        tmp_path = path.with_suffix('.tmp')
+        tmp_path.write_text(json.dumps(manifest, indent=2), encoding='utf-8')
+        os.replace(tmp_path, path)
+
+    def manifests(self) -> List[Dict]:
+        if not self.manifests_dir.exists():
+            return []
+        return [json.loads(path.read_text(encoding='utf-8')) for path in sorted(self.manifests_dir.glob('*.json'))]
+
+    def checkout(self, name: str, output_dir: str) -> List[str]:
+        """
+        Rebuild the files of a dataset from their chunks
+
+        Files that already match their hash are left alone. Every rebuilt
+        file is checked against the hash in the manifest.
+
+        Returns:
+            Paths of the files written
+        """
+        manifest = self.read_manifest(name)
+        if manifest is None:
+            raise FileNotFoundError(f"No manifest '{name}' in {self.path}")
+
+        written = []
+        for entry in manifest['files']:
+            path = Path(output_dir) / entry['path']
+            if path.exists() and path.stat().st_size == entry['bytes'] and file_sha256(path) == entry['sha256']:
+                continue
+
+            path.parent.mkdir(parents=True, exist_ok=True)
+            tmp_path = path.with_name(path.name + '.tmp')
+            file_hash = hashlib.sha256()
+            with open(tmp_path, 'wb') as out:
+                for digest, _ in entry['chunks']:
+                    data = self.object_path(digest).read_bytes()
+                    file_hash.update(data)
+                    out.write(data)
+            if file_hash.hexdigest() != entry['sha256']:
+                tmp_path.unlink()
+                raise ValueError(f"{entry['path']} does not match its manifest hash, store is corrupt")
+            os.replace(tmp_path, path)
+            written.append(str(path))
+        return written
+
+    def gc(self) -> int:
+        """Delete objects no manifest refers to; returns the number deleted"""
+        live = {digest for manifest in self.manifests() for digest in manifest_objects(manifest)}
+        dead = self.objects() - live
+        for digest in dead:
+            self.object_path(digest).unlink()
+        return len(dead)
+
+
+def file_sha256(path) -> str:
+    file_hash = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(BLOCK_BYTES), b''):
+            file_hash.update(block)
+    return file_hash.hexdigest()
+
+
+def manifest_objects(manifest: Dict) -> Dict[str, int]:
+    """Unique objects of a manifest with their sizes"""
+    return {digest: size for entry in manifest['files'] for digest, size in entry['chunks']}
+
+
+class DirectoryRemote:
+    """A store on a mounted volume, or a local directory standing in for the pod"""
+
+    def __init__(self, path: str):
+        self.store = ShardStore(path)
+
+    def objects(self) -> Set[str]:
+        return self.store.objects()
+
+    def read_manifest(self, name: str) -> Optional[Dict]:
+        return self.store.read_manifest(name)
+
+    def upload(self, local: ShardStore, digests: List[str]):
+        for digest in digests:
+            self.store.put(local.object_path(digest).read_bytes())
+
+    def write_manifest(self, manifest: Dict):
+        self.store.write_manifest(manifest)
+
+
+class SSHRemote:
+    """A store on a pod, reached with ssh (one listing call, one tar stream per sync)"""
+
+    def __init__(self, url: str):
+        target, _, path = url[len('ssh://'):].partition('/')
+        host, _, port = target.partition(':')
+        self.ssh = ['ssh'] + (['-p', port] if port else []) + [host]
+        self.path = '/' + path
+
+    def _run(self, command: str, data: Optional[bytes] = None) -> bytes:
+        result = subprocess.run(self.ssh + [command], input=data, capture_output=True, check=True)
+        return result.stdout
+
+    def objects(self) -> Set[str]:
+        listing = self._run(f"mkdir -p {shlex.quote(self.path)}/objects && "
+                            f"cd {shlex.quote(self.path)}/objects && find . -type f ! -name '*.tmp'")
+        return {os.path.basename(line) for line in listing.decode().split()}
+
+    def read_manifest(self, name: str) -> Optional[Dict]:
+        data = self._run(f"cat {shlex.quote(f'{self.path}/manifests/{name}.json')} 2>/dev/null || true")
+        return json.loads(data) if data.strip() else None
+
+    def upload(self, local: ShardStore, digests: List[str]):
+        if not digests:
+            return
+        names = '\n'.join(f'objects/{digest[:2]}/{digest}' for digest in digests).encode()
+        tar = subprocess.Popen(['tar', '-cf', '-', '-C', str(local.path), '-T', '-'],
+                               stdin=subprocess.PIPE, stdout=subprocess.PIPE)
+        receiver = subprocess.Popen(self.ssh + [f"mkdir -p {shlex.quote(self.path)} && "
+                                                f"tar -xf - -C {shlex.quote(self.path)}"],
+                                    stdin=tar.stdout)
+        tar.stdout.close()
+        tar.stdin.write(names)
+        tar.stdin.close()
+        if receiver.wait() or tar.wait():
+            raise RuntimeError(f"Upload to {' '.join(self.ssh)} failed")
+
+    def write_manifest(self, manifest: Dict):
+        path = f"{self.path}/manifests/{manifest['name']}.json"
+        self._run(f"mkdir -p {shlex.quote(self.path)}/manifests && cat > {shlex.quote(path + '.tmp')} && "
+                  f"mv {shlex.quote(path + '.tmp')} {shlex.quote(path)}",
+                  data=json.dumps(manifest, indent=2).encode())
+
+
+def open_remote(target: str):
+    return SSHRemote(target) if target.startswith('ssh://') else DirectoryRemote(target)
+
+
+def sync(local: ShardStore, name: str, target: str) -> Dict:
+    """
+    Bring a remote store up to date with a local dataset version
+
+    Objects go first and the manifest last, so an interrupted sync leaves
+    the remote on its previous version, and the next sync resumes.
+
+    Args:
+        local: Local store
+        name: Dataset name
+        target: Remote directory or ssh://[user@]host[:port]/path
+
+    Returns:
+        Transfer statistics (objects and bytes sent / already there, changed files)
+    """
+    manifest = local.read_manifest(name)
+    if manifest is None:
+        raise FileNotFoundError(f"No manifest '{name}' in {local.path}")
+
+    remote = open_remote(target)
+    previous = remote.read_manifest(name)
+    wanted = manifest_objects(manifest)
+    missing = sorted(set(wanted) - remote.objects())
+
+    remote.upload(local, missing)
+    remote.write_manifest(manifest)
+
+    old_hashes = {entry['path']: entry['sha256'] for entry in previous['files']} if previous else {}
+    return {
+        'objects': len(wanted),
+        'sent_objects': len(missing),
+        'bytes': sum(wanted.values()),
+        'sent_bytes': sum(wanted[digest] for digest in missing),
+        'changed_files': [entry['path'] for entry in manifest['files']
+                          if old_hashes.get(entry['path']) != entry['sha256']],
+    }
+
+
+def log_manifest(manifest: Dict):
+    total = sum(manifest_objects(manifest).values())
+    logger.info(f"📦 {manifest['name']}: {len(manifest['files'])} files, {total / 1e6:.1f} MB "
+                f"in {len(manifest_objects(manifest))} shards ({manifest['created_at']})")
+    for entry in manifest['files']:
+        logger.info(f"   {entry['path']}: {entry['bytes'] / 1e6:.1f} MB, {len(entry['chunks'])} shards")
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Content-addressed dataset shards and delta sync')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    add = subparsers.add_parser('add', help='Store files as the new version of a dataset')
+    add.add_argument('store', help='Local store directory')
+    add.add_argument('name', help='Dataset name')
+    add.add_argument('files', nargs='+', help='Files or directories')
+    add.add_argument('--chunk-kb', type=int, default=CHUNK_BYTES // 1024, help='Average JSONL shard size (KB)')
+
+    sync_parser = subparsers.add_parser('sync', help='Send the missing shards of a dataset to a remote store')
+    sync_parser.add_argument('store', help='Local store directory')
+    sync_parser.add_argument('name', help='Dataset name')
+    sync_parser.add_argument('remote', help='Remote store: directory or ssh://[user@]host[:port]/path')
+
+    checkout = subparsers.add_parser('checkout', help='Rebuild the files of a dataset')
+    checkout.add_argument('store', help='Store directory')
+    checkout.add_argument('name', help='Dataset name')
+    checkout.add_argument('output', help='Output directory')
+
+    status = subparsers.add_parser('status', help='List the datasets of a store')
+    status.add_argument('store', help='Store directory')
+
+    gc = subparsers.add_parser('gc', help='Delete shards no manifest refers to')
+    gc.add_argument('store', help='Store directory')
+
+    args = parser.parse_args()
+    store = ShardStore(args.store)
+
+    if args.command == 'add':
+        before = store.objects()
+        manifest = store.add(args.name, args.files, chunk_bytes=args.chunk_kb * 1024)
+        new = set(manifest_objects(manifest)) - before
+        log_manifest(manifest)
+        logger.info(f"✅ {len(new)} new shards ({sum(manifest_objects(manifest)[d] for d in new) / 1e6:.2f} MB)")
+
+    elif args.command == 'sync':
+        stats = sync(store, args.name, args.remote)
+        logger.info(f"✅ Sent {stats['sent_objects']}/{stats['objects']} shards, "
+                    f"{stats['sent_bytes'] / 1e6:.2f} of {stats['bytes'] / 1e6:.2f} MB")
+        for path in stats['changed_files']:
+            logger.info(f"   changed: {path}")
+
+    elif args.command == 'checkout':
+        written = store.checkout(args.name, args.output)
+        logger.info(f"✅ {len(written)} files rebuilt in {args.output}")
+        for path in written:
+            logger.info(f"   💾 {path}")
+
+    elif args.command == 'status':
+        manifests = store.manifests()
+        if not manifests:
+            logger.info(f"📭 No datasets in {args.store}")
+        for manifest in manifests:
+            log_manifest(manifest)
+
+    elif args.command == 'gc':
+        logger.info(f"🗑️  Deleted {store.gc()} unreferenced shards")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,266 @@
+#!/usr/bin/env python3
+"""
+Streaming filter pipeline over JSONL commentary files
+read → normalize → deduplicate → quality filter → decontaminate → write, one entry at a time
+
+Memory is bounded by the near-duplicate index, not by the corpus size.
+
+Usage:
+    python stream_pipeline.py data/raw_commentary.jsonl data/filtered_commentary.jsonl --strict
+    python stream_pipeline.py data/raw_commentary.jsonl data/filtered_commentary.jsonl --exclude data/eval.bloom
+"""
+
+import os
+import re
+import json
+import argparse
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Iterable, Iterator, Optional
+import logging
+
+from commentary_entry import CommentaryEntry, as_entry, entry_to_json
+from dataset_store import Dataset
+from near_duplicates import NearDuplicateFilter
+from quality_filter import check_commentary, log_rejections
+
+if TYPE_CHECKING:  # Imported at run time only when --exclude is set
+    from contamination import BloomFilter
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+WHITESPACE_RE = re.compile(r'\s+')
+
+
+def read_entries(file_path: str) -> Iterator[CommentaryEntry]:
+    """
+    Read commentary entries from a JSONL file, one line at a time
+
+    Columnar dataset directories (dataset_store.py) are read shard by shard.
+    Legacy JSON list files are still accepted but have to be loaded whole.
+
+    Args:
+        file_path: Path to a .jsonl file, a dataset directory, or a legacy .json file
+
+    Yields:
+        Commentary entries
+    """
+    if os.path.isdir(file_path):
+        with Dataset(file_path) as dataset:
+            yield from map(CommentaryEntry.from_dict, dataset.iter_records())
+        return
+
+    with open(file_path, 'r', encoding='utf-8') as f:
+        if not file_path.endswith('.jsonl'):
+            logger.warning(f"⚠️  {file_path} is not JSONL, loading it into memory")
+            yield from map(CommentaryEntry.from_dict, json.load(f))
+            return
+
+        for line in f:
+            if line.strip():
+                yield CommentaryEntry.from_json(line)
+
+
+def write_jsonl(entries: Iterable[Dict], file_path: str) -> int:
+    """
+    Write entries to a JSONL file as they arrive
+
+    The file is written under a temporary name and moved into place at the
+    end, so an interrupted run never leaves a truncated output behind.
+
+    Args:
+        entries: Commentary entries (or any JSON-serializable records)
+        file_path: Output path
+
+    Returns:
+        Number of entries written
+    """
+    tmp_path = f"{file_path}.tmp"
+    count = 0
+
+    with open(tmp_path, 'w', encoding='utf-8') as f:
+        for entry in entries:
+            f.write(entry_to_json(entry) + '\n')
+            count += 1
+
+    os.replace(tmp_path, file_path)
+    return count
+
+
+def normalize_entries(entries: Iterable[Dict]) -> Iterator[CommentaryEntry]:
+    """
+    Normalize text and time fields, dropping entries without text
+
+    The caller's entries are left untouched: entries that need normalizing
+    are copied first.
+
+    Args:
+        entries: Commentary entries (plain dictionaries are converted)
+
+    Yields:
+        Normalized commentary entries
+    """
+    for entry in entries:
+        converted = as_entry(entry)
+        text = WHITESPACE_RE.sub(' ', converted.text or '').strip()
+        if not text:
+            continue
+
+        time = converted.time
+        if time is not None:
+            time = time.replace('′', "'").strip()
+        if text != converted.text or time != converted.time:
+            if converted is entry:
+                converted = converted.copy()
+            converted.text = text
+            converted.time = time
+
+        yield converted
+
+
+def deduplicate_entries(entries: Iterable[Dict], threshold: float = 0.8) -> Iterator[Dict]:
+    """
+    Drop near-duplicates of earlier entries (MinHash/LSH)
+
+    Args:
+        entries: Commentary dictionaries
+        threshold: Jaccard similarity above which entries are duplicates
+
+    Yields:
+        Unique commentary dictionaries
+    """
+    yield from NearDuplicateFilter(threshold=threshold).iter_unique(entries)
+
+
+def quality_filter_entries(
+    entries: Iterable[Dict],
+    strict: bool = False,
+    rejections: Optional[Counter] = None
+) -> Iterator[Dict]:
+    """
+    Keep entries that pass the quality rules
+
+    Args:
+        entries: Commentary dictionaries
+        strict: Apply stricter filtering criteria
+        rejections: Counter updated with the reason code of every rejected entry
+
+    Yields:
+        Accepted commentary dictionaries
+    """
+    for entry in entries:
+        reason = check_commentary(entry, strict=strict)
+        if reason is None:
+            yield entry
+        elif rejections is not None:
+            rejections[reason] += 1
+
+
+def filter_stream(
+    entries: Iterable[Dict],
+    strict: bool = False,
+    dedup_threshold: float = 0.8,
+    stats: Optional[Dict] = None,
+    exclude: Optional['BloomFilter'] = None
+) -> Iterator[Dict]:
+    """
+    Chain normalize → deduplicate → quality filter (→ decontaminate) over an entry stream
+
+    Args:
+        entries: Commentary dictionaries
+        strict: Apply stricter filtering criteria
+        dedup_threshold: Jaccard similarity above which entries are duplicates
+        stats: Optional dict filled with 'input', 'unique', 'rejections' (and
+            'contaminated') as the stream is consumed
+        exclude: N-gram filter of a split to keep out (contamination.py)
+
+    Yields:
+        Filtered commentary dictionaries
+    """
+    if stats is None:
+        stats = {}
+    stats.update({'input': 0, 'unique': 0, 'rejections': Counter()})
+
+    def counted(stream: Iterable[Dict], key: str) -> Iterator[Dict]:
+        for entry in stream:
+            stats[key] += 1
+            yield entry
+
+    stream = counted(entries, 'input')
+    stream = normalize_entries(stream)
+    stream = counted(deduplicate_entries(stream, threshold=dedup_threshold), 'unique')
+    stream = quality_filter_entries(stream, strict=strict, rejections=stats['rejections'])
+    if exclude is not None:
+        # Imported here: the contamination check needs numpy, plain filtering does not
+        from contamination import NGRAM_SIZE, drop_contaminated
+        stream = drop_contaminated(stream, exclude, exclude.metadata.get('ngram_size', NGRAM_SIZE), stats=stats)
+    yield from stream
+
+
+def run_pipeline(
+    input_file: str,
+    output_file: str,
+    strict: bool = False,
+    dedup_threshold: float = 0.8,
+    exclude: Optional[str] = None
+) -> Dict:
+    """
+    Filter a commentary file into a JSONL training candidate file
+
+    Args:
+        input_file: Raw commentary (.jsonl, or legacy .json)
+        output_file: Output JSONL path
+        strict: Apply stricter filtering criteria
+        dedup_threshold: Jaccard similarity above which entries are duplicates
+        exclude: Split whose commentary must not leak in (JSONL, or a .bloom filter)
+
+    Returns:
+        Dictionary of pipeline counts
+    """
+    logger.info(f"📂 Streaming {input_file} → {output_file}")
+
+    stats = {}
+    bloom = None
+    if exclude:
+        from contamination import load_or_build
+        bloom = load_or_build(exclude)
+    written = write_jsonl(
+        filter_stream(read_entries(input_file), strict=strict, dedup_threshold=dedup_threshold,
+                      stats=stats, exclude=bloom),
+        output_file
+    )
+    stats['written'] = written
+
+    logger.info(f"✅ Pipeline complete:")
+    logger.info(f"   Original: {stats['input']}")
+    logger.info(f"   After deduplication: {stats['unique']}")
+    if bloom is not None:
+        logger.info(f"   After quality filter: {written + stats['contaminated']}")
+        logger.info(f"   After contamination check: {written}")
+    else:
+        logger.info(f"   After quality filter: {written}")
+    log_rejections(stats['rejections'], stats['input'])
+
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Stream commentary through dedupe and quality filters')
+    parser.add_argument('input', help='Input commentary file (.jsonl, dataset directory, or legacy .json list)')
+    parser.add_argument('output', help='Output JSONL file')
+    parser.add_argument('--strict', action='store_true', help='Use strict quality filtering')
+    parser.add_argument('--dedup-threshold', type=float, default=0.8,
+                        help='Jaccard similarity above which entries count as near-duplicates')
+    parser.add_argument('--exclude', help='Drop entries overlapping this split (JSONL, or .bloom from contamination.py)')
+
+    args = parser.parse_args()
+
+    run_pipeline(args.input, args.output, strict=args.strict, dedup_threshold=args.dedup_threshold,
+                 exclude=args.exclude)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,281 @@
+#!/usr/bin/env python3
+"""
+Streaming, mergeable quality metrics for commentary datasets
+Constant memory: HyperLogLog for vocabulary size, running moments and
+fixed-bin histograms for lengths, counters for sources and event types
+
+Accumulators are updated one record at a time and merged across worker shards.
+"""
+
+import base64
+import hashlib
+import math
+from bisect import bisect_right
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
+
+
+@lru_cache(maxsize=1 << 16)
+def hash64(value: str) -> int:
+    """Stable 64-bit hash (identical across processes, unlike hash())"""
+    return int.from_bytes(hashlib.blake2b(value.encode('utf-8'), digest_size=8).digest(), 'little')
+
+
+class HyperLogLog:
+    """Approximate distinct counter (~0.8% standard error with p=14, 16 KB)"""
+
+    def __init__(self, p: int = 14):
+        """
+        Initialize counter
+
+        Args:
+            p: Precision; 2^p one-byte registers
+        """
+        self.p = p
+        self.m = 1 << p
+        self.registers = bytearray(self.m)
+        self._suffix_bits = 64 - p
+        self._suffix_mask = (1 << self._suffix_bits) - 1
+
+    def add(self, value: str):
+        """Add one value"""
+        x = hash64(value)
+        index = x >> self._suffix_bits
+        rank = self._suffix_bits - (x & self._suffix_mask).bit_length() + 1
+        if rank > self.registers[index]:
+            self.registers[index] = rank
+
+    def count(self) -> int:
+        """Estimated number of distinct values added"""
+        m = self.m
+        alpha = 0.7213 / (1 + 1.079 / m)
+        estimate = alpha * m * m / sum(2.0 ** -r for r in self.registers)
+
+        zeros = self.registers.count(0)
+        if estimate <= 2.5 * m and zeros:
+            # Small range correction: linear counting
+            estimate = m * math.log(m / zeros)
+
+        return int(round(estimate))
+
+    def merge(self, other: 'HyperLogLog'):
+        """Merge another counter of the same precision into this one"""
+        if other.p != self.p:
+            raise ValueError(f"Cannot merge HyperLogLog with p={other.p} into p={self.p}")
+        self.registers = bytearray(map(max, self.registers, other.registers))
+
+    def to_state(self) -> Dict:
+        return {'p': self.p, 'registers': base64.b64encode(bytes(self.registers)).decode('ascii')}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'HyperLogLog':
+        hll = cls(p=state['p'])
+        hll.registers = bytearray(base64.b64decode(state['registers']))
+        return hll
+
+
+class RunningMoments:
+    """Count, mean, variance, min and max of a stream (Welford / Chan merge)"""
+
+    def __init__(self):
+        self.count = 0
+        self.mean = 0.0
+        self.m2 = 0.0
+        self.min: Optional[float] = None
+        self.max: Optional[float] = None
+
+    def update(self, value: float):
+        self.count += 1
+        delta = value - self.mean
+        self.mean += delta / self.count
+        self.m2 += delta * (value - self.mean)
+        self.min = value if self.min is None else min(self.min, value)
+        self.max = value if self.max is None else max(self.max, value)
+
+    def merge(self, other: 'RunningMoments'):
+        if not other.count:
+            return
+        if not self.count:
+            self.count, self.mean, self.m2 = other.count, other.mean, other.m2
+            self.min, self.max = other.min, other.max
+            return
+
+        total = self.count + other.count
+        delta = other.mean - self.mean
+        self.mean += delta * other.count / total
+        self.m2 += other.m2 + delta * delta * self.count * other.count / total
+        self.count = total
+        self.min = min(self.min, other.min)
+        self.max = max(self.max, other.max)
+
+    @property
+    def std(self) -> float:
+        return math.sqrt(self.m2 / self.count) if self.count else 0.0
+
+    def to_dict(self) -> Dict:
+        return {'mean': self.mean, 'std': self.std, 'min': self.min, 'max': self.max}
+
+    def to_state(self) -> Dict:
+        return {'count': self.count, 'mean': self.mean, 'm2': self.m2, 'min': self.min, 'max': self.max}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'RunningMoments':
+        moments = cls()
+        moments.count, moments.mean, moments.m2 = state['count'], state['mean'], state['m2']
+        moments.min, moments.max = state['min'], state['max']
+        return moments
+
+
+class Histogram:
+    """Fixed-bin histogram; the last bin collects everything above the last edge"""
+
+    def __init__(self, edges: List[float]):
+        """
+        Initialize histogram
+
+        Args:
+            edges: Ascending lower bin edges
+        """
+        self.edges = list(edges)
+        self.counts = [0] * len(self.edges)
+
+    def update(self, value: float, count: int = 1):
+        self.counts[max(bisect_right(self.edges, value) - 1, 0)] += count
+
+    def merge(self, other: 'Histogram'):
+        if other.edges != self.edges:
+            raise ValueError("Cannot merge histograms with different bin edges")
+        self.counts = [a + b for a, b in zip(self.counts, other.counts)]
+
+    def to_dict(self) -> Dict[str, int]:
+        labels = [f"{low}-{high}" for low, high in zip(self.edges, self.edges[1:])]
+        labels.append(f"{self.edges[-1]}+")
+        return dict(zip(labels, self.counts))
+
+    def to_state(self) -> Dict:
+        return {'edges': self.edges, 'counts': self.counts}
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'Histogram':
+        histogram = cls(state['edges'])
+        histogram.counts = list(state['counts'])
+        return histogram
+
+
+CHAR_LENGTH_EDGES = list(range(0, 525, 25))
+WORD_LENGTH_EDGES = list(range(0, 105, 5))
+
+
+class QualityMetrics:
+    """Mergeable accumulator behind calculate_quality_metrics()"""
+
+    def __init__(self):
+        self.total_examples = 0
+        self.total_words = 0
+        self.total_chars = 0
+        self.vocabulary = HyperLogLog()
+        self.char_lengths = RunningMoments()
+        self.word_lengths = RunningMoments()
+        self.char_histogram = Histogram(CHAR_LENGTH_EDGES)
+        self.word_histogram = Histogram(WORD_LENGTH_EDGES)
+        self.sources: Dict[str, int] = {}
+        self.event_types: Dict[str, int] = {}
+
+    def update(self, entry: Dict):
+        """Add one commentary entry"""
+        text = entry['text']
+        words = text.lower().split()
+
+        self.total_examples += 1
+        self.total_words += len(words)
+        self.total_chars += len(text)
+
+        for word in words:
+            self.vocabulary.add(word)
+
+        self.char_lengths.update(len(text))
+        self.word_lengths.update(len(words))
+        self.char_histogram.update(len(text))
+        self.word_histogram.update(len(words))
+
+        source = entry.get('source', 'unknown')
+        self.sources[source] = self.sources.get(source, 0) + 1
+        event_type = entry.get('event_type', 'unknown')
+        self.event_types[event_type] = self.event_types.get(event_type, 0) + 1
+
+    def update_many(self, entries: Iterable[Dict]) -> 'QualityMetrics':
+        for entry in entries:
+            self.update(entry)
+        return self
+
+    def merge(self, other: 'QualityMetrics') -> 'QualityMetrics':
+        """Merge the metrics of another shard into this one"""
+        self.total_examples += other.total_examples
+        self.total_words += other.total_words
+        self.total_chars += other.total_chars
+        self.vocabulary.merge(other.vocabulary)
+        self.char_lengths.merge(other.char_lengths)
+        self.word_lengths.merge(other.word_lengths)
+        self.char_histogram.merge(other.char_histogram)
+        self.word_histogram.merge(other.word_histogram)
+
+        for source, count in other.sources.items():
+            self.sources[source] = self.sources.get(source, 0) + count
+        for event_type, count in other.event_types.items():
+            self.event_types[event_type] = self.event_types.get(event_type, 0) + count
+
+        return self
+
+    def to_dict(self) -> Dict:
+        """
+        Report in the calculate_quality_metrics() format
+
+        Returns:
+            Metrics dictionary (empty if nothing was added)
+        """
+        if not self.total_examples:
+            return {}
+
+        vocabulary_size = self.vocabulary.count()
+
+        return {
+            'total_examples': self.total_examples,
+            'avg_length_chars': self.total_chars / self.total_examples,
+            'avg_length_words': self.total_words / self.total_examples,
+            'vocabulary_size': vocabulary_size,
+            'vocabulary_diversity': min(vocabulary_size / self.total_words, 1.0) if self.total_words else 0,
+            'sources': dict(self.sources),
+            'event_types': dict(self.event_types),
+            'length_chars': {**self.char_lengths.to_dict(), 'histogram': self.char_histogram.to_dict()},
+            'length_words': {**self.word_lengths.to_dict(), 'histogram': self.word_histogram.to_dict()},
+        }
+
+    def to_state(self) -> Dict:
+        """JSON-serializable state, for persisting or shipping between processes"""
+        return {
+            'total_examples': self.total_examples,
+            'total_words': self.total_words,
+            'total_chars': self.total_chars,
+            'vocabulary': self.vocabulary.to_state(),
+            'char_lengths': self.char_lengths.to_state(),
+            'word_lengths': self.word_lengths.to_state(),
+            'char_histogram': self.char_histogram.to_state(),
+            'word_histogram': self.word_histogram.to_state(),
+            'sources': self.sources,
+            'event_types': self.event_types,
+        }
+
+    @classmethod
+    def from_state(cls, state: Dict) -> 'QualityMetrics':
+        metrics = cls()
+        metrics.total_examples = state['total_examples']
+        metrics.total_words = state['total_words']
+        metrics.total_chars = state['total_chars']
+        metrics.vocabulary = HyperLogLog.from_state(state['vocabulary'])
+        metrics.char_lengths = RunningMoments.from_state(state['char_lengths'])
+        metrics.word_lengths = RunningMoments.from_state(state['word_lengths'])
+        metrics.char_histogram = Histogram.from_state(state['char_histogram'])
+        metrics.word_histogram = Histogram.from_state(state['word_histogram'])
+        metrics.sources = dict(state['sources'])
+        metrics.event_types = dict(state['event_types'])
+        return metrics
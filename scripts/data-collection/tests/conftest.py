@@ -0,0 +1,27 @@
+"""Shared fixtures; the data-collection scripts are flat modules, imported from the parent directory"""
+
+import os
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+
+def commentary(i: int, **fields) -> dict:
+    """A distinct commentary entry that passes the quality rules"""
+    players = ['Mbappé', 'Hakimi', 'Salah', 'Osimhen', 'Ziyech', 'Mané', 'Kudus', 'Haller']
+    entry = {
+        'source': 'lequipe',
+        'time': f"{i % 90 + 1}'",
+        'text': (f"{players[i % len(players)]} récupère le ballon au milieu de terrain, élimine {i} défenseurs "
+                 f"et frappe du pied {'droit' if i % 2 else 'gauche'}, le gardien détourne en corner"),
+        'event_type': 'commentary',
+    }
+    entry.update(fields)
+    return entry
+
+
+@pytest.fixture
+def entries():
+    return [commentary(i) for i in range(50)]
@@ -0,0 +1,78 @@
+"""Async pipeline: output on success, no hang and no partial file when a stage fails"""
+
+import asyncio
+import json
+
+import pytest
+
+import async_pipeline
+from async_pipeline import AsyncCommentaryPipeline
+from conftest import commentary
+from crawl_scheduler import CrawlScheduler
+
+
+def make_fetch(per_url: int = 40):
+    async def fetch(url):
+        await asyncio.sleep(0)
+        base = int(url.rsplit('/', 1)[1]) * per_url
+        return [commentary(base + i) for i in range(per_url)]
+    return fetch
+
+
+def test_writes_every_unique_accepted_entry(tmp_path):
+    output = tmp_path / 'out.jsonl'
+    pipeline = AsyncCommentaryPipeline(make_fetch(), str(output), queue_size=1, batch_size=16, dedup_threshold=0.95)
+
+    report = asyncio.run(pipeline.run([f'https://example.com/{i}' for i in range(10)]))
+
+    lines = output.read_text(encoding='utf-8').splitlines()
+    assert report['scraped'] == 400
+    assert len(lines) == report['written'] > 0
+    assert all(json.loads(line)['text'] for line in lines)
+    assert not (tmp_path / 'out.jsonl.tmp').exists()
+
+
+@pytest.mark.parametrize('stage', ['filter', 'write'])
+def test_stage_failure_is_raised_without_hanging(tmp_path, monkeypatch, stage):
+    def broken(*args, **kwargs):
+        raise RuntimeError('stage failed')
+
+    if stage == 'filter':
+        monkeypatch.setattr(async_pipeline, 'check_commentary', broken)
+    else:
+        monkeypatch.setattr(async_pipeline, 'entry_to_json', broken)
+
+    output = tmp_path / 'out.jsonl'
+    # Tiny queues: the scrapers fill them immediately once a consumer dies
+    pipeline = AsyncCommentaryPipeline(make_fetch(), str(output), queue_size=1, batch_size=8, dedup_threshold=0.95)
+
+    async def run():
+        return await asyncio.wait_for(pipeline.run([f'https://example.com/{i}' for i in range(50)]), timeout=20)
+
+    with pytest.raises(RuntimeError, match='stage failed'):
+        asyncio.run(run())
+
+    assert not output.exists()
+    assert not (tmp_path / 'out.jsonl.tmp').exists()
+
+
+def test_scheduler_counts_what_was_written(tmp_path):
+    async def fetch(url):
+        await asyncio.sleep(0)
+        i = int(url.rsplit('/', 1)[1])
+        # Every other match repeats the previous one: scraped, but dropped as near-duplicates
+        base = (i - i % 2) * 40
+        return [commentary(base + j) for j in range(40)] + [{'text': 'But !', 'time': "3'"}]
+
+    scheduler = CrawlScheduler({'lequipe': 10_000}, history_file=None)
+    output = tmp_path / 'out.jsonl'
+    pipeline = AsyncCommentaryPipeline(fetch, str(output), queue_size=1, batch_size=16, dedup_threshold=0.95,
+                                       scheduler=scheduler)
+
+    report = asyncio.run(pipeline.run([f'https://www.lequipe.fr/Football/match-direct/can/2025/m/{i}'
+                                       for i in range(6)]))
+
+    assert report['scraped'] == 6 * 41
+    assert scheduler.accepted['lequipe'] == report['written'] == len(output.read_text().splitlines()) < 3 * 41
+    assert scheduler.fetched == 6 and not scheduler.in_flight
+    assert scheduler.acceptance['lequipe'].to_state() == [report['written'], report['scraped']]
@@ -0,0 +1,46 @@
+import json
+
+from chat_export import TEMPLATES
+from export_to_jsonl import export_to_jsonl
+
+
+def historical_example(entry):
+    """export_to_jsonl.py's record before it moved to chat_export"""
+    return {
+        "messages": [
+            {
+                "role": "system",
+                "content": "Tu es un commentateur sportif professionnel pour L'Équipe, spécialisé dans le football africain. Ton style est vif, précis, émotionnel mais jamais sensationnaliste."
+            },
+            {
+                "role": "user",
+                "content": f"Génère un commentaire pour: Minute {entry['time']} - Événement: {entry['event_type']}"
+            },
+            {
+                "role": "assistant",
+                "content": entry['text']
+            }
+        ]
+    }
+
+
+def test_export_to_jsonl_keeps_its_format(tmp_path, entries):
+    entries[3]['event_type'] = 'goal'
+    source = tmp_path / 'training_commentary.json'
+    source.write_text(json.dumps(entries, ensure_ascii=False), encoding='utf-8')
+    output = tmp_path / 'training.jsonl'
+
+    export_to_jsonl(str(source), str(output))
+
+    with open(output, encoding='utf-8') as f:
+        assert [json.loads(line) for line in f] == [historical_example(entry) for entry in entries]
+
+
+def test_review_export_keeps_its_format():
+    assert TEMPLATES['review'].render("45'+2", 'goal', 'But !') == {
+        "messages": [
+            {"role": "system", "content": "Tu es un commentateur sportif professionnel pour L'Équipe."},
+            {"role": "user", "content": "Génère un commentaire pour: Minute 45'+2 - goal"},
+            {"role": "assistant", "content": 'But !'}
+        ]
+    }
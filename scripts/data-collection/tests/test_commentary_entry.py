@@ -0,0 +1,69 @@
+import json
+import subprocess
+import sys
+from datetime import datetime
+from pathlib import Path
+
+from commentary_entry import CommentaryEntry, entry_to_json, local_timestamp
+from dataset_store import timestamp_to_int
+from parse_lequipe_commentary import parse_commentary_file
+from stream_pipeline import normalize_entries
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_json_round_trip_keeps_key_order():
+    lines = [
+        # Scrapers' order
+        {'source': 'lequipe', 'time': "12'", 'text': 'Tir de Hakimi', 'event_type': 'commentary',
+         'scraped_at': '2025-01-15T10:30:00.123456', 'url': 'https://www.lequipe.fr/m/1', 'method': 'json'},
+        # runpod_data_collector.py order, with a field outside the schema
+        {'source': 'lequipe', 'match': 'Maroc - Comores', 'time': "90'+3", 'text': 'Fin du match',
+         'event_type': 'commentary', 'url': 'https://www.lequipe.fr/m/1', 'scraped_at': '2025-01-15T22:01:00',
+         'event_id': 7},
+        {'event_id': 8, 'text': 'But !', 'source': 'rmc'},
+    ]
+    for data in lines:
+        line = json.dumps(data, ensure_ascii=False)
+        entry = CommentaryEntry.from_json(line)
+        assert entry_to_json(entry) == line
+        assert list(entry.keys()) == list(data)
+        assert dict(entry) == data
+
+
+def test_normalized_entries_keep_key_order():
+    data = {'text': '  But   de Salah ', 'source': 'rmc', 'time': "45′"}
+    [entry] = normalize_entries([data])
+    assert list(entry.to_dict().items()) == [('text', 'But de Salah'), ('source', 'rmc'), ('time', "45'")]
+
+
+def test_local_timestamp_renders_local_wall_clock():
+    before = datetime.now()
+    entry = CommentaryEntry('But !', scraped_at=local_timestamp())
+    after = datetime.now()
+    assert timestamp_to_int(before.isoformat()) <= entry.scraped_at <= timestamp_to_int(after.isoformat())
+    assert before.isoformat()[:13] <= entry['scraped_at'][:13] <= after.isoformat()[:13]
+
+
+def test_scrapers_import_without_editing_sys_path():
+    # As a package module (python -m scrapers.x, batch_scraper) and as a top-level module (collect_commentary)
+    code = ("import sys; before = list(sys.path); "
+            "import scrapers.lequipe_scraper, scrapers.rmc_scraper; "
+            "sys.path.insert(0, 'scrapers'); before.insert(0, 'scrapers'); "
+            "import lequipe_scraper, rmc_scraper; "
+            "assert sys.path == before, sys.path")
+    subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR, check=True)
+
+
+def test_rtf_export_parser_produces_entries(tmp_path):
+    export = tmp_path / 'export.txt'
+    export.write_text("45′ But de Ziyech (1-0) Frappe enroulée du pied gauche dans la lucarne\n"
+                      "pas une ligne de commentaire\n", encoding='utf-8')
+
+    [entry] = parse_commentary_file(str(export))
+    assert isinstance(entry, CommentaryEntry)
+    record = json.loads(entry_to_json(entry))
+    assert list(record) == ['source', 'time', 'text', 'event_type', 'scraped_at', 'match']
+    assert (record['time'], record['event_type']) == ("45'", 'goal')
+    assert record['text'] == 'Frappe enroulée du pied gauche dans la lucarne'
+    assert datetime.fromisoformat(record['scraped_at']).tzinfo is None
@@ -0,0 +1,32 @@
+"""AFCON generator: a seed reproduces the file whatever the process count, without repeated examples"""
+
+import json
+
+import pytest
+
+pytest.importorskip('numpy')
+
+from create_afcon_training_data import generate_dataset
+
+
+def test_same_seed_same_file_across_processes(tmp_path):
+    single, pooled = tmp_path / 'single.jsonl', tmp_path / 'pooled.jsonl'
+
+    stats = generate_dataset(str(single), num_examples=2000, seed=2025, processes=1, shard_size=500)
+    generate_dataset(str(pooled), num_examples=2000, seed=2025, processes=4, shard_size=500)
+
+    assert stats['shards'] > 1
+    assert single.read_bytes() == pooled.read_bytes()
+
+    lines = single.read_bytes().splitlines()
+    assert len(lines) == stats['examples'] == 2000
+    assert len(set(lines)) == len(lines)
+    assert sum(stats['event_types'].values()) == 2000
+    assert [json.loads(line) for line in lines[:len(stats['samples'])]] == stats['samples']
+
+
+def test_seed_changes_the_file(tmp_path):
+    first, second = tmp_path / 'first.jsonl', tmp_path / 'second.jsonl'
+    generate_dataset(str(first), num_examples=200, seed=1, shard_size=500)
+    generate_dataset(str(second), num_examples=200, seed=2, shard_size=500)
+    assert first.read_bytes() != second.read_bytes()
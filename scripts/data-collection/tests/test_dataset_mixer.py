@@ -0,0 +1,60 @@
+import json
+
+import pytest
+
+from dataset_mixer import Source, mix_datasets
+
+
+def write_source(path, name, count):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            f.write(json.dumps({'source': name, 'id': i}) + '\n')
+            if i % 100 == 0:
+                f.write('\n')
+
+
+@pytest.mark.parametrize('spec, path, weight, cap', [
+    ('data/a.jsonl:0.7', 'data/a.jsonl', 0.7, None),
+    ('data/a.jsonl:0.7:500', 'data/a.jsonl', 0.7, 500),
+    ('C:\\data\\a.jsonl:0.7', 'C:\\data\\a.jsonl', 0.7, None),
+    ('C:\\data\\a.jsonl:0.7:500', 'C:\\data\\a.jsonl', 0.7, 500),
+    ('runs/12:30.jsonl:1', 'runs/12:30.jsonl', 1.0, None),
+])
+def test_source_path_may_contain_colons(spec, path, weight, cap):
+    source = Source.parse(spec)
+    assert (source.path, source.weight, source.cap) == (path, weight, cap)
+
+
+@pytest.mark.parametrize('spec', ['a.jsonl', 'a.jsonl:heavy', 'a.jsonl:0.5:many', 'a.jsonl:0'])
+def test_bad_source_specs(spec):
+    with pytest.raises(ValueError):
+        Source.parse(spec)
+
+
+def test_mix_takes_exact_quotas(tmp_path):
+    counts = {'lequipe': 9000, 'flashscore': 4000, 'synthetic': 2500}
+    for name, count in counts.items():
+        write_source(tmp_path / f'{name}.jsonl', name, count)
+    specs = [f"{tmp_path / 'lequipe.jsonl'}:0.7", f"{tmp_path / 'flashscore.jsonl'}:0.2",
+             f"{tmp_path / 'synthetic.jsonl'}:0.1"]
+
+    output = tmp_path / 'mix.jsonl'
+    stats = mix_datasets([Source.parse(spec) for spec in specs], str(output), total=9001, seed=7)
+
+    # 6300.7 / 1800.2 / 900.1: the largest remainder gets the last line
+    assert stats['total'] == 9001
+    assert [source['taken'] for source in stats['sources']] == [6301, 1800, 900]
+    with open(output, encoding='utf-8') as f:
+        rows = [json.loads(line) for line in f]
+    assert len(rows) == 9001
+    assert len({(row['source'], row['id']) for row in rows}) == 9001
+
+    taken = [sum(row['source'] == name for row in rows) for name in counts]
+    assert taken == [source['taken'] for source in stats['sources']]
+
+    # Every prefix of the output stays close to the target shares
+    seen = 0
+    for position, row in enumerate(rows, 1):
+        seen += row['source'] == 'lequipe'
+        if position % 1000 == 0:
+            assert abs(seen / position - 0.7) < 0.05
@@ -0,0 +1,83 @@
+import json
+
+import pytest
+
+from commentary_entry import CommentaryEntry
+from dataset_store import Dataset, DatasetWriter
+from stream_pipeline import read_entries
+
+
+def records():
+    for i in range(250):
+        record = {
+            'source': 'lequipe' if i % 3 else 'rmc',
+            'time': f"{i % 90}'+{i % 4}" if i % 7 else None,
+            'text': f"Action n°{i} : frappe enroulée, le gardien détourne ✋" if i % 11 else '',
+            'event_type': 'goal' if i % 13 == 0 else 'commentary',
+            'scraped_at': f'2025-01-{i % 28 + 1:02d}T10:11:{i % 60:02d}' + ('.250000' if i % 2 else ''),
+            'url': f'https://www.lequipe.fr/match/{i // 40}',
+        }
+        if i % 5 == 0:
+            record['event_id'] = i
+            record['players'] = ['Mbappé', i]
+        yield {key: value for key, value in record.items() if value is not None}
+
+
+@pytest.fixture
+def store(tmp_path):
+    path = tmp_path / 'store'
+    with DatasetWriter(str(path), shard_size=64) as writer:
+        writer.write_many(records())
+    return path
+
+
+def test_bulk_decoding_round_trips(store):
+    with Dataset(str(store)) as dataset:
+        assert list(dataset.iter_records()) == list(records())
+        # Whole-column decoding agrees with row access
+        for shard_index in range(len(dataset.manifest['shards'])):
+            for name in dataset.columns + ['_extra']:
+                column = dataset._column_shard(shard_index, name)
+                assert column.to_list() == [column[i] for i in range(column.rows)]
+
+
+def test_projection(store):
+    with Dataset(str(store)) as dataset:
+        rows = list(dataset.iter_rows(['text', 'scraped_at']))
+    assert rows == [{'text': record['text'], 'scraped_at': record['scraped_at']} for record in records()]
+
+
+def test_close_unmaps_columns(store):
+    dataset = Dataset(str(store))
+    rows = dataset.iter_rows(['text'])
+    first, second = next(rows), next(rows)
+    assert dataset._columns
+    mapped = [mapped for column in dataset._columns.values() for mapped, _ in column._maps if mapped is not None]
+    dataset.close()
+
+    assert (first, second) == ({'text': ''}, {'text': 'Action n°1 : frappe enroulée, le gardien détourne ✋'})
+    assert mapped and all(m.closed for m in mapped)
+    # Reopens on the next read
+    assert len(list(dataset.iter_rows(['url']))) == 250
+
+
+def test_chat_records_round_trip(tmp_path):
+    examples = [{'messages': [{'role': 'system', 'content': 'Commentateur'},
+                              {'role': 'user', 'content': f'Minute {i}'},
+                              {'role': 'assistant', 'content': f'Réponse {i}'}]} for i in range(10)]
+    examples.append({'messages': [{'role': 'user', 'content': 'seul'}], 'id': 'odd'})
+    with DatasetWriter(str(tmp_path / 'chat'), schema='chat', shard_size=4) as writer:
+        writer.write_many(examples)
+
+    with Dataset(str(tmp_path / 'chat')) as dataset:
+        assert [json.dumps(record) for record in dataset.iter_records()] == [json.dumps(e) for e in examples]
+
+
+def test_scraper_entries_round_trip(tmp_path):
+    # batch_scraper.py and the pod collector write CommentaryEntry lists directly
+    entries = [CommentaryEntry.from_dict(record) for record in records()]
+    with DatasetWriter(str(tmp_path / 'training_commentary')) as writer:
+        writer.write_many(entries)
+
+    assert [entry.to_dict() for entry in read_entries(str(tmp_path / 'training_commentary'))] == \
+        [entry.to_dict() for entry in entries]
@@ -0,0 +1,83 @@
+"""Live poller: events parsed by LeQuipeScraper, only new ones returned"""
+
+import io
+
+from scrapers.lequipe_live_scraper import LeQuipeLiveScraper
+from scrapers.lequipe_scraper import LeQuipeScraper
+
+
+def article(event_id: int, minute: str, summary: str, picto: str = None, title: str = None) -> str:
+    img = f'<img src="/img/icons/live/ico_{picto}.svg" height="20">' if picto else ''
+    heading = f'<h2 class="grid__title">{title}</h2>' if title else ''
+    return (f'<article id="{event_id}" class="grid__item"><div class="CommentsLive__event">'
+            f'<span class="CommentsLive__time">\n  {minute}\n</span> {img}</div>'
+            f'<div class="grid__content">{heading}<p class="grid__summary">{summary}</p>'
+            f'<div class="playerCard">Achraf Hakimi Défenseur</div></div></article>')
+
+
+class FakeResponse:
+    def __init__(self, page: str):
+        self.page = page
+        self.status_code = 200
+        self.headers = {'Content-Type': 'text/html; charset=utf-8', 'ETag': '"v1"'}
+        self.raw = io.BytesIO(page.encode('utf-8'))
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def raise_for_status(self):
+        pass
+
+    def iter_content(self, chunk_size, decode_unicode):
+        # Small chunks: articles span several of them
+        for i in range(0, len(self.page), 50):
+            self.raw.seek(i + 50)
+            yield self.page[i:i + 50]
+
+
+class FakeSession:
+    def __init__(self, pages):
+        self.pages = list(pages)
+
+    def get(self, url, **kwargs):
+        return FakeResponse(self.pages.pop(0))
+
+
+def test_poll_returns_new_events_oldest_first(tmp_path):
+    first = [
+        article(3, "12'", 'Frappe de Hakimi, le gardien détourne.'),
+        article(2, "8'", 'Ziyech ouvre le score &amp; célèbre !', picto='but', title='BUT !'),
+        '<article data-v="1"><p>Publicité</p></article>',
+        article(1, "1'", "C'est parti au stade Mohammed-V."),
+    ]
+    second = [article(5, "90'+4", 'Fin du match.', picto='sifflet_fin'),
+              article(4, "88′", 'Carton jaune pour Saïss.')] + first
+
+    scraper = LeQuipeLiveScraper(state_file=str(tmp_path / 'cursors.json'), known_events_to_stop=2)
+    scraper.session = FakeSession(['<html>' + ''.join(page) + '</html>' for page in (first, second)])
+    url = 'https://www.lequipe.fr/Football/match-direct/can/2025/m/1'
+
+    events = scraper.poll(url)
+    assert [event['event_id'] for event in events] == ['1', '2', '3']
+    assert events[1].text == 'BUT ! Ziyech ouvre le score & célèbre !'
+    assert [event.event_type for event in events] == ['commentary', 'goal', 'commentary']
+    assert {event.method for event in events} == {'live'} and events[0].url == url
+    assert not scraper.cursor(url)['finished']
+
+    events = scraper.poll(url)
+    assert [(event['event_id'], event.time, event.event_type) for event in events] == [
+        ('4', "88'", 'yellow_card'), ('5', "90'+4", 'commentary')]
+    assert scraper.cursor(url)['finished']
+    assert scraper.cursor(url)['seen_ids'] == ['1', '2', '3', '4', '5']
+
+
+def test_full_page_extraction_matches_the_poller():
+    from bs4 import BeautifulSoup
+
+    page = '<html>' + article(7, "30'", 'Penalty sifflé pour le Maroc !') + '</html>'
+    [entry] = LeQuipeScraper().extract_commentary(BeautifulSoup(page, 'html.parser'))
+    assert (entry.text, entry.time, entry.event_type, entry['event_id']) == (
+        'Penalty sifflé pour le Maroc !', "30'", 'penalty', '7')
@@ -0,0 +1,39 @@
+import random
+
+import pytest
+
+import near_duplicates
+from near_duplicates import MinHasher, NearDuplicateFilter
+
+from conftest import commentary
+
+
+def corpus():
+    rng = random.Random(3)
+    words = ['but', 'Mbappé', 'frappe', 'corner', 'gardien', 'été', '⚽', '2-1', 'hors-jeu', 'VAR', 'x' * 40]
+    texts = [commentary(i)['text'] for i in range(200)]
+    texts += [' '.join(rng.choice(words) for _ in range(rng.randint(1, 30))) for _ in range(300)]
+    return texts + ['', '   ', '!!!', 'un', 'deux mots']
+
+
+def test_numpy_signatures_match_pure_python(monkeypatch):
+    pytest.importorskip('numpy')
+    texts = corpus()
+    hasher = MinHasher(num_perm=128, shingle_size=3, seed=5)
+    vectorized = hasher.signatures(texts)
+
+    monkeypatch.setattr(near_duplicates, 'np', None)
+    assert hasher.signatures(texts) == vectorized
+    assert [hasher.signature(text) for text in texts[::37]] == vectorized[::37]
+    assert vectorized[-4] is None
+
+
+def test_duplicate_flags_do_not_depend_on_numpy(monkeypatch):
+    pytest.importorskip('numpy')
+    texts = corpus()
+    texts += [text + ' !' for text in texts[:100]]
+    flags = NearDuplicateFilter(threshold=0.8).flag_duplicates(texts)
+
+    monkeypatch.setattr(near_duplicates, 'np', None)
+    assert NearDuplicateFilter(threshold=0.8).flag_duplicates(texts) == flags
+    assert any(flags[-100:])
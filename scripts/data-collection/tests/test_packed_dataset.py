@@ -0,0 +1,87 @@
+"""Packed dataset: best-fit packing, label masking, per-example attention and positions"""
+
+import json
+import random
+
+import pytest
+
+np = pytest.importorskip('numpy')
+
+from packed_dataset import IGNORE_INDEX, PackedDataset, pack_file, pack_lengths
+
+
+class CharTokenizer:
+    """One token per character; the chat template is role tags around each message"""
+
+    pad_token_id = 0
+    eos_token_id = 0
+
+    def apply_chat_template(self, messages, tokenize=False, add_generation_prompt=False):
+        text = ''.join(f"<{m['role']}>{m['content']}|" for m in messages)
+        return text + '<assistant>' if add_generation_prompt else text
+
+    def __call__(self, texts, add_special_tokens=False):
+        return {'input_ids': [[ord(c) for c in text] for text in texts]}
+
+
+def chat(answer):
+    return {'messages': [
+        {'role': 'system', 'content': 'S'},
+        {'role': 'user', 'content': 'U'},
+        {'role': 'assistant', 'content': answer},
+    ]}
+
+
+def test_pack_lengths_is_best_fit_decreasing():
+    assert pack_lengths([5, 4, 3, 3, 2, 1], 8) == [[0, 2], [1, 3, 5], [4]]
+
+
+def test_pack_lengths_never_exceeds_capacity():
+    rng = random.Random(0)
+    lengths = [rng.randint(1, 64) for _ in range(500)]
+
+    sequences = pack_lengths(lengths, 64)
+
+    assert sorted(i for sequence in sequences for i in sequence) == list(range(len(lengths)))
+    assert all(sum(lengths[i] for i in sequence) <= 64 for sequence in sequences)
+    # Best fit leaves at most one sequence less than half full
+    assert sum(sum(lengths[i] for i in sequence) <= 32 for sequence in sequences) <= 1
+
+
+def test_packed_sequences_mask_prompts_and_padding(tmp_path):
+    tokenizer = CharTokenizer()
+    prompt_len = len(tokenizer.apply_chat_template(chat('')['messages'][:-1], add_generation_prompt=True))
+    answers = ['a' * 10, 'b' * 40, 'c' * 5]
+    source = tmp_path / 'chat.jsonl'
+    source.write_text(''.join(json.dumps(chat(answer)) + '\n' for answer in answers), encoding='utf-8')
+
+    # Examples are prompt (29 tokens) + answer + '|': 40, 70 and 35 tokens in 80-token sequences
+    assert prompt_len == 29
+    manifest = pack_file(str(source), str(tmp_path / 'packed'), 'char', sequence_len=80, tokenizer=tokenizer)
+    assert (manifest['examples'], manifest['sequences']) == (3, 2)
+
+    dataset = PackedDataset(str(tmp_path / 'packed'))
+    first, second = dataset[0], dataset[1]
+    assert dataset.example_lengths(0).tolist() == [70]
+    assert dataset.example_lengths(1).tolist() == [40, 35]
+
+    # Sequence 1: example 'a' at [0, 40), example 'c' at [40, 75), padding after
+    lengths = [40, 35]
+    labels = second['labels'].tolist()
+    ids = second['input_ids'].tolist()
+    start = 0
+    for length in lengths:
+        end = start + length
+        assert labels[start:start + prompt_len] == [IGNORE_INDEX] * prompt_len
+        assert labels[start + prompt_len:end] == ids[start + prompt_len:end]
+        start = end
+    assert labels[75:] == [IGNORE_INDEX] * 5
+    assert ids[75:] == [tokenizer.pad_token_id] * 5
+
+    assert second['attention_mask'].tolist() == [1] * 40 + [2] * 35 + [0] * 5
+    assert second['position_ids'].tolist() == list(range(40)) + list(range(35)) + list(range(5))
+    assert dataset.cu_seqlens(1).tolist() == [0, 40, 75]
+
+    assert first['attention_mask'].tolist() == [1] * 70 + [0] * 10
+    assert first['position_ids'][:70].tolist() == list(range(70))
+    assert manifest['trainable_tokens'] == sum(len(answer) + 1 for answer in answers)
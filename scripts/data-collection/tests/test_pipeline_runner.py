@@ -0,0 +1,91 @@
+"""Pipeline runner: shard order, stopping at a failed stage, code hash inputs, cache hits"""
+
+import json
+
+from pipeline_runner import PipelineRunner, Stage, dedupe_shards, local_imports, shard_sort_key
+
+
+def write_source(source, output_path):
+    with open(output_path, 'w', encoding='utf-8') as f:
+        f.write(json.dumps({'text': source}) + '\n')
+
+
+def copy_shard(input_path, output_path):
+    if input_path.endswith('/2.jsonl'):
+        raise RuntimeError('broken shard')
+    with open(input_path, 'r', encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as dst:
+        dst.write(src.read())
+
+
+def copy_lines(input_path, output_path):
+    with open(input_path, 'r', encoding='utf-8') as src, open(output_path, 'w', encoding='utf-8') as dst:
+        dst.write(src.read())
+
+
+def test_shard_keys_sort_numerically():
+    assert sorted(['10', 'a1b2c3', '2', '100'], key=shard_sort_key) == ['2', '10', '100', 'a1b2c3']
+
+
+def test_run_stops_at_first_failed_stage(tmp_path):
+    exported = []
+    stages = [
+        Stage('collect', write_source, shards=lambda: {'10': 'ten', '2': 'two', '3': 'three'}),
+        Stage('filter', copy_shard, deps=['collect'], sharded=True),
+        Stage('export', lambda inputs, output_path: exported.append(inputs), deps=['filter']),
+    ]
+    runner = PipelineRunner(stages, work_dir=str(tmp_path))
+
+    report = runner.run()
+
+    assert list(runner.outputs['collect']) == ['2', '3', '10']
+    assert [row['stage'] for row in report] == ['collect', 'filter']
+    assert report[-1]['failed'] == 1
+    assert not exported
+
+
+def test_unchanged_tasks_are_cached_and_dedupe_resumes(tmp_path):
+    matches = {
+        '1': 'Le Maroc ouvre le score sur un coup franc direct de Hakimi',
+        '2': "Les Comores égalisent d'une tête au second poteau après un corner",
+    }
+
+    def run():
+        stages = [
+            Stage('collect', write_source, shards=lambda: dict(matches)),
+            Stage('filter', copy_lines, deps=['collect'], sharded=True),
+            Stage('dedupe', dedupe_shards, deps=['filter'], incremental=True),
+        ]
+        return {row['stage']: row for row in PipelineRunner(stages, work_dir=str(tmp_path)).run()}
+
+    first = run()
+    assert [first[name]['ran'] for name in ('collect', 'filter', 'dedupe')] == [2, 2, 1]
+    assert first['dedupe']['resumed_from'] is None
+
+    second = run()
+    assert [second[name]['cached'] for name in ('collect', 'filter', 'dedupe')] == [2, 2, 1]
+    assert not any(row['ran'] for row in second.values())
+
+    # One new match: one scrape, one filter, and dedupe folds in only the new shard
+    matches['3'] = "Carton jaune pour le milieu comorien après une faute sur Ounahi"
+    third = run()
+    assert (third['collect']['ran'], third['collect']['cached']) == (1, 2)
+    assert (third['filter']['ran'], third['filter']['cached']) == (1, 2)
+    assert third['dedupe']['ran'] == 1
+    assert third['dedupe']['resumed_from'] == 2
+
+    with open(tmp_path / 'dedupe.jsonl', 'r', encoding='utf-8') as f:
+        assert [json.loads(line)['text'] for line in f] == list(matches.values())
+
+
+def test_local_imports_are_transitive(tmp_path):
+    (tmp_path / 'scrapers').mkdir()
+    (tmp_path / 'scrapers' / 'base_scraper.py').write_text('import helpers\n')
+    (tmp_path / 'scrapers' / 'site_scraper.py').write_text(
+        'try:\n    from .base_scraper import X\nexcept ImportError:\n    from base_scraper import X\n')
+    (tmp_path / 'helpers.py').write_text('import json\n\ndef f():\n    from lazy import g\n')
+    (tmp_path / 'lazy.py').write_text('import numpy\n')
+    (tmp_path / 'stage.py').write_text('from scrapers.site_scraper import Y\n')
+
+    assert local_imports('stage.py', root=str(tmp_path)) == {
+        'stage.py', 'scrapers/site_scraper.py', 'scrapers/base_scraper.py', 'helpers.py', 'lazy.py'
+    }
@@ -0,0 +1,89 @@
+"""Fused quality rules accept exactly what the original per-check filter accepted"""
+
+import random
+import re
+
+import pytest
+
+from conftest import commentary
+from quality_filter import FOOTBALL_TERMS_FR, QUALITY_RULES, RuleCascade, check_commentary, filter_many
+
+
+def reference_is_quality(entry: dict, strict: bool = False) -> bool:
+    """is_quality_commentary() before the rules were compiled (checks as they were written)"""
+    text = entry.get('text', '').strip()
+
+    min_length = 50 if not strict else 60
+    max_length = 500 if not strict else 300
+    if len(text) < min_length or len(text) > max_length:
+        return False
+
+    text_lower = text.lower()
+    if not any(term in text_lower for term in FOOTBALL_TERMS_FR):
+        return False
+
+    if text.startswith('http') or text.startswith('www'):
+        return False
+
+    sentence_count = text.count('.') + text.count('!') + text.count('?')
+    if sentence_count > 3 and not strict:
+        return False
+
+    if text.count('...') > 2:
+        return False
+
+    if not re.search(r'[a-zA-Zà-ÿÀ-Ÿ]{10,}', text):
+        return False
+
+    if re.match(r'^\d+[\':]', text) and len(text) < 80:
+        return False
+
+    words = text.split()
+    if len(words) > 10:
+        if len(set(words)) / len(words) < 0.5:
+            return False
+
+    return True
+
+
+PIECES = [
+    'Mbappé', 'frappe', 'du gauche', 'le gardien', 'CORNER', 'Penalty !', 'hors-jeu', 'www.lequipe.fr',
+    'http://x.fr', "45'", '12:30', '...', '.', '!', '?', 'abcdefghijkl', 'xyz', '123', 'le', 'le le le',
+    'extra time', 'Canal', 'ballon', 'incroyable', 'Ça', 'et', 'il', 'défenseur', '—', 'ÉQUIPE', '  ',
+]
+
+
+def corpus(size: int = 5000, seed: int = 7) -> list:
+    rng = random.Random(seed)
+    texts = [commentary(i)['text'] for i in range(50)]
+    for _ in range(size):
+        words = rng.choices(PIECES, k=rng.randint(1, 90))
+        texts.append((' ' if rng.random() < 0.8 else '').join(words))
+    # Boundary lengths of both modes
+    for length in (49, 50, 59, 60, 79, 80, 300, 301, 500, 501):
+        texts.append(('tir ' * 200)[:length])
+        texts.append(("12' but " + 'abcdefghij ' * 60)[:length])
+    return texts
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_fused_rules_match_the_original_filter(strict):
+    entries = [{'text': text} for text in corpus()]
+
+    expected = [reference_is_quality(entry, strict) for entry in entries]
+    assert 0 < sum(expected) < len(entries)
+    assert [check_commentary(entry, strict) is None for entry in entries] == expected
+
+    accepted, rejections = filter_many(entries, strict=strict)
+    assert accepted == [entry for entry, ok in zip(entries, expected) if ok]
+    assert sum(rejections.values()) == expected.count(False)
+
+
+@pytest.mark.parametrize('strict', [False, True])
+def test_rule_order_only_changes_the_reason(strict):
+    texts = [text.strip() for text in corpus(1000)]
+    default = RuleCascade()
+    reverse = RuleCascade([reason for reason, _ in reversed(QUALITY_RULES)])
+
+    assert [default.check(t, strict) is None for t in texts] == [reverse.check(t, strict) is None for t in texts]
+    assert any(default.check(t, strict) != reverse.check(t, strict) for t in texts)
@@ -0,0 +1,75 @@
+"""Review app: background auto checks survive a dead annotator"""
+
+import time
+
+import pytest
+
+import review_app
+from review_store import ReviewStore
+
+
+@pytest.fixture
+def app_store(tmp_path, monkeypatch, entries):
+    monkeypatch.setattr(review_app, 'REVIEW_DB', str(tmp_path / 'review.db'))
+    monkeypatch.setattr(review_app, 'store', None)
+    monkeypatch.setattr(review_app, 'annotation_thread', None)
+    store = ReviewStore(str(tmp_path / 'review.db'))
+    store.load(entries)
+    return store
+
+
+def wait_for_annotation():
+    review_app.annotation_thread.join(timeout=30)
+    assert not review_app.annotation_thread.is_alive()
+
+
+def test_opening_the_store_resumes_annotation(app_store):
+    review_app.get_store()
+    wait_for_annotation()
+    assert app_store.unannotated() == 0
+
+
+def test_polling_retries_after_a_dead_annotator_claim(app_store, monkeypatch):
+    # A pass killed while holding the claim: nothing is retried until the claim lapses
+    app_store.claim_job('annotator')
+    client = review_app.app.test_client()
+    client.get('/api/stats')
+    assert review_app.annotation_thread is None
+    assert app_store.unannotated() == len(app_store.page(limit=1000))
+
+    app_store._set_meta(app_store.conn, 'annotator_expires', int(time.time()) - 1)
+    client.post('/api/lease', json={'reviewer': 'ann'})
+    wait_for_annotation()
+    assert app_store.unannotated() == 0
+    assert not app_store.annotating()
+
+
+def test_racing_first_requests_open_one_store(app_store, monkeypatch):
+    opened = []
+    started = []
+
+    class SlowStore(ReviewStore):
+        def __init__(self, path):
+            opened.append(path)
+            time.sleep(0.05)
+            super().__init__(path)
+
+    real_thread = review_app.threading.Thread
+
+    def recording_thread(*args, **kwargs):
+        started.append(kwargs.get('target'))
+        return real_thread(*args, **kwargs)
+
+    monkeypatch.setattr(review_app, 'ReviewStore', SlowStore)
+    monkeypatch.setattr(review_app.threading, 'Thread', recording_thread)
+
+    # Threads of one gunicorn worker
+    requests = [real_thread(target=review_app.get_store) for _ in range(8)]
+    for thread in requests:
+        thread.start()
+    for thread in requests:
+        thread.join()
+
+    assert len(opened) == 1
+    assert len(started) == 1
+    wait_for_annotation()
@@ -0,0 +1,83 @@
+"""Review ranker: the training pass holds its claim, auto-accept can be undone cleanly"""
+
+import os
+
+import pytest
+
+import review_ranker
+from review_ranker import auto_accept, model_path, refresh
+from review_store import ReviewStore
+
+
+@pytest.fixture
+def store(tmp_path, entries):
+    store = ReviewStore(str(tmp_path / 'review.db'))
+    store.load(entries)
+    store.annotate()
+    for index in range(10):
+        store.decide(index, 'approved' if index % 3 else 'rejected', reviewer='ann')
+    return store
+
+
+def test_training_renews_the_ranker_claim(store, monkeypatch):
+    renewals = []
+    renew_job = store.renew_job
+
+    def recording(job, generation, ttl):
+        renewals.append((job, store.job_running(job)))
+        return renew_job(job, generation, ttl)
+
+    monkeypatch.setattr(store, 'renew_job', recording)
+
+    result = refresh(store, batch_size=3)
+
+    assert result['learned'] == 10
+    assert renewals == [('ranker', True)] * 4
+    assert not store.job_running('ranker')
+
+
+def test_training_on_a_replaced_queue_is_dropped(store, entries, monkeypatch):
+    generation = store.claim_job('ranker')
+    store.finish_job('ranker', generation)
+    store.load(entries)
+    assert not store.renew_job('ranker', generation)
+
+    # The queue is replaced again while the pass learns
+    for index in range(10):
+        store.decide(index, 'approved', reviewer='ann')
+    monkeypatch.setattr(store, 'renew_job', lambda job, generation, ttl: False)
+
+    assert refresh(store, batch_size=3) is None
+    assert not os.path.exists(model_path(store))
+    assert len(store.training_batch()) == 10
+
+
+def test_undo_auto_accept_resets_score_and_training(store):
+    generation = store.claim_job('ranker')
+    store.set_scores([(index, 0.99) for index in range(10, 50)], generation)
+    store.finish_job('ranker', generation)
+
+    approved, audited = store.auto_accept(0.9, audit_rate=0)
+    accepted = [row[0] for row in store.conn.execute(
+        "SELECT id FROM entries WHERE reviewer = 'auto-accept' ORDER BY id")]
+    assert approved == len(accepted) > 0 and not audited
+    assert store.undo_auto_accept() == approved
+
+    rows = store.conn.execute(
+        f"SELECT score, priority, trained FROM entries WHERE id IN ({','.join(map(str, accepted))})").fetchall()
+    assert set(rows) == {(None, None, 0)}
+    # Back at the front of the queue, and learned from once a reviewer decides
+    assert [entry['index'] for entry in store.lease('bob', limit=3)] == accepted[:3]
+    store.decide(accepted[0], 'rejected', reviewer='bob')
+    assert [row[0] for row in store.training_batch(after=9)] == [accepted[0]]
+
+
+def test_ranking_is_off_without_numpy(store, monkeypatch):
+    monkeypatch.setattr(review_ranker, 'np', None)
+
+    assert refresh(store) is None
+    assert not store.job_running('ranker')
+    with pytest.raises(ImportError):
+        auto_accept(store, min_decisions=0)
+    # Leases still work, in queue order
+    assert [entry['index'] for entry in store.lease('bob', limit=3)] == [10, 11, 12]
@@ -0,0 +1,89 @@
+"""Review store: lease isolation between reviewers, incremental statistics aggregates"""
+
+import random
+
+import pytest
+
+from review_store import ReviewStore
+
+
+@pytest.fixture
+def store(tmp_path, entries):
+    store = ReviewStore(str(tmp_path / 'review.db'))
+    store.load(entries)
+    return store
+
+
+def indexes(batch):
+    return {entry['index'] for entry in batch}
+
+
+def test_leases_are_isolated_between_reviewers(store):
+    ann = indexes(store.lease('ann', limit=10))
+    bob = indexes(store.lease('bob', limit=10))
+    assert len(ann) == len(bob) == 10
+    assert not ann & bob
+
+    # Neither can decide an entry the other holds
+    taken = min(ann)
+    assert not store.decide(taken, 'approved', reviewer='bob')
+    assert 'status' not in store.get(taken)
+    assert store.decide(taken, 'approved', reviewer='ann')
+    assert store.get(taken)['reviewer'] == 'ann'
+    assert not store.decide(min(bob), 'rejected', reviewer='ann')
+
+    assert indexes(store.held('ann')) == ann - {taken}
+    assert indexes(store.held('bob')) == bob
+
+    # Asking for the next batch renews the reviewer's own leases and skips everyone else's
+    more = indexes(store.lease('ann', limit=10))
+    assert not more & (ann | bob)
+    assert indexes(store.held('ann')) == (ann - {taken}) | more
+
+
+def test_lapsed_or_released_leases_go_to_the_next_reviewer(store):
+    lapsed = indexes(store.lease('ann', limit=5, ttl=-1))
+    assert store.held('ann') == []
+    assert indexes(store.lease('bob', limit=5)) == lapsed
+    assert store.decide(min(lapsed), 'approved', reviewer='bob')
+
+    released = indexes(store.lease('ann', limit=5))
+    assert not released & lapsed
+    assert store.release('ann') == 5
+    assert indexes(store.lease('cid', limit=5)) == released
+    assert not store.decide(min(released), 'approved', reviewer='ann')
+
+
+def aggregates(store):
+    return store._stats(), store.conn.execute('SELECT word, entries FROM vocabulary ORDER BY word').fetchall()
+
+
+def test_incremental_aggregates_match_a_rebuild(store):
+    rng = random.Random(49)
+    store.annotate()
+    reviewers = ['ann', 'bob', None]
+    words = ['superbe', 'frappe', 'ballon', 'corner', 'Hakimi']
+    auto_accepted = undone = 0
+
+    for step in range(400):
+        if step % 60 == 0:
+            store.set_scores([(i, rng.random()) for i in range(50)], store._generation())
+            auto_accepted += store.auto_accept(0.3, audit_rate=0.2, seed=step)[0]
+        if step % 60 == 30:
+            undone += store.undo_auto_accept()
+        if step % 40 == 0:
+            store.lease(rng.choice(['ann', 'bob']), limit=3)
+
+        # Decisions on pending, decided, leased and auto-accepted entries alike
+        index = rng.randrange(50)
+        status = rng.choice(['approved', 'rejected', 'edited'])
+        edited_text = ' '.join(rng.choices(words, k=rng.randint(3, 8))) if status == 'edited' else None
+        store.decide(index, status, reason='hors sujet' if status == 'rejected' else None,
+                     edited_text=edited_text, reviewer=rng.choice(reviewers))
+
+        if step % 20 == 19:
+            incremental = aggregates(store)
+            store.rebuild_stats()
+            assert aggregates(store) == incremental, f"aggregates drifted by step {step}"
+
+    assert auto_accepted and undone
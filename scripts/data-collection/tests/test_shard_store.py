@@ -0,0 +1,50 @@
+import json
+
+import pytest
+
+from runpod_finetuner import RunPodFineTuner
+from shard_store import ShardStore, sync
+
+
+def write_jsonl(path, count, edited=None):
+    with open(path, 'w', encoding='utf-8') as f:
+        for i in range(count):
+            text = 'modifié' if i == edited else f"exemple {i} " + 'x' * (i % 37)
+            f.write(json.dumps({'id': i, 'text': text}) + '\n')
+
+
+def test_delta_sync_round_trip(tmp_path):
+    source = tmp_path / 'llama3_training.jsonl'
+    write_jsonl(source, 5000)
+    local = ShardStore(str(tmp_path / 'local'))
+    remote_path = str(tmp_path / 'remote')
+
+    manifest = local.add('training', [str(source)], chunk_bytes=4096)
+    first = sync(local, 'training', remote_path)
+    assert first['sent_objects'] == first['objects'] == len({digest for digest, _ in manifest['files'][0]['chunks']})
+    assert first['changed_files'] == ['llama3_training.jsonl']
+
+    # One edited line changes one or two shards, everything else is already on the remote
+    write_jsonl(source, 5000, edited=2500)
+    local.add('training', [str(source)], chunk_bytes=4096)
+    second = sync(local, 'training', remote_path)
+    assert 1 <= second['sent_objects'] <= 2
+    assert second['objects'] > 20
+
+    checkout = tmp_path / 'pod'
+    assert ShardStore(remote_path).checkout('training', str(checkout)) == [str(checkout / 'llama3_training.jsonl')]
+    assert (checkout / 'llama3_training.jsonl').read_bytes() == source.read_bytes()
+    assert ShardStore(remote_path).checkout('training', str(checkout)) == []
+
+
+def test_finetuner_checkout_needs_the_added_file_name(tmp_path):
+    source = tmp_path / 'llama3_training.jsonl'
+    write_jsonl(source, 10)
+    ShardStore(str(tmp_path / 'shards')).add('training', [str(source)])
+
+    finetuner = RunPodFineTuner(str(tmp_path / 'pod' / 'training_data.jsonl'), shard_store=str(tmp_path / 'shards'))
+    with pytest.raises(FileNotFoundError, match='training_data.jsonl'):
+        finetuner.checkout_training_data()
+
+    RunPodFineTuner(str(tmp_path / 'pod' / 'llama3_training.jsonl'),
+                    shard_store=str(tmp_path / 'shards')).checkout_training_data()
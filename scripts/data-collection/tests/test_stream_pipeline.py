@@ -0,0 +1,62 @@
+"""Streaming filter: imports, inputs left untouched, contamination check, sequential collector output"""
+
+import json
+import subprocess
+import sys
+from pathlib import Path
+
+import collect_commentary
+from commentary_entry import CommentaryEntry
+from conftest import commentary
+from stream_pipeline import filter_stream, normalize_entries, run_pipeline
+
+SCRIPTS_DIR = Path(__file__).resolve().parent.parent
+
+
+def test_contamination_is_imported_only_for_exclude():
+    # near_duplicates uses numpy when it is there; the contamination check requires it
+    code = "import sys, stream_pipeline; assert 'contamination' not in sys.modules, 'contamination imported'"
+    subprocess.run([sys.executable, '-c', code], cwd=SCRIPTS_DIR, check=True)
+
+
+def test_exclude_drops_leaked_entries(tmp_path):
+    entries = [commentary(i) for i in range(20)]
+    raw = tmp_path / 'raw.jsonl'
+    raw.write_text(''.join(json.dumps(entry, ensure_ascii=False) + '\n' for entry in entries), encoding='utf-8')
+
+    clean = run_pipeline(str(raw), str(tmp_path / 'clean.jsonl'))
+    leaked = json.loads((tmp_path / 'clean.jsonl').read_text(encoding='utf-8').splitlines()[0])
+    eval_split = tmp_path / 'eval.jsonl'
+    eval_split.write_text(json.dumps(leaked, ensure_ascii=False) + '\n', encoding='utf-8')
+
+    stats = run_pipeline(str(raw), str(tmp_path / 'out.jsonl'), exclude=str(eval_split))
+
+    texts = [json.loads(line)['text'] for line in (tmp_path / 'out.jsonl').read_text(encoding='utf-8').splitlines()]
+    assert leaked['text'] not in texts
+    assert stats['written'] == clean['written'] - stats['contaminated'] < clean['written']
+
+
+def test_normalize_leaves_the_callers_entries_alone():
+    data = commentary(1, text='  But   de Salah ! ', time='45′ ')
+    entry = CommentaryEntry.from_dict(data)
+    clean = CommentaryEntry.from_dict(commentary(2))
+
+    normalized = list(normalize_entries([data, entry, clean]))
+
+    assert [e.text for e in normalized[:2]] == ['But de Salah !'] * 2
+    assert [e.time for e in normalized[:2]] == ["45'"] * 2
+    assert data['text'] == entry.text == '  But   de Salah ! '
+    assert entry.time == '45′ '
+    assert normalized[1] is not entry and normalized[2] is clean
+
+
+def test_sequential_collector_writes_jsonl(tmp_path, monkeypatch, entries):
+    monkeypatch.setattr(collect_commentary, 'FILTERED_JSONL_FILE', str(tmp_path / 'filtered.jsonl'))
+    collector = collect_commentary.CommentaryCollector()
+
+    written = collector.filter_and_deduplicate(iter(entries + entries))
+
+    lines = (tmp_path / 'filtered.jsonl').read_text(encoding='utf-8').splitlines()
+    expected = [entry['text'] for entry in filter_stream(entries)]
+    assert written == len(lines) == len(expected) > 0
+    assert [json.loads(line)['text'] for line in lines] == expected
@@ -0,0 +1,75 @@
+"""Streaming metrics: HyperLogLog accuracy, exact merges of moments and quality metrics"""
+
+import json
+import random
+import statistics
+
+import pytest
+
+from conftest import commentary
+from streaming_metrics import HyperLogLog, QualityMetrics, RunningMoments
+
+
+@pytest.mark.parametrize('n', [100, 5_000, 100_000])
+def test_hyperloglog_error_is_within_bounds(n):
+    hll = HyperLogLog()
+    for i in range(n):
+        hll.add(f"mot{i}")
+        hll.add(f"mot{i // 2}")  # repeats do not count
+
+    # Standard error is 1.04 / sqrt(2^14) ≈ 0.8%; allow four of them
+    assert abs(hll.count() - n) <= 0.033 * n
+
+
+def test_hyperloglog_merge_is_the_union():
+    left, right, union = HyperLogLog(), HyperLogLog(), HyperLogLog()
+    for i in range(30_000):
+        (left if i < 20_000 else right).add(f"mot{i}")
+        union.add(f"mot{i}")
+    for i in range(10_000, 20_000):
+        right.add(f"mot{i}")
+
+    left.merge(right)
+
+    assert left.registers == union.registers
+    assert HyperLogLog.from_state(left.to_state()).count() == union.count()
+    with pytest.raises(ValueError):
+        left.merge(HyperLogLog(p=10))
+
+
+def test_running_moments_merge_matches_statistics():
+    rng = random.Random(29)
+    values = [rng.gauss(180, 60) for _ in range(5000)]
+
+    merged = RunningMoments()
+    for start, end in [(0, 0), (0, 1), (1, 1200), (1200, 1201), (1201, 5000)]:
+        shard = RunningMoments()
+        for value in values[start:end]:
+            shard.update(value)
+        merged.merge(shard)
+
+    assert merged.count == len(values)
+    assert merged.mean == pytest.approx(statistics.fmean(values), rel=1e-12)
+    assert merged.std == pytest.approx(statistics.pstdev(values), rel=1e-9)
+    assert (merged.min, merged.max) == (min(values), max(values))
+
+
+def test_quality_metrics_merge_equals_single_pass():
+    rng = random.Random(7)
+    entries = [commentary(i, source=rng.choice(['lequipe', 'rmc']),
+                          event_type=rng.choice(['commentary', 'goal', 'substitution']))
+               for i in range(900)]
+
+    single = QualityMetrics().update_many(entries)
+    merged = QualityMetrics()
+    for start in range(0, len(entries), 250):
+        shard = QualityMetrics().update_many(entries[start:start + 250])
+        merged.merge(QualityMetrics.from_state(json.loads(json.dumps(shard.to_state()))))
+
+    expected, actual = single.to_dict(), merged.to_dict()
+    for key in ('length_chars', 'length_words'):
+        expected_lengths, actual_lengths = expected.pop(key), actual.pop(key)
+        assert actual_lengths.pop('histogram') == expected_lengths.pop('histogram')
+        assert actual_lengths == pytest.approx(expected_lengths, rel=1e-9)
+    assert actual == expected
+    assert merged.vocabulary.registers == single.vocabulary.registers
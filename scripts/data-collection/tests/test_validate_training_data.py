@@ -0,0 +1,75 @@
+import json
+import sys
+
+import pytest
+
+import validate_training_data
+from runpod_finetuner import RunPodFineTuner
+from validate_training_data import validate_file
+
+
+def example(i: int) -> dict:
+    return {'messages': [
+        {'role': 'system', 'content': 'Tu es un commentateur sportif.'},
+        {'role': 'user', 'content': f"Minute {i}"},
+        {'role': 'assistant', 'content': f"Action numéro {i} au milieu de terrain"},
+    ]}
+
+
+@pytest.fixture
+def training_file(tmp_path):
+    """200 lines: invalid JSON on line 7, a missing message on line 120, an empty line 150"""
+    lines = [json.dumps(example(i), ensure_ascii=False) for i in range(200)]
+    lines[6] = '{"messages": ['
+    broken = example(119)
+    del broken['messages'][1]
+    lines[119] = json.dumps(broken)
+    lines[149] = ''
+    path = tmp_path / 'training.jsonl'
+    path.write_text('\n'.join(lines) + '\n', encoding='utf-8')
+    return path
+
+
+class FakeTokenizer:
+    def __call__(self, texts, add_special_tokens=True):
+        return {'input_ids': [text.split() for text in texts]}
+
+
+@pytest.mark.parametrize('processes', [1, 2])
+def test_line_numbers_across_ranges(training_file, processes):
+    report = validate_file(str(training_file), processes=processes, chunk_bytes=512)
+
+    assert report['lines'] == 200
+    assert report['examples'] == 197
+    assert sorted({line for line, _ in report['errors']}) == [7, 120]
+
+
+def test_tokenizer_is_loaded_once(training_file, monkeypatch):
+    loaded = []
+    monkeypatch.setattr(validate_training_data, 'load_tokenizer',
+                        lambda name: loaded.append(name) or FakeTokenizer())
+
+    report = validate_file(str(training_file), processes=2, tokenizer='fake', chunk_bytes=512)
+
+    assert loaded == ['fake']
+    moments, _ = report['tokens']['user']
+    assert moments.count == 197
+
+
+def test_finetuner_counts_tokens_only_on_request(training_file, monkeypatch):
+    monkeypatch.setattr(validate_training_data, 'load_tokenizer', pytest.fail)
+    finetuner = RunPodFineTuner(str(training_file))
+
+    with pytest.raises(ValueError, match='3 errors'):
+        finetuner.validate_training_data()
+
+
+def test_finetuner_falls_back_without_the_validator(training_file, tmp_path, monkeypatch):
+    monkeypatch.setitem(sys.modules, 'validate_training_data', None)
+
+    with pytest.raises(ValueError, match='Line 7'):
+        RunPodFineTuner(str(training_file)).validate_training_data()
+
+    valid = tmp_path / 'valid.jsonl'
+    valid.write_text(''.join(json.dumps(example(i)) + '\n' for i in range(5)), encoding='utf-8')
+    assert RunPodFineTuner(str(valid)).validate_training_data() == 5
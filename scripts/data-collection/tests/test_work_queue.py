@@ -0,0 +1,61 @@
+"""Work queue: fencing of expired leases, hand-over to the next worker, attempt limit"""
+
+import time
+
+import pytest
+
+from work_queue import SQLiteWorkQueue
+
+
+@pytest.fixture
+def queue(tmp_path):
+    queue = SQLiteWorkQueue(str(tmp_path / 'q.db'), visibility_timeout=0.1)
+    queue.enqueue([('1', {'url': 'https://www.lequipe.fr/match/1'})])
+    yield queue
+    queue.close()
+
+
+def expire():
+    time.sleep(0.15)
+
+
+def test_expired_lease_goes_to_the_next_worker_and_cannot_complete(queue):
+    stale = queue.lease('w1')
+    assert queue.lease('w2') is None
+
+    expire()
+    fresh = queue.lease('w2')
+    assert fresh.key == stale.key
+    assert fresh.token == stale.token + 1
+
+    # The first worker lost the task: its results and errors are discarded
+    assert not queue.heartbeat(stale)
+    assert not queue.complete(stale, [{'text': 'stale'}])
+    assert not queue.fail(stale, 'boom')
+
+    assert queue.complete(fresh, [{'text': 'fresh'}])
+    assert list(queue.iter_results()) == [('1', [{'text': 'fresh'}])]
+    assert queue.stats()['done'] == 1
+
+
+def test_task_fails_after_max_attempts(queue):
+    for attempt in range(1, queue.max_attempts):
+        lease = queue.lease(f"w{attempt}")
+        assert lease.token == attempt
+        assert queue.fail(lease, f"error {attempt}")
+        assert queue.stats()['pending'] == 1
+
+    # The last attempt expires instead of failing: the task is given up either way
+    queue.lease('w3')
+    expire()
+    assert queue.lease('w4') is None
+    assert queue.stats()['failed'] == 1
+    assert queue.failures() == [('1', 'lease expired')]
+
+
+def test_error_on_last_attempt_fails_the_task(queue):
+    for attempt in range(1, queue.max_attempts + 1):
+        assert queue.fail(queue.lease(f"w{attempt}"), f"error {attempt}")
+
+    assert queue.lease('w4') is None
+    assert queue.failures() == [('1', f"error {queue.max_attempts}")]
@@ -2,57 +2,329 @@
 """
 Validate Mistral training data format
 Ensures JSONL is ready for Colab
+
+The file is memory-mapped and split into byte ranges on line boundaries;
+worker processes validate their ranges against a compiled schema and return
+every error with its line number, plus mergeable character (and, with a
+tokenizer, token) length statistics per role. Nothing is kept per example.
+
+Usage:
+    python validate_training_data.py data/mistral_training.jsonl
+    python validate_training_data.py data/llama3_training.jsonl --processes 8 \\
+        --tokenizer meta-llama/Llama-3.1-70B-Instruct
 """
 
-import json
+import os
 import sys
+import json
+import mmap
+import argparse
+from bisect import bisect_right
+from collections import Counter
+from multiprocessing import Pool, cpu_count
 from pathlib import Path
+from typing import Callable, Dict, List, Optional, Tuple
 
-def validate_jsonl(file_path: str):
-    """Validate training data format"""
+from streaming_metrics import Histogram, RunningMoments
 
-    print(f"📂 Validating: {file_path}\n")
-    print("="*70)
+try:
+    import orjson
+except ImportError:  # Optional speed-up, json is used otherwise
+    orjson = None
+
+ROLES = ('system', 'user', 'assistant')
+
+# Record layouts written by chat_export.py
+SCHEMAS = {
+    'messages': {'field': 'messages', 'roles': ROLES},
+    'prompt': {'fields': ('system', 'prompt', 'response')},
+}
+
+CHAR_EDGES = list(range(0, 1000, 50)) + [1000, 2000, 4000]
+TOKEN_EDGES = list(range(0, 256, 16)) + [256, 512, 1024, 2048]
+
+CHUNK_BYTES = 32 * 1024 * 1024
+
+_tokenizer = None
+
+
+def compile_schema(name: str) -> Callable[[object], Tuple[List[str], Optional[Tuple[str, ...]]]]:
+    """
+    Build the check function of a record layout
+
+    Returns:
+        check(example) → (error messages, contents in ROLES order or None)
+    """
+    schema = SCHEMAS[name]
+
+    if 'fields' in schema:
+        fields = schema['fields']
+
+        def check(example):
+            if not isinstance(example, dict):
+                return [f"Expected an object, got {type(example).__name__}"], None
+            errors = [f"Missing '{field}' field" for field in fields if field not in example]
+            if errors:
+                return errors, None
+            contents = tuple(example[field] for field in fields)
+            errors = [f"Field '{field}': empty content" for field, content in zip(fields, contents)
+                      if not isinstance(content, str) or not content]
+            return errors, (None if errors else contents)
+
+        return check
+
+    field, roles = schema['field'], list(schema['roles'])
+
+    def check(example):
+        if not isinstance(example, dict) or field not in example:
+            return [f"Missing '{field}' field"], None
+        messages = example[field]
+        if not isinstance(messages, list) or not all(isinstance(m, dict) for m in messages):
+            return [f"'{field}' must be a list of objects"], None
+
+        errors = []
+        if len(messages) != len(roles):
+            errors.append(f"Expected {len(roles)} messages, got {len(messages)}")
+        actual_roles = [m.get('role') for m in messages]
+        if actual_roles != roles:
+            errors.append(f"Roles {actual_roles} != {roles}")
+        contents = tuple(m.get('content') for m in messages)
+        errors.extend(f"Message {j}: Empty content" for j, content in enumerate(contents)
+                      if not isinstance(content, str) or not content)
+        return errors, (None if errors else contents)
+
+    return check
+
+
+def byte_ranges(file_path: str, chunks: int) -> List[Tuple[int, int]]:
+    """Split a file into about `chunks` byte ranges ending on line boundaries"""
+    size = os.path.getsize(file_path)
+    if size == 0:
+        return []
+
+    bounds = [0]
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        for k in range(1, chunks):
+            newline = mm.find(b'\n', max(size * k // chunks, bounds[-1]))
+            if newline < 0:
+                break
+            if bounds[-1] < newline + 1 < size:
+                bounds.append(newline + 1)
+    bounds.append(size)
+    return list(zip(bounds, bounds[1:]))
+
+
+def new_role_stats(edges: List[int]) -> Dict[str, Tuple[RunningMoments, Histogram]]:
+    return {role: (RunningMoments(), Histogram(edges)) for role in ROLES + ('total',)}
+
+
+def summarize_lengths(lengths: Counter, edges: List[int]) -> Tuple[RunningMoments, Histogram]:
+    """Moments and histogram of a length → count table (lengths repeat a lot, e.g. the system prompt)"""
+    moments = RunningMoments()
+    histogram = Histogram(edges)
+    count = sum(lengths.values())
+    if not count:
+        return moments, histogram
+
+    mean = sum(length * n for length, n in lengths.items()) / count
+    moments = RunningMoments.from_state({
+        'count': count,
+        'mean': mean,
+        'm2': sum(n * (length - mean) ** 2 for length, n in lengths.items()),
+        'min': min(lengths),
+        'max': max(lengths),
+    })
+    for length, n in lengths.items():
+        histogram.counts[max(bisect_right(edges, length) - 1, 0)] += n
+    return moments, histogram
+
+
+def merge_role_stats(total: Dict, part: Dict):
+    for role, (moments, histogram) in part.items():
+        total[role][0].merge(moments)
+        total[role][1].merge(histogram)
+
+
+def load_tokenizer(tokenizer_name: str):
+    """Load a Hugging Face tokenizer (needs transformers)"""
+    # Imported here: transformers is slow to import and only needed for token lengths
+    from transformers import AutoTokenizer
+    return AutoTokenizer.from_pretrained(tokenizer_name)
+
+
+def _init_worker(tokenizer):
+    global _tokenizer
+    _tokenizer = tokenizer
+
+
+def _validate_range(args) -> Dict:
+    """
+    Worker: validate the lines of one byte range
+
+    Returns:
+        Lines in the range, valid examples, errors (line within the range,
+        message), length statistics per role and the first valid example
+    """
+    file_path, start, end, schema = args
+    check = compile_schema(schema)
+    loads = orjson.loads if orjson is not None else json.loads
+
+    with open(file_path, 'rb') as f, mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as mm:
+        lines = mm[start:end].split(b'\n')
+    if lines[-1] == b'':
+        lines.pop()
 
     errors = []
-    examples = []
+    char_lengths = {role: Counter() for role in ROLES + ('total',)}
+    valid: List[Tuple[str, ...]] = []
+    sample = None
+
+    for number, line in enumerate(lines, 1):
+        if not line.strip():
+            continue
+        try:
+            example = loads(line)
+        except ValueError as e:
+            errors.append((number, f"Invalid JSON - {e}"))
+            continue
+
+        problems, contents = check(example)
+        if problems:
+            errors.extend((number, problem) for problem in problems)
+            continue
+
+        if sample is None:
+            sample = contents
+        valid.append(contents)
+        system, user, assistant = map(len, contents)
+        char_lengths['system'][system] += 1
+        char_lengths['user'][user] += 1
+        char_lengths['assistant'][assistant] += 1
+        char_lengths['total'][system + user + assistant] += 1
+
+    chars = {role: summarize_lengths(lengths, CHAR_EDGES) for role, lengths in char_lengths.items()}
+
+    tokens = None
+    if _tokenizer is not None and valid:
+        token_lengths = {}
+        totals = [0] * len(valid)
+        for j, role in enumerate(ROLES):
+            encoded = _tokenizer([contents[j] for contents in valid], add_special_tokens=False)['input_ids']
+            token_lengths[role] = Counter(map(len, encoded))
+            totals = [total + len(ids) for total, ids in zip(totals, encoded)]
+        token_lengths['total'] = Counter(totals)
+        tokens = {role: summarize_lengths(lengths, TOKEN_EDGES) for role, lengths in token_lengths.items()}
 
-    with open(file_path, 'r', encoding='utf-8') as f:
-        for i, line in enumerate(f, 1):
-            try:
-                example = json.loads(line)
-                examples.append(example)
+    return {
+        'lines': len(lines),
+        'examples': len(valid),
+        'errors': errors,
+        'chars': chars,
+        'tokens': tokens,
+        'sample': sample,
+    }
 
-                # Check required fields
-                if 'messages' not in example:
-                    errors.append(f"Line {i}: Missing 'messages' field")
-                    continue
 
-                messages = example['messages']
+def validate_file(
+    file_path: str,
+    schema: str = 'messages',
+    processes: Optional[int] = None,
+    tokenizer: Optional[str] = None,
+    chunk_bytes: int = CHUNK_BYTES
+) -> Dict:
+    """
+    Validate a training JSONL file in parallel
 
-                # Check message structure
-                if len(messages) != 3:
-                    errors.append(f"Line {i}: Expected 3 messages, got {len(messages)}")
+    Args:
+        file_path: Training JSONL
+        schema: Record layout ('messages' or 'prompt')
+        processes: Worker processes (default: all CPUs)
+        tokenizer: Tokenizer name for token-length statistics (needs transformers);
+            loaded once here and handed to the workers
+        chunk_bytes: Target size of the byte range handed to a worker
 
-                # Check roles
-                expected_roles = ['system', 'user', 'assistant']
-                actual_roles = [m['role'] for m in messages]
+    Returns:
+        Report: examples, errors [(line, message)], per-role char/token stats, sample
+    """
+    processes = processes or cpu_count()
+    size = os.path.getsize(file_path)
+    chunks = max(processes * 4, -(-size // chunk_bytes))
+    tasks = [(file_path, start, end, schema) for start, end in byte_ranges(file_path, chunks)]
 
-                if actual_roles != expected_roles:
-                    errors.append(f"Line {i}: Roles {actual_roles} != {expected_roles}")
+    report = {
+        'file': file_path,
+        'bytes': size,
+        'lines': 0,
+        'examples': 0,
+        'errors': [],
+        'chars': new_role_stats(CHAR_EDGES),
+        'tokens': new_role_stats(TOKEN_EDGES) if tokenizer else None,
+        'sample': None,
+    }
 
-                # Check content exists
-                for j, msg in enumerate(messages):
-                    if 'content' not in msg or not msg['content']:
-                        errors.append(f"Line {i}, message {j}: Empty content")
+    loaded = load_tokenizer(tokenizer) if tokenizer else None
+    if processes > 1 and len(tasks) > 1:
+        pool = Pool(processes, initializer=_init_worker, initargs=(loaded,))
+        results = pool.imap(_validate_range, tasks)
+    else:
+        pool = None
+        _init_worker(loaded)
+        results = map(_validate_range, tasks)
 
-            except json.JSONDecodeError as e:
-                errors.append(f"Line {i}: Invalid JSON - {e}")
+    try:
+        # Ranges come back in file order, so line numbers are offsets of the previous ranges
+        for result in results:
+            offset = report['lines']
+            report['errors'].extend((offset + number, message) for number, message in result['errors'])
+            report['lines'] += result['lines']
+            report['examples'] += result['examples']
+            merge_role_stats(report['chars'], result['chars'])
+            if result['tokens'] is not None:
+                merge_role_stats(report['tokens'], result['tokens'])
+            if report['sample'] is None:
+                report['sample'] = result['sample']
+    finally:
+        if pool is not None:
+            pool.close()
+            pool.join()
+
+    return report
+
+
+def format_errors(errors: List[Tuple[int, str]]) -> List[str]:
+    return [f"Line {line}: {message}" for line, message in errors]
+
+
+def print_length_stats(title: str, unit: str, stats: Dict):
+    print(f"\n📏 {title}:")
+    for role, (moments, histogram) in stats.items():
+        if not moments.count:
+            continue
+        print(f"   {role:<10} avg {moments.mean:.1f} {unit} "
+              f"(min {moments.min}, max {moments.max}, std {moments.std:.1f})")
+        for label, count in histogram.to_dict().items():
+            if count:
+                print(f"      {label:>10}: {count}")
+
+
+def validate_jsonl(
+    file_path: str,
+    processes: Optional[int] = None,
+    tokenizer: Optional[str] = None,
+    schema: str = 'messages'
+) -> bool:
+    """Validate training data format"""
+
+    print(f"📂 Validating: {file_path}\n")
+    print("="*70)
+
+    report = validate_file(file_path, schema=schema, processes=processes, tokenizer=tokenizer)
+    errors = format_errors(report['errors'])
 
     # Print results
     print(f"\n✅ VALIDATION RESULTS")
     print("="*70)
-    print(f"Total examples: {len(examples)}")
+    print(f"Total examples: {report['examples']}")
     print(f"Errors found: {len(errors)}")
 
     if errors:
@@ -63,28 +335,33 @@ def validate_jsonl(file_path: str):
             print(f"   ... and {len(errors) - 10} more")
         return False
 
+    if not report['examples']:
+        print(f"\n❌ No examples found")
+        return False
+
     # Show statistics
     print(f"\n📊 STATISTICS:")
 
-    system_lengths = [len(ex['messages'][0]['content']) for ex in examples]
-    user_lengths = [len(ex['messages'][1]['content']) for ex in examples]
-    assistant_lengths = [len(ex['messages'][2]['content']) for ex in examples]
+    chars = report['chars']
+    print(f"   System message avg length: {chars['system'][0].mean:.1f} chars")
+    print(f"   User prompt avg length: {chars['user'][0].mean:.1f} chars")
+    print(f"   Assistant response avg length: {chars['assistant'][0].mean:.1f} chars")
 
-    print(f"   System message avg length: {sum(system_lengths) / len(system_lengths):.1f} chars")
-    print(f"   User prompt avg length: {sum(user_lengths) / len(user_lengths):.1f} chars")
-    print(f"   Assistant response avg length: {sum(assistant_lengths) / len(assistant_lengths):.1f} chars")
+    print_length_stats('CHARACTER LENGTHS', 'chars', chars)
+    if report['tokens'] is not None:
+        print_length_stats(f'TOKEN LENGTHS ({tokenizer})', 'tokens', report['tokens'])
 
     # Show sample
     print(f"\n📝 SAMPLE EXAMPLE:")
     print("-"*70)
-    sample = examples[5]
-    print(f"System: {sample['messages'][0]['content'][:100]}...")
-    print(f"\nUser: {sample['messages'][1]['content']}")
-    print(f"\nAssistant: {sample['messages'][2]['content']}")
+    system, user, assistant = report['sample']
+    print(f"System: {system[:100]}...")
+    print(f"\nUser: {user}")
+    print(f"\nAssistant: {assistant}")
     print("-"*70)
 
     # File size
-    file_size = Path(file_path).stat().st_size / 1024
+    file_size = report['bytes'] / 1024
     print(f"\n💾 FILE INFO:")
     print(f"   Size: {file_size:.1f} KB")
     print(f"   Ready for upload to Colab: {'✅ YES' if file_size < 500 else '⚠️  Large file'}")
@@ -97,11 +374,17 @@ def validate_jsonl(file_path: str):
 
 
 if __name__ == '__main__':
-    file_path = sys.argv[1] if len(sys.argv) > 1 else 'data/mistral_training.jsonl'
+    parser = argparse.ArgumentParser(description='Validate chat training JSONL')
+    parser.add_argument('file', nargs='?', default='data/mistral_training.jsonl', help='Training JSONL')
+    parser.add_argument('--schema', choices=sorted(SCHEMAS), default='messages',
+                        help='Record layout (prompt: ollama system/prompt/response records)')
+    parser.add_argument('--processes', type=int, default=None, help='Worker processes (default: all CPUs)')
+    parser.add_argument('--tokenizer', default=None, help='Tokenizer for token-length histograms')
+    args = parser.parse_args()
 
-    if not Path(file_path).exists():
-        print(f"❌ File not found: {file_path}")
+    if not Path(args.file).exists():
+        print(f"❌ File not found: {args.file}")
         sys.exit(1)
 
-    success = validate_jsonl(file_path)
+    success = validate_jsonl(args.file, processes=args.processes, tokenizer=args.tokenizer, schema=args.schema)
     sys.exit(0 if success else 1)
@@ -0,0 +1,596 @@
+#!/usr/bin/env python3
+"""
+Lease-based work queue for sharding a crawl across processes and machines
+
+Match URLs are enqueued once. A worker leases one match at a time; the lease
+expires after a visibility timeout unless the worker keeps heartbeating, so a
+crashed worker's match is picked up again by someone else. Every lease carries
+a fencing token: a worker whose lease expired cannot complete or fail the task
+after it has been handed to another worker, so each match is scraped and
+stored by exactly one live worker.
+
+Backends:
+    SQLite (default)    one file, for all processes of one box (or a shared volume)
+    Redis               redis://host:6379/0, for several boxes (requires `redis`)
+
+Scraped commentary is stored in the queue itself, which is the shared sink all
+workers push to; `export` writes it out as JSONL.
+
+Usage:
+    python work_queue.py enqueue --matches data/lequipe_commented_matches.json
+    python work_queue.py worker --processes 8
+    python work_queue.py worker --queue redis://10.0.0.5:6379/0 --processes 8
+    python work_queue.py status
+    python work_queue.py export data/raw_commentary.jsonl
+"""
+
+import os
+import json
+import time
+import socket
+import asyncio
+import sqlite3
+import argparse
+import multiprocessing
+from dataclasses import dataclass
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+import logging
+
+from commentary_entry import json_default
+
+try:
+    import redis
+except ImportError:  # Only needed for redis:// queues
+    redis = None
+
+logging.basicConfig(
+    level=logging.INFO,
+    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s'
+)
+logger = logging.getLogger(__name__)
+
+DATA_DIR = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'data')
+DEFAULT_QUEUE = os.path.join(DATA_DIR, 'work_queue.db')
+
+STATUS_PENDING = 'pending'
+STATUS_LEASED = 'leased'
+STATUS_DONE = 'done'
+STATUS_FAILED = 'failed'
+
+
+@dataclass
+class Lease:
+    """A task handed to one worker until `expires`"""
+    key: str
+    payload: Dict
+    owner: str
+    token: int
+    expires: float
+
+
+class SQLiteWorkQueue:
+    """Work queue in a SQLite database (WAL mode, safe across processes)"""
+
+    def __init__(self, path: str = DEFAULT_QUEUE, visibility_timeout: float = 300.0, max_attempts: int = 3):
+        """
+        Open (or create) a queue
+
+        Args:
+            path: Database file
+            visibility_timeout: Seconds a lease lasts without a heartbeat
+            max_attempts: Leases per task before it is marked failed
+        """
+        self.path = path
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        self.conn = sqlite3.connect(path, timeout=30, isolation_level=None)
+        self.conn.execute('PRAGMA journal_mode=WAL')
+        self.conn.execute('PRAGMA synchronous=NORMAL')
+        self.conn.executescript('''
+            CREATE TABLE IF NOT EXISTS tasks (
+                key TEXT PRIMARY KEY,
+                payload TEXT NOT NULL,
+                status TEXT NOT NULL DEFAULT 'pending',
+                owner TEXT,
+                token INTEGER NOT NULL DEFAULT 0,
+                lease_expires REAL NOT NULL DEFAULT 0,
+                error TEXT,
+                result_count INTEGER,
+                updated_at REAL
+            );
+            CREATE INDEX IF NOT EXISTS tasks_status ON tasks (status, lease_expires);
+            CREATE TABLE IF NOT EXISTS results (
+                key TEXT PRIMARY KEY,
+                entries TEXT NOT NULL
+            );
+        ''')
+
+    def enqueue(self, tasks: Iterable[Tuple[str, Dict]]) -> int:
+        """
+        Add tasks; keys already in the queue are ignored
+
+        Args:
+            tasks: (key, payload) pairs
+
+        Returns:
+            Number of new tasks
+        """
+        now = time.time()
+        with self._transaction() as cursor:
+            before = cursor.execute('SELECT COUNT(*) FROM tasks').fetchone()[0]
+            cursor.executemany(
+                'INSERT OR IGNORE INTO tasks (key, payload, updated_at) VALUES (?, ?, ?)',
+                ((key, json.dumps(payload, ensure_ascii=False), now) for key, payload in tasks)
+            )
+            return cursor.execute('SELECT COUNT(*) FROM tasks').fetchone()[0] - before
+
+    def lease(self, owner: str) -> Optional[Lease]:
+        """
+        Lease the next pending task, or one whose lease has expired
+
+        Args:
+            owner: Worker id
+
+        Returns:
+            Lease, or None if nothing is available right now
+        """
+        now = time.time()
+        expires = now + self.visibility_timeout
+
+        with self._transaction() as cursor:
+            # Expired leases that used their last attempt are given up
+            cursor.execute(
+                "UPDATE tasks SET status = ?, error = 'lease expired', updated_at = ? "
+                "WHERE status = ? AND lease_expires < ? AND token >= ?",
+                (STATUS_FAILED, now, STATUS_LEASED, now, self.max_attempts)
+            )
+            row = cursor.execute(
+                "SELECT key, payload, token FROM tasks "
+                "WHERE status = ? OR (status = ? AND lease_expires < ?) "
+                "ORDER BY rowid LIMIT 1",
+                (STATUS_PENDING, STATUS_LEASED, now)
+            ).fetchone()
+            if row is None:
+                return None
+
+            key, payload, token = row
+            cursor.execute(
+                'UPDATE tasks SET status = ?, owner = ?, token = ?, lease_expires = ?, updated_at = ? WHERE key = ?',
+                (STATUS_LEASED, owner, token + 1, expires, now, key)
+            )
+
+        return Lease(key=key, payload=json.loads(payload), owner=owner, token=token + 1, expires=expires)
+
+    def heartbeat(self, lease: Lease) -> bool:
+        """
+        Extend a lease by the visibility timeout
+
+        Returns:
+            False if the lease was lost (expired and handed to another worker)
+        """
+        expires = time.time() + self.visibility_timeout
+        if not self._update_leased(lease, 'lease_expires = ?', (expires,)):
+            return False
+        lease.expires = expires
+        return True
+
+    def complete(self, lease: Lease, entries: List[Dict]) -> bool:
+        """
+        Store a task's results and mark it done
+
+        Returns:
+            False if the lease was lost; the results are then discarded
+        """
+        with self._transaction() as cursor:
+            if not self._update_leased(lease, 'status = ?, result_count = ?, error = NULL',
+                                       (STATUS_DONE, len(entries)), cursor):
+                return False
+            cursor.execute(
+                'INSERT OR REPLACE INTO results (key, entries) VALUES (?, ?)',
+                (lease.key, json.dumps(entries, ensure_ascii=False, default=json_default))
+            )
+        return True
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        """
+        Release a task after an error; it is retried until max_attempts
+
+        Returns:
+            False if the lease was lost
+        """
+        status = STATUS_FAILED if lease.token >= self.max_attempts else STATUS_PENDING
+        return self._update_leased(lease, 'status = ?, lease_expires = 0, error = ?', (status, error))
+
+    def _update_leased(self, lease: Lease, assignments: str, values: Tuple, cursor=None) -> bool:
+        """Update a task only while this lease still holds it (fencing on owner and token)"""
+        cursor = cursor or self.conn
+        updated = cursor.execute(
+            f'UPDATE tasks SET {assignments}, updated_at = ? '
+            'WHERE key = ? AND status = ? AND owner = ? AND token = ? AND lease_expires >= ?',
+            values + (time.time(), lease.key, STATUS_LEASED, lease.owner, lease.token, time.time())
+        )
+        return updated.rowcount == 1
+
+    def stats(self) -> Dict[str, int]:
+        """Number of tasks per status"""
+        counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        for status, count in self.conn.execute('SELECT status, COUNT(*) FROM tasks GROUP BY status'):
+            counts[status] = count
+        return counts
+
+    def failures(self) -> List[Tuple[str, str]]:
+        """(key, last error) of failed tasks"""
+        return self.conn.execute(
+            'SELECT key, error FROM tasks WHERE status = ? ORDER BY rowid', (STATUS_FAILED,)
+        ).fetchall()
+
+    def iter_results(self) -> Iterator[Tuple[str, List[Dict]]]:
+        """(key, entries) of completed tasks, in enqueue order"""
+        rows = self.conn.execute(
+            'SELECT results.key, results.entries FROM results JOIN tasks ON tasks.key = results.key '
+            'ORDER BY tasks.rowid'
+        )
+        for key, entries in rows:
+            yield key, json.loads(entries)
+
+    def _transaction(self):
+        return _Transaction(self.conn)
+
+    def close(self):
+        self.conn.close()
+
+
+class _Transaction:
+    """BEGIN IMMEDIATE ... COMMIT, so concurrent lease() calls serialize on the write lock"""
+
+    def __init__(self, conn: sqlite3.Connection):
+        self.conn = conn
+
+    def __enter__(self) -> sqlite3.Cursor:
+        self.cursor = self.conn.cursor()
+        self.cursor.execute('BEGIN IMMEDIATE')
+        return self.cursor
+
+    def __exit__(self, exc_type, exc, tb):
+        self.cursor.execute('ROLLBACK' if exc_type else 'COMMIT')
+
+
+# Lua scripts run atomically on the Redis server
+_REDIS_LEASE = '''
+local prefix, now, expires, owner, max_attempts = ARGV[1], tonumber(ARGV[2]), ARGV[3], ARGV[4], tonumber(ARGV[5])
+while true do
+    local key = redis.call('ZRANGEBYSCORE', prefix .. ':leased', '-inf', now, 'LIMIT', 0, 1)[1]
+    if key then
+        redis.call('ZREM', prefix .. ':leased', key)
+    else
+        key = redis.call('LPOP', prefix .. ':pending')
+    end
+    if not key then
+        return nil
+    end
+    local task = prefix .. ':task:' .. key
+    local token = tonumber(redis.call('HGET', task, 'token') or '0')
+    if token >= max_attempts then
+        redis.call('HSET', task, 'status', 'failed', 'error', 'lease expired')
+    else
+        redis.call('HSET', task, 'status', 'leased', 'owner', owner, 'token', token + 1, 'expires', expires)
+        redis.call('ZADD', prefix .. ':leased', expires, key)
+        return {key, redis.call('HGET', task, 'payload'), token + 1}
+    end
+end
+'''
+
+# ARGV: prefix, key, owner, token, now, action, [value]
+_REDIS_UPDATE = '''
+local prefix, key, owner, token, now, action = ARGV[1], ARGV[2], ARGV[3], ARGV[4], tonumber(ARGV[5]), ARGV[6]
+local task = prefix .. ':task:' .. key
+local current = redis.call('HMGET', task, 'status', 'owner', 'token', 'expires')
+if current[1] ~= 'leased' or current[2] ~= owner or current[3] ~= token or tonumber(current[4]) < now then
+    return 0
+end
+if action == 'heartbeat' then
+    redis.call('HSET', task, 'expires', ARGV[7])
+    redis.call('ZADD', prefix .. ':leased', ARGV[7], key)
+elseif action == 'complete' then
+    redis.call('ZREM', prefix .. ':leased', key)
+    redis.call('HSET', task, 'status', 'done', 'result_count', ARGV[8])
+    redis.call('HDEL', task, 'error')
+    redis.call('HSET', prefix .. ':results', key, ARGV[7])
+else
+    redis.call('ZREM', prefix .. ':leased', key)
+    redis.call('HSET', task, 'status', ARGV[8], 'error', ARGV[7])
+    if ARGV[8] == 'pending' then
+        redis.call('RPUSH', prefix .. ':pending', key)
+    end
+end
+return 1
+'''
+
+
+class RedisWorkQueue:
+    """Same queue on a Redis server, for workers on several machines"""
+
+    def __init__(
+        self,
+        url: str,
+        visibility_timeout: float = 300.0,
+        max_attempts: int = 3,
+        prefix: str = 'commentary-queue'
+    ):
+        """
+        Connect to a queue
+
+        Args:
+            url: redis://host:port/db
+            visibility_timeout: Seconds a lease lasts without a heartbeat
+            max_attempts: Leases per task before it is marked failed
+            prefix: Key prefix, to keep several queues on one server
+        """
+        if redis is None:
+            raise ImportError("redis:// queues need the redis package (pip install redis)")
+
+        self.client = redis.Redis.from_url(url, decode_responses=True)
+        self.visibility_timeout = visibility_timeout
+        self.max_attempts = max_attempts
+        self.prefix = prefix
+        self._lease = self.client.register_script(_REDIS_LEASE)
+        self._update = self.client.register_script(_REDIS_UPDATE)
+
+    def enqueue(self, tasks: Iterable[Tuple[str, Dict]]) -> int:
+        added = 0
+        for key, payload in tasks:
+            task = f"{self.prefix}:task:{key}"
+            if self.client.hsetnx(task, 'payload', json.dumps(payload, ensure_ascii=False)):
+                pipe = self.client.pipeline()
+                pipe.hset(task, mapping={'status': STATUS_PENDING, 'token': 0})
+                pipe.rpush(f"{self.prefix}:order", key)
+                pipe.rpush(f"{self.prefix}:pending", key)
+                pipe.execute()
+                added += 1
+        return added
+
+    def lease(self, owner: str) -> Optional[Lease]:
+        now = time.time()
+        expires = now + self.visibility_timeout
+        leased = self._lease(args=[self.prefix, now, expires, owner, self.max_attempts])
+        if not leased:
+            return None
+        key, payload, token = leased
+        return Lease(key=key, payload=json.loads(payload), owner=owner, token=int(token), expires=expires)
+
+    def heartbeat(self, lease: Lease) -> bool:
+        expires = time.time() + self.visibility_timeout
+        if not self._call_update(lease, 'heartbeat', expires):
+            return False
+        lease.expires = expires
+        return True
+
+    def complete(self, lease: Lease, entries: List[Dict]) -> bool:
+        return self._call_update(lease, 'complete', json.dumps(entries, ensure_ascii=False, default=json_default), len(entries))
+
+    def fail(self, lease: Lease, error: str) -> bool:
+        status = STATUS_FAILED if lease.token >= self.max_attempts else STATUS_PENDING
+        return self._call_update(lease, 'fail', error, status)
+
+    def _call_update(self, lease: Lease, action: str, *values) -> bool:
+        args = [self.prefix, lease.key, lease.owner, lease.token, time.time(), action, *values]
+        return bool(self._update(args=args))
+
+    def _keys(self) -> List[str]:
+        return self.client.lrange(f"{self.prefix}:order", 0, -1)
+
+    def stats(self) -> Dict[str, int]:
+        counts = {STATUS_PENDING: 0, STATUS_LEASED: 0, STATUS_DONE: 0, STATUS_FAILED: 0}
+        pipe = self.client.pipeline()
+        for key in self._keys():
+            pipe.hget(f"{self.prefix}:task:{key}", 'status')
+        for status in pipe.execute():
+            counts[status] = counts.get(status, 0) + 1
+        return counts
+
+    def failures(self) -> List[Tuple[str, str]]:
+        failed = []
+        for key in self._keys():
+            status, error = self.client.hmget(f"{self.prefix}:task:{key}", 'status', 'error')
+            if status == STATUS_FAILED:
+                failed.append((key, error))
+        return failed
+
+    def iter_results(self) -> Iterator[Tuple[str, List[Dict]]]:
+        for key in self._keys():
+            entries = self.client.hget(f"{self.prefix}:results", key)
+            if entries is not None:
+                yield key, json.loads(entries)
+
+    def close(self):
+        self.client.close()
+
+
+def open_queue(url: str = DEFAULT_QUEUE, **kwargs):
+    """
+    Open a queue from a URL: redis://... or a SQLite file path (sqlite:/// optional)
+    """
+    if url.startswith(('redis://', 'rediss://')):
+        return RedisWorkQueue(url, **kwargs)
+    if url.startswith('sqlite:///'):
+        url = url[len('sqlite:///'):]
+    return SQLiteWorkQueue(url, **kwargs)
+
+
+def get_scraper(url: str):
+    """Scraper instance for a match URL (Playwright is only imported by workers)"""
+    if 'rmcsport' in url:
+        from scrapers.rmc_playwright_scraper import RMCPlaywrightScraper
+        return RMCPlaywrightScraper()
+
+    from scrapers.lequipe_finished_match_scraper import LeQuipeFinishedMatchScraper
+    return LeQuipeFinishedMatchScraper()
+
+
+async def _keep_alive(queue, lease: Lease, interval: float):
+    """Heartbeat until cancelled; stops once the lease is lost"""
+    while True:
+        await asyncio.sleep(interval)
+        if not queue.heartbeat(lease):
+            logger.warning(f"⚠️  Lost lease on {lease.key}")
+            return
+
+
+async def run_worker(
+    queue,
+    worker_id: str,
+    delay: float = 5.0,
+    poll_interval: float = 10.0,
+    max_tasks: Optional[int] = None
+) -> int:
+    """
+    Lease, scrape and complete matches until the queue is drained
+
+    Args:
+        queue: Work queue
+        worker_id: Unique worker id (host:pid)
+        delay: Seconds to wait between matches (politeness)
+        poll_interval: Seconds to wait when every remaining task is leased by someone else
+        max_tasks: Stop after this many tasks
+
+    Returns:
+        Number of matches this worker completed
+    """
+    completed = 0
+    handled = 0
+    heartbeat_interval = queue.visibility_timeout / 3
+
+    while max_tasks is None or handled < max_tasks:
+        lease = queue.lease(worker_id)
+        if lease is None:
+            counts = queue.stats()
+            if not counts[STATUS_PENDING] and not counts[STATUS_LEASED]:
+                break
+            # Others hold the remaining leases; wait in case one of them dies
+            await asyncio.sleep(poll_interval)
+            continue
+
+        handled += 1
+        url = lease.payload['url']
+        logger.info(f"🎯 [{worker_id}] {lease.key} (attempt {lease.token}): {url}")
+
+        heartbeat = asyncio.create_task(_keep_alive(queue, lease, heartbeat_interval))
+        try:
+            commentary = await get_scraper(url).scrape_match(url)
+            if not commentary:
+                raise RuntimeError('no commentary extracted')
+        except Exception as e:
+            logger.error(f"❌ [{worker_id}] {lease.key}: {e}")
+            queue.fail(lease, str(e))
+        else:
+            if queue.complete(lease, commentary):
+                completed += 1
+                logger.info(f"✅ [{worker_id}] {lease.key}: {len(commentary)} entries")
+            else:
+                logger.warning(f"⚠️  [{worker_id}] {lease.key}: lease lost, results discarded")
+        finally:
+            heartbeat.cancel()
+
+        await asyncio.sleep(delay)
+
+    return completed
+
+
+def _worker_process(queue_url: str, options: Dict):
+    """Entry point of one worker process"""
+    queue = open_queue(queue_url, visibility_timeout=options['visibility_timeout'],
+                       max_attempts=options['max_attempts'])
+    worker_id = f"{socket.gethostname()}:{os.getpid()}"
+    completed = asyncio.run(run_worker(queue, worker_id, delay=options['delay'], max_tasks=options['max_tasks']))
+    logger.info(f"👋 [{worker_id}] done, {completed} matches completed")
+    queue.close()
+
+
+def load_tasks(match_file: Optional[str] = None, url_file: Optional[str] = None) -> List[Tuple[str, Dict]]:
+    """(key, payload) pairs from match finder output and/or a URL list"""
+    from pipeline_runner import match_key
+
+    tasks = []
+    if match_file:
+        with open(match_file, 'r', encoding='utf-8') as f:
+            for match in json.load(f):
+                if match.get('is_fully_commented'):
+                    tasks.append((match_key(match['url']), match))
+
+    if url_file:
+        with open(url_file, 'r', encoding='utf-8') as f:
+            for line in f:
+                url = line.strip()
+                if url and not url.startswith('#'):
+                    tasks.append((match_key(url), {'url': url}))
+
+    return tasks
+
+
+def main():
+    parser = argparse.ArgumentParser(description='Lease-based work queue for distributed scraping')
+    parser.add_argument('--queue', default=DEFAULT_QUEUE, help='SQLite file or redis://host:port/db')
+    parser.add_argument('--visibility-timeout', type=float, default=300.0,
+                        help='Seconds before an un-heartbeated lease is handed to another worker')
+    parser.add_argument('--max-attempts', type=int, default=3, help='Leases per match before giving up')
+    subparsers = parser.add_subparsers(dest='command', required=True)
+
+    enqueue_parser = subparsers.add_parser('enqueue', help='Add match URLs to the queue')
+    enqueue_parser.add_argument('--matches', help='Match finder output (fully commented matches are queued)')
+    enqueue_parser.add_argument('--urls', help='File with one match URL per line')
+
+    worker_parser = subparsers.add_parser('worker', help='Scrape matches from the queue')
+    worker_parser.add_argument('--processes', type=int, default=1, help='Worker processes on this machine')
+    worker_parser.add_argument('--delay', type=float, default=5.0, help='Seconds between matches per worker')
+    worker_parser.add_argument('--max-tasks', type=int, help='Matches per worker before exiting')
+
+    subparsers.add_parser('status', help='Show task counts and failures')
+
+    export_parser = subparsers.add_parser('export', help='Write scraped commentary to JSONL')
+    export_parser.add_argument('output', help='Output JSONL file')
+
+    args = parser.parse_args()
+    queue_options = {'visibility_timeout': args.visibility_timeout, 'max_attempts': args.max_attempts}
+
+    if args.command == 'enqueue':
+        tasks = load_tasks(args.matches, args.urls)
+        queue = open_queue(args.queue, **queue_options)
+        logger.info(f"✅ Enqueued {queue.enqueue(tasks)} new matches ({len(tasks)} given)")
+
+    elif args.command == 'worker':
+        options = dict(queue_options, delay=args.delay, max_tasks=args.max_tasks)
+        if args.processes == 1:
+            _worker_process(args.queue, options)
+            return
+
+        workers = [
+            multiprocessing.Process(target=_worker_process, args=(args.queue, options))
+            for _ in range(args.processes)
+        ]
+        for worker in workers:
+            worker.start()
+        for worker in workers:
+            worker.join()
+
+    elif args.command == 'status':
+        queue = open_queue(args.queue, **queue_options)
+        for status, count in queue.stats().items():
+            logger.info(f"   {status}: {count}")
+        for key, error in queue.failures():
+            logger.info(f"   ❌ {key}: {error}")
+
+    elif args.command == 'export':
+        from stream_pipeline import write_jsonl
+
+        queue = open_queue(args.queue, **queue_options)
+        written = write_jsonl(
+            (entry for _, entries in queue.iter_results() for entry in entries),
+            args.output
+        )
+        logger.info(f"💾 Exported {written} entries to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -2,13 +2,26 @@
 """
 Enhanced commentary generator with context memory and anti-repetition
 Uses configuration-driven model selection
+
+stream() yields the commentary as the model writes it and stops as soon as
+a complete sentence lands inside the 30-60 word target, so a live goal
+commentary can start showing within a second. It records time to first
+token, tokens per second and total time separately.
 """
 
+import re
+import json
 import requests
 import time
-from typing import List, Dict
+from typing import List, Dict, Iterator, Optional
 from model_config import ModelConfig
 
+MIN_WORDS = 30  # Target length of a commentary, from the prompt
+MAX_WORDS = 60
+
+# Text ending a sentence: . ! ? or … (optionally followed by a closing quote or bracket)
+SENTENCE_END_RE = re.compile(r'[.!?…][»)\]]?\s*$')
+
 
 class CommentaryGenerator:
     """Generate commentary with context memory to avoid repetition"""
@@ -16,8 +29,9 @@ class CommentaryGenerator:
     def __init__(self, ollama_url: str = "http://localhost:11434"):
         self.ollama_url = ollama_url
         self.context_memory: List[Dict] = []  # Last 10 events
+        self.last_stream: Optional[Dict] = None  # Result and timings of the last stream()
 
-    def generate(self, minute: int, event_type: str, context: str = "") -> Dict:
+    def generate(self, minute: int, event_type: str, context: str = "", stream: bool = False) -> Dict:
         """
         Generate commentary with anti-repetition context
 
@@ -25,41 +39,20 @@ class CommentaryGenerator:
             minute: Match minute (e.g., 23, "45'+2")
             event_type: Type of event (goal, commentary, substitution, etc.)
             context: Additional context about the event
+            stream: Generate through stream() (early stop, latency breakdown)
 
         Returns:
-            Dict with 'text', 'model', 'generation_time_ms'
+            Dict with 'text', 'model', 'generation_time_ms' (and with stream,
+            the stream() timings)
         """
+        if stream:
+            for _ in self.stream(minute, event_type, context):
+                pass
+            return self.last_stream
+
         model = ModelConfig.get_active_model()
         params = ModelConfig.get_model_params(model)
-
-        # Build context-aware prompt
-        recent_events = "\n".join([
-            f"{e['minute']}': {e['text'][:50]}..."
-            for e in self.context_memory[-5:]
-        ]) if self.context_memory else "Début du match"
-
-        # Map event types to French
-        event_type_fr = {
-            'goal': 'But',
-            'commentary': 'Commentaire général',
-            'yellow_card': 'Carton jaune',
-            'red_card': 'Carton rouge',
-            'substitution': 'Remplacement',
-            'penalty': 'Pénalty',
-            'corner': 'Corner',
-            'free_kick': 'Coup franc'
-        }.get(event_type, event_type)
-
-        prompt = f"""Tu es un commentateur sportif pour Afrique Sports.
-
-Événements récents:
-{recent_events}
-
-Minute actuelle: {minute}'
-Type d'événement: {event_type_fr}
-{f'Contexte: {context}' if context else ''}
-
-Génère UN commentaire court (30-60 mots) DIFFÉRENT des précédents. Varie ton style: parfois court et percutant, parfois plus descriptif. SANS GUILLEMETS."""
+        prompt = self._build_prompt(minute, event_type, context)
 
         # Generate
         start_time = time.time()
@@ -71,13 +64,7 @@ Génère UN commentaire court (30-60 mots) DIFFÉRENT des précédents. Varie to
                     'model': model,
                     'prompt': prompt,
                     'stream': False,
-                    'options': {
-                        'temperature': params['temperature'],
-                        'top_p': params['top_p'],
-                        'top_k': params['top_k'],
-                        'repeat_penalty': params['repeat_penalty'],
-                        'num_predict': params.get('num_predict', 120)
-                    }
+                    'options': self._options(params)
                 },
                 timeout=120
             )
@@ -87,21 +74,8 @@ Génère UN commentaire court (30-60 mots) DIFFÉRENT des précédents. Varie to
             if response.status_code != 200:
                 raise Exception(f"Ollama error: {response.status_code}")
 
-            text = response.json()['response'].strip()
-
-            # Clean up formatting
-            text = text.replace('"', '').replace("'", "'")
-
-            # Update context memory
-            self.context_memory.append({
-                'minute': minute,
-                'text': text,
-                'event_type': event_type
-            })
-
-            # Keep only last 10 events
-            if len(self.context_memory) > 10:
-                self.context_memory = self.context_memory[-10:]
+            text = self._clean(response.json()['response']).strip()
+            self._remember(minute, event_type, text)
 
             return {
                 'text': text,
@@ -118,6 +92,166 @@ Génère UN commentaire court (30-60 mots) DIFFÉRENT des précédents. Varie to
                 'error': str(e)
             }
 
+    def stream(
+        self,
+        minute: int,
+        event_type: str,
+        context: str = "",
+        stop_early: bool = True,
+        read_timeout: float = 30
+    ) -> Iterator[str]:
+        """
+        Generate commentary token by token
+
+        The request is closed (and Ollama stops generating) once the text ends
+        a sentence with MIN_WORDS to MAX_WORDS words. When the generator is
+        exhausted, self.last_stream holds the result: 'text', 'model',
+        'time_to_first_token_ms', 'tokens', 'tokens_per_second',
+        'generation_time_ms' (total), 'stopped_early' (and 'error').
+
+        Args:
+            minute: Match minute (e.g., 23, "45'+2")
+            event_type: Type of event (goal, commentary, substitution, etc.)
+            context: Additional context about the event
+            stop_early: Stop at the first complete sentence inside the target length
+            read_timeout: Seconds to wait for each chunk (not for the whole completion)
+
+        Yields:
+            Text deltas, in order
+        """
+        model = ModelConfig.get_active_model()
+        params = ModelConfig.get_model_params(model)
+        prompt = self._build_prompt(minute, event_type, context)
+
+        result = {'text': '', 'model': model, 'time_to_first_token_ms': None, 'tokens': 0,
+                  'tokens_per_second': None, 'generation_time_ms': 0, 'stopped_early': False}
+        self.last_stream = result
+        text = ''
+        first_token_time = None
+        start_time = time.time()
+
+        try:
+            with requests.post(
+                f'{self.ollama_url}/api/generate',
+                json={
+                    'model': model,
+                    'prompt': prompt,
+                    'stream': True,
+                    'options': self._options(params)
+                },
+                stream=True,
+                timeout=(10, read_timeout)
+            ) as response:
+                if response.status_code != 200:
+                    raise Exception(f"Ollama error: {response.status_code}")
+
+                # One JSON object per line: {"response": "<token>", "done": false, ...}
+                for line in response.iter_lines():
+                    if not line:
+                        continue
+                    chunk = json.loads(line)
+                    if chunk.get('error'):
+                        raise Exception(f"Ollama error: {chunk['error']}")
+
+                    delta = self._clean(chunk.get('response', ''))
+                    if first_token_time is None:
+                        delta = delta.lstrip()
+                    if delta:
+                        if first_token_time is None:
+                            first_token_time = time.time()
+                        result['tokens'] += 1
+                        text += delta
+                        yield delta
+
+                    if chunk.get('done'):
+                        # Ollama's own count, when the completion ran to the end
+                        result['tokens'] = chunk.get('eval_count', result['tokens'])
+                        break
+                    if stop_early and SENTENCE_END_RE.search(text) and MIN_WORDS <= len(text.split()) <= MAX_WORDS:
+                        result['stopped_early'] = True
+                        break
+
+        except Exception as e:
+            print(f"❌ Generation error: {e}")
+            result['error'] = str(e)
+            if not text:
+                text = f"Minute {minute}' - Action en cours..."
+                yield text
+
+        end_time = time.time()
+        text = text.strip()
+        result['text'] = text
+        result['generation_time_ms'] = (end_time - start_time) * 1000
+        if first_token_time is not None:
+            result['time_to_first_token_ms'] = (first_token_time - start_time) * 1000
+            # Decoding rate after the first token (the first one also pays for the prompt)
+            if result['tokens'] > 1 and end_time > first_token_time:
+                result['tokens_per_second'] = (result['tokens'] - 1) / (end_time - first_token_time)
+
+        if 'error' not in result:
+            self._remember(minute, event_type, text)
+
+    def _build_prompt(self, minute: int, event_type: str, context: str) -> str:
+        """Context-aware prompt, with the last events to avoid repetition"""
+        # Build context-aware prompt
+        recent_events = "\n".join([
+            f"{e['minute']}': {e['text'][:50]}..."
+            for e in self.context_memory[-5:]
+        ]) if self.context_memory else "Début du match"
+
+        # Map event types to French
+        event_type_fr = {
+            'goal': 'But',
+            'commentary': 'Commentaire général',
+            'yellow_card': 'Carton jaune',
+            'red_card': 'Carton rouge',
+            'substitution': 'Remplacement',
+            'penalty': 'Pénalty',
+            'corner': 'Corner',
+            'free_kick': 'Coup franc'
+        }.get(event_type, event_type)
+
+        prompt = f"""Tu es un commentateur sportif pour Afrique Sports.
+
+Événements récents:
+{recent_events}
+
+Minute actuelle: {minute}'
+Type d'événement: {event_type_fr}
+{f'Contexte: {context}' if context else ''}
+
+Génère UN commentaire court ({MIN_WORDS}-{MAX_WORDS} mots) DIFFÉRENT des précédents. Varie ton style: parfois court et percutant, parfois plus descriptif. SANS GUILLEMETS."""
+
+        return prompt
+
+    @staticmethod
+    def _options(params: Dict) -> Dict:
+        """Ollama sampling options from the model parameters"""
+        return {
+            'temperature': params['temperature'],
+            'top_p': params['top_p'],
+            'top_k': params['top_k'],
+            'repeat_penalty': params['repeat_penalty'],
+            'num_predict': params.get('num_predict', 120)
+        }
+
+    @staticmethod
+    def _clean(text: str) -> str:
+        """Clean up formatting"""
+        return text.replace('"', '').replace("'", "'")
+
+    def _remember(self, minute: int, event_type: str, text: str):
+        """Update context memory"""
+        self.context_memory.append({
+            'minute': minute,
+            'text': text,
+            'event_type': event_type
+        })
+
+        # Keep only last 10 events
+        if len(self.context_memory) > 10:
+            self.context_memory = self.context_memory[-10:]
+
     def clear_context(self):
         """Clear context memory (e.g., at start of new match)"""
         self.context_memory = []
@@ -129,15 +263,19 @@ if __name__ == '__main__':
     # Test the generator
     generator = CommentaryGenerator()
 
-    if len(sys.argv) < 3:
-        print("Usage: python commentary_generator.py <minute> <event_type> [context]")
+    streaming = '--stream' in sys.argv
+    args = [arg for arg in sys.argv[1:] if arg != '--stream']
+
+    if len(args) < 2:
+        print("Usage: python commentary_generator.py <minute> <event_type> [context] [--stream]")
         print("\nExample:")
         print("  python commentary_generator.py 23 goal 'Mbappé frappe du gauche'")
+        print("  python commentary_generator.py 23 goal 'Mbappé frappe du gauche' --stream")
         sys.exit(1)
 
-    minute = sys.argv[1]
-    event_type = sys.argv[2]
-    context = sys.argv[3] if len(sys.argv) > 3 else ""
+    minute = args[0]
+    event_type = args[1]
+    context = args[2] if len(args) > 2 else ""
 
     print(f"\n🎯 Generating commentary...")
     print(f"   Minute: {minute}'")
@@ -145,6 +283,23 @@ if __name__ == '__main__':
     if context:
         print(f"   Context: {context}")
 
+    if streaming:
+        print("\n➡️  ", end='', flush=True)
+        for delta in generator.stream(minute, event_type, context):
+            print(delta, end='', flush=True)
+        result = generator.last_stream
+
+        print(f"\n\n{'='*70}")
+        print(f"Model: {result['model']}")
+        if result['time_to_first_token_ms'] is not None:
+            print(f"First token: {result['time_to_first_token_ms']:.0f}ms")
+        if result['tokens_per_second'] is not None:
+            print(f"Speed: {result['tokens_per_second']:.1f} tokens/s ({result['tokens']} tokens)")
+        print(f"Total: {result['generation_time_ms']:.0f}ms"
+              f"{' (stopped at a complete sentence)' if result['stopped_early'] else ''}")
+        print(f"{'='*70}\n")
+        sys.exit(0)
+
     result = generator.generate(minute, event_type, context)
 
     print(f"\n{'='*70}")
@@ -0,0 +1,6 @@
+"""Shared fixtures; the deployment scripts are flat modules, imported from the parent directory"""
+
+import os
+import sys
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
@@ -0,0 +1,103 @@
+"""Commentary generator: streaming early stop, token counts, error fallback"""
+
+import json
+
+import pytest
+
+import commentary_generator
+from commentary_generator import MAX_WORDS, MIN_WORDS, CommentaryGenerator
+from model_config import ModelConfig
+
+
+class FakeResponse:
+    """Streamed Ollama response: one NDJSON line per chunk, counting the lines read"""
+
+    def __init__(self, chunks, status_code=200):
+        self.chunks = chunks
+        self.status_code = status_code
+        self.read = 0
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def iter_lines(self):
+        for chunk in self.chunks:
+            self.read += 1
+            yield json.dumps(chunk).encode('utf-8')
+
+
+@pytest.fixture
+def ollama(monkeypatch, tmp_path):
+    """Install a fake response for the next requests.post"""
+    monkeypatch.setattr(ModelConfig, 'CONFIG_PATH', tmp_path / 'models.json')
+
+    def reply(chunks, status_code=200):
+        response = FakeResponse(chunks, status_code)
+        monkeypatch.setattr(commentary_generator.requests, 'post', lambda *args, **kwargs: response)
+        return response
+
+    return reply
+
+
+def words(n, end='.'):
+    """Chunks of n words, one per token, the last one ending with `end`"""
+    return [{'response': f" mot{i}" + (end if i == n - 1 else ''), 'done': False} for i in range(n)]
+
+
+def test_stream_stops_at_first_sentence_end_inside_target(ollama):
+    # A sentence ending before MIN_WORDS does not stop the stream, the one ending at 35 words does
+    chunks = words(10) + words(25) + words(10) + [{'response': '', 'done': True, 'eval_count': 99}]
+    response = ollama(chunks)
+    generator = CommentaryGenerator()
+
+    deltas = list(generator.stream(23, 'goal'))
+    result = generator.last_stream
+
+    assert response.read == 35
+    assert result['stopped_early']
+    assert len(result['text'].split()) == 35
+    assert MIN_WORDS <= 35 <= MAX_WORDS
+    assert result['text'] == ''.join(deltas).strip()
+    assert result['tokens'] == 35
+    assert 'error' not in result
+    assert generator.context_memory == [{'minute': 23, 'text': result['text'], 'event_type': 'goal'}]
+
+
+def test_stream_counts_tokens_from_eval_count_when_done(ollama):
+    ollama(words(12) + [{'response': '', 'done': True, 'eval_count': 42}])
+    generator = CommentaryGenerator()
+
+    list(generator.stream(60, 'commentary'))
+
+    assert not generator.last_stream['stopped_early']
+    assert generator.last_stream['tokens'] == 42
+    assert len(generator.last_stream['text'].split()) == 12
+
+
+def test_stream_falls_back_on_http_error_without_remembering(ollama):
+    ollama([], status_code=500)
+    generator = CommentaryGenerator()
+
+    deltas = list(generator.stream(45, 'commentary'))
+    result = generator.last_stream
+
+    assert deltas == ["Minute 45' - Action en cours..."]
+    assert result['text'] == "Minute 45' - Action en cours..."
+    assert result['error'] == 'Ollama error: 500'
+    assert result['time_to_first_token_ms'] is None
+    assert generator.context_memory == []
+
+
+def test_stream_keeps_partial_text_on_midstream_error(ollama):
+    ollama(words(5, end='') + [{'error': 'model unloaded'}])
+    generator = CommentaryGenerator()
+
+    deltas = list(generator.stream(70, 'commentary'))
+
+    assert len(deltas) == 5
+    assert generator.last_stream['text'] == 'mot0 mot1 mot2 mot3 mot4'
+    assert generator.last_stream['error'] == 'Ollama error: model unloaded'
+    assert generator.context_memory == []